@@ -0,0 +1,276 @@
+"""
+Offline batch submission for whole-vplan generation.
+Renders requests into a JSONL file, submits them through a provider batch API,
+polls for completion and hands back one chat completion per request.
+"""
+
+import re
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable
+from rich.console import Console
+
+console = Console()
+
+
+class BatchError(RuntimeError):
+    """A batch failed, expired or was cancelled on the provider side."""
+
+
+class BatchPending(Exception):
+    """A batch was submitted (or is still running) and --batch-no-wait was given."""
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one request in a batch."""
+    custom_id: str
+    response: Optional[Dict[str, Any]] = None  # Chat completion body
+    error: Optional[str] = None
+
+
+def make_custom_id(name: str) -> str:
+    """Turn an artifact name into a provider-safe custom_id (<= 64 chars)."""
+    custom_id = re.sub(r'[^A-Za-z0-9_-]', '_', name)
+    if len(custom_id) > 64:
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:12]
+        custom_id = f"{custom_id[:51]}_{digest}"
+    return custom_id
+
+
+class BatchProvider:
+    """Base class for batch back-ends."""
+
+    name = "base"
+
+    def submit(self, requests_path: Path) -> str:
+        """Submit a JSONL request file. Returns the batch id."""
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> str:
+        """Return 'in_progress', 'completed' or 'failed'."""
+        raise NotImplementedError
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Fetch the results of a completed batch, keyed on custom_id."""
+        raise NotImplementedError
+
+
+def _parse_output_lines(text: str) -> Dict[str, BatchResult]:
+    """Parse OpenAI batch output/error JSONL."""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record["custom_id"]
+        response = record.get("response") or {}
+        if record.get("error"):
+            error = record["error"].get("message", str(record["error"]))
+            results[custom_id] = BatchResult(custom_id, error=error)
+        elif response.get("status_code", 200) != 200:
+            error = json.dumps(response.get("body", {}))
+            results[custom_id] = BatchResult(custom_id, error=f"HTTP {response['status_code']}: {error}")
+        else:
+            results[custom_id] = BatchResult(custom_id, response=response["body"])
+    return results
+
+
+class OpenAIBatchProvider(BatchProvider):
+    """OpenAI Batch API (/v1/chat/completions, 24h completion window)."""
+
+    name = "openai"
+    FAILED_STATES = {"failed", "expired", "cancelled", "cancelling"}
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, requests_path: Path) -> str:
+        with open(requests_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return "completed"
+        if batch.status in self.FAILED_STATES:
+            return "failed"
+        return "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                results.update(_parse_output_lines(self.client.files.content(file_id).text))
+        return results
+
+
+class LocalBatchProvider(BatchProvider):
+    """
+    File-based stand-in for a batch API, for offline runs.
+
+    Each batch is a directory ``<root>/<batch_id>/`` holding ``input.jsonl``.
+    The batch completes once ``output.jsonl`` exists; each output line is
+    either ``{"custom_id": ..., "content": "<code>"}`` or
+    ``{"custom_id": ..., "error": "<message>"}``. The output file is written by
+    ``responder`` at submit time when one is given, otherwise by hand or by
+    an external tool.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Path, responder: Optional[Callable[[str, Dict[str, Any]], str]] = None):
+        self.root = Path(root)
+        self.responder = responder
+
+    def submit(self, requests_path: Path) -> str:
+        batch_id = f"local_{int(time.time() * 1000)}"
+        batch_dir = self.root / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(requests_path, batch_dir / "input.jsonl")
+
+        if self.responder:
+            lines = []
+            for request in _read_jsonl(batch_dir / "input.jsonl"):
+                content = self.responder(request["custom_id"], request["body"])
+                lines.append(json.dumps({"custom_id": request["custom_id"], "content": content}))
+            (batch_dir / "output.jsonl").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        batch_dir = self.root / batch_id
+        if not batch_dir.exists():
+            return "failed"
+        return "completed" if (batch_dir / "output.jsonl").exists() else "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch_dir = self.root / batch_id
+        models = {r["custom_id"]: r["body"].get("model", "local") for r in _read_jsonl(batch_dir / "input.jsonl")}
+
+        results = {}
+        for record in _read_jsonl(batch_dir / "output.jsonl"):
+            custom_id = record["custom_id"]
+            if record.get("error"):
+                results[custom_id] = BatchResult(custom_id, error=record["error"])
+                continue
+            # Wrap plain content in a chat completion body like the real API
+            results[custom_id] = BatchResult(custom_id, response={
+                "id": f"{batch_id}-{custom_id}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": models.get(custom_id, "local"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": record.get("content", "")},
+                    "finish_reason": record.get("finish_reason", "stop"),
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        return results
+
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    """Read a JSONL file, skipping blank lines."""
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+class BatchJob:
+    """
+    Submit-or-resume driver for batch stages.
+
+    Each stage (e.g. ``vseq``, ``test``) is recorded in ``<work_dir>/state.json``
+    with its batch id and a hash of the request bodies. Rerunning with the
+    same requests picks up the existing batch instead of submitting a new one;
+    changed requests start a fresh batch.
+    """
+
+    def __init__(self, provider: BatchProvider, work_dir: Path, poll_interval: float = 60.0, wait: bool = True):
+        self.provider = provider
+        self.work_dir = Path(work_dir)
+        self.poll_interval = poll_interval
+        self.wait = wait
+        self.state_path = self.work_dir / "state.json"
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+    def _load_state(self) -> Dict[str, Any]:
+        if self.state_path.exists():
+            try:
+                return json.loads(self.state_path.read_text(encoding="utf-8"))
+            except ValueError:
+                console.print(f"[yellow]Ignoring unreadable batch state: {self.state_path}[/yellow]")
+        return {}
+
+    def _save_state(self, state: Dict[str, Any]):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+    def run(self, stage: str, requests: Dict[str, Dict[str, Any]]) -> Dict[str, BatchResult]:
+        """
+        Run one stage to completion.
+
+        Args:
+            stage: Stage name, used for the request file and state entry
+            requests: Chat completion request bodies keyed on custom_id
+
+        Returns:
+            Results keyed on custom_id
+
+        Raises:
+            BatchPending: The batch is still running and wait is disabled
+            BatchError: The provider reported the batch as failed
+        """
+        request_hash = hashlib.sha256(
+            json.dumps(requests, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+        state = self._load_state()
+        entry = state.get(stage)
+        if entry and entry.get("request_hash") == request_hash and entry.get("provider") == self.provider.name:
+            batch_id = entry["batch_id"]
+            console.print(f"  [dim]Resuming {stage} batch {batch_id}[/dim]")
+        else:
+            requests_path = self.work_dir / f"{stage}_requests.jsonl"
+            with open(requests_path, "w", encoding="utf-8") as f:
+                for custom_id, body in requests.items():
+                    f.write(json.dumps({
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": body,
+                    }, ensure_ascii=False) + "\n")
+
+            batch_id = self.provider.submit(requests_path)
+            state[stage] = {
+                "batch_id": batch_id,
+                "provider": self.provider.name,
+                "request_hash": request_hash,
+                "requests": len(requests),
+                "submitted_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._save_state(state)
+            console.print(f"  [cyan]Submitted {stage} batch {batch_id} ({len(requests)} requests)[/cyan]")
+
+        while True:
+            status = self.provider.status(batch_id)
+            if status == "completed":
+                return self.provider.results(batch_id)
+            if status == "failed":
+                # Forget the batch so the next run resubmits
+                state.pop(stage, None)
+                self._save_state(state)
+                raise BatchError(f"{stage} batch {batch_id} failed on the provider side")
+            if not self.wait:
+                raise BatchPending(f"{stage} batch {batch_id} is in progress")
+            time.sleep(self.poll_interval)
@@ -0,0 +1,112 @@
+"""
+Run journal for checkpoint/resume.
+Progress of a run (start, each finished artifact with its manifest
+fingerprint, finished phases, clean end) is appended to a JSONL file in the
+output directory and flushed to disk line by line, so it survives a crash,
+Ctrl-C or a killed process. ``--resume`` replays the journal of an
+interrupted run: its finished artifacts are kept instead of regenerated.
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+STATE_FILE = ".run_state.jsonl"
+
+
+@dataclass
+class InterruptedRun:
+    """Progress of a run that ended without finishing."""
+    started: str
+    settings: Dict[str, Any]
+    artifacts: Dict[str, str] = field(default_factory=dict)  # relative path -> inputs fingerprint
+    phases_done: List[str] = field(default_factory=list)
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of the current run.
+
+    Each line is written with a single write, flushed and fsync'ed; a torn
+    last line (process killed mid-write) is ignored when the journal is read.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / STATE_FILE
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load_interrupted(self) -> Optional[InterruptedRun]:
+        """Progress of the previous run, or None if there is none or it finished cleanly."""
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            return None
+        run = None
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            kind = event.get("event")
+            if kind == "run_start":
+                run = InterruptedRun(event.get("time", ""), event.get("settings", {}))
+            elif run is None:
+                continue
+            elif kind == "artifact":
+                run.artifacts[event["path"]] = event["inputs"]
+            elif kind == "phase_done":
+                run.phases_done.append(event["phase"])
+            elif kind == "run_done":
+                run = None
+        return run
+
+    def start(self, settings: Dict[str, Any], carried: Optional[InterruptedRun] = None):
+        """Begin a new journal, carrying over the artifacts of a resumed run."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        events = [self._event("run_start", settings=settings)]
+        if carried:
+            events.extend(self._event("artifact", path=path, inputs=inputs)
+                          for path, inputs in carried.artifacts.items())
+            events.extend(self._event("phase_done", phase=phase) for phase in carried.phases_done)
+        # Replace the old journal atomically, then append to the new one
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(''.join(json.dumps(event) + "\n" for event in events))
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a")
+
+    def artifact_done(self, output_path: Path, inputs: str):
+        """Journal a written artifact and the fingerprint it was generated from."""
+        self._append(self._event("artifact", path=Path(output_path).relative_to(self.output_dir).as_posix(),
+                                 inputs=inputs))
+
+    def phase_done(self, phase: str):
+        """Journal a finished phase."""
+        self._append(self._event("phase_done", phase=phase))
+
+    def finish(self):
+        """Journal the clean end of the run (nothing left to resume) and close the journal."""
+        self._append(self._event("run_done"))
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _event(self, kind: str, **fields) -> Dict[str, Any]:
+        return {"event": kind, "time": datetime.now().isoformat(timespec="seconds"), **fields}
+
+    def _append(self, event: Dict[str, Any]):
+        with self._lock:
+            if not self._file:
+                return
+            self._file.write(json.dumps(event) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
@@ -0,0 +1,153 @@
+"""
+Structural clustering of vplan test cases.
+Test cases with the same active UVCs, stimulus sections, targets and
+ps_phase differ only in register values and pattern bins. With
+``--cluster`` Phase B asks the LLM for one template per cluster, written
+with ``@@NAME@@`` placeholders for those values, and instantiates every
+member locally by substitution, so LLM calls scale with the number of
+distinct shapes instead of the number of tests.
+"""
+
+import re
+import json
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from parsers import TestCase
+
+PLACEHOLDER_RE = re.compile(r"@@(\w+)@@")
+
+# Regbank fields that change the shape of the generated code rather than a value in it
+STRUCTURAL_FIELDS = ('ps_phase',)
+
+
+def placeholder(name: str) -> str:
+    return f"@@{name}@@"
+
+
+@dataclass
+class TestCaseCluster:
+    """Test cases sharing one structural signature, in vplan order."""
+    signature: Tuple
+    members: List[TestCase] = field(default_factory=list)
+
+    @property
+    def exemplar(self) -> TestCase:
+        """The member the LLM generates the template from."""
+        return self.members[0]
+
+
+def _is_value(value: Any) -> bool:
+    """Scalar regbank value that can be substituted into a template."""
+    return not isinstance(value, (dict, list)) and '\n' not in str(value)
+
+
+def structural_signature(test_case: TestCase) -> Tuple:
+    """Everything that shapes a test case's code: active UVCs, stimulus
+    sections and targets, regbank fields, ps_phase and non-scalar settings."""
+    stimulus = test_case.stimulus
+    sections = tuple(name for name in ('regbank_program', 'input_provisioning', 'trigger_compute', 'output_read')
+                     if getattr(stimulus, name))
+    regbank = stimulus.regbank_program or {}
+    fixed = tuple(sorted((key, json.dumps(value, sort_keys=True, default=str)) for key, value in regbank.items()
+                         if key in STRUCTURAL_FIELDS or not _is_value(value)))
+    return (
+        tuple(sorted(test_case.active_uvcs)),
+        sections,
+        tuple(sorted(regbank)),
+        fixed,
+        tuple(sorted(stimulus.input_provisioning or {})),
+        tuple(sorted(stimulus.output_read or {})),
+    )
+
+
+def cluster_test_cases(test_cases: List[TestCase]) -> List[TestCaseCluster]:
+    """Group test cases by structural signature (clusters in order of first member)."""
+    clusters: Dict[Tuple, TestCaseCluster] = {}
+    for test_case in test_cases:
+        signature = structural_signature(test_case)
+        clusters.setdefault(signature, TestCaseCluster(signature)).members.append(test_case)
+    return list(clusters.values())
+
+
+def _sv_value(value: Any) -> str:
+    """Template value of a regbank field: binary strings as integers, dont_care as 0."""
+    text = str(value)
+    if re.fullmatch(r"[01]+", text):
+        return str(int(text, 2))
+    if text == 'dont_care':
+        return '0'
+    return text
+
+
+def template_values(test_case: TestCase) -> Dict[str, str]:
+    """Placeholder name -> this test case's value (TC_ID, regbank values, pattern bins)."""
+    values = {"TC_ID": test_case.tc_id}
+    for key, value in (test_case.stimulus.regbank_program or {}).items():
+        if key not in STRUCTURAL_FIELDS and _is_value(value):
+            values[key.upper()] = _sv_value(value)
+    for target, info in (test_case.stimulus.input_provisioning or {}).items():
+        if isinstance(info, dict) and info.get('pattern_bin'):
+            values[f"{target.upper()}_PATTERN"] = str(info['pattern_bin'])
+    return values
+
+
+def describe_placeholders(test_case: TestCase) -> str:
+    """Placeholder table for the template prompt."""
+    regbank = test_case.stimulus.regbank_program or {}
+    lines = []
+    for name, value in template_values(test_case).items():
+        source = next((f' (regbank_program.{key} = "{raw}")' for key, raw in regbank.items()
+                       if key.upper() == name), '')
+        lines.append(f"{placeholder(name)} = {value}{source}")
+    return '\n'.join(lines)
+
+
+def varying_placeholders(members: List[TestCase]) -> List[str]:
+    """Placeholders whose value differs between members (TC_ID always does)."""
+    values = [template_values(test_case) for test_case in members]
+    return [name for name in values[0] if any(other.get(name) != values[0][name] for other in values[1:])]
+
+
+def templatize(code: str, tc_id: str) -> str:
+    """Replace any literal exemplar TC_ID left in a template by its placeholder."""
+    return code.replace(tc_id, placeholder("TC_ID"))
+
+
+def check_template(template: Optional[str], members: List[TestCase]) -> List[str]:
+    """Problems that keep a template from covering the whole cluster (empty = usable)."""
+    if not template:
+        return ["no template"]
+    known = set(template_values(members[0]))
+    used = set(PLACEHOLDER_RE.findall(template))
+    problems = [f"unknown placeholder {placeholder(name)}" for name in sorted(used - known)]
+    missing = [placeholder(name) for name in varying_placeholders(members) if name not in used]
+    if missing:
+        problems.append(f"varying values not templated: {', '.join(missing)}")
+    return problems
+
+
+def instantiate(template: str, values: Dict[str, str]) -> str:
+    """Substitute a test case's values into a template."""
+    return PLACEHOLDER_RE.sub(lambda m: values.get(m.group(1), m.group(0)), template)
+
+
+def check_instance(code: str, values: Dict[str, str], exemplar_values: Dict[str, str]) -> List[str]:
+    """Structural diff check of an instantiated member against the exemplar.
+
+    Every placeholder must be substituted, and no exemplar-specific literal
+    (its TC_ID or a non-numeric value the member does not share) may remain:
+    one would mean the template hard-codes the exemplar somewhere.
+    """
+    problems = [f"unsubstituted {placeholder(name)}" for name in sorted(set(PLACEHOLDER_RE.findall(code)))]
+    own = set(values.values())
+    for name, value in exemplar_values.items():
+        if value not in own and not value.isdigit() and re.search(rf"\b{re.escape(value)}\b", code):
+            problems.append(f"exemplar {name} {value} left in code")
+    return problems
+
+
+def instance_inputs(template_inputs: str, values: Dict[str, str]) -> str:
+    """Manifest fingerprint of a member: its template's inputs and its own values."""
+    return hashlib.sha256(json.dumps([template_inputs, values], sort_keys=True).encode('utf-8')).hexdigest()
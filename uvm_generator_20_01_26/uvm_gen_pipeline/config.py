@@ -9,6 +9,12 @@ from typing import Optional
 from pathlib import Path
 
 
+def _env_int(name: str) -> Optional[int]:
+    """Integer environment variable, or None when unset."""
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
 @dataclass
 class OpenAIConfig:
     """OpenAI API configuration."""
@@ -17,6 +23,33 @@ class OpenAIConfig:
     temperature: float = 0.2
     max_tokens: int = 4096
     org_id: Optional[str] = field(default_factory=lambda: os.getenv("OPENAI_ORG_ID"))
+    # Client-side quota (None = learn from x-ratelimit-* response headers)
+    rpm_limit: Optional[int] = field(default_factory=lambda: _env_int("OPENAI_RPM_LIMIT"))
+    tpm_limit: Optional[int] = field(default_factory=lambda: _env_int("OPENAI_TPM_LIMIT"))
+
+
+@dataclass
+class CacheConfig:
+    """Persistent LLM response cache configuration."""
+    enabled: bool = True
+    refresh: bool = False  # Ignore cached entries but store new responses
+    cache_dir: Path = field(default_factory=lambda: Path(os.getenv("UVM_GEN_CACHE_DIR", ".llm_cache")))
+    max_size_mb: float = 512
+    max_age_days: float = 30
+
+
+@dataclass
+class TransportConfig:
+    """LLM transport configuration (live API, record, replay or synthetic)."""
+    mode: str = "live"  # "live", "record", "replay" or "synthetic"
+    fixtures_dir: Path = Path(".llm_fixtures")  # Record/replay fixture store
+    latency: Optional[float] = None  # Fixed offline latency (None = recorded/modelled)
+    latency_scale: float = 1.0  # Multiplier on offline latency
+    
+    @property
+    def offline(self) -> bool:
+        """True when no API key or network access is needed."""
+        return self.mode in ("replay", "synthetic")
 
 
 @dataclass
@@ -36,8 +69,30 @@ class PipelineConfig:
     
     # Generation options
     generate_scoreboard: bool = True
+    scoreboard_holes: bool = False  # Scoreboard skeleton rendered locally, the LLM fills only its holes
     generate_package: bool = True
     verbose: bool = True
+    
+    # Concurrency options
+    scheduler: str = "dag"  # "dag" (artifact dependency graph) or "phases" (A, then B, then C)
+    max_inflight: int = 4  # Max concurrent LLM requests (Phase B only with "phases")
+    pack_size: int = 1  # Test cases per Phase B request (1 = one request per file)
+    combined: bool = False  # One request per test case for both vseq and test
+    cluster: bool = False  # One template request per structural cluster of test cases
+    vseq_plan: bool = False  # Vseqs rendered locally from a JSON stimulus plan the LLM returns
+    
+    # Incremental regeneration: files whose inputs match <output>/.manifest.json are reused
+    force: bool = False  # Regenerate every file regardless of the manifest
+    resume: bool = False  # Keep the files an interrupted run journaled in <output>/.run_state.jsonl
+    
+    # Telemetry: per-call JSONL ledger (None = <output>/.telemetry/run_<timestamp>.jsonl)
+    ledger_file: Optional[Path] = None
+    
+    # Batch options (Phase B through the provider batch API)
+    batch: bool = False
+    batch_provider: str = "openai"  # "openai" or "local" (offline stand-in)
+    batch_poll_interval: float = 60.0  # Seconds between status checks
+    batch_wait: bool = True  # False: submit/check once and exit
 
 
 @dataclass
@@ -45,10 +100,12 @@ class Config:
     """Main configuration container."""
     openai: OpenAIConfig = field(default_factory=OpenAIConfig)
     pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    transport: TransportConfig = field(default_factory=TransportConfig)
     
     def validate(self) -> bool:
         """Validate configuration."""
-        if not self.openai.api_key:
+        if not self.openai.api_key and not self.transport.offline:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         return True
 
@@ -0,0 +1,643 @@
+"""
+Deterministic SystemVerilog emitters.
+Artifacts that are fully determined by the UVC mapping and the block name
+are rendered here instead of being requested from the LLM: they take
+milliseconds, are byte-stable across runs, and the names later phases rely
+on (sequencer handles, interface type, config_db keys) are exact by
+construction.
+"""
+
+import re
+import textwrap
+from typing import Dict, List, Optional, Tuple
+
+from parsers import instance_stem
+from stimulus_plan import (
+    REGISTER_FIELDS,
+    REGISTER_MEMBER,
+    REGISTER_SEQUENCE,
+    START_COMPUTE_FIELDS,
+    plan_steps,
+    register_bits,
+    register_uvc,
+    step_sequence
+)
+
+
+def dut_interface(short_name: str) -> Tuple[str, str]:
+    """(interface type, config_db key) of the main DUT interface."""
+    return f"{short_name}_if", f"{short_name}_vif"
+
+
+def _kind_params(kind: str) -> str:
+    """Parameter list of a UVC kind (``#(64,9)`` for ``dpmem_env#(64,9)``), empty if it has none."""
+    return kind[kind.index('#'):] if '#(' in kind else ''
+
+
+def sequencer_handles(uvc_mapping: Dict) -> List[Tuple[str, str, str]]:
+    """(sequencer type, virtual sequencer handle, UVC instance) per UVC, in mapping order.
+
+    The type carries the parameters of the UVC kind (``istream_env#(64)``
+    gives ``istream_sequencer#(64)``); the handle is the instance name
+    without ``m_``/``_env`` (``m_feature_buffer_env`` gives ``seqr_feature_buffer``).
+    """
+    handles = []
+    for name, info in uvc_mapping.get('uvcs', {}).items():
+        seqr_type = f"{info.get('sequencer_type') or 'uvm_sequencer'}{_kind_params(info.get('kind', ''))}"
+        handles.append((seqr_type, f"seqr_{instance_stem(name)}", name))
+    return handles
+
+
+def render_virtual_sequencer(class_name: str, short_name: str, uvc_mapping: Dict) -> str:
+    """Render the virtual sequencer in the golden p18_dimc_tile_wrap_virtual_sequencer.sv layout.
+
+    One handle per UVC sequencer plus the DUT virtual interface, fetched
+    from config_db in build_phase.
+    """
+    interface_type, vif_key = dut_interface(short_name)
+    handles = sequencer_handles(uvc_mapping)
+    width = max((len(seqr_type) for seqr_type, _, _ in handles), default=0) + 2
+
+    lines = [
+        f"// {class_name} having handles to the UVC sequencers:",
+        f"// {', '.join(handle for _, handle, _ in handles)}",
+        "// Auto-generated by the UVM Test Case Generator - do not edit manually",
+        f"class {class_name} extends uvm_sequencer;",
+        "",
+        f"  `uvm_component_utils({class_name})",
+        "",
+    ]
+    lines.extend(f"  {seqr_type.ljust(width)}{handle};" for seqr_type, handle, _ in handles)
+    lines.extend([
+        "",
+        "  // Virtual interface",
+        f"  virtual {interface_type} vif;",
+        "",
+        "  function new(string name, uvm_component parent);",
+        "    super.new(name, parent);",
+        "  endfunction",
+        "",
+        "  function void build_phase(uvm_phase phase);",
+        "    super.build_phase(phase);",
+        "",
+        "    // Get virtual interface from config_db",
+        f'    if (!uvm_config_db#(virtual {interface_type})::get(this, "", "{vif_key}", vif))',
+        f'      `uvm_fatal("NOVIF", "Virtual interface must be set for {class_name}")',
+        "  endfunction",
+        "",
+        "endclass",
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def uvc_interfaces(uvc_mapping: Dict) -> List[Tuple[str, str, str, str]]:
+    """(interface type, instance, clock port, config_db key) per UVC, in mapping order.
+
+    The interface type and clock port are the ones ``scan_uvc_library`` found
+    (``istream_if``, ``istream_clk``), with the parameters of the UVC kind;
+    the instance is the UVC instance name without ``m_``/``_env`` plus
+    ``_if_inst`` (``m_feature_buffer_env`` gives ``feature_buffer_if_inst``).
+    """
+    interfaces = []
+    for name, info in uvc_mapping.get('uvcs', {}).items():
+        interface_type = info.get('interface_type') or info.get('type', name).replace('_uvc', '_if')
+        base = interface_type[:-3] if interface_type.endswith('_if') else interface_type
+        interfaces.append((
+            f"{interface_type}{_kind_params(info.get('kind', ''))}",
+            f"{instance_stem(name)}_if_inst",
+            info.get('interface_clock') or f"{base}_clk",
+            info.get('config_db_name') or f"{instance_stem(name)}_vif",
+        ))
+    return interfaces
+
+
+def is_output_uvc(name: str, info: Dict) -> bool:
+    """True for a UVC carrying DUT output (checked by the scoreboard)."""
+    return 'output' in name.lower() or 'ostream' in info.get('kind', '').lower()
+
+
+def scoreboard_ports(uvc_mapping: Dict) -> List[Tuple[str, str, str]]:
+    """(monitor port, scoreboard imp, transaction type) per analysis port of an output UVC.
+
+    The port is the full path below the environment
+    (``m_output_buffer_env.m_agent.m_monitor.ostream_rd_port``), the imp is
+    the port name with an ``imp_`` prefix, and the transaction type has the
+    UVC parameters filled in (``ostream_seq_item#(64)``).
+    """
+    ports = []
+    for name, info in uvc_mapping.get('uvcs', {}).items():
+        if not is_output_uvc(name, info):
+            continue
+        for port in info.get('analysis_ports', []):
+            item_type = port['item_type']
+            for param, value in (info.get('params') or {}).items():
+                item_type = re.sub(rf'\b{param}\b', str(value), item_type)
+            ports.append((f"{name}.{port['path']}", f"imp_{port['path'].rsplit('.', 1)[-1]}", item_type))
+    return ports
+
+
+def render_environment(class_name: str, short_name: str, uvc_mapping: Dict,
+                       scoreboard_class: Optional[str] = None) -> str:
+    """Render the top-level environment in the golden p18_dimc_tile_wrap_env.sv layout.
+
+    build_phase creates every UVC env (``env_type`` plus the kind
+    parameters), the virtual sequencer and the scoreboard, and gets each
+    UVC interface from config_db under the key the testbench sets.
+    connect_phase points the virtual sequencer handles at the UVC
+    sequencers, hands each interface to the components ``scan_uvc_library``
+    found holding a ``vif``, and connects the output monitors to the
+    scoreboard imps (see scoreboard_ports()).
+    """
+    vseqr_class = f"{short_name}_virtual_sequencer"
+    uvcs = list(uvc_mapping.get('uvcs', {}).items())
+    envs = [(name, f"{info.get('env_type') or info.get('kind', '').split('#')[0]}{_kind_params(info.get('kind', ''))}")
+            for name, info in uvcs]
+    vifs = [(f"virtual {iface}", f"{instance_stem(name)}_vif", key)
+            for (name, _), (iface, _, _, key) in zip(uvcs, uvc_interfaces(uvc_mapping))]
+    members = []
+    for (name, env_type), (vif_type, vif, _) in zip(envs, vifs):
+        members.extend([(env_type, name), (vif_type, vif)])
+    members.append((vseqr_class, "v_seqr"))
+    if scoreboard_class:
+        members.append((scoreboard_class, "scoreboard"))
+    width = max(len(member_type) for member_type, _ in members) + 2
+
+    lines = [
+        f"// {class_name} instantiating {', '.join(name for name, _ in uvcs)},",
+        f"// {vseqr_class}{f' and {scoreboard_class}' if scoreboard_class else ''}",
+        "// Auto-generated by the UVM Test Case Generator - do not edit manually",
+        f"class {class_name} extends uvm_env;",
+        "",
+        "  // Sub-environment instances and their virtual interfaces",
+    ]
+    lines.extend(f"  {member_type.ljust(width)}{member};" for member_type, member in members)
+    lines.extend([
+        "",
+        f"  `uvm_component_utils({class_name})",
+        "",
+        "  function new(string name, uvm_component parent);",
+        "    super.new(name, parent);",
+        "  endfunction",
+        "",
+        "  function void build_phase(uvm_phase phase);",
+        "    super.build_phase(phase);",
+        "",
+        "    // Create sub-environments",
+    ])
+    creations = [(name, env_type) for name, env_type in envs] + [("v_seqr", vseqr_class)]
+    if scoreboard_class:
+        creations.append(("scoreboard", scoreboard_class))
+    name_width = max(len(name) for name, _ in creations) + 1
+    lines.extend(f'    {name.ljust(name_width)}= {member_type}::type_id::create("{name}", this);'
+                 for name, member_type in creations)
+    lines.extend(["", "    // Get the virtual interfaces set by the testbench"])
+    for vif_type, vif, key in vifs:
+        lines.append(f'    if (!uvm_config_db#({vif_type})::get(this, "", "{key}", {vif}))')
+        lines.append(f'      `uvm_fatal("NOVIF", "Virtual interface must be set for {vif}")')
+    lines.extend([
+        "  endfunction",
+        "",
+        "  function void connect_phase(uvm_phase phase);",
+        "    super.connect_phase(phase);",
+        "",
+        "    // Virtual sequencer handles",
+    ])
+    seqr_assignments = [(f"v_seqr.{handle}", f"{name}.{uvc_mapping['uvcs'][name].get('sequencer_path') or 'm_agent.m_sequencer'}")
+                        for _, handle, name in sequencer_handles(uvc_mapping)]
+    vif_assignments = [(f"{name}.{path}.vif", vif)
+                       for (name, info), (_, vif, _) in zip(uvcs, vifs)
+                       for path in info.get('vif_paths') or ["m_agent", "m_agent.m_driver"]]
+    target_width = max((len(target) for target, _ in seqr_assignments + vif_assignments), default=0) + 1
+    lines.extend(f"    {target.ljust(target_width)}= {source};" for target, source in seqr_assignments)
+    lines.extend(["", "    // Virtual interfaces of the UVC components"])
+    lines.extend(f"    {target.ljust(target_width)}= {source};" for target, source in vif_assignments)
+    if scoreboard_class:
+        lines.extend(["", "    // Output monitors to the scoreboard"])
+        lines.extend(f"    {port}.connect(scoreboard.{imp});" for port, imp, _ in scoreboard_ports(uvc_mapping))
+    lines.extend([
+        "  endfunction",
+        "",
+        "endclass",
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def clock_half_period(clock_freq: str) -> str:
+    """Half clock period in ns for ``always #<half>`` (``100MHz`` gives ``5``; unparsable gives 100MHz)."""
+    match = re.match(r'\s*([\d.]+)\s*([kmg]?)hz', clock_freq.lower())
+    if not match:
+        return "5"
+    hertz = float(match.group(1)) * {'': 1, 'k': 1e3, 'm': 1e6, 'g': 1e9}[match.group(2)]
+    return f"{0.5e9 / hertz:g}"
+
+
+def render_testbench(module_name: str, short_name: str, block_config: Dict, uvc_mapping: Dict,
+                     package_name: Optional[str] = None) -> str:
+    """Render the testbench top module in the golden P18_TILE_WRAPPER_tb.sv layout.
+
+    Clock and reset come from the Block YAML, then one instance of the DUT
+    interface and of every UVC interface, each set in config_db under the
+    key the environment gets it with, and ``run_test()``. The DUT itself is
+    left to a marked DUT PORT HOOK: its port list is not in the inputs.
+    """
+    clock = block_config.get('clock_name') or 'clk'
+    reset = block_config.get('reset_name') or 'resetn'
+    clock_freq = block_config.get('clock_freq') or '100MHz'
+    active_low = block_config.get('reset_active_low', True)
+    interface_type, vif_key = dut_interface(short_name)
+    interfaces = [(interface_type, f"{short_name}_if_inst", None, vif_key)] + uvc_interfaces(uvc_mapping)
+    block_name = block_config.get('name', short_name)
+
+    lines = [
+        f"// {block_name} testbench instantiating the DUT interface and the UVC interfaces:",
+        f"// {', '.join(instance for _, instance, _, _ in interfaces)}",
+        "// Auto-generated by the UVM Test Case Generator - do not edit manually",
+        f"module {module_name};",
+        "",
+        "  import uvm_pkg::*;",
+    ]
+    if package_name:
+        lines.append(f"  import {package_name}::*;")
+    lines.extend([
+        "",
+        f"  logic {clock};",
+        f"  logic {reset};",
+        "",
+        f"  // Reset generation (active {'low' if active_low else 'high'})",
+        "  initial begin",
+        f"    {reset} = 1'b{0 if active_low else 1};",
+        "    #250;",
+        f"    {reset} = 1'b{1 if active_low else 0};",
+        "  end",
+        "",
+        f"  // Clock generation ({clock_freq})",
+        f"  initial {clock} = 0;",
+        f"  always #{clock_half_period(clock_freq)} {clock} = ~{clock};",
+        "",
+        "  // Interface instantiation",
+        f"  {interface_type} {short_name}_if_inst(.{clock}({clock}), .{reset}({reset}));",
+    ])
+    lines.extend(f"  {iface} {instance}(.{clock_port}({clock}));" for iface, instance, clock_port, _ in interfaces[1:])
+    lines.extend([
+        "",
+        "  // ---------------------------------------------------------------------------",
+        f"  // DUT PORT HOOK: instantiate {block_name} here and connect its ports to the",
+        "  // interface instances above, e.g. .<port>(<instance>.<signal>). Decode logic",
+        "  // between a packed register interface and the DUT control ports goes here too.",
+        "  // ---------------------------------------------------------------------------",
+        f"  // {block_name} dut (",
+        f"  //   .{clock}({clock}),",
+        f"  //   .{reset}({reset})",
+        "  // );",
+        "",
+        "  // UVM environment",
+        "  initial begin",
+        "    // Set the interfaces in the UVM config_db (global scope, all instances)",
+    ])
+    lines.extend(f'    uvm_config_db#(virtual {iface})::set(null, "*", "{key}", {instance});'
+                 for iface, instance, _, key in interfaces)
+    lines.extend([
+        "",
+        "    run_test();",
+        "  end",
+        "",
+        "endmodule",
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def render_test(tc_id: str, short_name: str, block_config: Dict) -> str:
+    """Render a test class in the golden CI_TC_005 ``*_test.sv`` layout.
+
+    Every test without phase overrides is the same boilerplate: build the
+    environment and the test case's vseq, get the DUT interface from
+    config_db, then in run_phase wait for reset release, start the vseq on
+    ``env.v_seqr`` and drain. Delays use the interface clock port, which the
+    interface always has under the Block YAML clock name.
+    """
+    clock = block_config.get('clock_name') or 'clk'
+    reset = block_config.get('reset_name') or 'resetn'
+    released = 1 if block_config.get('reset_active_low', True) else 0
+    class_name = f"{tc_id}_test"
+    env_class = f"{short_name}_env"
+    vseq_class = f"{tc_id}_vseq"
+    interface_type, vif_key = dut_interface(short_name)
+
+    lines = [
+        f"// {class_name} starting {vseq_class} on the virtual sequencer",
+        "// Auto-generated by the UVM Test Case Generator - do not edit manually",
+        f"class {class_name} extends uvm_test;",
+        "",
+        f"  `uvm_component_utils({class_name})",
+        "",
+        f"  {env_class} env;",
+        f"  {vseq_class} vseq;",
+        "",
+        "  // Virtual interface",
+        f"  virtual {interface_type} vif;",
+        "",
+        "  function new(string name, uvm_component parent);",
+        "    super.new(name, parent);",
+        "  endfunction",
+        "",
+        "  function void build_phase(uvm_phase phase);",
+        "    super.build_phase(phase);",
+        f'    env = {env_class}::type_id::create("env", this);',
+        f'    vseq = {vseq_class}::type_id::create("vseq");',
+        "",
+        "    // Get virtual interface from config_db",
+        f'    if (!uvm_config_db#(virtual {interface_type})::get(this, "", "{vif_key}", vif))',
+        f'      `uvm_fatal("NOVIF", "Virtual interface must be set for {class_name}")',
+        "  endfunction",
+        "",
+        "  task run_phase(uvm_phase phase);",
+        "    phase.raise_objection(this);",
+        "",
+        f"    wait (vif.{reset} == {released});",
+        f"    repeat (5) @(posedge vif.{clock});",
+        "",
+        "    vseq.start(env.v_seqr);",
+        "",
+        f"    repeat (10) @(posedge vif.{clock});",
+        "",
+        "    phase.drop_objection(this);",
+        "  endtask",
+        "",
+        "endclass",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _sv_string(text: str, args: List[str]) -> str:
+    """SV string of a plan command: ``$sformatf`` with its args when it has format fields.
+
+    ``%%`` in a command without args is formatted as well, so it reads as
+    ``%`` in the shell call and in the error message alike.
+    """
+    if args or '%' in text:
+        return f'$sformatf("{text}"{"".join(f", {arg}" for arg in args)})'
+    return f'"{text}"'
+
+
+def render_vseq(tc_id: str, short_name: str, block_config: Dict, uvc_mapping: Dict, plan: Dict) -> str:
+    """Render a virtual sequence from a validated stimulus plan (see stimulus_plan.py).
+
+    Follows the golden CI_TC_005 ``*_vseq.sv`` layout: one sub-sequence
+    handle per UVC sequence the plan runs, the plan variables as members,
+    the ``pack_register`` helper, and body() running the steps in order on
+    the virtual sequencer handles. Clock edges use the interface clock port,
+    which the interface always has under the Block YAML clock name.
+    """
+    clock = block_config.get('clock_name') or 'clk'
+    class_name = f"{tc_id}_vseq"
+    uvcs = uvc_mapping.get('uvcs', {})
+    seqr_of = {name: handle for _, handle, name in sequencer_handles(uvc_mapping)}
+    reg_uvc = register_uvc(uvc_mapping)
+    steps = plan_steps(plan)
+
+    # One handle per (UVC, sequence) the plan runs, in first-use order
+    handles: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for op, args in steps:
+        if op in ('program_reg', 'start_compute'):
+            uvc, seq = reg_uvc, next(s for s in uvcs[reg_uvc]['sequence_types'] if s['name'] == REGISTER_SEQUENCE)
+        elif op in ('write', 'read'):
+            uvc, seq = args['uvc'], step_sequence(uvcs[args['uvc']], op, args)
+        else:
+            continue
+        if (uvc, seq['name']) in handles:
+            continue
+        seq_type = f"{seq['name']}{_kind_params(uvcs[uvc].get('kind', '')) if seq.get('parameters') else ''}"
+        handle = f"seq_{instance_stem(uvc)}_{'rd' if seq.get('operation_type') == 'read' else 'wr'}"
+        taken = {h for _, h in handles.values()}
+        if handle in taken:
+            handle = f"{handle}_{sum(h.startswith(handle) for h in taken) + 1}"
+        handles[(uvc, seq['name'])] = (seq_type, handle)
+
+    variables = plan.get('variables', {})
+    width = max((len(seq_type) for seq_type, _ in handles.values()), default=0) + 2
+    lines = [
+        f"// {class_name} rendered from its stimulus plan",
+        "// Auto-generated by the UVM Test Case Generator - do not edit manually",
+        f"class {class_name} extends uvm_sequence; // virtual sequence",
+        "",
+        f"  `uvm_object_utils({class_name})",
+        f"  `uvm_declare_p_sequencer({short_name}_virtual_sequencer)",
+        "",
+    ]
+    lines.extend(f"  {seq_type.ljust(width)}{handle};" for seq_type, handle in handles.values())
+    if variables:
+        lines.append("")
+        lines.extend(f"  int {name};" for name in variables)
+    lines.extend([
+        "",
+        f'  function new(string name = "{class_name}");',
+        "    super.new(name);",
+        "  endfunction",
+    ])
+
+    if reg_uvc and any(op in ('program_reg', 'start_compute') for op, _ in steps):
+        lines.extend(["", "  // Pack the control register fields into the 32-bit register", "  function int pack_register("])
+        lines.extend(f"    int {name.lower()} = 0{',' if i < len(REGISTER_FIELDS) - 1 else ''}"
+                     for i, (name, _, _) in enumerate(REGISTER_FIELDS))
+        lines.extend(["  );", "    int reg_val;", "    reg_val = 0;"])
+        for name, msb, lsb in REGISTER_FIELDS:
+            bits = msb - lsb + 1
+            lines.append(f"    reg_val = reg_val | (({name.lower()} & {bits}'h{(1 << bits) - 1:X}) << {lsb});"
+                         f"  // bit{'s' if msb > lsb else ''} {register_bits(msb, lsb)}")
+        lines.extend(["    return reg_val;", "  endfunction"])
+
+    lines.extend(["", "  task body();", "    int status;", ""])
+    if variables:
+        lines.append("    // Test case parameters")
+        lines.extend(f"    {name} = {value};" for name, value in variables.items())
+        lines.append("")
+
+    edge = f"@(posedge p_sequencer.vif.{clock});"
+    register: Dict = {}
+    for op, args in steps:
+        if op == 'run':
+            command, call_args = args['command'], args.get('args', [])
+            lines.extend([
+                f"    status = $system({_sv_string(command, call_args)});",
+                "    if (status != 0) begin",
+                f'      `uvm_error("VSEQ", {_sv_string(f"Command failed: {command}", call_args)})',
+                "      return;",
+                "    end",
+            ])
+        elif op == 'set':
+            lines.extend(f"    p_sequencer.vif.{signal} = {value};" for signal, value in args.items())
+            lines.append(f"    {edge}")
+        elif op == 'wait':
+            lines.extend([
+                f"    while (p_sequencer.vif.{args['signal']} != {args.get('value', 1)}) begin",
+                f"      {edge}",
+                "    end",
+            ])
+        elif op in ('program_reg', 'start_compute'):
+            if op == 'program_reg':
+                register = dict(args or {})
+                lines.append("    // Register write: configuration")
+            else:
+                register = {**register, **START_COMPUTE_FIELDS, **(args or {})}
+                lines.append("    // Register write: start compute")
+            seq_type, handle = handles[(reg_uvc, REGISTER_SEQUENCE)]
+            lines.append(f'    {handle} = {seq_type}::type_id::create("{handle}");')
+            lines.append(f"    {handle}.{REGISTER_MEMBER} = pack_register(")
+            lines.extend(f"      .{name.lower()}({register.get(name, 0)}){',' if i < len(REGISTER_FIELDS) - 1 else ''}"
+                         for i, (name, _, _) in enumerate(REGISTER_FIELDS))
+            lines.extend(["    );", f"    {handle}.start(p_sequencer.{seqr_of[reg_uvc]});"])
+        else:
+            uvc = args['uvc']
+            seq = step_sequence(uvcs[uvc], op, args)
+            seq_type, handle = handles[(uvc, seq['name'])]
+            lines.append(f"    // {uvc} {op}")
+            lines.append(f'    {handle} = {seq_type}::type_id::create("{handle}");')
+            if seq.get('has_size_param'):
+                lines.append(f"    {handle}.size = {args['size']};")
+            if op == 'write' and seq.get('uses_file_input'):
+                lines.append(f'    {handle}.{seq.get("file_path_var") or "file_path"} = "{args["file"]}";')
+            lines.append(f"    {handle}.start(p_sequencer.{seqr_of[uvc]});")
+        lines.append("")
+
+    lines.extend([
+        "  endtask",
+        "",
+        "endclass",
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+# Scoreboard regions left to the LLM: ``@@NAME@@`` lines of the skeleton
+SCOREBOARD_HOLE_RE = re.compile(r"^([ \t]*)@@(\w+)@@[ \t]*$", re.MULTILINE)
+
+# Holes inside a function body take statements only; class-level holes no class structure
+_BODY_KEYWORDS_RE = re.compile(r"\b(function|endfunction|task|endtask|class|endclass)\b")
+_CLASS_KEYWORDS_RE = re.compile(r"\b(class|endclass|uvm_component_utils)\b")
+_COMMENT_RE = re.compile(r"//.*?$|/\*.*?\*/", re.MULTILINE | re.DOTALL)
+
+
+def _write_hole(imp: str, single: bool) -> Tuple[str, str]:
+    """(hole name, write function) of a scoreboard imp (``write`` alone, else ``write_<port>``)."""
+    suffix = imp[len('imp_'):]
+    return ("WRITE", "write") if single else (f"WRITE_{suffix.upper()}", f"write_{suffix}")
+
+
+def scoreboard_holes(uvc_mapping: Dict) -> List[Tuple[str, str]]:
+    """(hole name, what its fill holds) of the scoreboard skeleton, in skeleton order."""
+    ports = scoreboard_ports(uvc_mapping)
+    holes = [
+        ("MEMBERS", "class members: expected data queue, match/mismatch counters, expected file name"),
+        ("BUILD", "statements of build_phase after super.build_phase (config_db overrides)"),
+        ("HELPERS", "complete helper functions, e.g. reading the expected output file"),
+    ]
+    for _, imp, item_type in ports:
+        hole, function = _write_hole(imp, len(ports) == 1)
+        holes.append((hole, f"statements of {function}({item_type} t): compare t against the next "
+                            f"expected value, count and report mismatches with `uvm_error"))
+    holes.append(("REPORT", "statements of report_phase after super.report_phase: "
+                            "print the summary, `uvm_error on any mismatch"))
+    return holes
+
+
+def render_scoreboard_skeleton(class_name: str, uvc_mapping: Dict) -> str:
+    """Render the scoreboard with ``@@NAME@@`` holes for the checking logic.
+
+    The class, its factory registration, the imps the environment connects
+    (see scoreboard_ports()), the constructor and the phase headers are
+    fixed; the holes (see scoreboard_holes()) are filled by the LLM and
+    spliced in with splice_holes().
+    """
+    ports = scoreboard_ports(uvc_mapping)
+    single = len(ports) == 1
+    lines = [
+        f"// {class_name} checking {', '.join(port for port, _, _ in ports) or 'no monitor ports'}",
+        "// Skeleton rendered from the UVC mapping; the checking logic is LLM-generated",
+    ]
+    if not single:
+        lines.extend(f"`uvm_analysis_imp_decl(_{imp[len('imp_'):]})" for _, imp, _ in ports)
+    lines.extend([
+        f"class {class_name} extends uvm_scoreboard;",
+        "",
+        f"  `uvm_component_utils({class_name})",
+        "",
+    ])
+    if ports:
+        declarations = [(f"uvm_analysis_imp{'' if single else '_' + imp[len('imp_'):]}#({item_type}, {class_name})", imp)
+                        for _, imp, item_type in ports]
+        width = max(len(imp_type) for imp_type, _ in declarations) + 2
+        lines.append("  // Analysis imps connected by the environment")
+        lines.extend(f"  {imp_type.ljust(width)}{imp};" for imp_type, imp in declarations)
+        lines.append("")
+    lines.extend([
+        "  @@MEMBERS@@",
+        "",
+        "  function new(string name, uvm_component parent);",
+        "    super.new(name, parent);",
+    ])
+    lines.extend(f'    {imp} = new("{imp}", this);' for _, imp, _ in ports)
+    lines.extend([
+        "  endfunction",
+        "",
+        "  function void build_phase(uvm_phase phase);",
+        "    super.build_phase(phase);",
+        "    @@BUILD@@",
+        "  endfunction",
+        "",
+        "  @@HELPERS@@",
+        "",
+    ])
+    for port, imp, item_type in ports:
+        hole, function = _write_hole(imp, single)
+        lines.extend([
+            f"  // Transactions from {port}",
+            f"  function void {function}({item_type} t);",
+            f"    @@{hole}@@",
+            "  endfunction",
+            "",
+        ])
+    lines.extend([
+        "  function void report_phase(uvm_phase phase);",
+        "    super.report_phase(phase);",
+        "    @@REPORT@@",
+        "  endfunction",
+        "",
+        "endclass",
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def check_hole_fills(skeleton: str, fills: Dict[str, str], class_name: str) -> List[str]:
+    """Problems that keep LLM fills from being spliced into a skeleton (empty if none).
+
+    Holes left out are spliced empty, except the write holes. Function body
+    fills hold statements only and class-level fills no class structure;
+    any scoreboard class or imp owner a fill names must be ``class_name``.
+    """
+    problems = []
+    holes = [name for _, name in SCOREBOARD_HOLE_RE.findall(skeleton)]
+    unknown = [name for name in fills if name not in holes]
+    if unknown:
+        problems.append(f"unknown holes: {', '.join(unknown)}")
+    missing = [name for name in holes if name.startswith('WRITE') and not fills.get(name, '').strip()]
+    if missing:
+        problems.append(f"missing holes: {', '.join(missing)}")
+    for name, fill in fills.items():
+        code = _COMMENT_RE.sub('', fill)
+        keywords = _CLASS_KEYWORDS_RE if name in ('MEMBERS', 'HELPERS') else _BODY_KEYWORDS_RE
+        found = sorted(set(keywords.findall(code)))
+        if found:
+            problems.append(f"hole {name} must not contain {', '.join(found)}")
+        others = set(re.findall(r"\b(\w*_scoreboard)\b", code))
+        others |= set(re.findall(r"uvm_analysis_imp\w*\s*#\s*\([^,]+,\s*(\w+)\s*\)", code))
+        others.discard(class_name)
+        if others:
+            problems.append(f"hole {name} names {', '.join(sorted(others))} instead of {class_name}")
+    return problems
+
+
+def splice_holes(skeleton: str, fills: Dict[str, str]) -> str:
+    """Replace each ``@@NAME@@`` line of a skeleton with its fill at the line's indentation."""
+    def fill(match: re.Match) -> str:
+        indent, text = match.group(1), textwrap.dedent(fills.get(match.group(2), '')).strip('\n')
+        return textwrap.indent(text, indent) if text.strip() else f"{indent}// (none)"
+    return SCOREBOARD_HOLE_RE.sub(fill, skeleton)
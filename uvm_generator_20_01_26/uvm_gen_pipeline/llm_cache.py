@@ -0,0 +1,147 @@
+"""
+Persistent LLM response cache.
+Content-addressed, disk-backed store so reruns with unchanged prompts skip the API.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+
+class ResponseCache:
+    """
+    Disk-backed LLM response cache with size/age based LRU eviction.
+
+    Entries are keyed on a SHA-256 of (model, messages, temperature, max_tokens)
+    and stored as one JSON file each under ``<cache_dir>/<key[:2]>/<key>.json``.
+    File mtime doubles as the last-access time for LRU eviction.
+    """
+
+    # Evict every N writes so long runs stay within the size budget
+    EVICT_INTERVAL = 64
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_size_mb: float = 512,
+        max_age_days: float = 30,
+        refresh: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.refresh = refresh  # Skip lookups but still store fresh responses
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.evict()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+    ) -> str:
+        """Compute the content address of a request."""
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for key, or None on miss/refresh."""
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path, None)  # Touch for LRU
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Store an entry atomically (write to temp file, then rename)."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        record = dict(entry)
+        record["key"] = key
+        record["created_at"] = time.time()
+
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.EVICT_INTERVAL == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least-recently-used entries until the
+        cache fits in max_size_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        if self.max_size_bytes and total_size > self.max_size_bytes:
+            entries.sort()  # Oldest access first
+            for _, size, path in entries:
+                if total_size <= self.max_size_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total_size -= size
+                removed += 1
+
+        return removed
+
+    def stats_line(self) -> str:
+        """One-line summary of cache effectiveness for the run report."""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"LLM cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
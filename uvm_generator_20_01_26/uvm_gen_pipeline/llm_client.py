@@ -3,14 +3,23 @@ OpenAI LLM Client for UVM Generation.
 Handles all interactions with the OpenAI API.
 """
 
+import re
 import json
+import time
+import asyncio
+import threading
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, RateLimitError
+from openai.types.chat import ChatCompletion
 from rich.console import Console
 from rich.panel import Panel
 
-from config import OpenAIConfig
+from config import OpenAIConfig, CacheConfig, TransportConfig
+from llm_cache import ResponseCache
+from rate_limiter import get_rate_limiter, estimate_request_tokens
+from transport import Transport, create_transport
+from telemetry import RunLedger, call_tags
 
 console = Console()
 
@@ -27,13 +36,66 @@ class LLMResponse:
 class UVMGeneratorLLM:
     """LLM client specialized for UVM code generation."""
     
-    def __init__(self, config: OpenAIConfig):
+    def __init__(
+        self,
+        config: OpenAIConfig,
+        cache_config: Optional[CacheConfig] = None,
+        transport_config: Optional[TransportConfig] = None,
+        ledger: Optional[RunLedger] = None,
+    ):
         self.config = config
         self.client = OpenAI(
-            api_key=config.api_key,
+            api_key=config.api_key or "offline",  # Not used by offline transports
             organization=config.org_id
         )
         self.conversation_history: List[Dict[str, str]] = []
+        self._async_client: Optional[AsyncOpenAI] = None
+        
+        # Token usage of API calls made this run (cache hits excluded)
+        self.usage_totals: Dict[str, int] = {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
+        self._usage_lock = threading.Lock()
+        
+        # Per-call telemetry (phase, artifact, tokens, latency, cost)
+        self.ledger = ledger or RunLedger()
+        
+        # RPM/TPM budget shared by every caller (sync and async) of this model
+        self.limiter = get_rate_limiter("openai", config.model, config.rpm_limit, config.tpm_limit)
+        
+        # Live API, fixture record/replay or synthetic responses (--transport)
+        transport_config = transport_config or TransportConfig()
+        self.transport: Transport = create_transport(
+            transport_config.mode,
+            transport_config.fixtures_dir,
+            transport_config.latency,
+            transport_config.latency_scale
+        )
+        
+        # Persistent response cache (disabled with --no-cache). Only live runs
+        # use it: recording must see every request and offline responses must
+        # never be served to a later live run.
+        self.cache: Optional[ResponseCache] = None
+        if cache_config and cache_config.enabled and self.transport.name == "live":
+            self.cache = ResponseCache(
+                cache_config.cache_dir,
+                max_size_mb=cache_config.max_size_mb,
+                max_age_days=cache_config.max_age_days,
+                refresh=cache_config.refresh
+            )
+    
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Lazily created async OpenAI client used by agenerate()."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.config.api_key or "offline",
+                organization=self.config.org_id
+            )
+        return self._async_client
         
     def _build_system_prompt(self) -> str:
         """Build the system prompt for UVM generation."""
@@ -56,26 +118,18 @@ When generating code:
 - Start directly with the code (comments or class definition)
 - End with the closing endclass or endmodule statement"""
 
-    def generate(
+    def _build_messages(
         self,
         prompt: str,
         context: Optional[str] = None,
         examples: Optional[List[str]] = None,
-        temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None,
-    ) -> LLMResponse:
-        """
-        Generate UVM code using the LLM.
+    ) -> List[Dict[str, str]]:
+        """Assemble the chat message list for a generation request.
         
-        Args:
-            prompt: The main generation prompt
-            context: Additional context (block yaml, vplan, etc.)
-            examples: Example files for few-shot learning
-            temperature: Override default temperature
-            max_tokens: Override default max tokens
-            
-        Returns:
-            LLMResponse with generated code
+        Static material (system prompt, context, examples) comes first and the
+        per-call prompt last, so consecutive calls share a byte-identical
+        prefix that OpenAI's automatic prompt caching can reuse. Callers must
+        keep anything that varies per call out of context and examples.
         """
         messages = [{"role": "system", "content": self._build_system_prompt()}]
         
@@ -104,29 +158,229 @@ When generating code:
         
         # Add the main prompt
         messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def build_request(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        examples: Optional[List[str]] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+    ) -> Dict[str, Any]:
+        """Chat completion request body for a prompt.
+        
+        Shared by live calls and batch submission, so a prompt produces the
+        same request (and cache key) either way. ``json_mode`` asks the API
+        for a JSON object instead of bare code (packed Phase B requests).
+        """
+        body = {
+            "model": self.config.model,
+            "messages": self._build_messages(prompt, context, examples),
+            "temperature": temperature or self.config.temperature,
+            "max_tokens": max_tokens or self.config.max_tokens,
+        }
+        if json_mode:
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    def _cache_lookup(self, key: Optional[str]) -> Optional[LLMResponse]:
+        """Return a cached LLMResponse for key, if any."""
+        if not self.cache or not key:
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        return LLMResponse(
+            content=entry["content"],
+            model=entry["model"],
+            usage=entry.get("usage", {}),
+            finish_reason=entry.get("finish_reason", "stop")
+        )
+    
+    def _cache_store(self, key: Optional[str], result: LLMResponse):
+        """Store a response unless it was cut off by the token limit."""
+        if not self.cache or not key or result.finish_reason == "length":
+            return
+        self.cache.put(key, {
+            "content": result.content,
+            "model": result.model,
+            "usage": result.usage,
+            "finish_reason": result.finish_reason,
+        })
+    
+    def _cache_key(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Optional[str]:
+        """Content address of a request, or None when caching is disabled."""
+        if not self.cache:
+            return None
+        return ResponseCache.make_key(self.config.model, messages, temperature, max_tokens)
+
+    def _request_cache_key(self, body: Dict[str, Any]) -> Optional[str]:
+        """Cache key of a request body built by build_request()."""
+        return self._cache_key(body["messages"], body["temperature"], body["max_tokens"])
+
+    def cached_response(self, body: Dict[str, Any]) -> Optional[LLMResponse]:
+        """Return the cached response for a request body, if any."""
+        cached = self._cache_lookup(self._request_cache_key(body))
+        if cached:
+            self.ledger.record_call(body, cached, 0.0, cache_hit=True)
+        return cached
+
+    def batch_response(self, body: Dict[str, Any], completion: Dict[str, Any]) -> LLMResponse:
+        """Convert a chat completion returned by a batch, recording usage and caching it."""
+        result = self._to_response(ChatCompletion.model_validate(completion))
+        self.ledger.record_call(body, result, batch=True)
+        self._cache_store(self._request_cache_key(body), result)
+        return result
+
+    def _to_response(self, response) -> LLMResponse:
+        """Convert an OpenAI chat completion into an LLMResponse."""
+        details = getattr(response.usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        usage = {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.total_tokens,
+        }
+        
+        with self._usage_lock:
+            self.usage_totals["calls"] += 1
+            self.usage_totals["prompt_tokens"] += usage["prompt_tokens"]
+            self.usage_totals["cached_tokens"] += cached_tokens
+            self.usage_totals["completion_tokens"] += usage["completion_tokens"]
+        
+        return LLMResponse(
+            content=response.choices[0].message.content,
+            model=response.model,
+            usage=usage,
+            finish_reason=response.choices[0].finish_reason
+        )
+    
+    def prompt_cache_summary(self) -> str:
+        """One-line summary of provider prompt-cache hits for the run report."""
+        prompt_tokens = self.usage_totals["prompt_tokens"]
+        cached_tokens = self.usage_totals["cached_tokens"]
+        rate = (cached_tokens / prompt_tokens * 100) if prompt_tokens else 0.0
+        return (
+            f"Prompt cache: {cached_tokens:,} of {prompt_tokens:,} input tokens cached "
+            f"({rate:.0f}%) over {self.usage_totals['calls']} API calls"
+        )
+
+    def generate(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        examples: Optional[List[str]] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+    ) -> LLMResponse:
+        """
+        Generate UVM code using the LLM.
+        
+        Args:
+            prompt: The main generation prompt
+            context: Additional context (block yaml, vplan, etc.)
+            examples: Example files for few-shot learning
+            temperature: Override default temperature
+            max_tokens: Override default max tokens
+            json_mode: Request a JSON object response
+            
+        Returns:
+            LLMResponse with generated code
+        """
+        body = self.build_request(prompt, context, examples, temperature, max_tokens, json_mode)
+        
+        cache_key = self._request_cache_key(body)
+        cached = self._cache_lookup(cache_key)
+        if cached:
+            self.ledger.record_call(body, cached, 0.0, cache_hit=True)
+            return cached
         
+        queued = time.monotonic()
+        reserved = self.limiter.acquire(estimate_request_tokens(body["messages"], body["max_tokens"]))
+        start = time.monotonic()
         try:
-            response = self.client.chat.completions.create(
-                model=self.config.model,
-                messages=messages,
-                temperature=temperature or self.config.temperature,
-                max_tokens=max_tokens or self.config.max_tokens,
-            )
+            completion, headers = self.transport.send(self, body)
+            result = self._to_response(completion)
+            self.ledger.record_call(body, result, time.monotonic() - start, start - queued)
+            self.limiter.record(reserved, result.usage["total_tokens"], headers)
+            self._cache_store(cache_key, result)
+            return result
             
-            return LLMResponse(
-                content=response.choices[0].message.content,
-                model=response.model,
-                usage={
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens,
-                },
-                finish_reason=response.choices[0].finish_reason
-            )
+        except RateLimitError as e:
+            self.ledger.record_call(body, None, time.monotonic() - start, start - queued, error=e)
+            self._rate_limited(e)
+            raise
+        except Exception as e:
+            self.ledger.record_call(body, None, time.monotonic() - start, start - queued, error=e)
+            # Only a 429 keeps its reservation (the limiter is drained anyway)
+            self.limiter.release(reserved)
+            console.print(f"[red]Error calling OpenAI API: {e}[/red]")
+            raise
+
+    async def agenerate(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        examples: Optional[List[str]] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+    ) -> LLMResponse:
+        """
+        Async variant of generate() for concurrent generation.
+        
+        Takes the same arguments and builds the same messages as generate(),
+        so a given prompt produces the same request either way.
+        """
+        body = self.build_request(prompt, context, examples, temperature, max_tokens, json_mode)
+        
+        cache_key = self._request_cache_key(body)
+        cached = self._cache_lookup(cache_key)
+        if cached:
+            self.ledger.record_call(body, cached, 0.0, cache_hit=True)
+            return cached
+        
+        queued = time.monotonic()
+        reserved = await self.limiter.aacquire(estimate_request_tokens(body["messages"], body["max_tokens"]))
+        start = time.monotonic()
+        try:
+            completion, headers = await self.transport.asend(self, body)
+            result = self._to_response(completion)
+            self.ledger.record_call(body, result, time.monotonic() - start, start - queued)
+            self.limiter.record(reserved, result.usage["total_tokens"], headers)
+            self._cache_store(cache_key, result)
+            return result
             
+        except RateLimitError as e:
+            self.ledger.record_call(body, None, time.monotonic() - start, start - queued, error=e)
+            self._rate_limited(e)
+            raise
         except Exception as e:
+            self.ledger.record_call(body, None, time.monotonic() - start, start - queued, error=e)
+            # Only a 429 keeps its reservation (the limiter is drained anyway)
+            self.limiter.release(reserved)
             console.print(f"[red]Error calling OpenAI API: {e}[/red]")
             raise
+        except asyncio.CancelledError:
+            self.limiter.release(reserved)
+            raise
+
+    def _rate_limited(self, error: RateLimitError):
+        """Pause every caller of this model after a 429."""
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        wait = self.limiter.penalize(headers=headers)
+        console.print(f"[yellow]Rate limited by OpenAI - pausing requests for {wait:.1f}s[/yellow]")
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        """Backoff before the next attempt (rate limits wait in the limiter instead)."""
+        if isinstance(error, RateLimitError):
+            return 0.0
+        return min(2.0 ** attempt, 30.0)
 
     def generate_with_retry(
         self,
@@ -134,15 +388,42 @@ When generating code:
         context: Optional[str] = None,
         examples: Optional[List[str]] = None,
         max_retries: int = 3,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
     ) -> LLMResponse:
         """Generate with automatic retry on failure."""
         last_error = None
         for attempt in range(max_retries):
             try:
-                return self.generate(prompt, context, examples)
+                with call_tags(attempt=attempt):
+                    return self.generate(prompt, context, examples, max_tokens=max_tokens, json_mode=json_mode)
             except Exception as e:
                 last_error = e
                 console.print(f"[yellow]Attempt {attempt + 1} failed, retrying...[/yellow]")
+                if attempt < max_retries - 1:
+                    time.sleep(self._retry_delay(e, attempt))
+        raise last_error
+
+    async def agenerate_with_retry(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        examples: Optional[List[str]] = None,
+        max_retries: int = 3,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+    ) -> LLMResponse:
+        """Async variant of generate_with_retry()."""
+        last_error = None
+        for attempt in range(max_retries):
+            try:
+                with call_tags(attempt=attempt):
+                    return await self.agenerate(prompt, context, examples, max_tokens=max_tokens, json_mode=json_mode)
+            except Exception as e:
+                last_error = e
+                console.print(f"[yellow]Attempt {attempt + 1} failed, retrying...[/yellow]")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(self._retry_delay(e, attempt))
         raise last_error
 
 
@@ -160,3 +441,75 @@ def extract_code_from_response(response: str) -> str:
         lines = lines[:-1]
     
     return '\n'.join(lines)
+
+
+def extract_file_map(response: str) -> Dict[str, str]:
+    """
+    Parse a packed response: a JSON object mapping file names to code.
+    Tolerates markdown fences around the JSON or around each file; returns
+    an empty dict when the response is not such an object.
+    """
+    try:
+        data = json.loads(extract_code_from_response(response))
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        str(name): extract_code_from_response(code)
+        for name, code in data.items()
+        if isinstance(code, str) and code.strip()
+    }
+
+
+_FILE_DELIMITER_RE = re.compile(r"^[ \t]*//[ \t]*=+[ \t]*FILE:[ \t]*(\S+?)[ \t]*=+[ \t]*$", re.MULTILINE)
+
+
+def split_delimited_files(response: str) -> Dict[str, str]:
+    """
+    Split a combined response on ``// ===== FILE: <name> =====`` lines.
+    Text before the first delimiter is dropped, as are markdown fences
+    around each file; returns an empty dict when there is no delimiter.
+    """
+    matches = list(_FILE_DELIMITER_RE.finditer(response))
+    files = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(response)
+        code = extract_code_from_response(response[match.end():end])
+        if code.strip():
+            files[match.group(1)] = code
+    return files
+
+
+_SV_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_SV_STRING_RE = re.compile(r'"(?:\\.|[^"\\\n])*"')
+_SV_BLOCKS = [("class", "endclass"), ("function", "endfunction"), ("task", "endtask")]
+
+
+def validate_generated_code(code: str, class_name: Optional[str] = None) -> List[str]:
+    """
+    Cheap structural checks on generated SystemVerilog.
+    
+    Catches the usual failures of a truncated or mangled response: no code,
+    unbalanced class/function/task blocks, or a missing expected class.
+    
+    Returns:
+        List of problems (empty when the code looks complete)
+    """
+    if not code.strip():
+        return ["empty file"]
+    
+    text = _SV_STRING_RE.sub('""', _SV_COMMENT_RE.sub("", code))
+    # Forward, prototype and DPI declarations have no matching end keyword
+    text = re.sub(r"\btypedef\s+class\b", "", text)
+    text = re.sub(r"\b(?:extern|import|export|pure\s+virtual)\b[^;]*;", "", text)
+    
+    problems = []
+    for open_kw, close_kw in _SV_BLOCKS:
+        opened = len(re.findall(rf"\b{open_kw}\b", text))
+        closed = len(re.findall(rf"\b{close_kw}\b", text))
+        if opened != closed:
+            problems.append(f"{opened} '{open_kw}' but {closed} '{close_kw}'")
+    if class_name and not re.search(rf"\bclass\s+{re.escape(class_name)}\b", text):
+        problems.append(f"class {class_name} not defined")
+    return problems
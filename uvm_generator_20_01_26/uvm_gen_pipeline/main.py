@@ -37,6 +37,11 @@ from phase0_preprocess import run_phase0
 from phase_a_infrastructure import run_phase_a
 from phase_b_testgen import run_phase_b
 from phase_c_package import run_phase_c
+from scheduler import run_dag
+from manifest import Manifest
+from checkpoint import RunJournal
+from batch import BatchPending
+from telemetry import RunLedger, call_tags, default_ledger_path
 
 
 def print_banner():
@@ -77,6 +82,9 @@ class UVMGeneratorPipeline:
     def __init__(self, config: Config):
         self.config = config
         self.llm: Optional[UVMGeneratorLLM] = None
+        self.ledger: Optional[RunLedger] = None
+        self.manifest: Optional[Manifest] = None
+        self.journal: Optional[RunJournal] = None
         self.all_generated_files = []
         
     def initialize(self):
@@ -84,12 +92,62 @@ class UVMGeneratorPipeline:
         # Validate config
         self.config.validate()
         
+        # Per-call telemetry ledger for this run
+        ledger_path = self.config.pipeline.ledger_file or default_ledger_path(self.config.pipeline.output_dir)
+        self.ledger = RunLedger(ledger_path)
+        
         # Initialize LLM client
-        self.llm = UVMGeneratorLLM(self.config.openai)
+        self.llm = UVMGeneratorLLM(self.config.openai, self.config.cache, self.config.transport, self.ledger)
         
         # Create output directory
         self.config.pipeline.output_dir.mkdir(parents=True, exist_ok=True)
         
+        # Input fingerprints of the files generated by earlier runs
+        self.manifest = Manifest(self.config.pipeline.output_dir, force=self.config.pipeline.force)
+        
+        # Journal progress so an interrupted run can be resumed
+        self.journal = RunJournal(self.config.pipeline.output_dir)
+        self._start_journal()
+    
+    def _run_settings(self) -> dict:
+        """Settings recorded at the start of the journal."""
+        pipeline = self.config.pipeline
+        return {
+            "vplan": str(pipeline.vplan_file),
+            "block": str(pipeline.block_yaml_file),
+            "model_cpp": str(pipeline.model_cpp_file),
+            "model": self.config.openai.model,
+            "scheduler": pipeline.scheduler,
+            "pack_size": pipeline.pack_size,
+            "combined": pipeline.combined,
+            "cluster": pipeline.cluster,
+            "vseq_plan": pipeline.vseq_plan,
+            "scoreboard_holes": pipeline.scoreboard_holes,
+            "batch": pipeline.batch,
+        }
+    
+    def _start_journal(self):
+        """Start this run's journal, taking over an interrupted run's files with --resume."""
+        settings = self._run_settings()
+        interrupted = self.journal.load_interrupted()
+        if interrupted and self.config.pipeline.resume:
+            self.manifest.resume(interrupted)
+            phases = f", phases done: {', '.join(interrupted.phases_done)}" if interrupted.phases_done else ""
+            console.print(f"[cyan]Resuming run started {interrupted.started}: "
+                          f"{len(interrupted.artifacts)} files already generated{phases}[/cyan]")
+            changed = [key for key, value in settings.items() if interrupted.settings.get(key) != value]
+            if changed:
+                console.print(f"[yellow]Settings changed since the interrupted run: {', '.join(changed)} "
+                              f"(files are still only kept if their inputs match)[/yellow]")
+        elif self.config.pipeline.resume:
+            console.print("[yellow]No interrupted run to resume - running normally[/yellow]")
+        elif interrupted:
+            console.print(f"[yellow]The previous run ({interrupted.started}) was interrupted; "
+                          f"use --resume to keep its {len(interrupted.artifacts)} journaled files[/yellow]")
+            interrupted = None
+        self.journal.start(settings, carried=interrupted)
+        self.manifest.journal = self.journal
+        
     def run(self) -> list:
         """
         Execute the full pipeline.
@@ -104,38 +162,26 @@ class UVMGeneratorPipeline:
         # Phase 0: Preprocessing
         block_config, test_cases, model_info, uvc_mapping = run_phase0(self.config)
         
-        # Phase A: IP Infrastructure
-        ip_files = run_phase_a(
-            self.config,
-            self.llm,
-            block_config,
-            uvc_mapping,
-            model_info
-        )
-        self.all_generated_files.extend(ip_files)
-        
-        # Phase B: Test Case Generation
-        # Pass infrastructure files from Phase A as context for better test generation
-        test_files = run_phase_b(
-            self.config,
-            self.llm,
-            block_config,
-            test_cases,
-            uvc_mapping,
-            model_info,
-            infra_files=ip_files  # Pass Phase A files as context
-        )
-        self.all_generated_files.extend(test_files)
-        
-        # Phase C: Package & Integration
-        pkg_files = run_phase_c(
-            self.config,
-            self.llm,
-            block_config,
-            uvc_mapping,
-            self.all_generated_files
-        )
-        self.all_generated_files.extend(pkg_files)
+        try:
+            if self.config.pipeline.scheduler == "dag":
+                # Phases A-C as one artifact dependency graph
+                self.all_generated_files.extend(run_dag(
+                    self.config,
+                    self.llm,
+                    block_config,
+                    test_cases,
+                    uvc_mapping,
+                    model_info,
+                    self.manifest
+                ))
+            else:
+                self._run_phases(block_config, test_cases, model_info, uvc_mapping)
+            self.journal.finish()
+        finally:
+            # Keep the fingerprints of whatever was written, even on failure;
+            # an unfinished journal is what --resume picks up
+            self.manifest.save()
+            self.journal.close()
         
         # Print summary
         end_time = datetime.now()
@@ -145,8 +191,61 @@ class UVMGeneratorPipeline:
         console.print(f"[dim]Duration: {duration.total_seconds():.1f} seconds[/dim]\n")
         
         print_summary(self.config, self.all_generated_files)
+        if self.llm.cache:
+            console.print(f"[dim]{self.llm.cache.stats_line()}[/dim]")
+        console.print(f"[dim]{self.llm.prompt_cache_summary()}[/dim]")
+        console.print(f"[dim]{self.llm.limiter.summary()}[/dim]")
+        console.print(f"[dim]{self.manifest.summary()}[/dim]")
+        
+        phase_table = self.ledger.phase_table()
+        if phase_table:
+            console.print(phase_table)
+            console.print(f"[dim]LLM call ledger: {self.ledger.path}[/dim]")
         
         return self.all_generated_files
+    
+    def _run_phases(self, block_config: dict, test_cases: list, model_info: dict, uvc_mapping: dict):
+        """Run Phase A, then Phase B, then Phase C."""
+        # Phase A: IP Infrastructure
+        with call_tags(phase="A"):
+            ip_files = run_phase_a(
+                self.config,
+                self.llm,
+                block_config,
+                uvc_mapping,
+                model_info,
+                self.manifest
+            )
+        self.all_generated_files.extend(ip_files)
+        self.journal.phase_done("A")
+        
+        # Phase B: Test Case Generation
+        # Pass infrastructure files from Phase A as context for better test generation
+        with call_tags(phase="B"):
+            test_files = run_phase_b(
+                self.config,
+                self.llm,
+                block_config,
+                test_cases,
+                uvc_mapping,
+                model_info,
+                infra_files=ip_files,  # Pass Phase A files as context
+                manifest=self.manifest
+            )
+        self.all_generated_files.extend(test_files)
+        self.journal.phase_done("B")
+        
+        # Phase C: Package & Integration
+        with call_tags(phase="C"):
+            pkg_files = run_phase_c(
+                self.config,
+                block_config,
+                uvc_mapping,
+                self.all_generated_files,
+                self.manifest
+            )
+        self.all_generated_files.extend(pkg_files)
+        self.journal.phase_done("C")
 
 
 @click.command()
@@ -191,6 +290,11 @@ class UVMGeneratorPipeline:
     is_flag=True,
     help='Skip scoreboard generation'
 )
+@click.option(
+    '--scoreboard-holes',
+    is_flag=True,
+    help='Render the scoreboard skeleton from the UVC mapping and have the LLM fill only its checking logic'
+)
 @click.option(
     '--no-package',
     is_flag=True,
@@ -202,6 +306,129 @@ class UVMGeneratorPipeline:
     default=True,
     help='Enable verbose output'
 )
+@click.option(
+    '--scheduler',
+    type=click.Choice(['dag', 'phases']),
+    default='dag',
+    help='dag: start each artifact as soon as its inputs exist; phases: run Phase A, then B, then C'
+)
+@click.option(
+    '--max-inflight',
+    type=click.IntRange(min=1),
+    default=4,
+    help='Maximum concurrent LLM requests (Phase B only with --scheduler phases)'
+)
+@click.option(
+    '--pack-size',
+    type=click.IntRange(min=1),
+    default=1,
+    help='Pack up to N test cases with the same active UVCs into one Phase B request (ignored with --batch)'
+)
+@click.option(
+    '--combined',
+    is_flag=True,
+    help='Generate each test case\'s vseq and test in one Phase B request (ignored with --batch)'
+)
+@click.option(
+    '--cluster',
+    is_flag=True,
+    help='Generate one template per structural cluster of test cases and instantiate the members locally (ignored with --batch)'
+)
+@click.option(
+    '--vseq-plan',
+    is_flag=True,
+    help='Have the LLM return a JSON stimulus plan per vseq and render the SystemVerilog locally (replaces --pack-size, --combined and --cluster)'
+)
+@click.option(
+    '--rpm-limit',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Requests per minute to pace LLM calls at (default: $OPENAI_RPM_LIMIT or learned from response headers)'
+)
+@click.option(
+    '--tpm-limit',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Tokens per minute to pace LLM calls at (default: $OPENAI_TPM_LIMIT or learned from response headers)'
+)
+@click.option(
+    '--no-cache',
+    is_flag=True,
+    help='Disable the persistent LLM response cache'
+)
+@click.option(
+    '--force',
+    is_flag=True,
+    help='Regenerate every file, even those the output manifest has up to date'
+)
+@click.option(
+    '--resume',
+    is_flag=True,
+    help='Keep the files an interrupted run already generated (see <output>/.run_state.jsonl)'
+)
+@click.option(
+    '--refresh',
+    is_flag=True,
+    help='Ignore cached LLM responses (fresh responses are still cached)'
+)
+@click.option(
+    '--cache-dir',
+    type=click.Path(),
+    default=None,
+    help='LLM response cache directory (default: $UVM_GEN_CACHE_DIR or ./.llm_cache)'
+)
+@click.option(
+    '--batch',
+    is_flag=True,
+    help='Generate Phase B through the provider batch API (resumable)'
+)
+@click.option(
+    '--batch-provider',
+    type=click.Choice(['openai', 'local']),
+    default='openai',
+    help='Batch back-end; "local" reads results from files under <output>/.batch/local'
+)
+@click.option(
+    '--batch-poll-interval',
+    type=click.FloatRange(min=1),
+    default=60.0,
+    help='Seconds between batch status checks'
+)
+@click.option(
+    '--batch-no-wait',
+    is_flag=True,
+    help='Submit or check the batch once and exit; rerun to collect results'
+)
+@click.option(
+    '--transport',
+    type=click.Choice(['live', 'record', 'replay', 'synthetic']),
+    default='live',
+    help='LLM transport: live API, record fixtures, replay fixtures offline, or synthetic SV'
+)
+@click.option(
+    '--fixtures',
+    type=click.Path(),
+    default='.llm_fixtures',
+    help='Fixture store for --transport record/replay'
+)
+@click.option(
+    '--latency',
+    type=click.FloatRange(min=0),
+    default=None,
+    help='Fixed per-request latency in seconds for replay/synthetic (default: recorded/modelled)'
+)
+@click.option(
+    '--latency-scale',
+    type=click.FloatRange(min=0),
+    default=1.0,
+    help='Multiplier on replay/synthetic latency (0 = no delay)'
+)
+@click.option(
+    '--ledger',
+    type=click.Path(),
+    default=None,
+    help='Per-call LLM telemetry JSONL (default: <output>/.telemetry/run_<timestamp>.jsonl)'
+)
 @click.option(
     '--dry-run',
     is_flag=True,
@@ -215,8 +442,31 @@ def main(
     uvc_path: str,
     golden_ref: str,
     no_scoreboard: bool,
+    scoreboard_holes: bool,
     no_package: bool,
     verbose: bool,
+    scheduler: str,
+    max_inflight: int,
+    pack_size: int,
+    combined: bool,
+    cluster: bool,
+    vseq_plan: bool,
+    rpm_limit: Optional[int],
+    tpm_limit: Optional[int],
+    force: bool,
+    resume: bool,
+    no_cache: bool,
+    refresh: bool,
+    cache_dir: Optional[str],
+    batch: bool,
+    batch_provider: str,
+    batch_poll_interval: float,
+    batch_no_wait: bool,
+    transport: str,
+    fixtures: str,
+    latency: Optional[float],
+    latency_scale: float,
+    ledger: Optional[str],
     dry_run: bool
 ):
     """
@@ -224,12 +474,13 @@ def main(
     
     Generates complete UVM testbench from Vplan, Block YAML, and C++ model.
     
-    Requires OPENAI_API_KEY environment variable to be set.
+    Requires OPENAI_API_KEY environment variable to be set, except with
+    --transport replay/synthetic.
     """
     print_banner()
     
-    # Check for API key
-    if not os.getenv('OPENAI_API_KEY'):
+    # Check for API key (offline transports make no API calls)
+    if not os.getenv('OPENAI_API_KEY') and transport not in ('replay', 'synthetic'):
         console.print("[red]Error: OPENAI_API_KEY environment variable not set![/red]")
         console.print("\nPlease set your OpenAI API key:")
         console.print("  export OPENAI_API_KEY='your-api-key-here'")
@@ -249,8 +500,39 @@ def main(
     
     # Apply option flags
     config.pipeline.generate_scoreboard = not no_scoreboard
+    config.pipeline.scoreboard_holes = scoreboard_holes
     config.pipeline.generate_package = not no_package
     config.pipeline.verbose = verbose
+    config.pipeline.scheduler = scheduler
+    config.pipeline.max_inflight = max_inflight
+    if vseq_plan and (pack_size > 1 or combined or cluster):
+        # Plans are one small request per vseq; multi-file requests would return SystemVerilog
+        console.print("[yellow]--vseq-plan requests one plan per vseq: ignoring --pack-size, --combined and --cluster[/yellow]")
+        pack_size, combined, cluster = 1, False, False
+    config.pipeline.vseq_plan = vseq_plan
+    config.pipeline.pack_size = pack_size
+    config.pipeline.combined = combined
+    config.pipeline.cluster = cluster
+    if rpm_limit:
+        config.openai.rpm_limit = rpm_limit
+    if tpm_limit:
+        config.openai.tpm_limit = tpm_limit
+    config.pipeline.force = force
+    config.pipeline.resume = resume
+    config.cache.enabled = not no_cache
+    config.cache.refresh = refresh
+    if cache_dir:
+        config.cache.cache_dir = Path(cache_dir)
+    config.pipeline.batch = batch
+    config.pipeline.batch_provider = batch_provider
+    config.pipeline.batch_poll_interval = batch_poll_interval
+    config.pipeline.batch_wait = not batch_no_wait
+    config.transport.mode = transport
+    config.transport.fixtures_dir = Path(fixtures)
+    config.transport.latency = latency
+    config.transport.latency_scale = latency_scale
+    if ledger:
+        config.pipeline.ledger_file = Path(ledger)
     
     # Show configuration
     if verbose:
@@ -262,7 +544,18 @@ def main(
   Output:     {config.pipeline.output_dir}
   UVC Path:   {config.pipeline.uvc_library_path}
   Golden Ref: {config.pipeline.golden_ref_path}
-  Model:      {config.openai.model}""",
+  Model:      {config.openai.model}
+  Scheduler:  {config.pipeline.scheduler}
+  Inflight:   {config.pipeline.max_inflight}
+  Pack Size:  {'off (batch)' if config.pipeline.batch else 'off (cluster)' if config.pipeline.cluster else config.pipeline.pack_size}
+  Combined:   {'on' if config.pipeline.combined and not config.pipeline.batch else 'off'}
+  Cluster:    {'on' if config.pipeline.cluster and not config.pipeline.batch else 'off'}
+  Vseq Plan:  {'on' if config.pipeline.vseq_plan else 'off'}
+  Scoreboard: {'off' if not config.pipeline.generate_scoreboard else 'skeleton + holes' if config.pipeline.scoreboard_holes else 'whole file'}
+  Reuse:      {'off (--force)' if config.pipeline.force else 'files with unchanged inputs'}{' + interrupted run (--resume)' if config.pipeline.resume else ''}
+  LLM Cache:  {config.cache.cache_dir if config.cache.enabled and config.transport.mode == 'live' else 'disabled'}{' (refresh)' if config.cache.enabled and config.cache.refresh else ''}
+  Batch:      {config.pipeline.batch_provider if config.pipeline.batch else 'off'}
+  Transport:  {config.transport.mode}{f' ({config.transport.fixtures_dir})' if config.transport.mode in ('record', 'replay') else ''}""",
             title="Settings",
             border_style="blue"
         ))
@@ -280,6 +573,9 @@ def main(
         pipeline.initialize()
         generated_files = pipeline.run()
         
+    except BatchPending as e:
+        console.print(f"\n[yellow]{e}[/yellow]")
+        console.print("Rerun the same command with --batch to collect the results.")
     except FileNotFoundError as e:
         console.print(f"[red]Error: {e}[/red]")
         sys.exit(1)
@@ -0,0 +1,114 @@
+"""
+Input-hash manifest for incremental regeneration.
+Every generated file is recorded with a fingerprint of the inputs that
+produced it: the rendered prompt (vplan entry, Block YAML, UVC mapping and,
+for dependents, the upstream files it embeds), the few-shot example, the
+prompt template version and the model. A rerun reuses files whose
+fingerprint is unchanged and regenerates only the stale ones.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from prompts import PROMPT_TEMPLATE_VERSION
+from checkpoint import RunJournal, InterruptedRun
+
+MANIFEST_FILE = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+def artifact_inputs(model: str, context: Optional[str], prompt: str, example: Optional[str]) -> str:
+    """Fingerprint of everything an LLM-generated file depends on."""
+    digest = hashlib.sha256()
+    for part in (MANIFEST_VERSION, PROMPT_TEMPLATE_VERSION, model, context, prompt, example):
+        digest.update(json.dumps(part).encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def rendered_inputs(code: str) -> str:
+    """Fingerprint of a file rendered locally (no LLM): its content."""
+    return artifact_inputs(None, None, code, None)
+
+
+class Manifest:
+    """
+    Output manifest mapping each generated file to its input fingerprint.
+
+    Stored as JSON in the output directory; paths are relative to it.
+    """
+
+    def __init__(self, output_dir: Path, force: bool = False):
+        """
+        Args:
+            output_dir: Generation output directory (holds the manifest file)
+            force: Treat every file as stale (entries are still recorded)
+        """
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILE
+        self.force = force
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+        self.stats = {"reused": 0, "regenerated": 0}
+        self.journal: Optional[RunJournal] = None  # Journals every record() durably
+        self.resumed: set = set()  # Files of an interrupted run kept even with force
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the manifest; a missing or unreadable one is empty."""
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def _key(self, output_path: Path) -> str:
+        return Path(output_path).relative_to(self.output_dir).as_posix()
+
+    def is_current(self, output_path: Path, inputs: str) -> bool:
+        """True when the file exists and was generated from the same inputs."""
+        key = self._key(output_path)
+        if self.force and key not in self.resumed:
+            return False
+        entry = self.entries.get(key)
+        return entry is not None and entry.get("inputs") == inputs and Path(output_path).exists()
+    
+    def resume(self, run: InterruptedRun):
+        """Take over the files an interrupted run finished (they still need matching inputs)."""
+        for key, inputs in run.artifacts.items():
+            self.entries[key] = {"inputs": inputs, "generated_at": run.started}
+            self.resumed.add(key)
+
+    def reuse(self, output_path: Path) -> Path:
+        """Count a file kept from a previous run instead of regenerated."""
+        self.stats["reused"] += 1
+        return output_path
+
+    def record(self, output_path: Path, inputs: str):
+        """Record the input fingerprint of a file that was just written."""
+        self.entries[self._key(output_path)] = {
+            "inputs": inputs,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.stats["regenerated"] += 1
+        if self.journal:
+            self.journal.artifact_done(output_path, inputs)
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"version": MANIFEST_VERSION, "files": self.entries}, indent=1, sort_keys=True))
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        """One-line reuse summary for the run report."""
+        line = (f"Manifest: {self.stats['reused']} files up to date, "
+                f"{self.stats['regenerated']} generated")
+        if self.force:
+            line += " (--force)"
+        return line
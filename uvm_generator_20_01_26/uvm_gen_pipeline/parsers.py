@@ -50,6 +50,7 @@ class TestCase:
     stimulus: StimulusConfig
     observability: List[str] = field(default_factory=list)
     coverage_intent: Dict[str, List[str]] = field(default_factory=dict)
+    test_overrides: Dict[str, str] = field(default_factory=dict)  # phase -> custom behaviour
 
 
 @dataclass
@@ -194,7 +195,8 @@ def parse_vplan_yaml(file_path: Path) -> List[TestCase]:
             active_uvcs=item.get('Active_UVCs', []),
             stimulus=stimulus,
             observability=item.get('Observability', []),
-            coverage_intent=coverage
+            coverage_intent=coverage,
+            test_overrides=item.get('Test_Overrides') or {}
         )
         test_cases.append(test_case)
     
@@ -259,6 +261,12 @@ def parse_model_cpp(file_path: Path) -> ModelInfo:
     return model_info
 
 
+def instance_stem(name: str) -> str:
+    """UVC instance name without ``m_``/``_env`` (``m_feature_buffer_env`` gives ``feature_buffer``)."""
+    stem = name[2:] if name.startswith('m_') else name
+    return stem[:-4] if stem.endswith('_env') else stem
+
+
 def generate_uvc_mapping(block_config: BlockConfig, uvc_library_path: Path = None) -> Dict[str, Any]:
     """
     Generate UVC mapping configuration from block config.
@@ -306,8 +314,12 @@ def generate_uvc_mapping(block_config: BlockConfig, uvc_library_path: Path = Non
             # Get sequencer type and sequences from library scan or fallback
             sequencer_type = resolved_base_type.replace('_env', '_sequencer')
             sequence_types = get_sequence_types(resolved_base_type)
+            env_type = resolved_base_type
+            component_info = {}
             interface_type = None
+            interface_clock = None
             package_name = None
+            package_file = None
             
             # Override with dynamically scanned info if available
             if resolved_uvc_type in uvc_library_info:
@@ -315,17 +327,28 @@ def generate_uvc_mapping(block_config: BlockConfig, uvc_library_path: Path = Non
                 sequencer_type = lib_info.get('sequencer_type', sequencer_type)
                 sequence_types = lib_info.get('sequences', sequence_types)
                 interface_type = lib_info.get('interface_type')
+                interface_clock = lib_info.get('interface_clock')
+                env_type = lib_info.get('env_type') or env_type
+                component_info = lib_info
                 package_name = lib_info.get('package_name')
+                package_file = lib_info.get('package_file')
             
             mapping["uvcs"][interface.name] = {
                 "type": resolved_uvc_type,
                 "kind": kind,
                 "params": interface.params,
                 "model_arg": interface.map_to_model,
+                "env_type": env_type,
                 "sequencer_type": sequencer_type,
+                "sequencer_path": component_info.get('sequencer_path') or "m_agent.m_sequencer",
+                "vif_paths": component_info.get('vif_paths') or ["m_agent", "m_agent.m_driver"],
+                "analysis_ports": component_info.get('analysis_ports', []),
                 "sequence_types": sequence_types,
                 "interface_type": interface_type,
+                "interface_clock": interface_clock,
+                "config_db_name": f"{instance_stem(interface.name)}_vif",
                 "package_name": package_name,
+                "package_file": package_file,
                 "param_signature": get_param_signature(resolved_base_type, uvc_library_info.get(resolved_uvc_type, {}))
             }
     
@@ -363,7 +386,9 @@ def scan_uvc_library(uvc_path: Path) -> Dict[str, Dict]:
             "sequencer_type": None,
             "env_type": None,
             "interface_type": None,
+            "interface_clock": None,
             "package_name": None,
+            "package_file": None,
             "parameters": [],
             "param_defaults": {}
         }
@@ -393,6 +418,10 @@ def scan_uvc_library(uvc_path: Path) -> Dict[str, Dict]:
         if if_dir.exists():
             info.update(_parse_uvc_interface(if_dir))
         
+        # Walk the component hierarchy below the env
+        if info["env_type"]:
+            info.update(_parse_uvc_components(uvc_dir, info["env_type"], info["sequencer_type"]))
+        
         uvc_info[uvc_name] = info
     
     return uvc_info
@@ -409,6 +438,7 @@ def _parse_uvc_package(pkg_dir: Path) -> Dict:
         pkg_match = re.search(r'package\s+(\w+)\s*;', content)
         if pkg_match:
             result["package_name"] = pkg_match.group(1)
+            result["package_file"] = pkg_file.name
         
         # Extract included files to understand component structure
         includes = re.findall(r'`include\s+"([^"]+)"', content)
@@ -507,14 +537,55 @@ def _parse_uvc_interface(if_dir: Path) -> Dict:
     for if_file in if_dir.glob("*.sv"):
         content = if_file.read_text()
         
-        # Extract interface definition with parameters
+        # Extract interface definition with parameters and its clock port
+        # (anchored so header comments like "istream_if interface which ..." don't match)
         if_match = re.search(
-            r'interface\s+(\w+)\s*(?:#\s*\(\s*([^)]+)\s*\))?',
-            content
+            r'^\s*interface\s+(\w+)\s*(?:#\s*\(\s*([^)]+)\s*\))?\s*\(\s*input\s+(?:logic\s+)?(\w+)',
+            content,
+            re.MULTILINE
         )
         if if_match:
             result["interface_type"] = if_match.group(1)
+            result["interface_clock"] = if_match.group(3)
+    
+    return result
+
+
+def _parse_uvc_components(uvc_dir: Path, env_type: str, sequencer_type: Optional[str]) -> Dict:
+    """Walk the component hierarchy below the env class.
+    
+    Returns the paths (relative to the env instance) of the components that
+    hold a ``vif`` to assign, of the sequencer, and of the monitor analysis
+    ports, e.g. ``m_agent.m_driver`` and ``m_agent.m_monitor.istream_wr_port``.
+    """
+    classes = {}
+    for sv_file in uvc_dir.glob("*/*.sv"):
+        content = sv_file.read_text(errors='ignore')
+        for class_match in re.finditer(r'^\s*class\s+(\w+)(.*?)^\s*endclass', content, re.MULTILINE | re.DOTALL):
+            body = class_match.group(2)
+            classes[class_match.group(1)] = {
+                "members": re.findall(r'^\s*(\w+)\s*(?:#\s*\([^;]*?\))?\s+(m_\w+)\s*;', body, re.MULTILINE),
+                "has_vif": bool(re.search(r'^\s*virtual\s+\w+[^;]*\bvif\s*;', body, re.MULTILINE)),
+                "ports": re.findall(r'^\s*uvm_analysis_port\s*#\s*\((.+)\)\s+(\w+)\s*;', body, re.MULTILINE),
+            }
     
+    result = {"vif_paths": [], "sequencer_path": None, "analysis_ports": []}
+    
+    def walk(class_name: str, prefix: str):
+        for member_type, member in classes.get(class_name, {}).get("members", []):
+            member_info = classes.get(member_type)
+            if member_info is None or member_type == class_name:
+                continue
+            path = f"{prefix}.{member}" if prefix else member
+            if member_info["has_vif"]:
+                result["vif_paths"].append(path)
+            if member_type == sequencer_type:
+                result["sequencer_path"] = path
+            for item_type, port in member_info["ports"]:
+                result["analysis_ports"].append({"path": f"{path}.{port}", "item_type": item_type.strip()})
+            walk(member_type, path)
+    
+    walk(env_type, "")
     return result
 
 
@@ -20,6 +20,7 @@ from parsers import (
     TestCase,
     ModelInfo
 )
+from clustering import cluster_test_cases, template_values, TestCaseCluster
 
 console = Console()
 
@@ -33,6 +34,7 @@ class Phase0Preprocessor:
         self.test_cases: list[TestCase] = []
         self.model_info: ModelInfo = None
         self.uvc_mapping: Dict[str, Any] = {}
+        self.clusters: list[TestCaseCluster] = []
         
     def run(self) -> Tuple[Dict, list, Dict, Dict]:
         """
@@ -55,7 +57,10 @@ class Phase0Preprocessor:
         # Step 0.4: Generate UVC Mapping
         self._generate_uvc_mapping()
         
-        # Step 0.5: Save intermediate configs
+        # Step 0.5: Cluster test cases by structure
+        self._cluster_test_cases()
+        
+        # Step 0.6: Save intermediate configs
         self._save_configs()
         
         console.print("[green]Phase 0 complete[/green]\n")
@@ -147,9 +152,23 @@ class Phase0Preprocessor:
                 seq_count = len(uvc_info.get('sequence_types', []))
                 console.print(f"    - {uvc_name}: {seq_count} sequences available")
     
+    def _cluster_test_cases(self):
+        """Group test cases that differ only in register values and pattern bins.
+        
+        Phase B generates one template per cluster with --cluster.
+        """
+        console.print("  [0.5] Clustering test cases...", end=" ")
+        
+        self.clusters = cluster_test_cases(self.test_cases)
+        console.print(f"[green]OK[/green] ({len(self.test_cases)} test cases in {len(self.clusters)} structural clusters)")
+        
+        if self.config.pipeline.verbose:
+            for cluster in self.clusters:
+                console.print(f"    - {cluster.exemplar.tc_id}: {len(cluster.members)} test cases")
+    
     def _save_configs(self):
         """Save intermediate configuration files."""
-        console.print("  [0.5] Saving configurations...", end=" ")
+        console.print("  [0.6] Saving configurations...", end=" ")
         
         output_dir = self.config.pipeline.output_dir
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -169,6 +188,15 @@ class Phase0Preprocessor:
                 f.write(f"Output files: {', '.join(self.model_info.output_files)}\n")
                 f.write(f"Parameters: {', '.join(self.model_info.parameters)}\n")
         
+        # Save test case clusters with each member's template values
+        clusters_file = output_dir / "clusters.yaml"
+        with open(clusters_file, 'w') as f:
+            yaml.dump([
+                {'exemplar': cluster.exemplar.tc_id,
+                 'members': {tc.tc_id: template_values(tc) for tc in cluster.members}}
+                for cluster in self.clusters
+            ], f, default_flow_style=False, sort_keys=False)
+        
         console.print("[green]OK[/green]")
 
 
@@ -1,26 +1,47 @@
 """
 Phase A: IP Infrastructure Generation
 Generates one-time IP-level UVM components: interface, virtual sequencer, environment, scoreboard.
+The virtual sequencer and environment are rendered locally from the UVC mapping (see emitters.py).
+With ``--scoreboard-holes`` the scoreboard skeleton is rendered too and the LLM fills only its holes.
 """
 
+import asyncio
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from rich.console import Console
 from rich.panel import Panel
 
 from config import Config
-from llm_client import UVMGeneratorLLM, extract_code_from_response
+from llm_client import UVMGeneratorLLM, extract_code_from_response, extract_file_map, validate_generated_code
+from manifest import Manifest, artifact_inputs, rendered_inputs
+from telemetry import call_tags
+from emitters import (
+    dut_interface,
+    is_output_uvc,
+    scoreboard_ports,
+    scoreboard_holes,
+    render_virtual_sequencer,
+    render_environment,
+    render_scoreboard_skeleton,
+    check_hole_fills,
+    splice_holes
+)
 from prompts import (
     INTERFACE_GENERATION_PROMPT,
-    VIRTUAL_SEQUENCER_PROMPT,
-    ENVIRONMENT_PROMPT,
     SCOREBOARD_PROMPT,
+    SCOREBOARD_HOLES_PROMPT,
     build_context,
     format_prompt
 )
 
 console = Console()
 
+# Artifacts rendered locally instead of requested (their builder returns code, not a prompt)
+RENDERED_ARTIFACTS = ('virtual_sequencer', 'environment')
+
+# Response budget of the scoreboard holes request (the skeleton is not repeated)
+HOLES_MAX_TOKENS = 4096
+
 
 class PhaseAInfrastructure:
     """Generates IP-level infrastructure components."""
@@ -31,15 +52,22 @@ class PhaseAInfrastructure:
         llm: UVMGeneratorLLM,
         block_config: Dict,
         uvc_mapping: Dict,
-        model_info: Dict
+        model_info: Dict,
+        manifest: Optional[Manifest] = None
     ):
         self.config = config
         self.llm = llm
         self.block_config = block_config
         self.uvc_mapping = uvc_mapping
         self.model_info = model_info
+        self.manifest = manifest  # Reuse files whose inputs are unchanged
         self.generated_files: List[Path] = []
         
+        # Shared prompt material, set by prepare()
+        self.output_dir: Optional[Path] = None
+        self.context = ""
+        self.examples: Dict[str, str] = {}
+        
         # Derive names from block config
         self.block_name = block_config.get('name', 'dut')
         self.short_name = self._get_short_name()
@@ -62,29 +90,157 @@ class PhaseAInfrastructure:
         """
         console.print(Panel("[bold cyan]Phase A: IP Infrastructure Generation[/bold cyan]"))
         
-        output_dir = self.config.pipeline.output_dir / "ip"
-        output_dir.mkdir(parents=True, exist_ok=True)
+        self.prepare()
         
-        # Load example files for few-shot learning
-        examples = self._load_example_files()
-        context = build_context(self.block_config, self.uvc_mapping, self.model_info)
+        # A.1 Interface, A.2 Virtual Sequencer, A.3 Environment, A.4 Scoreboard (optional)
+        for key, (step, title, _) in self.artifacts().items():
+            console.print(f"  [{step}] Generating {title}...", end=" ")
+            output_path = self.generate_artifact(key)
+            console.print(f"[green]OK[/green] ({output_path.name})")
         
-        # A.1 Generate Interface
-        self._generate_interface(output_dir, context, examples.get('interface'))
+        console.print(f"[green]Phase A complete - Generated {len(self.generated_files)} files[/green]\n")
         
-        # A.2 Generate Virtual Sequencer
-        self._generate_virtual_sequencer(output_dir, context, examples.get('virtual_sequencer'))
+        return self.generated_files
+    
+    def prepare(self):
+        """Create the output directory and load the prompt material shared by all artifacts."""
+        self.output_dir = self.config.pipeline.output_dir / "ip"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # A.3 Generate Environment
-        self._generate_environment(output_dir, context, examples.get('environment'))
+        # Load example files for few-shot learning
+        self.examples = self._load_example_files()
+        self.context = build_context(self.block_config, self.uvc_mapping, self.model_info)
+    
+    def artifacts(self) -> Dict[str, Tuple[str, str, Callable[[], Tuple[str, str]]]]:
+        """Phase A artifacts in generation order: key -> (step, title, builder).
         
-        # A.4 Generate Scoreboard (optional)
+        The artifacts do not depend on each other; each is built from the
+        block configuration and UVC mapping only. A builder returns
+        (prompt, output_filename), or (code, output_filename) for
+        RENDERED_ARTIFACTS.
+        """
+        artifacts = {
+            'interface': ("A.1", "Interface", self._build_interface_prompt),
+            'virtual_sequencer': ("A.2", "Virtual Sequencer", self._render_virtual_sequencer),
+            'environment': ("A.3", "Environment", self._render_environment),
+        }
         if self.config.pipeline.generate_scoreboard:
-            self._generate_scoreboard(output_dir, context, examples.get('scoreboard'))
+            artifacts['scoreboard'] = ("A.4", "Scoreboard", self._build_scoreboard_prompt)
+        return artifacts
+    
+    def generate_artifact(self, key: str) -> Path:
+        """Generate one artifact (see artifacts()) and write it to the ip directory.
         
-        console.print(f"[green]Phase A complete - Generated {len(self.generated_files)} files[/green]\n")
+        An artifact the manifest has up to date is reused without a request.
+        """
+        if key in RENDERED_ARTIFACTS:
+            return self._write_rendered(key)
+        if key == 'scoreboard' and self.config.pipeline.scoreboard_holes:
+            return self._generate_scoreboard_holes()
+        prompt, output_filename = self.artifacts()[key][2]()
+        example = self.examples.get(key)
+        inputs = artifact_inputs(self.config.openai.model, self.context, prompt, example)
+        output_path = self._reusable(output_filename, inputs)
+        if output_path:
+            return output_path
+        response = self.llm.generate(prompt, context=self.context, examples=[example] if example else None)
+        return self._write_code(output_filename, response.content, inputs)
+    
+    async def agenerate_artifact(self, key: str, semaphore: asyncio.Semaphore) -> Path:
+        """Async variant of generate_artifact() holding a slot of ``semaphore`` for the request."""
+        if key in RENDERED_ARTIFACTS:
+            return self._write_rendered(key)
+        if key == 'scoreboard' and self.config.pipeline.scoreboard_holes:
+            return await self._agenerate_scoreboard_holes(semaphore)
+        prompt, output_filename = self.artifacts()[key][2]()
+        example = self.examples.get(key)
+        inputs = artifact_inputs(self.config.openai.model, self.context, prompt, example)
+        output_path = self._reusable(output_filename, inputs)
+        if output_path:
+            return output_path
+        async with semaphore:
+            response = await self.llm.agenerate_with_retry(
+                prompt, context=self.context, examples=[example] if example else None
+            )
+        return self._write_code(output_filename, response.content, inputs)
+    
+    def _generate_scoreboard_holes(self) -> Path:
+        """Fill the holes of the rendered scoreboard skeleton, or generate the whole file if the fills are rejected."""
+        prompt, output_filename, skeleton = self._build_scoreboard_holes_prompt()
+        inputs = artifact_inputs(self.config.openai.model, self.context, prompt, None)
+        output_path = self._reusable(output_filename, inputs)
+        if output_path:
+            return output_path
+        with call_tags(artifact=output_filename):
+            response = self.llm.generate(prompt, context=self.context, max_tokens=HOLES_MAX_TOKENS, json_mode=True)
+        output_path = self._write_filled(output_filename, skeleton, response.content, inputs)
+        if output_path:
+            return output_path
+        prompt, _ = self._build_scoreboard_prompt()
+        response = self.llm.generate(prompt, context=self.context)
+        return self._write_code(output_filename, response.content, inputs)
+    
+    async def _agenerate_scoreboard_holes(self, semaphore: asyncio.Semaphore) -> Path:
+        """Async variant of _generate_scoreboard_holes() holding a slot of ``semaphore`` per request."""
+        prompt, output_filename, skeleton = self._build_scoreboard_holes_prompt()
+        inputs = artifact_inputs(self.config.openai.model, self.context, prompt, None)
+        output_path = self._reusable(output_filename, inputs)
+        if output_path:
+            return output_path
+        async with semaphore:
+            with call_tags(artifact=output_filename):
+                response = await self.llm.agenerate_with_retry(
+                    prompt, context=self.context, max_tokens=HOLES_MAX_TOKENS, json_mode=True
+                )
+        output_path = self._write_filled(output_filename, skeleton, response.content, inputs)
+        if output_path:
+            return output_path
+        prompt, _ = self._build_scoreboard_prompt()
+        async with semaphore:
+            response = await self.llm.agenerate_with_retry(prompt, context=self.context)
+        return self._write_code(output_filename, response.content, inputs)
+    
+    def _write_filled(self, output_filename: str, skeleton: str, content: str, inputs: str) -> Optional[Path]:
+        """Splice the hole fills of a response into the skeleton and write it.
         
-        return self.generated_files
+        Returns None (problems logged to the run ledger) if the fills are
+        rejected; the manifest records ``inputs`` either way, so a fallback
+        file is reused by the next run too.
+        """
+        class_name = Path(output_filename).stem
+        fills = extract_file_map(content)
+        problems = check_hole_fills(skeleton, fills, class_name) if fills else ["no JSON object of hole fills in the response"]
+        code = splice_holes(skeleton, fills)
+        problems = problems or validate_generated_code(code, class_name)
+        if problems:
+            console.print(f"[yellow]scoreboard holes rejected ({problems[0]}) - generating the whole file[/yellow]", end=" ")
+            self.llm.ledger.record_validation(output_filename, problems)
+            return None
+        return self._write_code(output_filename, code, inputs)
+    
+    def _reusable(self, output_filename: str, inputs: str) -> Optional[Path]:
+        """Existing file in the ip directory if the manifest has it up to date for ``inputs``."""
+        output_path = self.output_dir / output_filename
+        if self.manifest and self.manifest.is_current(output_path, inputs):
+            self.generated_files.append(output_path)
+            return self.manifest.reuse(output_path)
+        return None
+    
+    def _write_rendered(self, key: str) -> Path:
+        """Write a locally rendered artifact (reused when the manifest has the same content)."""
+        code, output_filename = self.artifacts()[key][2]()
+        inputs = rendered_inputs(code)
+        return self._reusable(output_filename, inputs) or self._write_code(output_filename, code, inputs)
+    
+    def _write_code(self, output_filename: str, content: str, inputs: str) -> Path:
+        """Extract code from an LLM response, write it to the ip directory and record its inputs."""
+        code = extract_code_from_response(content)
+        output_path = self.output_dir / output_filename
+        output_path.write_text(code)
+        self.generated_files.append(output_path)
+        if self.manifest:
+            self.manifest.record(output_path, inputs)
+        return output_path
     
     def _load_example_files(self) -> Dict[str, str]:
         """Load example files from golden reference for few-shot learning."""
@@ -96,23 +252,12 @@ class PhaseAInfrastructure:
         if interface_file.exists():
             examples['interface'] = interface_file.read_text()
         
-        # Virtual sequencer example
-        vseqr_file = golden_path / "dimc_tile_DUT_files" / "virtual_sequencer" / "p18_dimc_tile_wrap_virtual_sequencer.sv"
-        if vseqr_file.exists():
-            examples['virtual_sequencer'] = vseqr_file.read_text()
-        
-        # Environment example
-        env_file = golden_path / "dimc_tile_DUT_files" / "env" / "p18_dimc_tile_wrap_env.sv"
-        if env_file.exists():
-            examples['environment'] = env_file.read_text()
-        
         return examples
     
-    def _generate_interface(self, output_dir: Path, context: str, example: Optional[str]):
-        """Generate the main DUT interface file."""
-        console.print("  [A.1] Generating Interface...", end=" ")
-        
+    def _build_interface_prompt(self) -> Tuple[str, str]:
+        """Build the main DUT interface prompt. Returns (prompt, output_filename)."""
         output_filename = f"{self.short_name}_if.sv"
+        interface_name, vif_key = dut_interface(self.short_name)
         
         # Build interface list from UVC mapping
         interface_list = []
@@ -129,123 +274,67 @@ class PhaseAInfrastructure:
             clock_freq=self.block_config.get('clock_freq', '100MHz'),
             reset_name=self.block_config.get('reset_name', 'resetn'),
             reset_polarity=reset_polarity,
+            interface_name=interface_name,
+            vif_key=vif_key,
             interface_list='\n'.join(interface_list),
             output_filename=output_filename
         )
-        
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
-        
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
-        self.generated_files.append(output_path)
-        
-        console.print(f"[green]OK[/green] ({output_filename})")
+        return prompt, output_filename
     
-    def _generate_virtual_sequencer(self, output_dir: Path, context: str, example: Optional[str]):
-        """Generate the virtual sequencer file."""
-        console.print("  [A.2] Generating Virtual Sequencer...", end=" ")
-        
-        output_filename = f"{self.short_name}_virtual_sequencer.sv"
-        
-        # Build sequencer list from UVC mapping
-        sequencer_list = []
-        for name, info in self.uvc_mapping.get('uvcs', {}).items():
-            seqr_type = info.get('sequencer_type', 'uvm_sequencer')
-            kind = info.get('kind', '')
-            
-            # Extract parameters from kind (e.g., "istream_env#(64)" -> "#(64)")
-            params = ""
-            if '#(' in kind:
-                params = kind[kind.index('#'):]
-                params = params.replace('_env', '_sequencer')
-            
-            sequencer_list.append(f"- {seqr_type}{params} seqr_{name.replace('m_', '').replace('_env', '')}")
-        
-        prompt = format_prompt(
-            VIRTUAL_SEQUENCER_PROMPT,
-            block_name=self.block_name,
-            sequencer_list='\n'.join(sequencer_list),
-            output_filename=output_filename
-        )
-        
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
-        
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
-        self.generated_files.append(output_path)
-        
-        console.print(f"[green]OK[/green] ({output_filename})")
+    def _render_virtual_sequencer(self) -> Tuple[str, str]:
+        """Render the virtual sequencer from the UVC mapping. Returns (code, output_filename)."""
+        class_name = f"{self.short_name}_virtual_sequencer"
+        return render_virtual_sequencer(class_name, self.short_name, self.uvc_mapping), f"{class_name}.sv"
     
-    def _generate_environment(self, output_dir: Path, context: str, example: Optional[str]):
-        """Generate the top-level environment file."""
-        console.print("  [A.3] Generating Environment...", end=" ")
-        
-        output_filename = f"{self.short_name}_env.sv"
-        
-        # Build environment list
-        env_list = []
-        params_config = []
+    def _render_environment(self) -> Tuple[str, str]:
+        """Render the top-level environment from the UVC mapping. Returns (code, output_filename)."""
+        class_name = f"{self.short_name}_env"
+        scoreboard_class = f"{self.short_name}_scoreboard" if self.config.pipeline.generate_scoreboard else None
+        code = render_environment(class_name, self.short_name, self.uvc_mapping, scoreboard_class)
+        return code, f"{class_name}.sv"
+    
+    def _output_data_width(self) -> int:
+        """Data width of the first output UVC in the UVC mapping (64 if none)."""
         for name, info in self.uvc_mapping.get('uvcs', {}).items():
-            kind = info.get('kind', '')
-            params = info.get('params', {})
-            env_list.append(f"- {kind} {name}")
-            if params:
-                params_config.append(f"{name}: {params}")
-        
-        prompt = format_prompt(
-            ENVIRONMENT_PROMPT,
-            block_name=self.block_name,
-            env_list='\n'.join(env_list),
-            params_config='\n'.join(params_config) if params_config else "No special parameters",
-            output_filename=output_filename
-        )
-        
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
-        
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
-        self.generated_files.append(output_path)
-        
-        console.print(f"[green]OK[/green] ({output_filename})")
+            if is_output_uvc(name, info):
+                return info.get('params', {}).get('DATA_WIDTH', 64)
+        return 64
     
-    def _generate_scoreboard(self, output_dir: Path, context: str, example: Optional[str]):
-        """Generate the scoreboard file."""
-        console.print("  [A.4] Generating Scoreboard...", end=" ")
-        
+    def _build_scoreboard_prompt(self) -> Tuple[str, str]:
+        """Build the scoreboard prompt. Returns (prompt, output_filename)."""
         output_filename = f"{self.short_name}_scoreboard.sv"
+        data_width = self._output_data_width()
         
-        # Get output data width from UVC mapping
-        data_width = 64  # Default
-        for name, info in self.uvc_mapping.get('uvcs', {}).items():
-            if 'output' in name.lower() or 'ostream' in info.get('kind', '').lower():
-                params = info.get('params', {})
-                data_width = params.get('DATA_WIDTH', 64)
-                break
+        imp_ports = [f"   - {imp}: receives {item_type} from {port}"
+                     for port, imp, item_type in scoreboard_ports(self.uvc_mapping)]
         
         prompt = format_prompt(
             SCOREBOARD_PROMPT,
+            class_name=f"{self.short_name}_scoreboard",
             block_name=self.block_name,
+            imp_ports='\n'.join(imp_ports) or "   - (no output monitor ports found; declare none)",
             expected_output_file="output_buffer_expected_out_psout_hex.txt",
             data_width=data_width,
             num_entries=32,
             output_filename=output_filename
         )
-        
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
-        
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
-        self.generated_files.append(output_path)
-        
-        console.print(f"[green]OK[/green] ({output_filename})")
+        return prompt, output_filename
+    
+    def _build_scoreboard_holes_prompt(self) -> Tuple[str, str, str]:
+        """Build the scoreboard holes prompt. Returns (prompt, output_filename, skeleton)."""
+        class_name = f"{self.short_name}_scoreboard"
+        skeleton = render_scoreboard_skeleton(class_name, self.uvc_mapping)
+        prompt = format_prompt(
+            SCOREBOARD_HOLES_PROMPT,
+            class_name=class_name,
+            block_name=self.block_name,
+            skeleton=skeleton,
+            holes='\n'.join(f"- {name}: {description}" for name, description in scoreboard_holes(self.uvc_mapping)),
+            expected_output_file="output_buffer_expected_out_psout_hex.txt",
+            data_width=self._output_data_width(),
+            num_entries=32
+        )
+        return prompt, f"{class_name}.sv", skeleton
 
 
 def run_phase_a(
@@ -253,8 +342,9 @@ def run_phase_a(
     llm: UVMGeneratorLLM,
     block_config: Dict,
     uvc_mapping: Dict,
-    model_info: Dict
+    model_info: Dict,
+    manifest: Optional[Manifest] = None
 ) -> List[Path]:
     """Convenience function to run Phase A."""
-    phase = PhaseAInfrastructure(config, llm, block_config, uvc_mapping, model_info)
+    phase = PhaseAInfrastructure(config, llm, block_config, uvc_mapping, model_info, manifest)
     return phase.run()
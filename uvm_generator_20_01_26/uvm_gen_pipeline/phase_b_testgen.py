@@ -3,19 +3,50 @@ Phase B: Test Case Generation
 Generates test files and virtual sequences for each test case in the Vplan.
 """
 
+import asyncio
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from dataclasses import asdict
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
 from config import Config
-from llm_client import UVMGeneratorLLM, extract_code_from_response
+from llm_client import (
+    UVMGeneratorLLM,
+    extract_code_from_response,
+    extract_file_map,
+    split_delimited_files,
+    validate_generated_code
+)
+from manifest import Manifest, artifact_inputs, rendered_inputs
+from emitters import render_test, render_vseq
+from stimulus_plan import (
+    parse_plan, validate_plan, describe_uvcs, register_mapping,
+    regbank_values, describe_regbank, fill_regbank,
+)
+from clustering import (
+    cluster_test_cases,
+    template_values,
+    describe_placeholders,
+    templatize,
+    check_template,
+    instantiate,
+    check_instance,
+    instance_inputs
+)
+from batch import BatchJob, BatchProvider, OpenAIBatchProvider, LocalBatchProvider, make_custom_id
 from parsers import TestCase
+from telemetry import call_tags
 from prompts import (
     TEST_FILE_PROMPT,
     VIRTUAL_SEQUENCE_PROMPT,
+    VSEQ_PLAN_PROMPT,
+    VSEQ_PLAN_EXAMPLE,
+    PACKED_TEST_CASES_PROMPT,
+    COMBINED_TEST_CASE_PROMPT,
+    CLUSTER_TEMPLATE_PROMPT,
+    FILE_DELIMITER,
     build_context,
     build_infra_context,
     format_prompt
@@ -23,6 +54,12 @@ from prompts import (
 
 console = Console()
 
+# Output token ceiling for a multi-file request (per-file budget x files, capped)
+MULTI_FILE_MAX_TOKENS = 32768
+
+# Output token ceiling for a stimulus plan request (--vseq-plan)
+PLAN_MAX_TOKENS = 2048
+
 
 class PhaseBTestGeneration:
     """Generates test files and virtual sequences for each test case."""
@@ -35,7 +72,8 @@ class PhaseBTestGeneration:
         test_cases: List[TestCase],
         uvc_mapping: Dict,
         model_info: Dict,
-        infra_files: List[Path] = None
+        infra_files: List[Path] = None,
+        manifest: Optional[Manifest] = None
     ):
         self.config = config
         self.llm = llm
@@ -44,7 +82,19 @@ class PhaseBTestGeneration:
         self.uvc_mapping = uvc_mapping
         self.model_info = model_info
         self.infra_files = infra_files or []  # Infrastructure files from Phase A
+        self.manifest = manifest  # Reuse files whose inputs are unchanged
         self.generated_files: List[Path] = []
+        self.multi_file_stats = {"packed_requests": 0, "packed_test_cases": 0, "combined_requests": 0, "fallbacks": 0}
+        self.cluster_stats = {"clusters": 0, "test_cases": 0, "instantiated": 0, "fallbacks": 0}
+        self.rendered_tests = 0
+        self.plan_stats = {"rendered": 0, "fallbacks": 0}
+        self.failed: Dict[str, BaseException] = {}  # TC_ID -> error of its request group
+        
+        # Output directories and shared prompt material, set by prepare()
+        self.tests_dir: Optional[Path] = None
+        self.vseq_dir: Optional[Path] = None
+        self.context: Optional[str] = None
+        self.examples: Dict[str, str] = {}
         
         # Derive names
         self.block_name = block_config.get('name', 'dut')
@@ -67,14 +117,35 @@ class PhaseBTestGeneration:
         """
         console.print(Panel("[bold cyan]Phase B: Test Case Generation[/bold cyan]"))
         
+        self.prepare()
+        tests_dir, vseq_dir, context, examples = self.tests_dir, self.vseq_dir, self.context, self.examples
+        
+        if self.config.pipeline.batch:
+            # Submit all prompts through the provider batch API (--batch)
+            self._run_batch(tests_dir, vseq_dir, context, examples)
+        else:
+            # Generate all test cases concurrently (bounded by --max-inflight)
+            asyncio.run(self._run_async(tests_dir, vseq_dir, context, examples))
+        
+        self.print_report()
+        if self.failed:
+            # The files of the other test cases are written and in the manifest
+            raise RuntimeError(f"Phase B failed for {len(self.failed)} test cases: {', '.join(self.failed)}")
+        return self.generated_files
+    
+    def prepare(self):
+        """Create the output directories and build the prompt material shared by all test cases.
+        
+        The infrastructure files must exist: their code goes into the context.
+        """
         # Create separate directories for tests and virtual sequences
-        tests_dir = self.config.pipeline.output_dir / "tests"
-        vseq_dir = self.config.pipeline.output_dir / "virtual_sequences"
-        tests_dir.mkdir(parents=True, exist_ok=True)
-        vseq_dir.mkdir(parents=True, exist_ok=True)
+        self.tests_dir = self.config.pipeline.output_dir / "tests"
+        self.vseq_dir = self.config.pipeline.output_dir / "virtual_sequences"
+        self.tests_dir.mkdir(parents=True, exist_ok=True)
+        self.vseq_dir.mkdir(parents=True, exist_ok=True)
         
         # Load example files
-        examples = self._load_example_files()
+        self.examples = self._load_example_files()
         
         # Build base context from block config and UVC mapping
         base_context = build_context(self.block_config, self.uvc_mapping, self.model_info)
@@ -83,46 +154,832 @@ class PhaseBTestGeneration:
         infra_context = build_infra_context(self.infra_files)
         
         # Combine contexts for richer LLM understanding
-        context = base_context
+        self.context = base_context
         if infra_context:
-            context = f"{base_context}\n\n{infra_context}"
+            self.context = f"{base_context}\n\n{infra_context}"
             console.print(f"  [dim]Using {len(self.infra_files)} infrastructure files as context[/dim]")
+    
+    def print_report(self):
+        """Print the Phase B file count and request packing statistics."""
+        console.print(f"[green]Phase B complete - Generated {len(self.generated_files)} files[/green]")
+        if self.rendered_tests:
+            console.print(f"  [dim]Rendered {self.rendered_tests} test files locally (no phase overrides)[/dim]")
+        plans = self.plan_stats
+        if plans["rendered"] or plans["fallbacks"]:
+            console.print(f"  [dim]Rendered {plans['rendered']} vseqs from stimulus plans, "
+                          f"{plans['fallbacks']} generated as SystemVerilog (plan rejected)[/dim]")
+        stats = self.multi_file_stats
+        if stats["packed_requests"]:
+            console.print(f"  [dim]Packed {stats['packed_test_cases']} test cases into {stats['packed_requests']} requests[/dim]")
+        if stats["combined_requests"]:
+            console.print(f"  [dim]Generated {stats['combined_requests']} test cases with one combined request each[/dim]")
+        if stats["packed_requests"] or stats["combined_requests"]:
+            console.print(f"  [dim]{stats['fallbacks']} files regenerated individually[/dim]")
+        clusters = self.cluster_stats
+        if clusters["clusters"]:
+            console.print(f"  [dim]Generated {clusters['test_cases']} test cases from {clusters['clusters']} cluster templates: "
+                          f"{clusters['instantiated']} files instantiated locally, {clusters['fallbacks']} generated individually[/dim]")
+        console.print(f"  [dim]Tests: {self.tests_dir}[/dim]")
+        console.print(f"  [dim]Virtual Sequences: {self.vseq_dir}[/dim]\n")
+        if self.failed:
+            console.print(f"[red]{len(self.failed)} test cases failed (rerun to regenerate only these):[/red]")
+            for tc_id, error in self.failed.items():
+                console.print(f"  [red]{tc_id}: {error}[/red]")
+    
+    async def _run_async(
+        self,
+        tests_dir: Path,
+        vseq_dir: Path,
+        context: str,
+        examples: Dict[str, str]
+    ):
+        """Generate every test case concurrently.
+        
+        Each test case keeps its vseq -> test ordering, while different test
+        cases overlap. At most ``max_inflight`` LLM requests are outstanding.
+        With ``pack_size`` > 1, similar test cases share one request; with
+        ``combined``, a test case's vseq and test come from one request; with
+        ``cluster``, a structural cluster is instantiated from one template.
+        A request group that fails does not stop the others; its test cases
+        are collected in ``failed``.
+        """
+        semaphore = asyncio.Semaphore(self.config.pipeline.max_inflight)
+        total = len(self.test_cases)
+        completed = 0
         
-        # Generate for each test case
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             console=console
         ) as progress:
             task = progress.add_task(
-                f"Generating {len(self.test_cases)} test cases...",
-                total=len(self.test_cases)
+                f"Generating {total} test cases...",
+                total=total
             )
             
-            for i, test_case in enumerate(self.test_cases, 1):
-                progress.update(task, description=f"[{i}/{len(self.test_cases)}] {test_case.tc_id}")
-                
-                # B.1 Generate virtual sequence FIRST (vseq defines what the test will do)
-                # Save to virtual_sequences directory
-                vseq_path = self._generate_virtual_sequence(vseq_dir, test_case, context, examples.get('vseq'))
-                
-                # B.2 Generate test file AFTER (test instantiates the vseq)
-                # Include the just-generated vseq as additional context for the test
-                # Save to tests directory
-                test_context = context
-                if vseq_path and vseq_path.exists():
-                    vseq_content = vseq_path.read_text()
-                    test_context = f"{context}\n\n=== Generated Virtual Sequence for This Test ===\n{vseq_content}"
-                
-                self._generate_test_file(tests_dir, test_case, test_context, examples.get('test'))
-                
-                progress.advance(task)
+            async def generate_group(group: List[TestCase]) -> Dict[str, List[Path]]:
+                nonlocal completed
+                files = await self._agenerate_group(semaphore, tests_dir, vseq_dir, group, context, examples)
+                completed += len(group)
+                tc_ids = ', '.join(tc.tc_id for tc in group)
+                progress.update(task, description=f"[{completed}/{total}] {tc_ids}")
+                progress.advance(task, len(group))
+                return files
+            
+            groups = self.request_groups()
+            results = await asyncio.gather(*(generate_group(g) for g in groups), return_exceptions=True)
         
-        console.print(f"[green]Phase B complete - Generated {len(self.generated_files)} files[/green]")
-        console.print(f"  [dim]Tests: {tests_dir}[/dim]")
-        console.print(f"  [dim]Virtual Sequences: {vseq_dir}[/dim]\n")
+        files_by_tc = {}
+        for group, result in zip(groups, results):
+            if isinstance(result, BaseException):
+                self.failed.update((tc.tc_id, result) for tc in group)
+            else:
+                files_by_tc.update(result)
         
-        return self.generated_files
+        # Record files in vplan order so the output matches a serial run
+        for test_case in self.test_cases:
+            self.generated_files.extend(files_by_tc.get(test_case.tc_id, []))
+    
+    async def _agenerate_group(
+        self,
+        semaphore: asyncio.Semaphore,
+        tests_dir: Path,
+        vseq_dir: Path,
+        group: List[TestCase],
+        context: str,
+        examples: Dict[str, str]
+    ) -> Dict[str, List[Path]]:
+        """Generate one request group (see request_groups()). Returns tc_id -> files.
+        
+        Test cases whose vseq and test the manifest has up to date are
+        reused; only the rest of the group is requested.
+        """
+        if self.config.pipeline.cluster and len(group) > 1:
+            # Members are reused per file inside, so the template stays shared
+            return await self._agenerate_cluster(semaphore, tests_dir, vseq_dir, group, context, examples)
+        
+        files = {}
+        stale = []
+        for test_case in group:
+            current = self._current_test_case(tests_dir, vseq_dir, test_case, context, examples)
+            if current:
+                files[test_case.tc_id] = current
+            else:
+                stale.append(test_case)
+        
+        if len(stale) > 1:
+            files.update(await self._agenerate_pack(semaphore, tests_dir, vseq_dir, stale, context, examples))
+        elif stale and self.config.pipeline.combined and not self.renders_test(stale[0]):
+            files[stale[0].tc_id] = await self._agenerate_combined(
+                semaphore, tests_dir, vseq_dir, stale[0], context, examples
+            )
+        elif stale:
+            files[stale[0].tc_id] = await self._agenerate_test_case(
+                semaphore, tests_dir, vseq_dir, stale[0], context, examples
+            )
+        return files
+    
+    def _current_test_case(
+        self,
+        tests_dir: Path,
+        vseq_dir: Path,
+        test_case: TestCase,
+        context: str,
+        examples: Dict[str, str]
+    ) -> Optional[List[Path]]:
+        """[vseq_path, test_path] if the manifest has both files up to date, else None."""
+        if not self.manifest:
+            return None
+        vseq_path = vseq_dir / f"{test_case.tc_id}_vseq.sv"
+        test_path = tests_dir / f"{test_case.tc_id}_test.sv"
+        if not (self.manifest.is_current(vseq_path, self._vseq_inputs(test_case, context, examples))
+                and self.manifest.is_current(test_path, self._test_inputs(test_case, vseq_path, context, examples))):
+            return None
+        return [self.manifest.reuse(vseq_path), self.manifest.reuse(test_path)]
+    
+    def _vseq_inputs(self, test_case: TestCase, context: str, examples: Dict[str, str]) -> str:
+        """Manifest fingerprint of a test case's vseq (that of its own per-file request)."""
+        if self.config.pipeline.vseq_plan:
+            prompt, _ = self._build_vseq_plan_prompt(test_case)
+            return artifact_inputs(self.config.openai.model, context, prompt, None)
+        prompt, _ = self._build_vseq_prompt(test_case)
+        return artifact_inputs(self.config.openai.model, context, prompt, examples.get('vseq'))
+    
+    def _test_inputs(self, test_case: TestCase, vseq_path: Optional[Path], context: str, examples: Dict[str, str]) -> str:
+        """Manifest fingerprint of a test case's test; the prompt embeds the vseq on disk."""
+        if self.renders_test(test_case):
+            return rendered_inputs(self._render_test_code(test_case))
+        prompt, _ = self._build_test_prompt(test_case, vseq_path)
+        return artifact_inputs(self.config.openai.model, context, prompt, examples.get('test'))
+    
+    def _reusable(self, output_path: Path, inputs: str) -> bool:
+        """True (and counted as reused) if the manifest has the file up to date for ``inputs``."""
+        if self.manifest and self.manifest.is_current(output_path, inputs):
+            self.manifest.reuse(output_path)
+            return True
+        return False
+    
+    def renders_test(self, test_case: TestCase) -> bool:
+        """True if the test file is rendered locally: the vplan asks for no phase overrides."""
+        return not test_case.test_overrides
+    
+    def _render_test_code(self, test_case: TestCase) -> str:
+        """Template-rendered test class of a test case (see emitters.render_test())."""
+        return render_test(test_case.tc_id, self.short_name, self.block_config)
+    
+    def render_test(self, test_case: TestCase) -> Path:
+        """Write (or reuse) a test case's template-rendered test file.
+        
+        Needs neither prepare() nor the vseq: the test only names the vseq class.
+        """
+        tests_dir = self.config.pipeline.output_dir / "tests"
+        tests_dir.mkdir(parents=True, exist_ok=True)
+        output_path = tests_dir / f"{test_case.tc_id}_test.sv"
+        code = self._render_test_code(test_case)
+        inputs = rendered_inputs(code)
+        self.rendered_tests += 1
+        if not self._reusable(output_path, inputs):
+            output_path.write_text(code)
+            if self.manifest:
+                self.manifest.record(output_path, inputs)
+        return output_path
+    
+    async def agenerate_group(self, group: List[TestCase], semaphore: asyncio.Semaphore) -> Dict[str, List[Path]]:
+        """Generate one request group after prepare(). Returns tc_id -> files."""
+        return await self._agenerate_group(semaphore, self.tests_dir, self.vseq_dir, group, self.context, self.examples)
+    
+    async def agenerate_vseq(self, test_case: TestCase, semaphore: asyncio.Semaphore) -> Path:
+        """Generate a test case's virtual sequence with its own request after prepare()."""
+        return await self._agenerate_vseq(semaphore, self.vseq_dir, test_case, self.context, self.examples)
+    
+    async def agenerate_test(self, test_case: TestCase, vseq_path: Optional[Path], semaphore: asyncio.Semaphore) -> Path:
+        """Generate a test case's test file with its own request after prepare()."""
+        return await self._agenerate_test(semaphore, self.tests_dir, test_case, vseq_path, self.context, self.examples)
+    
+    def generate_batch(self):
+        """Generate every test case through the provider batch API after prepare()."""
+        self._run_batch(self.tests_dir, self.vseq_dir, self.context, self.examples)
+    
+    async def _agenerate_test_case(
+        self,
+        semaphore: asyncio.Semaphore,
+        tests_dir: Path,
+        vseq_dir: Path,
+        test_case: TestCase,
+        context: str,
+        examples: Dict[str, str]
+    ) -> List[Path]:
+        """Generate the vseq and then the test for a single test case."""
+        # B.1 Generate virtual sequence FIRST (vseq defines what the test will do)
+        vseq_path = await self._agenerate_vseq(semaphore, vseq_dir, test_case, context, examples)
+        
+        # B.2 Generate test file AFTER (test instantiates the vseq)
+        test_path = await self._agenerate_test(semaphore, tests_dir, test_case, vseq_path, context, examples)
+        
+        return [vseq_path, test_path]
+    
+    async def _agenerate_vseq(
+        self,
+        semaphore: asyncio.Semaphore,
+        vseq_dir: Path,
+        test_case: TestCase,
+        context: str,
+        examples: Dict[str, str]
+    ) -> Path:
+        """Generate the virtual sequence for a test case with its own request.
+        
+        With ``vseq_plan`` the request asks for a stimulus plan, rendered
+        locally; a plan that fails validation falls back to a SystemVerilog
+        request, recorded under the plan's inputs so a rerun reuses it.
+        """
+        if self.config.pipeline.vseq_plan:
+            vseq_path = await self._agenerate_vseq_plan(semaphore, vseq_dir, test_case, context)
+            if vseq_path:
+                return vseq_path
+        prompt, output_filename = self._build_vseq_prompt(test_case)
+        example = examples.get('vseq')
+        inputs = self._vseq_inputs(test_case, context, examples)
+        if self._reusable(vseq_dir / output_filename, inputs):
+            return vseq_dir / output_filename
+        with call_tags(test_id=test_case.tc_id):
+            async with semaphore:
+                response = await self.llm.agenerate_with_retry(
+                    prompt, context=context, examples=[example] if example else None
+                )
+            return self._write_code(vseq_dir, output_filename, response.content, inputs)
+    
+    async def _agenerate_vseq_plan(
+        self,
+        semaphore: asyncio.Semaphore,
+        vseq_dir: Path,
+        test_case: TestCase,
+        context: str
+    ) -> Optional[Path]:
+        """Request a test case's stimulus plan and render its vseq; None if the plan is rejected."""
+        prompt, output_filename = self._build_vseq_plan_prompt(test_case)
+        inputs = artifact_inputs(self.config.openai.model, context, prompt, None)
+        if self._reusable(vseq_dir / output_filename, inputs):
+            return vseq_dir / output_filename
+        with call_tags(test_id=test_case.tc_id):
+            async with semaphore:
+                response = await self.llm.agenerate_with_retry(
+                    prompt, context=context, max_tokens=PLAN_MAX_TOKENS, json_mode=True
+                )
+            return self._write_plan(vseq_dir, test_case, output_filename, response.content, inputs)
+    
+    def _write_plan(self, output_dir: Path, test_case: TestCase, output_filename: str, content: str, inputs: str) -> Optional[Path]:
+        """Validate a stimulus plan response and write the vseq rendered from it.
+        
+        Returns None (problems logged to the run ledger) if the plan is not
+        valid for the test case.
+        """
+        plan = parse_plan(content)
+        if plan is not None:
+            plan = fill_regbank(plan, regbank_values(test_case))
+        problems = validate_plan(plan, test_case, self.uvc_mapping) if plan is not None else ["no JSON object in the response"]
+        if problems:
+            console.print(f"  [yellow]{test_case.tc_id} stimulus plan rejected ({problems[0]}) - generating SystemVerilog[/yellow]")
+            self.llm.ledger.record_validation(output_filename, problems)
+            self.plan_stats["fallbacks"] += 1
+            return None
+        code = render_vseq(test_case.tc_id, self.short_name, self.block_config, self.uvc_mapping, plan)
+        self.plan_stats["rendered"] += 1
+        output_path = output_dir / output_filename
+        output_path.write_text(code)
+        if self.manifest:
+            self.manifest.record(output_path, inputs)
+        return output_path
+    
+    async def _agenerate_test(
+        self,
+        semaphore: asyncio.Semaphore,
+        tests_dir: Path,
+        test_case: TestCase,
+        vseq_path: Optional[Path],
+        context: str,
+        examples: Dict[str, str]
+    ) -> Path:
+        """Generate the test file for a test case with its own request (rendered when possible)."""
+        if self.renders_test(test_case):
+            return self.render_test(test_case)
+        prompt, output_filename = self._build_test_prompt(test_case, vseq_path)
+        example = examples.get('test')
+        inputs = artifact_inputs(self.config.openai.model, context, prompt, example)
+        if self._reusable(tests_dir / output_filename, inputs):
+            return tests_dir / output_filename
+        with call_tags(test_id=test_case.tc_id):
+            async with semaphore:
+                response = await self.llm.agenerate_with_retry(
+                    prompt, context=context, examples=[example] if example else None
+                )
+            return self._write_code(tests_dir, output_filename, response.content, inputs)
+    
+    def request_groups(self) -> List[List[TestCase]]:
+        """Split the test cases into Phase B request groups.
+        
+        Test cases with the same active UVCs differ only in register and
+        stimulus values, so up to ``pack_size`` of them (in vplan order) share
+        one request. With pack_size 1 every test case is its own group.
+        With ``cluster`` each structural cluster (see clustering.py) is one
+        group, whatever its size.
+        """
+        if self.config.pipeline.cluster:
+            return [cluster.members for cluster in cluster_test_cases(self.test_cases)]
+        
+        size = max(1, self.config.pipeline.pack_size)
+        by_uvcs: Dict[Tuple[str, ...], List[TestCase]] = {}
+        for test_case in self.test_cases:
+            by_uvcs.setdefault(tuple(sorted(test_case.active_uvcs)), []).append(test_case)
+        
+        groups = []
+        for cases in by_uvcs.values():
+            groups.extend(cases[i:i + size] for i in range(0, len(cases), size))
+        return groups
+    
+    async def _agenerate_pack(
+        self,
+        semaphore: asyncio.Semaphore,
+        tests_dir: Path,
+        vseq_dir: Path,
+        group: List[TestCase],
+        context: str,
+        examples: Dict[str, str]
+    ) -> Dict[str, List[Path]]:
+        """Generate the vseqs and tests of several test cases in one request.
+        
+        The response is a JSON map of file name to code. Each file is
+        validated on its own; any file that is missing or fails validation is
+        regenerated with the normal per-file request.
+        
+        Returns:
+            [vseq_path, test_path] keyed on TC_ID
+        """
+        prompt, filenames = self._build_packed_prompt(group)
+        self.multi_file_stats["packed_requests"] += 1
+        self.multi_file_stats["packed_test_cases"] += len(group)
+        
+        tc_ids = ', '.join(tc.tc_id for tc in group)
+        packed: Dict[str, str] = {}
+        try:
+            with call_tags(test_id=tc_ids):
+                async with semaphore:
+                    response = await self.llm.agenerate_with_retry(
+                        prompt, context=context, examples=self._multi_file_examples(examples),
+                        max_tokens=self._multi_file_max_tokens(len(filenames)), json_mode=True
+                    )
+            packed = extract_file_map(response.content)
+            if not packed:
+                console.print(f"  [yellow]Packed response for {tc_ids} is not a JSON file map - generating individually[/yellow]")
+        except Exception as e:
+            console.print(f"  [yellow]Packed request for {tc_ids} failed ({e}) - generating individually[/yellow]")
+        
+        results = await asyncio.gather(*(
+            self._afinish_test_case(semaphore, tests_dir, vseq_dir, tc, packed, context, examples)
+            for tc in group
+        ))
+        return {tc.tc_id: files for tc, files in zip(group, results)}
+    
+    async def _agenerate_cluster(
+        self,
+        semaphore: asyncio.Semaphore,
+        tests_dir: Path,
+        vseq_dir: Path,
+        group: List[TestCase],
+        context: str,
+        examples: Dict[str, str]
+    ) -> Dict[str, List[Path]]:
+        """Generate a structural cluster from one vseq template and one test.
+        
+        The LLM writes the first member's vseq as a template with a
+        placeholder for every value that differs between members; the first
+        member's test, generated normally, becomes the test template. Every
+        member is then instantiated locally. A template that misses a varying
+        value sends the whole cluster, and a member failing the structural
+        check sends that member, to the per-file requests.
+        
+        Returns:
+            [vseq_path, test_path] keyed on TC_ID
+        """
+        exemplar = group[0]
+        self.cluster_stats["clusters"] += 1
+        self.cluster_stats["test_cases"] += len(group)
+        
+        template, template_inputs = await self._acluster_template(semaphore, exemplar, context, examples)
+        problems = check_template(template, group)
+        if problems:
+            console.print(f"  [yellow]Cluster template for {exemplar.tc_id}: {'; '.join(problems)} "
+                          f"- generating {len(group)} test cases individually[/yellow]")
+            self.cluster_stats["fallbacks"] += 2 * len(group)
+            results = await asyncio.gather(*(
+                self._agenerate_test_case(semaphore, tests_dir, vseq_dir, tc, context, examples)
+                for tc in group
+            ))
+            return {tc.tc_id: files for tc, files in zip(group, results)}
+        
+        vseq_paths = {}
+        for test_case in group:
+            vseq_paths[test_case.tc_id] = await self._ainstantiate(
+                vseq_dir, test_case, "vseq", template, template_inputs, exemplar,
+                lambda tc=test_case: self._agenerate_vseq(semaphore, vseq_dir, tc, context, examples)
+            )
+        
+        # Tests without phase overrides are rendered; a generated test (from
+        # its instantiated vseq) is the template for members with the same overrides
+        files = {}
+        test_template = test_inputs = template_case = None
+        for test_case in group:
+            vseq_path = vseq_paths[test_case.tc_id]
+            if not template_case or test_case.test_overrides != template_case.test_overrides:
+                test_path = await self._agenerate_test(semaphore, tests_dir, test_case, vseq_path, context, examples)
+                if not self.renders_test(test_case):
+                    test_template = templatize(test_path.read_text(), test_case.tc_id)
+                    test_inputs = self._test_inputs(test_case, vseq_path, context, examples)
+                    template_case = test_case
+            else:
+                test_path = await self._ainstantiate(
+                    tests_dir, test_case, "test", test_template, test_inputs, template_case,
+                    lambda tc=test_case: self._agenerate_test(
+                        semaphore, tests_dir, tc, vseq_paths[tc.tc_id], context, examples
+                    )
+                )
+            files[test_case.tc_id] = [vseq_path, test_path]
+        return files
+    
+    async def _acluster_template(
+        self,
+        semaphore: asyncio.Semaphore,
+        exemplar: TestCase,
+        context: str,
+        examples: Dict[str, str]
+    ) -> Tuple[Optional[str], str]:
+        """Request (or reuse) the vseq template of the cluster led by ``exemplar``.
+        
+        Templates are kept in <output>/.cluster_templates so the manifest can
+        reuse them when the exemplar's inputs are unchanged.
+        
+        Returns:
+            (template or None if the request failed, template inputs)
+        """
+        vseq_prompt, output_filename = self._build_vseq_prompt(exemplar)
+        prompt = format_prompt(
+            CLUSTER_TEMPLATE_PROMPT,
+            placeholders=describe_placeholders(exemplar),
+            file_prompt=vseq_prompt
+        )
+        example = examples.get('vseq')
+        inputs = artifact_inputs(self.config.openai.model, context, prompt, example)
+        template_path = self.config.pipeline.output_dir / ".cluster_templates" / output_filename
+        if self._reusable(template_path, inputs):
+            return template_path.read_text(), inputs
+        
+        try:
+            with call_tags(test_id=exemplar.tc_id):
+                async with semaphore:
+                    response = await self.llm.agenerate_with_retry(
+                        prompt, context=context, examples=[example] if example else None
+                    )
+        except Exception as e:
+            console.print(f"  [yellow]Cluster template request for {exemplar.tc_id} failed ({e})[/yellow]")
+            return None, inputs
+        
+        # A literal exemplar TC_ID (e.g. in the class name) still templates safely
+        template = templatize(extract_code_from_response(response.content), exemplar.tc_id)
+        template_path.parent.mkdir(parents=True, exist_ok=True)
+        template_path.write_text(template)
+        if self.manifest:
+            self.manifest.record(template_path, inputs)
+        return template, inputs
+    
+    async def _ainstantiate(
+        self,
+        output_dir: Path,
+        test_case: TestCase,
+        kind: str,
+        template: str,
+        template_inputs: str,
+        exemplar: TestCase,
+        generate
+    ) -> Path:
+        """Write a cluster member's ``kind`` file ("vseq" or "test") from a template.
+        
+        Reused when the manifest has it up to date for the same template and
+        values; a member failing the structural check is produced by
+        ``generate()`` (its per-file request) instead.
+        """
+        values = template_values(test_case)
+        output_filename = f"{test_case.tc_id}_{kind}.sv"
+        inputs = instance_inputs(template_inputs, values)
+        if self._reusable(output_dir / output_filename, inputs):
+            return output_dir / output_filename
+        
+        code = instantiate(template, values)
+        problems = check_instance(code, values, template_values(exemplar)) + \
+            validate_generated_code(code, Path(output_filename).stem)
+        if problems:
+            console.print(f"  [yellow]{output_filename}: {'; '.join(problems)} - generating individually[/yellow]")
+            self.llm.ledger.record_validation(output_filename, problems)
+            self.cluster_stats["fallbacks"] += 1
+            return await generate()
+        self.cluster_stats["instantiated"] += 1
+        return self._write_code(output_dir, output_filename, code, inputs)
+    
+    async def _agenerate_combined(
+        self,
+        semaphore: asyncio.Semaphore,
+        tests_dir: Path,
+        vseq_dir: Path,
+        test_case: TestCase,
+        context: str,
+        examples: Dict[str, str]
+    ) -> List[Path]:
+        """Generate the vseq and the test of a test case from one response.
+        
+        Saves the second request, which would resend the shared context plus
+        the vseq for a short test class. The files come back separated by
+        FILE_DELIMITER lines; each is validated and only a missing or broken
+        one is requested again on its own.
+        """
+        prompt, filenames = self._build_combined_prompt(test_case)
+        self.multi_file_stats["combined_requests"] += 1
+        
+        files: Dict[str, str] = {}
+        try:
+            with call_tags(test_id=test_case.tc_id):
+                async with semaphore:
+                    response = await self.llm.agenerate_with_retry(
+                        prompt, context=context, examples=self._multi_file_examples(examples),
+                        max_tokens=self._multi_file_max_tokens(len(filenames))
+                    )
+            files = split_delimited_files(response.content)
+            if not files:
+                console.print(f"  [yellow]Combined response for {test_case.tc_id} has no file delimiters - generating individually[/yellow]")
+        except Exception as e:
+            console.print(f"  [yellow]Combined request for {test_case.tc_id} failed ({e}) - generating individually[/yellow]")
+        
+        return await self._afinish_test_case(semaphore, tests_dir, vseq_dir, test_case, files, context, examples)
+    
+    async def _afinish_test_case(
+        self,
+        semaphore: asyncio.Semaphore,
+        tests_dir: Path,
+        vseq_dir: Path,
+        test_case: TestCase,
+        files: Dict[str, str],
+        context: str,
+        examples: Dict[str, str]
+    ) -> List[Path]:
+        """Write a test case's files from a multi-file response.
+        
+        Files that are missing or fail validation are regenerated with the
+        normal per-file requests (vseq first, since the test prompt embeds it).
+        
+        Returns:
+            [vseq_path, test_path]
+        """
+        with call_tags(test_id=test_case.tc_id):
+            vseq_filename = f"{test_case.tc_id}_vseq.sv"
+            code = self._checked_code(files, vseq_filename)
+            if code is not None:
+                vseq_path = self._write_code(vseq_dir, vseq_filename, code,
+                                             self._vseq_inputs(test_case, context, examples))
+            else:
+                vseq_path = await self._agenerate_vseq(semaphore, vseq_dir, test_case, context, examples)
+            
+            test_filename = f"{test_case.tc_id}_test.sv"
+            code = None if self.renders_test(test_case) else self._checked_code(files, test_filename)
+            if code is not None:
+                test_path = self._write_code(tests_dir, test_filename, code,
+                                             self._test_inputs(test_case, vseq_path, context, examples))
+            else:
+                test_path = await self._agenerate_test(
+                    semaphore, tests_dir, test_case, vseq_path, context, examples
+                )
+            return [vseq_path, test_path]
+    
+    def _checked_code(self, files: Dict[str, str], filename: str) -> Optional[str]:
+        """Validated code for one file of a multi-file response (None = regenerate it)."""
+        if not files:
+            # The whole response was unusable (reported by the caller)
+            self.multi_file_stats["fallbacks"] += 1
+            return None
+        code = files.get(filename)
+        problems = ["missing from response"] if code is None else \
+            validate_generated_code(code, Path(filename).stem)
+        if problems:
+            console.print(f"  [yellow]{filename}: {'; '.join(problems)} - regenerating individually[/yellow]")
+            self.llm.ledger.record_validation(filename, problems)
+            self.multi_file_stats["fallbacks"] += 1
+            return None
+        return code
+    
+    def _multi_file_examples(self, examples: Dict[str, str]) -> Optional[List[str]]:
+        """Few-shot examples for a request that returns both vseqs and tests."""
+        return [examples[key] for key in ('vseq', 'test') if examples.get(key)] or None
+    
+    def _multi_file_max_tokens(self, file_count: int) -> int:
+        """Output token limit for a request returning file_count files."""
+        return min(self.config.openai.max_tokens * file_count, MULTI_FILE_MAX_TOKENS)
+    
+    def _build_combined_prompt(self, test_case: TestCase) -> Tuple[str, List[str]]:
+        """Build one prompt for a test case's vseq and test. Returns (prompt, output_filenames)."""
+        vseq_prompt, vseq_filename = self._build_vseq_prompt(test_case)
+        test_prompt, test_filename = self._build_test_prompt(test_case)
+        filenames = [vseq_filename, test_filename]
+        
+        prompt = format_prompt(
+            COMBINED_TEST_CASE_PROMPT,
+            tc_id=test_case.tc_id,
+            vseq_prompt=vseq_prompt,
+            test_prompt=test_prompt,
+            delimiters='\n'.join(FILE_DELIMITER.format(filename=name) for name in filenames)
+        )
+        return prompt, filenames
+    
+    def _build_packed_prompt(self, group: List[TestCase]) -> Tuple[str, List[str]]:
+        """Build one prompt for several test cases. Returns (prompt, output_filenames)."""
+        sections = []
+        filenames = []
+        for index, test_case in enumerate(group, 1):
+            vseq_prompt, vseq_filename = self._build_vseq_prompt(test_case)
+            section = f"=== Test case {index} of {len(group)}: {test_case.tc_id} ===\n\n{vseq_prompt}"
+            filenames.append(vseq_filename)
+            if not self.renders_test(test_case):
+                # Rendered tests are not requested
+                test_prompt, test_filename = self._build_test_prompt(test_case)
+                section += f"\n{test_prompt}"
+                filenames.append(test_filename)
+            sections.append(section)
+        
+        prompt = format_prompt(
+            PACKED_TEST_CASES_PROMPT,
+            count=len(group),
+            test_cases='\n'.join(sections),
+            file_count=len(filenames),
+            file_list='\n'.join(f"- {name}" for name in filenames)
+        )
+        return prompt, filenames
+    
+    def _make_batch_provider(self, work_dir: Path) -> BatchProvider:
+        """Create the batch back-end selected by --batch-provider."""
+        if self.config.pipeline.batch_provider == "local":
+            return LocalBatchProvider(work_dir / "local")
+        return OpenAIBatchProvider(self.llm.client)
+    
+    def _run_batch(
+        self,
+        tests_dir: Path,
+        vseq_dir: Path,
+        context: str,
+        examples: Dict[str, str]
+    ):
+        """Generate every test case through the provider batch API.
+        
+        Runs as two stages because each test prompt embeds its generated
+        vseq: all vseqs are batched first, then all tests that are not
+        rendered locally. With ``vseq_plan`` the vseq stage batches
+        stimulus plans instead. Batch state lives
+        in <output>/.batch so an interrupted run resumes the same batches.
+        """
+        work_dir = self.config.pipeline.output_dir / ".batch"
+        job = BatchJob(
+            self._make_batch_provider(work_dir),
+            work_dir,
+            poll_interval=self.config.pipeline.batch_poll_interval,
+            wait=self.config.pipeline.batch_wait
+        )
+        
+        if self.config.pipeline.vseq_plan:
+            vseq_paths = self._run_batch_stage(
+                job, "vseq", vseq_dir, context, None,
+                {tc.tc_id: self._build_vseq_plan_prompt(tc) for tc in self.test_cases},
+                max_tokens=PLAN_MAX_TOKENS, json_mode=True,
+                write=lambda tc_id, output_filename, content, inputs: self._write_batch_plan(
+                    vseq_dir, tc_id, output_filename, content, inputs, context, examples.get('vseq'))
+            )
+        else:
+            vseq_paths = self._run_batch_stage(
+                job, "vseq", vseq_dir, context, examples.get('vseq'),
+                {tc.tc_id: self._build_vseq_prompt(tc) for tc in self.test_cases}
+            )
+        test_paths = {tc.tc_id: self.render_test(tc) for tc in self.test_cases if self.renders_test(tc)}
+        test_paths.update(self._run_batch_stage(
+            job, "test", tests_dir, context, examples.get('test'),
+            {tc.tc_id: self._build_test_prompt(tc, vseq_paths.get(tc.tc_id))
+             for tc in self.test_cases if not self.renders_test(tc)}
+        ))
+        
+        # Record files in vplan order so the output matches a serial run
+        for test_case in self.test_cases:
+            for path in (vseq_paths.get(test_case.tc_id), test_paths.get(test_case.tc_id)):
+                if path:
+                    self.generated_files.append(path)
+    
+    def _run_batch_stage(
+        self,
+        job: BatchJob,
+        stage: str,
+        output_dir: Path,
+        context: str,
+        example: Optional[str],
+        prompts: Dict[str, Tuple[str, str]],
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+        write: Optional[Callable[[str, str, str, str], Path]] = None
+    ) -> Dict[str, Path]:
+        """Batch one prompt per test case and write the results.
+        
+        Args:
+            prompts: (prompt, output_filename) keyed on TC_ID
+            max_tokens, json_mode: Passed on to every request
+            write: (tc_id, output_filename, content, inputs) -> path; by
+                default the code is extracted and written to output_dir
+        
+        Returns:
+            Written (or reused up-to-date) file paths keyed on TC_ID
+        """
+        examples = [example] if example else None
+        paths: Dict[str, Path] = {}
+        pending = {}
+        if write is None:
+            def write(tc_id: str, output_filename: str, content: str, inputs: str) -> Path:
+                return self._write_code(output_dir, output_filename, content, inputs)
+        
+        # Files the manifest has up to date and responses already in the
+        # response cache never enter the batch
+        for tc_id, (prompt, output_filename) in prompts.items():
+            inputs = artifact_inputs(self.config.openai.model, context, prompt, example)
+            if self._reusable(output_dir / output_filename, inputs):
+                paths[tc_id] = output_dir / output_filename
+                continue
+            body = self.llm.build_request(
+                prompt, context=context, examples=examples, max_tokens=max_tokens, json_mode=json_mode
+            )
+            with call_tags(test_id=tc_id):
+                cached = self.llm.cached_response(body)
+                if cached:
+                    paths[tc_id] = write(tc_id, output_filename, cached.content, inputs)
+                    continue
+            pending[make_custom_id(f"{tc_id}_{stage}")] = (tc_id, prompt, output_filename, body, inputs)
+        
+        if not pending:
+            return paths
+        console.print(f"  [dim]{stage}: {len(paths)} cached, {len(pending)} batched[/dim]")
+        
+        results = job.run(stage, {custom_id: item[3] for custom_id, item in pending.items()})
+        
+        for custom_id, (tc_id, prompt, output_filename, body, inputs) in pending.items():
+            result = results.get(custom_id)
+            with call_tags(test_id=tc_id):
+                if result and result.response:
+                    response = self.llm.batch_response(body, result.response)
+                else:
+                    # Generate directly anything the batch did not answer
+                    error = result.error if result else "missing from batch output"
+                    console.print(f"  [yellow]{tc_id} {stage}: {error} - generating directly[/yellow]")
+                    response = self.llm.generate_with_retry(
+                        prompt, context=context, examples=examples, max_tokens=max_tokens, json_mode=json_mode
+                    )
+                paths[tc_id] = write(tc_id, output_filename, response.content, inputs)
+        
+        return paths
+    
+    def _write_batch_plan(
+        self,
+        vseq_dir: Path,
+        tc_id: str,
+        output_filename: str,
+        content: str,
+        inputs: str,
+        context: str,
+        example: Optional[str]
+    ) -> Path:
+        """Render a batched stimulus plan, or generate the vseq directly if it is rejected.
+        
+        The direct vseq is recorded under the plan's ``inputs``, so a batch
+        rerun treats it as current rather than batching the plan again.
+        """
+        test_case = next(tc for tc in self.test_cases if tc.tc_id == tc_id)
+        vseq_path = self._write_plan(vseq_dir, test_case, output_filename, content, inputs)
+        if vseq_path:
+            return vseq_path
+        prompt, _ = self._build_vseq_prompt(test_case)
+        response = self.llm.generate_with_retry(prompt, context=context, examples=[example] if example else None)
+        return self._write_code(vseq_dir, output_filename, response.content, inputs)
+    
+    def _write_code(self, output_dir: Path, output_filename: str, content: str, inputs: str) -> Path:
+        """Extract code from an LLM response, write it to output_dir and record its inputs.
+        
+        Structural problems are logged to the run ledger, not fatal.
+        """
+        code = extract_code_from_response(content)
+        problems = validate_generated_code(code, Path(output_filename).stem)
+        if problems:
+            self.llm.ledger.record_validation(output_filename, problems)
+        output_path = output_dir / output_filename
+        output_path.write_text(code)
+        if self.manifest:
+            self.manifest.record(output_path, inputs)
+        return output_path
     
     def _load_example_files(self) -> Dict[str, str]:
         """Load example test files for few-shot learning."""
@@ -142,14 +999,16 @@ class PhaseBTestGeneration:
         
         return examples
     
-    def _generate_test_file(
+    def _build_test_prompt(
         self,
-        output_dir: Path,
         test_case: TestCase,
-        context: str,
-        example: Optional[str]
-    ):
-        """Generate the test file for a test case."""
+        vseq_path: Optional[Path] = None
+    ) -> Tuple[str, str]:
+        """Build the test file prompt. Returns (prompt, output_filename).
+        
+        The just-generated vseq goes into the prompt rather than the shared
+        context, so every Phase B call keeps the same cacheable prefix.
+        """
         tc_id = test_case.tc_id
         output_filename = f"{tc_id}_test.sv"
         
@@ -165,60 +1024,45 @@ class PhaseBTestGeneration:
             output_filename=output_filename
         )
         
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
+        if test_case.test_overrides:
+            overrides = '\n'.join(f"- {phase}: {behaviour}" for phase, behaviour in test_case.test_overrides.items())
+            prompt += f"\nCustom phase behaviour required by the Vplan (overrides the steps above):\n{overrides}\n"
         
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
-        self.generated_files.append(output_path)
+        if vseq_path and vseq_path.exists():
+            vseq_content = vseq_path.read_text()
+            prompt = f"=== Generated Virtual Sequence for This Test ===\n{vseq_content}\n\n{prompt}"
+        return prompt, output_filename
     
-    def _generate_virtual_sequence(
-        self,
-        output_dir: Path,
-        test_case: TestCase,
-        context: str,
-        example: Optional[str]
-    ) -> Path:
-        """Generate the virtual sequence for a test case.
-        
-        Returns:
-            Path to the generated vseq file
-        """
+    def _build_vseq_prompt(self, test_case: TestCase) -> Tuple[str, str]:
+        """Build the virtual sequence prompt. Returns (prompt, output_filename)."""
         tc_id = test_case.tc_id
         output_filename = f"{tc_id}_vseq.sv"
         
-        # Build test configuration
-        test_config = self._build_test_config(test_case)
-        
-        # Build register configuration
-        register_config = self._build_register_config(test_case)
-        
-        # Build stimulus configuration
-        stimulus_config = self._build_stimulus_config(test_case)
-        
-        # Build sequence list
-        sequence_list = self._build_sequence_list(test_case)
-        
         prompt = format_prompt(
             VIRTUAL_SEQUENCE_PROMPT,
             tc_id=tc_id,
-            test_config=test_config,
-            register_config=register_config,
-            stimulus_config=stimulus_config,
-            sequence_list=sequence_list,
+            test_config=self._build_test_config(test_case),
+            register_config=self._build_register_config(test_case),
+            stimulus_config=self._build_stimulus_config(test_case),
+            sequence_list=self._build_sequence_list(test_case),
             output_filename=output_filename
         )
-        
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
-        
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
-        self.generated_files.append(output_path)
-        
-        return output_path
+        return prompt, output_filename
+    
+    def _build_vseq_plan_prompt(self, test_case: TestCase) -> Tuple[str, str]:
+        """Build the stimulus plan prompt (--vseq-plan). Returns (prompt, output_filename)."""
+        tc_id = test_case.tc_id
+        prompt = format_prompt(
+            VSEQ_PLAN_PROMPT,
+            tc_id=tc_id,
+            test_config=self._build_test_config(test_case),
+            register_config=self._build_register_config(test_case),
+            stimulus_config=self._build_stimulus_config(test_case),
+            uvc_list=describe_uvcs(test_case, self.uvc_mapping),
+            regbank_values=describe_regbank(regbank_values(test_case)),
+            example=VSEQ_PLAN_EXAMPLE
+        )
+        return prompt, f"{tc_id}_vseq.sv"
     
     def _build_test_config(self, test_case: TestCase) -> str:
         """Build test configuration string from test case."""
@@ -243,20 +1087,8 @@ class PhaseBTestGeneration:
         if not regbank:
             return "No register configuration specified"
         
-        # Standard register mapping
-        mapping = """Register bit mapping:
-- register[5:0]   = K_DIM
-- register[6]     = START_COMPUTE
-- register[7]     = COMPE
-- register[8]     = PS_FIRST
-- register[9]     = PS_MODE
-- register[10]    = PS_LAST
-- register[12:11] = MODE
-- register[14:13] = sign_8b
-- register[15]    = CONT_COMP
-- register[23:16] = iteration"""
-        
-        config_lines = [mapping]
+        # Standard register mapping (shared with the stimulus plan renderer)
+        config_lines = [f"Register bit mapping:\n{register_mapping()}"]
         config_lines.append(f"\nValues for this test:")
         config_lines.append(f"- MODE = {regbank.get('mode', '00')}")
         config_lines.append(f"- sign_8b = {regbank.get('sign_8b', '00')}")
@@ -330,7 +1162,8 @@ def run_phase_b(
     test_cases: List[TestCase],
     uvc_mapping: Dict,
     model_info: Dict,
-    infra_files: List[Path] = None
+    infra_files: List[Path] = None,
+    manifest: Optional[Manifest] = None
 ) -> List[Path]:
     """Convenience function to run Phase B.
     
@@ -342,11 +1175,12 @@ def run_phase_b(
         uvc_mapping: UVC mapping dictionary
         model_info: Model information dictionary
         infra_files: List of infrastructure files from Phase A (env, vseqr, interface, etc.)
+        manifest: Input-hash manifest; up-to-date files are reused
     
     Returns:
-        List of generated file paths
+        List of generated (or reused) file paths
     """
     phase = PhaseBTestGeneration(
-        config, llm, block_config, test_cases, uvc_mapping, model_info, infra_files
+        config, llm, block_config, test_cases, uvc_mapping, model_info, infra_files, manifest
     )
     return phase.run()
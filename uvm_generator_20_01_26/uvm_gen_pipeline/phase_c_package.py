@@ -1,16 +1,17 @@
 """
 Phase C: Package & Integration
-Generates the package file and file list for compilation.
+Generates the package file, file list and testbench top module for compilation.
+All three are rendered locally, without LLM calls.
 """
 
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, List, Optional
 from rich.console import Console
 from rich.panel import Panel
 
 from config import Config
-from llm_client import UVMGeneratorLLM, extract_code_from_response
-from prompts import PACKAGE_PROMPT, TESTBENCH_PROMPT, format_prompt, build_context
+from manifest import Manifest, rendered_inputs
+from emitters import render_testbench
 
 console = Console()
 
@@ -21,18 +22,21 @@ class PhaseCPackage:
     def __init__(
         self,
         config: Config,
-        llm: UVMGeneratorLLM,
         block_config: Dict,
         uvc_mapping: Dict,
-        generated_files: List[Path]
+        generated_files: List[Path],
+        manifest: Optional[Manifest] = None
     ):
         self.config = config
-        self.llm = llm
         self.block_config = block_config
         self.uvc_mapping = uvc_mapping
         self.generated_files = generated_files
+        self.manifest = manifest  # Reuse files whose inputs are unchanged
         self.output_files: List[Path] = []
         
+        # Set by prepare()
+        self.output_dir: Optional[Path] = None
+        
         # Derive names
         self.block_name = block_config.get('name', 'dut')
         self.short_name = self._get_short_name()
@@ -54,85 +58,113 @@ class PhaseCPackage:
         """
         console.print(Panel("[bold cyan]Phase C: Package & Integration[/bold cyan]"))
         
-        output_dir = self.config.pipeline.output_dir
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Load example files
-        examples = self._load_example_files()
-        context = build_context(self.block_config, self.uvc_mapping)
+        self.prepare()
         
         # C.1 Generate Package File
         if self.config.pipeline.generate_package:
-            self._generate_package(output_dir, context, examples.get('package'))
+            console.print("  [C.1] Generating Package...", end=" ")
+            output_path = self.generate_package()
+            console.print(f"[green]OK[/green] ({output_path.name})")
         
         # C.2 Generate File List
-        self._generate_filelist(output_dir)
+        console.print("  [C.2] Generating File List...", end=" ")
+        output_path = self.generate_filelist()
+        console.print(f"[green]OK[/green] ({output_path.name})")
         
-        # C.3 Generate Testbench (optional - can use LLM or template)
-        self._generate_testbench_template(output_dir, context, examples.get('testbench'))
+        # C.3 Generate Testbench
+        console.print("  [C.3] Generating Testbench...", end=" ")
+        output_path = self.generate_testbench()
+        console.print(f"[green]OK[/green] ({output_path.name})")
         
         console.print(f"[green]Phase C complete - Generated {len(self.output_files)} files[/green]\n")
         
         return self.output_files
     
-    def _load_example_files(self) -> Dict[str, str]:
-        """Load example files for few-shot learning."""
-        examples = {}
-        golden_path = self.config.pipeline.golden_ref_path
-        
-        # Package example
-        pkg_file = golden_path / "dimc_tile_DUT_files" / "pkg" / "dimc_tile_wrap_package.sv"
-        if pkg_file.exists():
-            examples['package'] = pkg_file.read_text()
-        
-        # Testbench example
-        tb_file = golden_path / "dimc_tile_DUT_files" / "tb" / "P18_TILE_WRAPPER_tb.sv"
-        if tb_file.exists():
-            examples['testbench'] = tb_file.read_text()
-        
-        return examples
+    def prepare(self):
+        """Create the output directory."""
+        self.output_dir = self.config.pipeline.output_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def _generate_package(self, output_dir: Path, context: str, example: Optional[str]):
-        """Generate the SystemVerilog package file."""
-        console.print("  [C.1] Generating Package...", end=" ")
-        
-        output_filename = f"{self.short_name}_pkg.sv"
-        
-        # Build UVC package list
-        uvc_packages = []
-        for name, info in self.uvc_mapping.get('uvcs', {}).items():
-            uvc_type = info.get('type', '')
-            # Map UVC type to package name
-            pkg_name = uvc_type.replace('_uvc', '_pkg')
-            if pkg_name not in uvc_packages:
-                uvc_packages.append(f"- {pkg_name}")
-        
-        # Build file list (order matters for dependencies)
-        file_list = self._get_ordered_file_list()
+    def render_testbench(self) -> str:
+        """Render the testbench top module from the Block YAML and the UVC mapping (see emitters.py)."""
+        package_name = f"{self.short_name}_pkg" if self.config.pipeline.generate_package else None
+        return render_testbench(f"{self.short_name}_tb", self.short_name, self.block_config,
+                                self.uvc_mapping, package_name)
+    
+    def generate_testbench(self) -> Path:
+        """Write the rendered testbench (no LLM call, byte-stable).
         
-        prompt = format_prompt(
-            PACKAGE_PROMPT,
-            block_name=self.block_name,
-            uvc_packages='\n'.join(uvc_packages),
-            file_list='\n'.join([f"- {f}" for f in file_list]),
-            output_filename=output_filename
-        )
+        Recorded in the manifest, so an unchanged testbench is reused and
+        keeps its modification time.
+        """
+        output_path = self.output_dir / f"{self.short_name}_tb.sv"
+        code = self.render_testbench()
+        inputs = rendered_inputs(code)
+        self.output_files.append(output_path)
+        if self.manifest and self.manifest.is_current(output_path, inputs):
+            return self.manifest.reuse(output_path)
+        output_path.write_text(code)
+        if self.manifest:
+            self.manifest.record(output_path, inputs)
+        return output_path
+    
+    def _uvc_packages(self) -> List[str]:
+        """UVC package names (as found by scan_uvc_library), one per UVC, in mapping order."""
+        packages = []
+        for info in self.uvc_mapping.get('uvcs', {}).values():
+            package = info.get('package_name') or info.get('type', '').replace('_uvc', '_pkg')
+            if package and package not in packages:
+                packages.append(package)
+        return packages
+    
+    def render_package(self) -> str:
+        """Render the package from the UVC packages and the ordered file list.
         
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
+        Follows the golden dimc_tile_wrap_package.sv layout: UVC imports,
+        then the infrastructure, virtual sequence and test includes in
+        dependency order. Interfaces cannot be declared inside a package, so
+        files.f compiles them on their own.
+        """
+        files = self._get_ordered_file_list()
+        sections = [
+            ("Infrastructure", [f for f in files if not f.endswith(('_if.sv', '_vseq.sv', '_test.sv'))]),
+            ("Virtual sequences", [f for f in files if f.endswith('_vseq.sv')]),
+            ("Tests", [f for f in files if f.endswith('_test.sv')]),
+        ]
         
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
+        lines = [
+            f"// {self.block_name} package file importing all files",
+            "// Auto-generated by the UVM Test Case Generator - do not edit manually",
+            f"package {self.short_name}_pkg;",
+            "  import uvm_pkg::*;",
+        ]
+        lines.extend(f"  import {package}::*;" for package in self._uvc_packages())
+        lines.append('  `include "uvm_macros.svh"')
+        for title, names in sections:
+            lines.append("")
+            lines.append(f"  // {title}")
+            lines.extend(f'  `include "{name}"' for name in names)
+        lines.append("")
+        lines.append("endpackage")
+        return '\n'.join(lines) + '\n'
+    
+    def generate_package(self) -> Path:
+        """Write the package rendered from ``generated_files`` (no LLM call, byte-stable)."""
+        output_path = self.output_dir / f"{self.short_name}_pkg.sv"
+        output_path.write_text(self.render_package())
         self.output_files.append(output_path)
-        
-        console.print(f"[green]OK[/green] ({output_filename})")
+        return output_path
     
-    def _generate_filelist(self, output_dir: Path):
-        """Generate the compilation file list."""
-        console.print("  [C.2] Generating File List...", end=" ")
+    def generate_filelist(self) -> Path:
+        """Generate the compilation file list from ``generated_files``.
         
+        With the package, class files are compiled through its includes, so
+        only their include directories (and the interface) are listed;
+        without it they are listed one by one.
+        """
+        output_dir = self.output_dir
         output_filename = "files.f"
+        with_package = self.config.pipeline.generate_package
         
         lines = [
             "# UVM Test Case Generator - File List",
@@ -145,93 +177,36 @@ class PhaseCPackage:
             "# UVC Libraries",
         ]
         
-        # Add UVC paths
+        # Add UVC paths (once per UVC, with the package file found by scan_uvc_library)
         uvc_path = self.config.pipeline.uvc_library_path
+        uvc_types = []
         for name, info in self.uvc_mapping.get('uvcs', {}).items():
             uvc_type = info.get('type', '')
-            if uvc_type:
+            if uvc_type and uvc_type not in uvc_types:
+                uvc_types.append(uvc_type)
+                package_file = info.get('package_file') or f"{uvc_type.replace('_uvc', '_pkg')}.sv"
                 lines.append(f"+incdir+{uvc_path}/{uvc_type}")
-                lines.append(f"{uvc_path}/{uvc_type}/pkg/{uvc_type.replace('_uvc', '_pkg')}.sv")
-        
-        lines.append("")
-        lines.append("# Generated IP Files")
-        lines.append(f"+incdir+{output_dir}/ip")
-        
-        # Add generated IP files
-        for f in self.generated_files:
-            if '/ip/' in str(f) or '\\ip\\' in str(f):
-                lines.append(str(f))
+                lines.append(f"{uvc_path}/{uvc_type}/pkg/{package_file}")
         
-        lines.append("")
-        lines.append("# Generated Virtual Sequences")
-        lines.append(f"+incdir+{output_dir}/virtual_sequences")
-        
-        # Add generated virtual sequence files
-        for f in self.generated_files:
-            if '/virtual_sequences/' in str(f) or '\\virtual_sequences\\' in str(f):
-                lines.append(str(f))
-        
-        lines.append("")
-        lines.append("# Generated Test Files")
-        lines.append(f"+incdir+{output_dir}/tests")
-        
-        # Add generated test files
-        for f in self.generated_files:
-            if '/tests/' in str(f) or '\\tests\\' in str(f):
-                lines.append(str(f))
+        for title, subdir in (("IP Files", "ip"), ("Virtual Sequences", "virtual_sequences"), ("Test Files", "tests")):
+            lines.append("")
+            lines.append(f"# Generated {title}")
+            lines.append(f"+incdir+{output_dir}/{subdir}")
+            for f in self.generated_files:
+                if f"/{subdir}/" in str(f) or f"\\{subdir}\\" in str(f):
+                    if not with_package or f.name.endswith('_if.sv'):
+                        lines.append(str(f))
         
         lines.append("")
         lines.append("# Package and Testbench")
-        lines.append(f"{output_dir}/{self.short_name}_pkg.sv")
+        if with_package:
+            lines.append(f"{output_dir}/{self.short_name}_pkg.sv")
         lines.append(f"{output_dir}/{self.short_name}_tb.sv")
         
         output_path = output_dir / output_filename
-        output_path.write_text('\n'.join(lines))
-        self.output_files.append(output_path)
-        
-        console.print(f"[green]OK[/green] ({output_filename})")
-    
-    def _generate_testbench_template(self, output_dir: Path, context: str, example: Optional[str]):
-        """Generate a testbench template."""
-        console.print("  [C.3] Generating Testbench Template...", end=" ")
-        
-        output_filename = f"{self.short_name}_tb.sv"
-        
-        # Build interface instances
-        interface_instances = []
-        for name, info in self.uvc_mapping.get('uvcs', {}).items():
-            kind = info.get('kind', '')
-            # Convert env kind to interface kind
-            if_kind = kind.replace('_env', '_if')
-            interface_instances.append(f"- {if_kind} {name.replace('_env', '_if')}_inst")
-        
-        # Build DUT connections placeholder
-        dut_connections = f"""Connect signals according to {self.block_name} port list:
-- Clock and reset
-- Feature buffer interface signals
-- Kernel memory interface signals
-- Output buffer interface signals
-- PSIN/ADDIN interface signals
-- Register interface signals (decoded to control signals)
-- Status signals"""
-        
-        prompt = format_prompt(
-            TESTBENCH_PROMPT,
-            block_name=self.block_name,
-            interface_instances='\n'.join(interface_instances),
-            dut_connections=dut_connections,
-            output_filename=output_filename
-        )
-        
-        examples = [example] if example else None
-        response = self.llm.generate(prompt, context=context, examples=examples)
-        
-        code = extract_code_from_response(response.content)
-        output_path = output_dir / output_filename
-        output_path.write_text(code)
+        output_path.write_text('\n'.join(lines) + '\n')
         self.output_files.append(output_path)
-        
-        console.print(f"[green]OK[/green] ({output_filename})")
+        return output_path
     
     def _get_ordered_file_list(self) -> List[str]:
         """Get ordered list of files for inclusion in package."""
@@ -264,11 +239,11 @@ class PhaseCPackage:
 
 def run_phase_c(
     config: Config,
-    llm: UVMGeneratorLLM,
     block_config: Dict,
     uvc_mapping: Dict,
-    generated_files: List[Path]
+    generated_files: List[Path],
+    manifest: Optional[Manifest] = None
 ) -> List[Path]:
     """Convenience function to run Phase C."""
-    phase = PhaseCPackage(config, llm, block_config, uvc_mapping, generated_files)
+    phase = PhaseCPackage(config, block_config, uvc_mapping, generated_files, manifest)
     return phase.run()
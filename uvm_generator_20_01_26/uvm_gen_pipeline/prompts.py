@@ -3,6 +3,10 @@ Prompt templates for UVM code generation.
 Contains all LLM prompts organized by generation phase.
 """
 
+# Bump when a template or the system prompt changes in a way that should
+# regenerate existing outputs (part of every artifact's manifest fingerprint)
+PROMPT_TEMPLATE_VERSION = 1
+
 # =============================================================================
 # PHASE A: IP Infrastructure Prompts
 # =============================================================================
@@ -11,6 +15,8 @@ INTERFACE_GENERATION_PROMPT = """Generate a SystemVerilog interface file for the
 
 Block Configuration:
 - Block Name: {block_name}
+- Interface Name: {interface_name} (the testbench registers it in config_db as "{vif_key}")
+- Ports: exactly (input logic {clock_name}, input logic {reset_name}); the testbench connects them by these names
 - Clock: {clock_name} ({clock_freq})
 - Reset: {reset_name} (Active {reset_polarity})
 
@@ -28,49 +34,14 @@ Follow the exact style of the example interface provided.
 Generate the complete interface file named: {output_filename}
 """
 
-VIRTUAL_SEQUENCER_PROMPT = """Generate a virtual sequencer for the {block_name} UVM environment.
-
-The virtual sequencer should have handles to these sequencers:
-{sequencer_list}
-
-Include:
-1. `uvm_component_utils` macro
-2. All sequencer handles with proper parameterization
-3. Virtual interface handle for the main DUT interface
-4. build_phase to get the virtual interface from config_db
-5. Proper constructor
-
-Follow the exact style of the example virtual sequencer provided.
-Generate the complete file named: {output_filename}
-"""
-
-ENVIRONMENT_PROMPT = """Generate the top-level UVM environment for {block_name}.
-
-Sub-environments to instantiate:
-{env_list}
-
-The environment should:
-1. Instantiate all sub-environments listed above
-2. Create a virtual sequencer
-3. Create a scoreboard (if needed)
-4. Get all virtual interfaces from config_db in build_phase
-5. Connect sequencers to virtual sequencer in connect_phase
-6. Connect interfaces to agents and drivers in connect_phase
-7. Connect monitor analysis ports to scoreboard
-
-Use the exact parameter values from the configuration:
-{params_config}
-
-Follow the exact style of the example environment provided.
-Generate the complete file named: {output_filename}
-"""
-
-SCOREBOARD_PROMPT = """Generate a UVM scoreboard for {block_name}.
+SCOREBOARD_PROMPT = """Generate a UVM scoreboard class {class_name} (not parameterized) for {block_name}.
 
 The scoreboard should:
 1. Compare DUT output against expected values from C model
 2. Support reading expected output from file (generated by C model)
-3. Have analysis imp ports for receiving transactions from monitors
+3. Declare exactly these analysis imps; the environment (already generated) creates the
+   scoreboard as "scoreboard" and connects them (use `uvm_analysis_imp_decl when there is more than one):
+{imp_ports}
 4. Implement the write() method for comparison
 5. Track pass/fail statistics
 6. Report results in report_phase
@@ -84,6 +55,30 @@ Follow the exact style and methodology of existing UVM scoreboards.
 Generate the complete file named: {output_filename}
 """
 
+SCOREBOARD_HOLES_PROMPT = """Complete the UVM scoreboard {class_name} for {block_name}.
+
+The scoreboard skeleton below is already rendered from the UVC mapping: the class,
+its imps (connected by the environment), new() and the phase headers are fixed.
+Each @@NAME@@ line is a hole for you to fill:
+```systemverilog
+{skeleton}```
+
+Holes:
+{holes}
+
+Output format from C model:
+- File: {expected_output_file}
+- Data width: {data_width} bits
+- Number of entries: {num_entries}
+
+RESPONSE FORMAT: This request overrides the plain-code output rule.
+Respond with one JSON object mapping each hole name to its SystemVerilog, e.g.
+{{"MEMBERS": "bit [63:0] expected_q[$];\\nint unsigned num_mismatches;", "REPORT": "..."}}
+Do not repeat the skeleton. Function body holes are statements only (no function,
+task or class keywords), and no hole may declare a class or name another class
+than {class_name}.
+"""
+
 # =============================================================================
 # PHASE B: Test Case Generation Prompts
 # =============================================================================
@@ -166,45 +161,110 @@ Follow the exact style of the example virtual sequence provided.
 Generate the complete file named: {output_filename}
 """
 
-# =============================================================================
-# PHASE C: Package & Integration Prompts
-# =============================================================================
+VSEQ_PLAN_PROMPT = """Plan the virtual sequence for test case: {tc_id}
 
-PACKAGE_PROMPT = """Generate a SystemVerilog package file for {block_name}.
+Test Configuration:
+{test_config}
 
-The package should import/include:
-1. uvm_pkg
-2. All UVC packages used:
-{uvc_packages}
+Register Configuration (pack into 32-bit register):
+{register_config}
 
-3. All generated files in order (dependencies first):
-{file_list}
+Stimulus Configuration:
+{stimulus_config}
 
-Follow standard UVM package structure.
-Generate the complete file named: {output_filename}
+RESPONSE FORMAT: This request overrides the plain-code output rule.
+Do not write SystemVerilog. Respond with a JSON stimulus plan; the virtual sequence is rendered from it:
+{{"variables": {{"<name>": <int>, ...}}, "steps": [<step>, ...]}}
+
+The steps run in order. Each step is an object with exactly one of these keys:
+- {{"run": {{"command": "<shell command with $sformatf fields such as %d>", "args": ["<variable>", ...]}}}}: run a script or the C model
+- {{"set": {{"<interface signal>": <value>, ...}}}}: drive DUT interface signals, then wait one clock
+- {{"program_reg": {{"<register field>": <value>, ...}}}}: write the control register (fields not given are 0, except the fixed values below)
+- {{"start_compute": {{}}}}: write the last programmed register again with START_COMPUTE=1 and COMPE=1
+- {{"write": {{"uvc": "<UVC>", "file": "<input hex file>", "size": <entries>}}}}: run the UVC's input sequence
+- {{"wait": {{"signal": "<interface signal>", "value": <value>}}}}: wait until the signal has the value
+- {{"read": {{"uvc": "<UVC>", "size": <entries>}}}}: run the UVC's output sequence
+A <value> is an integer or the name of a plan variable. Commands must not contain quotes.
+Use the signal names of the generated interface in the infrastructure context.
+
+Register values fixed by the regbank_program, filled into every program_reg/start_compute
+step and declared as plan variables unless the plan declares them; any other value is rejected:
+{regbank_values}
+
+Write/read UVCs of this test case and their sequences:
+{uvc_list}
+
+Example plan for CI_TC_005 (its mode/sign_8b/PS_* variables and register fields are filled in):
+```json
+{example}
+```
+Respond with the JSON object only.
 """
 
-TESTBENCH_PROMPT = """Generate the top-level testbench module for {block_name}.
+# Stimulus plan of the golden CI_TC_005_mode0_sign0_PS_FIRST_vseq.sv
+VSEQ_PLAN_EXAMPLE = """{
+  "variables": {"feature_buffer_size": 1},
+  "steps": [
+    {"run": {"command": "python generate_data_hex_unique.py --mode %d --feature_buffer_size %d --sign_8b %d > result_feature.txt", "args": ["mode", "feature_buffer_size", "sign_8b"]}},
+    {"run": {"command": "python generate_data_psin_addin.py", "args": []}},
+    {"run": {"command": "./psout_exe kernel_hex.txt feature_hex.txt psin_hex.txt addin_hex.txt output_buffer_expected_out.txt %02b %02b %01b %01b %01b > result_cmodel.txt", "args": ["mode", "sign_8b", "PS_FIRST", "PS_MODE", "PS_LAST"]}},
+    {"set": {"capture_output_buffer_exp_data": 0}},
+    {"set": {"capture_output_buffer_exp_data": 1, "output_buffer_exp_data_size": 32}},
+    {"set": {"capture_output_buffer_exp_data": 0}},
+    {"program_reg": {}},
+    {"write": {"uvc": "m_feature_buffer_env", "file": "./feature_hex_rtl.txt", "size": 16}},
+    {"write": {"uvc": "m_kernel_mem_env", "file": "./kernel_hex_rtl.txt", "size": 512}},
+    {"start_compute": {}},
+    {"wait": {"signal": "psout_buff_full", "value": 1}},
+    {"read": {"uvc": "m_output_buffer_env", "size": 32}}
+  ]
+}"""
+
+PACKED_TEST_CASES_PROMPT ="""Generate the virtual sequence, and the test file where one is requested, for each of the {count} test cases below.
+The test cases use the same active UVCs and differ only in their register and stimulus values.
+Each test instantiates the virtual sequence generated for the same test case.
+
+{test_cases}
+
+RESPONSE FORMAT: This request overrides the plain-code output rule.
+Respond with a single JSON object that maps each file name to the complete SystemVerilog source of that file:
+{{"<file name>": "<file contents>", ...}}
+
+The object must contain exactly these {file_count} files:
+{file_list}
 
-The testbench should:
-1. Import uvm_pkg and the block package
-2. Define parameters for data widths
-3. Generate clock and reset
-4. Instantiate all interfaces:
-{interface_instances}
+Generate every file in full, exactly as if it had been requested on its own.
+Do not wrap the JSON or the file contents in markdown code fences.
+"""
 
-5. Add register decode logic if using packed registers
-6. Instantiate the DUT with proper port connections:
-{dut_connections}
+# Separator line between the files of a combined response
+FILE_DELIMITER = "// ===== FILE: {filename} ====="
 
-7. In initial block:
-   - Set all virtual interfaces in uvm_config_db
-   - Call run_test()
+COMBINED_TEST_CASE_PROMPT = """Generate both the virtual sequence and the test file for test case: {tc_id}
+The test starts this virtual sequence, so use its exact class name.
 
-Follow the exact style of the example testbench provided.
-Generate the complete file named: {output_filename}
+{vseq_prompt}
+{test_prompt}
+OUTPUT FORMAT: Output the two files one after the other, virtual sequence first.
+Put the delimiter line for each file, alone on its own line, directly before that file:
+{delimiters}
+Output nothing except the delimiter lines and the file contents.
 """
 
+CLUSTER_TEMPLATE_PROMPT = """The test case below is the first of a family of test cases with the same structure.
+They differ only in the values listed here, so write the file as a TEMPLATE for the whole family:
+wherever one of these values is used (class names, register fields, pattern selection, strings,
+messages), write its placeholder instead of the value. Each test case's values are substituted
+into the template, so never write any of these values literally.
+
+Placeholders and their values for this test case:
+{placeholders}
+
+Binary vplan values are given as integers (e.g. mode "10" is 2) and dont_care as 0.
+Placeholders stand for bare tokens: write 2'(@@MODE@@) or "@@KERNELS_PATTERN@@", not 2'b@@MODE@@.
+
+{file_prompt}"""
+
 # =============================================================================
 # Utility function to format prompts
 # =============================================================================
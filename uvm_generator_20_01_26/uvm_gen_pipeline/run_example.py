@@ -39,7 +39,7 @@ def run_pipeline():
     config.validate()
     
     # Initialize LLM client
-    llm = UVMGeneratorLLM(config.openai)
+    llm = UVMGeneratorLLM(config.openai, config.cache)
     
     print("=" * 60)
     print("UVM Test Case Generator - Programmatic Example")
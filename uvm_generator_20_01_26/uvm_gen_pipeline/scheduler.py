@@ -0,0 +1,305 @@
+"""
+Dependency-graph scheduler for the generation phases.
+Every generated artifact is a node with explicit inputs, so each one starts
+as soon as the files it needs exist instead of waiting for its whole phase.
+LLM requests share one pool of ``max_inflight`` slots.
+"""
+
+import asyncio
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Sequence
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+from config import Config
+from llm_client import UVMGeneratorLLM
+from parsers import TestCase
+from phase_a_infrastructure import PhaseAInfrastructure
+from phase_b_testgen import PhaseBTestGeneration
+from phase_c_package import PhaseCPackage
+from manifest import Manifest
+from telemetry import call_tags
+
+console = Console()
+
+# Phase A artifacts a test case's prompts are built from: the interface
+# (signals), virtual sequencer (sequencer handles) and environment (class name)
+PHASE_B_INFRA = ('interface', 'virtual_sequencer', 'environment')
+
+
+@dataclass
+class ArtifactNode:
+    """One artifact of the graph and its timing (seconds from the start of the run)."""
+    name: str
+    phase: str
+    action: Callable[[], Awaitable[Any]]
+    deps: List[str] = field(default_factory=list)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Any = None
+    error: Optional[BaseException] = None  # Own failure, or that of a dependency when skipped
+    skipped: bool = False
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or 0.0) - (self.started or 0.0)
+
+
+class ArtifactGraph:
+    """
+    Dependency graph of generation artifacts.
+
+    Nodes are added after their dependencies, so the graph is acyclic by
+    construction. run() starts every node as soon as all of its dependencies
+    have finished. A node that fails is marked with its error and its
+    dependents are skipped; unrelated nodes run on. Only an interrupt
+    cancels the rest of the graph.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, ArtifactNode] = {}
+        self.wall_time = 0.0
+
+    def add(self, name: str, phase: str, action: Callable[[], Awaitable[Any]], deps: Sequence[str] = ()) -> str:
+        """Add a node; ``action`` is a coroutine function run once ``deps`` have finished."""
+        if name in self.nodes:
+            raise ValueError(f"Duplicate artifact in graph: {name}")
+        missing = [dep for dep in deps if dep not in self.nodes]
+        if missing:
+            raise ValueError(f"Artifact {name} depends on unknown artifacts: {', '.join(missing)}")
+        self.nodes[name] = ArtifactNode(name, phase, action, list(deps))
+        return name
+
+    async def run(self):
+        """Execute the graph; node results and errors are stored on the nodes."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def execute(node: ArtifactNode):
+            if node.deps:
+                await asyncio.gather(*(tasks[dep] for dep in node.deps))
+            failed = next((self.nodes[dep] for dep in node.deps if self.nodes[dep].error), None)
+            if failed:
+                node.error, node.skipped = failed.error, True
+                console.print(f"  [{node.phase}] {node.name} [yellow]skipped[/yellow] [dim]({failed.name} failed)[/dim]")
+                return
+            node.started = loop.time() - start
+            try:
+                with call_tags(phase=node.phase):
+                    node.result = await node.action()
+            except Exception as e:
+                node.error = e
+                console.print(f"  [{node.phase}] {node.name} [red]FAILED[/red]: {e}")
+                return
+            finally:
+                node.finished = loop.time() - start
+            console.print(f"  [{node.phase}] {node.name} [green]OK[/green] [dim]({node.duration:.1f}s)[/dim]")
+
+        for name, node in self.nodes.items():
+            tasks[name] = asyncio.ensure_future(execute(node))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.wall_time = loop.time() - start
+
+    def failures(self) -> List[ArtifactNode]:
+        """Nodes that failed themselves (not those skipped for a failed dependency)."""
+        return [node for node in self.nodes.values() if node.error and not node.skipped]
+
+    def critical_path(self) -> List[ArtifactNode]:
+        """Chain of nodes that gated the end of the run, first to last.
+
+        Starts at the last node to finish and walks back through the
+        dependency that finished last. Failed and unstarted nodes are ignored.
+        """
+        finished = [node for node in self.nodes.values() if node.finished is not None and not node.error]
+        if not finished:
+            return []
+        node = max(finished, key=lambda n: n.finished)
+        path = [node]
+        while node.deps:
+            node = max((self.nodes[dep] for dep in node.deps), key=lambda n: n.finished or 0.0)
+            path.append(node)
+        return list(reversed(path))
+
+    def critical_path_table(self) -> Optional[Table]:
+        """Critical path with start times and durations (None before run())."""
+        path = self.critical_path()
+        if not path:
+            return None
+        table = Table(title="Critical Path", show_header=True)
+        table.add_column("Artifact", style="cyan")
+        table.add_column("Phase", style="cyan")
+        table.add_column("Start s", style="green", justify="right")
+        table.add_column("Duration s", style="green", justify="right")
+        for node in path:
+            table.add_row(node.name, node.phase, f"{node.started:.1f}", f"{node.duration:.1f}")
+        busy = sum(node.duration for node in self.nodes.values())
+        table.caption = (f"{len(self.nodes)} artifacts, {self.wall_time:.1f}s wall time, "
+                         f"{busy:.1f}s total artifact time")
+        return table
+
+
+def run_dag(
+    config: Config,
+    llm: UVMGeneratorLLM,
+    block_config: Dict,
+    test_cases: List[TestCase],
+    uvc_mapping: Dict,
+    model_info: Dict,
+    manifest: Optional[Manifest] = None
+) -> List[Path]:
+    """Run Phases A-C as one dependency graph.
+
+    - Phase A artifacts need only the parsed inputs.
+    - A test case's vseq needs the interface, virtual sequencer and
+      environment; its test also needs the vseq. Packed, combined and
+      cluster request groups, and the batch stage, are one node each.
+    - The package and file list need every Phase A and B file; the testbench
+      needs only the UVC mapping.
+
+    With a ``manifest``, nodes whose inputs are unchanged reuse their file
+    and finish without a request. A failed node skips only its dependents;
+    the failures are reported (Phase B test cases like a phase run) and
+    raised once the rest of the graph has finished.
+
+    Returns:
+        All generated file paths, in the same order as a phase-by-phase run
+    """
+    console.print(Panel("[bold cyan]Generating Phases A-C as a dependency graph[/bold cyan]"))
+    semaphore = asyncio.Semaphore(config.pipeline.max_inflight)
+    graph = ArtifactGraph()
+
+    # Phase A: independent infrastructure artifacts
+    phase_a = PhaseAInfrastructure(config, llm, block_config, uvc_mapping, model_info, manifest)
+    phase_a.prepare()
+    infra_nodes: Dict[str, str] = {}
+    for key, (_, _, build_prompt) in phase_a.artifacts().items():
+        infra_nodes[key] = graph.add(
+            build_prompt()[1], "A", lambda key=key: phase_a.agenerate_artifact(key, semaphore)
+        )
+
+    # Phase B: context is built once the infrastructure it embeds exists
+    phase_b_deps = [infra_nodes[key] for key in PHASE_B_INFRA if key in infra_nodes]
+    phase_b = PhaseBTestGeneration(config, llm, block_config, test_cases, uvc_mapping, model_info,
+                                   manifest=manifest)
+
+    def prepare_phase_b():
+        if phase_b.context is None:
+            phase_b.infra_files = [graph.nodes[name].result for name in phase_b_deps]
+            phase_b.prepare()
+
+    async def generate_vseq(test_case: TestCase) -> List[Path]:
+        prepare_phase_b()
+        return [await phase_b.agenerate_vseq(test_case, semaphore)]
+
+    async def generate_test(test_case: TestCase, vseq_node: str) -> List[Path]:
+        return [await phase_b.agenerate_test(test_case, graph.nodes[vseq_node].result[0], semaphore)]
+
+    async def render_test(test_case: TestCase) -> List[Path]:
+        return [phase_b.render_test(test_case)]
+
+    async def generate_group(group: List[TestCase]) -> List[Path]:
+        prepare_phase_b()
+        files = await phase_b.agenerate_group(group, semaphore)
+        return [path for test_case in group for path in files[test_case.tc_id]]
+
+    async def generate_batch() -> List[Path]:
+        prepare_phase_b()
+        await asyncio.to_thread(phase_b.generate_batch)
+        return phase_b.generated_files
+
+    test_nodes: List[str] = []
+    node_cases: Dict[str, List[TestCase]] = {}  # Phase B node -> its test cases
+    if config.pipeline.batch:
+        test_nodes.append(graph.add("Phase B batch", "B", generate_batch, phase_b_deps))
+        node_cases[test_nodes[-1]] = test_cases
+    else:
+        for group in phase_b.request_groups():
+            test_case = group[0]
+            if len(group) > 1:
+                kind = "cluster" if config.pipeline.cluster else "packed"
+                name = f"{test_case.tc_id} +{len(group) - 1} {kind}"
+                test_nodes.append(graph.add(name, "B", lambda group=group: generate_group(group), phase_b_deps))
+            elif config.pipeline.combined:
+                name = f"{test_case.tc_id} (vseq+test)"
+                test_nodes.append(graph.add(name, "B", lambda group=group: generate_group(group), phase_b_deps))
+            else:
+                vseq_node = graph.add(f"{test_case.tc_id}_vseq.sv", "B",
+                                      lambda tc=test_case: generate_vseq(tc), phase_b_deps)
+                test_nodes.append(vseq_node)
+                node_cases[vseq_node] = group
+                if phase_b.renders_test(test_case):
+                    # Rendered from the TC_ID alone, so it waits for nothing
+                    test_nodes.append(graph.add(f"{test_case.tc_id}_test.sv", "B",
+                                                lambda tc=test_case: render_test(tc)))
+                else:
+                    test_nodes.append(graph.add(f"{test_case.tc_id}_test.sv", "B",
+                                                lambda tc=test_case, v=vseq_node: generate_test(tc, v), [vseq_node]))
+            node_cases[test_nodes[-1]] = group
+
+    def test_files() -> List[Path]:
+        """Phase B files in vplan order (failed nodes left out)."""
+        files = [path for name in test_nodes for path in graph.nodes[name].result or []]
+        order = {test_case.tc_id: i for i, test_case in enumerate(test_cases)}
+        return sorted(files, key=lambda path: order.get(path.stem.rsplit('_', 1)[0], len(order)))
+
+    def infra_and_test_files() -> List[Path]:
+        """Phase A files in generation order, then Phase B files in vplan order."""
+        return [graph.nodes[name].result for name in infra_nodes.values() if graph.nodes[name].result] + test_files()
+
+    # Phase C: the testbench needs only the UVC mapping; package and file list need every file
+    phase_c = PhaseCPackage(config, block_config, uvc_mapping, [], manifest)
+    phase_c.prepare()
+    all_deps = list(infra_nodes.values()) + test_nodes
+
+    async def generate_package() -> Path:
+        phase_c.generated_files = infra_and_test_files()
+        return phase_c.generate_package()
+
+    async def generate_filelist() -> Path:
+        phase_c.generated_files = infra_and_test_files()
+        return phase_c.generate_filelist()
+
+    async def generate_testbench() -> Path:
+        return phase_c.generate_testbench()
+
+    c_nodes = []
+    if config.pipeline.generate_package:
+        c_nodes.append(graph.add(f"{phase_c.short_name}_pkg.sv", "C", generate_package, all_deps))
+    c_nodes.append(graph.add("files.f", "C", generate_filelist, all_deps))
+    c_nodes.append(graph.add(f"{phase_c.short_name}_tb.sv", "C", generate_testbench))
+
+    asyncio.run(graph.run())
+
+    # Test cases of failed (or skipped) Phase B nodes, reported like a phase run
+    for name in test_nodes:
+        node = graph.nodes[name]
+        if node.error:
+            for test_case in node_cases[name]:
+                phase_b.failed.setdefault(test_case.tc_id, node.error)
+
+    phase_b.generated_files = test_files()
+    phase_b.print_report()
+
+    table = graph.critical_path_table()
+    if table:
+        console.print(table)
+
+    failures = graph.failures()
+    if failures:
+        # Files of the nodes that finished are written and in the manifest
+        message = f"{len(failures)} artifacts failed: {', '.join(node.name for node in failures)}"
+        if phase_b.failed:
+            message += f" (Phase B failed for {len(phase_b.failed)} test cases: {', '.join(phase_b.failed)})"
+        raise RuntimeError(message)
+
+    return infra_and_test_files() + [graph.nodes[name].result for name in c_nodes]
@@ -0,0 +1,318 @@
+"""
+Stimulus plans for virtual sequences.
+With ``--vseq-plan`` the LLM answers a vseq request with a small JSON plan
+of ordered steps instead of SystemVerilog. The register values the test
+case's regbank_program fixes are filled in here rather than planned, the
+plan is validated against the UVC mapping and the test case, and
+emitters.render_vseq() renders
+the sequence declarations, ``type_id::create`` calls and the
+``pack_register`` helper locally, so the LLM only writes what differs
+between test cases.
+
+A plan is ``{"variables": {name: int}, "steps": [step, ...]}`` where each
+step is a one-key object:
+
+- ``{"run": {"command": str, "args": [variable, ...]}}``: ``$system`` call
+- ``{"set": {signal: value, ...}}``: drive DUT interface signals, one clock
+- ``{"program_reg": {field: value, ...}}``: control register write
+- ``{"start_compute": {field: value, ...}}``: register write that starts compute
+- ``{"write": {"uvc": str, "file": str, "size": int}}``: input sequence
+- ``{"wait": {"signal": str, "value": int}}``: wait for a DUT interface signal
+- ``{"read": {"uvc": str, "size": int}}``: output sequence
+
+A value is an integer or the name of a plan variable.
+"""
+
+import re
+import json
+from typing import Dict, Any, List, Optional, Tuple
+
+from parsers import TestCase
+
+PLAN_OPS = ('run', 'set', 'program_reg', 'start_compute', 'write', 'wait', 'read')
+
+# Control register layout: (field, msb, lsb)
+REGISTER_FIELDS = (
+    ('K_DIM', 5, 0),
+    ('START_COMPUTE', 6, 6),
+    ('COMPE', 7, 7),
+    ('PS_FIRST', 8, 8),
+    ('PS_MODE', 9, 9),
+    ('PS_LAST', 10, 10),
+    ('MODE', 12, 11),
+    ('sign_8b', 14, 13),
+    ('CONT_COMP', 15, 15),
+    ('iteration', 23, 16),
+)
+
+# Register field fixed by the regbank_program -> plan variable holding its value
+REGBANK_VARIABLES = {
+    'MODE': 'mode',
+    'sign_8b': 'sign_8b',
+    'PS_FIRST': 'PS_FIRST',
+    'PS_MODE': 'PS_MODE',
+    'PS_LAST': 'PS_LAST',
+}
+
+# ps_phase sets one of these fields and clears the others
+PS_FIELDS = ('PS_FIRST', 'PS_MODE', 'PS_LAST')
+
+# Fields a start_compute step sets on top of the last program_reg values
+START_COMPUTE_FIELDS = {'START_COMPUTE': 1, 'COMPE': 1}
+
+# Register UVC sequence the control register is written with, and its data member
+REGISTER_SEQUENCE = 'register_configure_write_seq'
+REGISTER_MEMBER = 'register'
+
+# Names the rendered vseq uses itself
+RESERVED_NAMES = ('pack_register', 'status', 'body', 'new')
+
+IDENTIFIER_RE = re.compile(r"^[A-Za-z_]\w*$")
+FORMAT_SPEC_RE = re.compile(r"%%|%-?\d*[bdhoxsBDHOXS]")
+
+
+def register_bits(msb: int, lsb: int) -> str:
+    """Bit range of a register field as written in SV (``[12:11]``, ``[6]``)."""
+    return f"[{msb}]" if msb == lsb else f"[{msb}:{lsb}]"
+
+
+def register_mapping() -> str:
+    """The control register bit mapping, one ``register[bits] = FIELD`` line per field."""
+    return '\n'.join(f"- {REGISTER_MEMBER}{register_bits(msb, lsb):<8}= {name}"
+                     for name, msb, lsb in REGISTER_FIELDS)
+
+
+def regbank_values(test_case: TestCase) -> Dict[str, int]:
+    """Register field -> value the test case's regbank_program fixes.
+
+    ``mode``/``sign_8b`` binary strings are read as integers and
+    ``dont_care`` as 0; ``ps_phase`` sets its PS_* field. Values that are
+    neither are left out.
+    """
+    regbank = {str(key).lower(): value for key, value in (test_case.stimulus.regbank_program or {}).items()}
+    values = {}
+    for field in ('MODE', 'sign_8b'):
+        text = str(regbank.get(field.lower(), ''))
+        if re.fullmatch(r"[01]+", text):
+            values[field] = int(text, 2)
+        elif text == 'dont_care':
+            values[field] = 0
+    phase = str(regbank.get('ps_phase', '')).upper()
+    if phase in PS_FIELDS:
+        values.update({field: int(field == phase) for field in PS_FIELDS})
+    return values
+
+
+def describe_regbank(values: Dict[str, int]) -> str:
+    """The fixed register values and their plan variables, for the plan prompt."""
+    if not values:
+        return "- none"
+    return '\n'.join(f"- {field} = {value} (variable {REGBANK_VARIABLES[field]})" for field, value in values.items())
+
+
+def parse_plan(content: str) -> Optional[Dict[str, Any]]:
+    """The JSON plan in an LLM response, or None if there is no JSON object.
+
+    Tolerates a markdown fence and text around the object.
+    """
+    start, end = content.find('{'), content.rfind('}')
+    if start < 0 or end < start:
+        return None
+    try:
+        plan = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return plan if isinstance(plan, dict) else None
+
+
+def fill_regbank(plan: Dict[str, Any], values: Dict[str, int]) -> Dict[str, Any]:
+    """Fill the regbank_values() a plan leaves out into it, in place.
+
+    Missing variables (``mode``, ``sign_8b``, ``PS_FIRST`` ...; a name in
+    any case counts as given) are added, and program_reg/start_compute
+    steps get the fields they do not set, so the LLM only plans the step
+    order and sizes. Values the plan gives are kept for validate_plan().
+    """
+    if plan.get('variables') is None:
+        plan['variables'] = {}
+    variables = plan['variables']
+    if isinstance(variables, dict):
+        declared = {str(name).lower() for name in variables}
+        for field, value in values.items():
+            if REGBANK_VARIABLES[field].lower() not in declared:
+                variables[REGBANK_VARIABLES[field]] = value
+    steps = plan.get('steps')
+    for step in steps if isinstance(steps, list) else []:
+        if isinstance(step, dict) and len(step) == 1 and next(iter(step)) in ('program_reg', 'start_compute'):
+            op, args = next(iter(step.items()))
+            if args is None or isinstance(args, dict):
+                step[op] = {**values, **(args or {})}
+    return plan
+
+
+def plan_steps(plan: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """(op, arguments) per step of a validated plan, in order."""
+    return [next(iter(step.items())) for step in plan.get('steps', [])]
+
+
+def default_sequence(info: Dict, operation: str) -> Optional[Dict]:
+    """The sequence a write/read step uses when the plan names none.
+
+    The first sequence of the operation that takes a size (and, for a
+    write, an input file), else the first of the operation.
+    """
+    candidates = [seq for seq in info.get('sequence_types', []) if seq.get('operation_type') == operation]
+    for seq in candidates:
+        if seq.get('has_size_param') and (operation != 'write' or seq.get('uses_file_input')):
+            return seq
+    return candidates[0] if candidates else None
+
+
+def step_sequence(info: Dict, op: str, args: Dict) -> Optional[Dict]:
+    """The sequence_types entry a write/read step runs (the named one, or the default)."""
+    name = args.get('sequence')
+    if name:
+        return next((seq for seq in info.get('sequence_types', [])
+                     if seq.get('name') == name and seq.get('operation_type') == op), None)
+    return default_sequence(info, op)
+
+
+def register_uvc(uvc_mapping: Dict) -> Optional[str]:
+    """The UVC whose write sequences include the control register sequence."""
+    for name, info in uvc_mapping.get('uvcs', {}).items():
+        if any(seq.get('name') == REGISTER_SEQUENCE for seq in info.get('sequence_types', [])):
+            return name
+    return None
+
+
+def describe_uvcs(test_case: TestCase, uvc_mapping: Dict) -> str:
+    """Write/read UVCs of a test case with their default sequence, for the plan prompt."""
+    uvcs = uvc_mapping.get('uvcs', {})
+    lines = []
+    for name in test_case.active_uvcs:
+        info = uvcs.get(name)
+        if not info or name == register_uvc(uvc_mapping):
+            continue
+        for op in ('write', 'read'):
+            seq = default_sequence(info, op)
+            if not seq:
+                continue
+            needs = ['size'] if seq.get('has_size_param') else []
+            if op == 'write' and seq.get('uses_file_input'):
+                needs.insert(0, 'file')
+            lines.append(f"- {op} {name}: {seq['name']}" + (f" (needs {', '.join(needs)})" if needs else ""))
+    return '\n'.join(lines) if lines else "- none"
+
+
+def validate_plan(plan: Dict[str, Any], test_case: TestCase, uvc_mapping: Dict) -> List[str]:
+    """Problems that keep a plan from being rendered for a test case (empty if none).
+
+    Write/read UVCs must be active in the test case and have a sequence for
+    the operation in the UVC mapping; sizes and files must match what that
+    sequence takes. Register steps need the register UVC to be active, and
+    register fields and variables the regbank_program fixes (variables
+    matched in any case) must have its values. Interface signal names are only checked to be identifiers: the DUT
+    interface is generated, not described by the mapping.
+    """
+    problems = []
+    variables = plan.get('variables', {})
+    if not isinstance(variables, dict):
+        return ["'variables' is not an object"]
+    expected = regbank_values(test_case)
+    fixed = {}
+    for field, value in expected.items():
+        fixed[field.lower()] = fixed[REGBANK_VARIABLES[field].lower()] = (field, value)
+    for name, value in variables.items():
+        if not IDENTIFIER_RE.match(name) or name in RESERVED_NAMES or name.startswith('seq_'):
+            problems.append(f"variable '{name}' is not a usable identifier")
+        if not isinstance(value, int) or isinstance(value, bool):
+            problems.append(f"variable '{name}' is not an integer")
+        elif name.lower() in fixed and value != fixed[name.lower()][1]:
+            field, want = fixed[name.lower()]
+            problems.append(f"variable '{name}' is {value} but the regbank_program gives {field} = {want}")
+
+    def check_value(where: str, value: Any):
+        if isinstance(value, bool) or not (isinstance(value, int) or value in variables):
+            problems.append(f"{where}: {value!r} is neither an integer nor a plan variable")
+
+    def check_register(where: str, fields: Any):
+        if not isinstance(fields, dict):
+            problems.append(f"{where}: expected an object of register fields")
+            return
+        known = {name for name, _, _ in REGISTER_FIELDS}
+        for name, value in fields.items():
+            if name not in known:
+                problems.append(f"{where}: unknown register field '{name}'")
+            check_value(f"{where} {name}", value)
+            actual = variables.get(value, value) if isinstance(value, str) else value
+            if name in expected and actual != expected[name]:
+                problems.append(f"{where}: {name} is {value!r} but the regbank_program gives {expected[name]}")
+
+    steps = plan.get('steps')
+    if not isinstance(steps, list) or not steps:
+        return problems + ["'steps' is missing or empty"]
+
+    uvcs = uvc_mapping.get('uvcs', {})
+    reg_uvc = register_uvc(uvc_mapping)
+    seen = set()
+    for index, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or len(step) != 1 or next(iter(step)) not in PLAN_OPS:
+            problems.append(f"step {index}: expected one of {', '.join(PLAN_OPS)}")
+            continue
+        op, args = next(iter(step.items()))
+        where = f"step {index} ({op})"
+        seen.add(op)
+        if op in ('program_reg', 'start_compute'):
+            if reg_uvc not in test_case.active_uvcs:
+                problems.append(f"{where}: the register UVC is not active in this test case")
+            check_register(where, args or {})
+        elif op == 'run':
+            command = args.get('command') if isinstance(args, dict) else None
+            call_args = args.get('args', []) if isinstance(args, dict) else []
+            if not isinstance(command, str) or not command or '"' in command or '\\' in command:
+                problems.append(f"{where}: 'command' must be a non-empty string without quotes or backslashes")
+                continue
+            if not isinstance(call_args, list) or any(arg not in variables for arg in call_args):
+                problems.append(f"{where}: 'args' must list plan variables")
+                continue
+            specs = [spec for spec in FORMAT_SPEC_RE.findall(command) if spec != '%%']
+            if len(specs) != len(call_args):
+                problems.append(f"{where}: {len(specs)} format fields but {len(call_args)} args")
+        elif op == 'set':
+            if not isinstance(args, dict) or not args:
+                problems.append(f"{where}: expected an object of interface signals")
+                continue
+            for signal, value in args.items():
+                if not IDENTIFIER_RE.match(signal):
+                    problems.append(f"{where}: '{signal}' is not a signal name")
+                check_value(f"{where} {signal}", value)
+        elif op == 'wait':
+            signal = args.get('signal') if isinstance(args, dict) else None
+            if not isinstance(signal, str) or not IDENTIFIER_RE.match(signal):
+                problems.append(f"{where}: 'signal' must be a signal name")
+                continue
+            check_value(where, args.get('value', 1))
+        else:
+            uvc = args.get('uvc') if isinstance(args, dict) else None
+            if uvc not in test_case.active_uvcs or uvc not in uvcs:
+                problems.append(f"{where}: '{uvc}' is not an active UVC of this test case")
+                continue
+            seq = step_sequence(uvcs[uvc], op, args)
+            if not seq:
+                problems.append(f"{where}: {uvc} has no such {op} sequence")
+                continue
+            size = args.get('size')
+            if seq.get('has_size_param'):
+                if isinstance(size, bool) or not isinstance(size, int) or size <= 0:
+                    problems.append(f"{where}: {seq['name']} needs a positive integer 'size'")
+            elif size is not None:
+                problems.append(f"{where}: {seq['name']} takes no size")
+            if op == 'write' and seq.get('uses_file_input'):
+                path = args.get('file')
+                if not isinstance(path, str) or not path or '"' in path:
+                    problems.append(f"{where}: {seq['name']} needs an input 'file'")
+
+    for op in ('start_compute', 'read'):
+        if op not in seen:
+            problems.append(f"the plan has no {op} step")
+    return problems
@@ -0,0 +1,237 @@
+"""
+Per-call LLM telemetry.
+Every LLM call of a run is appended to a JSONL ledger with its phase,
+artifact, test id, model, token usage, wall time, retries, finish_reason and
+estimated cost; validation issues found in the generated files are logged
+alongside. The run report breaks the ledger down per phase.
+"""
+
+import re
+import json
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+from rich.table import Table
+
+# USD per 1M tokens: (input, cached input, output). Longest prefix wins, so
+# dated snapshots like gpt-4.1-2025-04-14 use their family's price.
+MODEL_PRICING: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-5": (1.25, 0.125, 10.00),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "o3": (2.00, 0.50, 8.00),
+    "o4-mini": (1.10, 0.275, 4.40),
+}
+
+# Batch API requests are billed at half the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+
+_ARTIFACT_RE = re.compile(r"Generate the complete (?:\w+ )?file named: (\S+)")
+
+_call_tags: contextvars.ContextVar = contextvars.ContextVar("llm_call_tags", default={})
+
+
+@contextmanager
+def call_tags(**tags):
+    """
+    Tag the LLM calls made inside the block.
+
+    Tags nest and follow asyncio tasks (they live in a context variable), so
+    ``with call_tags(phase="B")`` around a phase and
+    ``with call_tags(test_id=...)`` around a test case combine.
+    """
+    token = _call_tags.set({**_call_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _call_tags.reset(token)
+
+
+def model_pricing(model: str) -> Optional[Tuple[float, float, float]]:
+    """Per-1M-token prices of a model, or None when it is not in MODEL_PRICING."""
+    matches = [name for name in MODEL_PRICING if model == name or model.startswith(name + "-")]
+    return MODEL_PRICING[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str, usage: Dict[str, int], batch: bool = False) -> Optional[float]:
+    """Estimated USD cost of one call's token usage (None for unknown models)."""
+    pricing = model_pricing(model)
+    if pricing is None:
+        return None
+    input_price, cached_price, output_price = pricing
+    cached = usage.get("cached_tokens", 0)
+    uncached = usage.get("prompt_tokens", 0) - cached
+    cost = (uncached * input_price + cached * cached_price + usage.get("completion_tokens", 0) * output_price) / 1e6
+    return cost * BATCH_PRICE_FACTOR if batch else cost
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of samples (pct in 0-100)."""
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def default_ledger_path(output_dir: Path) -> Path:
+    """Per-run ledger file under <output>/.telemetry/."""
+    return Path(output_dir) / ".telemetry" / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+class RunLedger:
+    """
+    JSONL ledger of the LLM calls of one run.
+
+    Each line is a ``call`` record (one per API attempt or cache hit) or a
+    ``validation`` record (issues found in a generated file). Records are
+    also kept in memory for the end-of-run breakdown; with no path the
+    ledger is in-memory only.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _append(self, record: Dict[str, Any]):
+        with self._lock:
+            self.records.append(record)
+            if self.path:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record_call(
+        self,
+        body: Dict[str, Any],
+        response=None,
+        seconds: Optional[float] = None,
+        queued: float = 0.0,
+        cache_hit: bool = False,
+        batch: bool = False,
+        error: Optional[Exception] = None,
+    ):
+        """
+        Record one LLM call.
+
+        Args:
+            body: Chat completion request body
+            response: LLMResponse (None when the call failed)
+            seconds: Wall time of the API call (None for batch results)
+            queued: Time spent waiting on the rate limiter
+            cache_hit: Served from the response cache
+            batch: Answered through the batch API
+            error: Exception raised by a failed call
+        """
+        tags = dict(_call_tags.get())
+        messages = body.get("messages") or [{}]
+        usage = dict(response.usage) if response else {}
+        model = response.model if response else body.get("model", "")
+        record = {
+            "type": "call",
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "phase": tags.pop("phase", None),
+            "artifact": tags.pop("artifact", None) or ", ".join(_ARTIFACT_RE.findall(messages[-1].get("content") or "")) or None,
+            "test_id": tags.pop("test_id", None),
+            "model": model,
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "cached_tokens": usage.get("cached_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "seconds": round(seconds, 3) if seconds is not None else None,
+            "queued": round(queued, 3),
+            "retries": tags.pop("attempt", 0),
+            "finish_reason": response.finish_reason if response else None,
+            "cache_hit": cache_hit,
+            "batch": batch,
+            "cost": 0.0 if cache_hit else (estimate_cost(model, usage, batch) if response else 0.0),
+            "error": f"{type(error).__name__}: {error}" if error else None,
+        }
+        record.update(tags)
+        self._append(record)
+
+    def record_validation(self, artifact: str, issues: List[str]):
+        """Record validation issues found in a generated file."""
+        tags = dict(_call_tags.get())
+        self._append({
+            "type": "validation",
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "phase": tags.get("phase"),
+            "artifact": artifact,
+            "test_id": tags.get("test_id"),
+            "issues": issues,
+        })
+
+    def phase_table(self) -> Optional[Table]:
+        """Per-phase breakdown of calls, latency, tokens and cost (None when no calls)."""
+        phases: Dict[str, Dict[str, Any]] = {}
+        for record in self.records:
+            row = phases.setdefault(record["phase"] or "-", self._empty_row())
+            if record["type"] == "validation":
+                row["issues"] += len(record["issues"])
+                continue
+            row["calls"] += 1
+            row["retries"] += record["retries"] > 0
+            if record["cache_hit"]:
+                # Served locally: no latency, tokens or cost
+                row["cache_hits"] += 1
+                continue
+            if record["seconds"] is not None:
+                row["latencies"].append(record["seconds"])
+            row["prompt"] += record["prompt_tokens"]
+            row["completion"] += record["completion_tokens"]
+            if record["cost"] is None:
+                row["priced"] = False
+            else:
+                row["cost"] += record["cost"]
+        if not any(row["calls"] for row in phases.values()):
+            return None
+
+        table = Table(title="LLM Calls by Phase", show_header=True)
+        for column in ("Phase", "Calls", "Hits", "Retries", "p50 s", "p95 s", "In tok", "Out tok", "Issues", "Cost $"):
+            table.add_column(column, style="cyan" if column == "Phase" else "green",
+                             justify="left" if column == "Phase" else "right")
+
+        total = self._empty_row()
+        for name, row in phases.items():
+            table.add_row(name, *self._format_row(row))
+            for key, value in row.items():
+                if key == "priced":
+                    total[key] = total[key] and value
+                else:
+                    total[key] += value
+        if len(phases) > 1:
+            table.add_row("Total", *self._format_row(total), style="bold")
+        return table
+
+    @staticmethod
+    def _empty_row() -> Dict[str, Any]:
+        return {"calls": 0, "cache_hits": 0, "retries": 0, "issues": 0, "latencies": [],
+                "prompt": 0, "completion": 0, "cost": 0.0, "priced": True}
+
+    @staticmethod
+    def _format_row(row: Dict[str, Any]) -> List[str]:
+        latencies = row["latencies"]
+        p50 = f"{percentile(latencies, 50):.1f}" if latencies else "-"
+        p95 = f"{percentile(latencies, 95):.1f}" if latencies else "-"
+        # "+" marks a lower bound: some calls used a model without pricing
+        cost = f"{row['cost']:.2f}" if row["priced"] else f"{row['cost']:.2f}+"
+        return [
+            str(row["calls"]), str(row["cache_hits"]), str(row["retries"]), p50, p95,
+            _compact(row["prompt"]), _compact(row["completion"]), str(row["issues"]), cost,
+        ]
+
+
+def _compact(count: int) -> str:
+    """Token count for a narrow column, e.g. 152274 -> '152.3k'."""
+    if count >= 1_000_000:
+        return f"{count / 1e6:.1f}M"
+    if count >= 10_000:
+        return f"{count / 1e3:.1f}k"
+    return str(count)
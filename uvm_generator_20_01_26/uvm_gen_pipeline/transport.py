@@ -0,0 +1,339 @@
+"""
+Pluggable LLM transports.
+Live calls go to the OpenAI API; record mode saves every request/response pair
+to a fixture store, replay mode serves them back offline with configurable
+latency, and synthetic mode fabricates SystemVerilog skeletons sized like real
+outputs, so the whole pipeline can be timed without network access.
+"""
+
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple, Mapping
+from openai.types.chat import ChatCompletion
+
+from prompts import FILE_DELIMITER
+
+TRANSPORT_MODES = ("live", "record", "replay", "synthetic")
+
+# Synthetic latency model: time to first token plus decode time
+SYNTHETIC_FIRST_TOKEN_SECONDS = 0.5
+SYNTHETIC_TOKENS_PER_SECOND = 60.0
+
+# Output size when the request carries no example of the artifact
+DEFAULT_SYNTHETIC_CHARS = 3000
+
+
+class FixtureMissing(KeyError):
+    """Replay mode found no recorded response for a request."""
+
+
+class FixtureStore:
+    """
+    Directory of recorded request/response pairs.
+
+    Each pair is ``<root>/<key[:2]>/<key>.json`` holding the request body, the
+    chat completion, the response headers and the observed latency. The key
+    hashes the whole request body, so any prompt change is a miss.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(body: Dict[str, Any]) -> str:
+        payload = json.dumps(body, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        path = self._path(self.make_key(body))
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, body: Dict[str, Any], completion: Dict[str, Any], headers: Mapping[str, str], latency: float):
+        path = self._path(self.make_key(body))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "request": body,
+            "response": completion,
+            "headers": dict(headers or {}),
+            "latency": latency,
+        }
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(record, ensure_ascii=False, indent=1), encoding="utf-8")
+        with self._lock:
+            tmp_path.replace(path)
+
+
+class Transport:
+    """
+    Live transport: sends request bodies to the OpenAI API.
+
+    ``send``/``asend`` take the owning UVMGeneratorLLM (for its SDK clients)
+    and a chat completion request body, and return the parsed completion
+    with the response headers.
+    """
+
+    name = "live"
+    offline = False  # True when no API key or network is needed
+
+    def send(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        raw = llm.client.chat.completions.with_raw_response.create(**body)
+        return raw.parse(), raw.headers
+
+    async def asend(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        raw = await llm.async_client.chat.completions.with_raw_response.create(**body)
+        return await raw.parse(), raw.headers
+
+    def describe(self) -> str:
+        return self.name
+
+
+class RecordTransport(Transport):
+    """Live transport that saves every request/response pair to a fixture store."""
+
+    name = "record"
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+
+    def send(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        start = time.monotonic()
+        completion, headers = super().send(llm, body)
+        self.store.put(body, completion.model_dump(), headers, time.monotonic() - start)
+        return completion, headers
+
+    async def asend(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        start = time.monotonic()
+        completion, headers = await super().asend(llm, body)
+        self.store.put(body, completion.model_dump(), headers, time.monotonic() - start)
+        return completion, headers
+
+    def describe(self) -> str:
+        return f"record -> {self.store.root}"
+
+
+class ReplayTransport(Transport):
+    """
+    Serves recorded responses offline.
+
+    Latency is the recorded latency by default, or a fixed ``latency`` in
+    seconds; either is multiplied by ``latency_scale``.
+    """
+
+    name = "replay"
+    offline = True
+
+    def __init__(self, store: FixtureStore, latency: Optional[float] = None, latency_scale: float = 1.0):
+        self.store = store
+        self.latency = latency
+        self.latency_scale = latency_scale
+
+    def _lookup(self, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str], float]:
+        record = self.store.get(body)
+        if record is None:
+            raise FixtureMissing(
+                f"No recorded response for request {FixtureStore.make_key(body)[:12]} in {self.store.root} "
+                f"- rerun with --transport record"
+            )
+        latency = self.latency if self.latency is not None else record.get("latency", 0.0)
+        return ChatCompletion.model_validate(record["response"]), record.get("headers", {}), latency * self.latency_scale
+
+    def send(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        completion, headers, latency = self._lookup(body)
+        time.sleep(latency)
+        return completion, headers
+
+    async def asend(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        completion, headers, latency = self._lookup(body)
+        await asyncio.sleep(latency)
+        return completion, headers
+
+    def describe(self) -> str:
+        latency = "recorded" if self.latency is None else f"{self.latency:g}s"
+        return f"replay <- {self.store.root} (latency {latency} x{self.latency_scale:g})"
+
+
+class SyntheticTransport(Transport):
+    """
+    Fabricates plausible SystemVerilog skeletons offline.
+
+    Output is sized like the example of the same artifact found in the
+    request (or DEFAULT_SYNTHETIC_CHARS), and latency follows a simple
+    first-token + tokens/second model unless a fixed ``latency`` is given.
+    JSON-mode requests (packed Phase B) get a ``{filename: code}`` object
+    and other multi-file prompts (combined vseq + test) get FILE_DELIMITER
+    separated skeletons, one per file the prompt asks for. JSON-mode
+    requests for no file (stimulus plans) echo the prompt's ```json example,
+    or fill each ``@@NAME@@`` hole of a skeleton with a comment.
+    """
+
+    name = "synthetic"
+    offline = True
+
+    def __init__(self, latency: Optional[float] = None, latency_scale: float = 1.0):
+        self.latency = latency
+        self.latency_scale = latency_scale
+
+    def _complete(self, body: Dict[str, Any]) -> Tuple[ChatCompletion, float]:
+        messages = body.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        request_text = "\n".join(m.get("content") or "" for m in messages)
+        target = min(_example_size(request_text) or DEFAULT_SYNTHETIC_CHARS, (body.get("max_tokens") or 4096) * 4)
+        names = _FILE_NAME_RE.findall(prompt)
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        example = _JSON_EXAMPLE_RE.search(prompt)
+        holes = list(dict.fromkeys(_HOLE_RE.findall(prompt)))
+        if json_mode and not names and example:
+            content = example.group(1)
+        elif json_mode and not names and holes:
+            content = json.dumps({hole: f"// Synthetic fill for {hole}" for hole in holes})
+        elif json_mode or len(names) > 1:
+            target = min(target, (body.get("max_tokens") or 4096) * 4 // max(1, len(names)))
+            files = {
+                name: synthesize_systemverilog(f"Generate the complete file named: {name}", target)
+                for name in names
+            }
+            if json_mode:
+                content = json.dumps(files)
+            else:
+                content = "\n".join(f"{FILE_DELIMITER.format(filename=name)}\n{code}" for name, code in files.items())
+        else:
+            content = synthesize_systemverilog(prompt, target)
+
+        prompt_tokens = len(request_text) // 4
+        completion_tokens = len(content) // 4
+        latency = self.latency
+        if latency is None:
+            latency = SYNTHETIC_FIRST_TOKEN_SECONDS + completion_tokens / SYNTHETIC_TOKENS_PER_SECOND
+
+        completion = ChatCompletion.model_validate({
+            "id": f"synthetic-{FixtureStore.make_key(body)[:12]}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "synthetic"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+        return completion, latency * self.latency_scale
+
+    def send(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        completion, latency = self._complete(body)
+        time.sleep(latency)
+        return completion, {}
+
+    async def asend(self, llm, body: Dict[str, Any]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        completion, latency = self._complete(body)
+        await asyncio.sleep(latency)
+        return completion, {}
+
+    def describe(self) -> str:
+        latency = "modelled" if self.latency is None else f"{self.latency:g}s"
+        return f"synthetic (latency {latency} x{self.latency_scale:g})"
+
+
+def create_transport(
+    mode: str,
+    fixtures_dir: Path,
+    latency: Optional[float] = None,
+    latency_scale: float = 1.0,
+) -> Transport:
+    """Create the transport for a --transport mode."""
+    if mode == "live":
+        return Transport()
+    if mode == "record":
+        return RecordTransport(FixtureStore(fixtures_dir))
+    if mode == "replay":
+        return ReplayTransport(FixtureStore(fixtures_dir), latency, latency_scale)
+    if mode == "synthetic":
+        return SyntheticTransport(latency, latency_scale)
+    raise ValueError(f"Unknown transport: {mode}. Use one of {', '.join(TRANSPORT_MODES)}.")
+
+
+# ---------------------------------------------------------------------------
+# Synthetic SystemVerilog
+# ---------------------------------------------------------------------------
+
+_FILE_NAME_RE = re.compile(r"Generate the complete file named: (\S+)")
+_JSON_EXAMPLE_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+_HOLE_RE = re.compile(r"^[ \t]*@@(\w+)@@[ \t]*$", re.MULTILINE)
+_PLACEHOLDER_RE = re.compile(r"^(@@\w+@@) = ", re.MULTILINE)
+_UNIT_RE = re.compile(r"^\s*(class|module|interface|package)\b.*?^\s*end\1\b", re.MULTILINE | re.DOTALL)
+_NAME_PATTERNS = [
+    re.compile(r"named:?\s*`?(\w+)(?:\.sv)?`?"),
+    re.compile(r"[Cc]lass name:\s*`?(\w+)`?"),
+    re.compile(r"\b(\w+)\.sv\b"),
+]
+_BASE_CLASSES = [
+    ("vseq", "uvm_sequence"),
+    ("seq", "uvm_sequence"),
+    ("test", "uvm_test"),
+    ("scoreboard", "uvm_scoreboard"),
+    ("sequencer", "uvm_sequencer"),
+    ("seqr", "uvm_sequencer"),
+    ("env", "uvm_env"),
+]
+
+
+def _example_size(text: str) -> int:
+    """Length of the largest complete SV unit (the few-shot example) in text."""
+    return max((len(m.group(0)) for m in _UNIT_RE.finditer(text)), default=0)
+
+
+def synthesize_systemverilog(prompt: str, target_chars: int) -> str:
+    """Deterministic SV skeleton for the artifact a prompt asks for, about target_chars long."""
+    name = next((m.group(1) for p in _NAME_PATTERNS for m in [p.search(prompt)] if m), None)
+    name = name or f"synthetic_{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]}"
+    lowered = name.lower()
+
+    if lowered.endswith("_pkg") or "package file" in prompt:
+        head, tail = [f"package {name};", "  import uvm_pkg::*;", '  `include "uvm_macros.svh"'], "endpackage"
+        filler = '  `include "{name}_part_{i}.sv"'
+    elif lowered.endswith("_if") or "interface file" in prompt:
+        head, tail = [f"interface {name} (input logic clk, input logic resetn);"], "endinterface"
+        filler = "  logic [31:0] sig_{i};"
+    elif lowered.endswith(("_tb", "_top")) or "testbench module" in prompt:
+        head, tail = [f"module {name};", "  import uvm_pkg::*;", '  `include "uvm_macros.svh"'], "endmodule"
+        filler = "  logic [31:0] sig_{i};"
+    else:
+        base = next((b for suffix, b in _BASE_CLASSES if lowered.endswith(suffix)), "uvm_object")
+        component = base in ("uvm_test", "uvm_env", "uvm_scoreboard", "uvm_sequencer")
+        head = [
+            f"class {name} extends {base};",
+            f"  `{'uvm_component_utils' if component else 'uvm_object_utils'}({name})",
+            "",
+            "  task run_phase(uvm_phase phase);" if component else "  task body();",
+        ]
+        tail = "  endtask\n\nendclass"
+        filler = '    `uvm_info(get_type_name(), $sformatf("{name} step %0d", {i}), UVM_MEDIUM)'
+
+    lines = [f"// Synthetic output for {name}"] + head
+    # Template requests (--cluster) use every placeholder they list
+    lines += [f"  // {placeholder}" for placeholder in _PLACEHOLDER_RE.findall(prompt)]
+    size = sum(len(line) + 1 for line in lines) + len(tail)
+    i = 0
+    while size < target_chars:
+        line = filler.format(name=name, i=i)
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    lines.append(tail)
+    return "\n".join(lines) + "\n"
@@ -23,10 +23,11 @@ For a new IP:
 
 import os
 import sys
+import json
 import argparse
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
 # Add parent directory to path for imports
@@ -39,7 +40,29 @@ from utils.parser import (
     load_uvc_mapping, 
     load_settings
 )
-from utils.llm_client import LLMClient, LLMError
+from utils.llm_client import LLMClient, LLMError, create_client
+from utils.hedging import HedgePolicy
+from utils.failover import ProviderChain
+from utils.transport import create_transport
+from utils.llm_cache import ResponseCache
+from utils.batch import BatchJob, BatchPending, create_batch_provider, make_custom_id
+from utils.telemetry import RunLedger, call_tags, tagged, default_ledger_path
+from utils.manifest import OutputManifest, input_hash
+from utils.token_budget import PromptAssembler, PromptSection
+from utils.vseq_template import VseqTemplate, TemplateNotApplicable, VSEQ_TEMPLATE_VERSION, parse_plan, is_plan
+from utils.test_writer import render_test, TEST_TEMPLATE_VERSION
+from utils.package_writer import render_package, PACKAGE_TEMPLATE_VERSION
+from utils.vseqr_writer import render_virtual_sequencer, VSEQR_TEMPLATE_VERSION
+from utils.env_writer import render_env, scoreboard_imports, ENV_TEMPLATE_VERSION
+from utils.scoreboard_writer import (
+    render_scoreboard_skeleton,
+    scoreboard_holes,
+    scoreboard_imps,
+    parse_fills,
+    check_fills,
+    splice_holes,
+    SCOREBOARD_TEMPLATE_VERSION
+)
 from utils.file_utils import (
     FileManager, 
     collect_uvc_info, 
@@ -47,13 +70,19 @@ from utils.file_utils import (
     derive_names_from_block
 )
 from prompts.ip_infra_prompts import (
-    get_env_prompt, 
-    get_virtual_sequencer_prompt,
     get_interface_prompt,
-    get_package_prompt,
-    get_scoreboard_prompt
+    get_scoreboard_prompt,
+    get_scoreboard_holes_prompt,
+    get_infra_context
 )
-from prompts.test_case_prompts import get_test_prompt, get_vseq_prompt
+from prompts.test_case_prompts import get_test_prompt, get_vseq_prompt, get_vseq_plan_prompt, get_test_case_context
+from prompts import PROMPT_TEMPLATE_VERSION
+
+# Response budget of a stimulus plan request (a plan is a few hundred tokens)
+PLAN_MAX_TOKENS = 2048
+
+# Response budget of a scoreboard holes request (the skeleton is not repeated)
+HOLES_MAX_TOKENS = 4096
 
 
 # Configure logging
@@ -92,7 +121,23 @@ class UVMGenerator:
                  provider: str = None,
                  model: Optional[str] = None,
                  config_dir: Optional[str] = None,
-                 uvc_mapping_path: Optional[str] = None):
+                 uvc_mapping_path: Optional[str] = None,
+                 use_cache: bool = True,
+                 refresh_cache: bool = False,
+                 cache_dir: Optional[str] = None,
+                 batch: bool = False,
+                 batch_provider: Optional[str] = None,
+                 batch_wait: bool = True,
+                 stream: bool = False,
+                 hedge: bool = False,
+                 failover: bool = False,
+                 transport: Optional[str] = None,
+                 fixtures_dir: Optional[str] = None,
+                 latency: Optional[float] = None,
+                 latency_scale: Optional[float] = None,
+                 ledger_file: Optional[str] = None,
+                 force: bool = False,
+                 templates: bool = True):
         
         self.logger = logging.getLogger(self.__class__.__name__)
         
@@ -125,12 +170,112 @@ class UVMGenerator:
         llm_settings = self.settings.get('llm', {})
         provider = provider or llm_settings.get('provider', 'anthropic')
         model = model or llm_settings.get('model')
-        self.llm = LLMClient(provider=provider, api_key=api_key, model=model)
+        
+        # Live API, fixture record/replay or synthetic responses (settings.yaml 'transport' section)
+        transport_settings = self.settings.get('transport', {})
+        self.transport_mode = transport or transport_settings.get('mode', 'live')
+        self.transport = create_transport(
+            self.transport_mode,
+            fixtures_dir=fixtures_dir or transport_settings.get('fixtures_dir', '.llm_fixtures'),
+            latency=latency if latency is not None else transport_settings.get('latency'),
+            latency_scale=latency_scale if latency_scale is not None else transport_settings.get('latency_scale', 1.0)
+        )
+        
+        # Persistent response cache (settings.yaml 'cache' section). Live runs
+        # only: recording must see every request and replayed/synthetic
+        # responses must never be served to a later live run.
+        cache_settings = self.settings.get('cache', {})
+        self.cache = None
+        if use_cache and cache_settings.get('enabled', True) and self.transport_mode == 'live':
+            self.cache = ResponseCache(
+                cache_dir or os.getenv('UVM_GEN_CACHE_DIR') or cache_settings.get('dir', '.llm_cache'),
+                max_size_mb=cache_settings.get('max_size_mb', 512),
+                max_age_days=cache_settings.get('max_age_days', 30),
+                refresh=refresh_cache
+            )
+        
+        # Hedged duplicates for slow requests (settings.yaml 'llm.hedging' section)
+        hedge_settings = llm_settings.get('hedging') or {}
+        hedging = None
+        if hedge or hedge_settings.get('enabled', False):
+            secondary = hedge_settings.get('secondary')
+            hedging = HedgePolicy(
+                percentile=hedge_settings.get('percentile', 95),
+                min_samples=hedge_settings.get('min_samples', 5),
+                min_delay=hedge_settings.get('min_delay', 5.0),
+                secondary=create_client(secondary['provider'], model=secondary.get('model'),
+                                        transport=self.transport) if secondary else None
+            )
+        
+        # Provider chain with circuit breakers (settings.yaml 'llm.failover' section)
+        failover_settings = llm_settings.get('failover') or {}
+        provider_chain = None
+        if failover or failover_settings.get('enabled', False):
+            fallbacks = [create_client(entry['provider'], model=entry.get('model'), transport=self.transport)
+                         for entry in failover_settings.get('chain') or []]
+            if fallbacks:
+                provider_chain = ProviderChain(
+                    fallbacks,
+                    failure_threshold=failover_settings.get('failure_threshold', 3),
+                    latency_threshold=failover_settings.get('latency_threshold'),
+                    cooldown=failover_settings.get('cooldown', 60.0)
+                )
+            else:
+                self.logger.warning("Failover enabled but llm.failover.chain is empty - using the primary only")
+        
+        # Per-call telemetry ledger (settings.yaml 'telemetry' section)
+        telemetry_settings = self.settings.get('telemetry', {})
+        self.ledger = None
+        if telemetry_settings.get('enabled', True):
+            self.ledger = RunLedger(ledger_file or telemetry_settings.get('ledger')
+                                    or default_ledger_path(output_dir))
+        
+        # Streaming mode writes partial output under <output>/.partial as tokens arrive
+        self.llm = LLMClient(
+            provider=provider, api_key=api_key, model=model, cache=self.cache,
+            stream=stream or llm_settings.get('stream', False),
+            stream_dir=str(Path(output_dir) / ".partial"),
+            stream_preamble_lines=llm_settings.get('stream_preamble_lines', 1),
+            rate_limit=llm_settings.get('rate_limit'),
+            hedging=hedging,
+            failover=provider_chain,
+            transport=self.transport,
+            ledger=self.ledger
+        )
+        
+        # Send static material as a shared, provider-cacheable prefix
+        self.prompt_caching = llm_settings.get('prompt_caching', True)
+        
+        # Pre-flight token budgeting (settings.yaml 'prompt_budget' section)
+        budget_settings = self.settings.get('prompt_budget', {})
+        self.assembler = PromptAssembler(
+            model=self.llm.model,
+            max_output_tokens=llm_settings.get('max_tokens', 8192),
+            context_window_tokens=budget_settings.get('context_window'),
+            safety_margin=budget_settings.get('safety_margin', 1024),
+            section_budgets=budget_settings.get('sections')
+        )
+        
+        # Batch mode: Phase B through the provider batch API (settings.yaml 'batch' section)
+        batch_settings = self.settings.get('batch', {})
+        self.batch = batch
+        self.batch_provider = batch_provider or batch_settings.get('provider') or provider
+        self.batch_poll_interval = batch_settings.get('poll_interval', 60)
+        self.batch_wait = batch_wait
+        if batch and self.batch_provider not in ('local', provider):
+            raise ValueError(f"Batch provider '{self.batch_provider}' does not match LLM provider '{provider}'")
         
         # Initialize file manager
         self.file_manager = FileManager(output_dir)
         self.file_manager.setup_directories()
         
+        # Input hashes of earlier outputs: files with unchanged inputs are
+        # reused instead of regenerated (settings.yaml 'output.manifest')
+        output_settings = self.settings.get('output', {})
+        self.manifest = None
+        if output_settings.get('manifest', True):
+            self.manifest = OutputManifest(output_dir, force=force)
+        
         # Load examples for few-shot learning
         if example_dir and Path(example_dir).exists():
             self.examples = collect_example_files(example_dir)
@@ -163,6 +308,27 @@ class UVMGenerator:
         self.reset = self.block_parser.get_reset()
         self.model_config = self.block_parser.get_model()
         
+        # Deterministic vseq rendering for test cases of the standard shape
+        # (settings.yaml 'templates', uvc_mapping.yaml 'vseq_template')
+        template_settings = self.settings.get('templates', {})
+        self.vseq_template = None
+        if templates and template_settings.get('vseq', True) and self.uvc_mapping.get('vseq_template'):
+            self.vseq_template = VseqTemplate(
+                self.uvc_mapping, self.transformer, self.vseqr_class_name,
+                self.block_parser.get_interfaces(), self.clock.get('name', 'clk')
+            )
+        # Test cases the template cannot express ask the LLM for a stimulus plan
+        # the template renders, instead of the whole vseq
+        self.vseq_plan = self.vseq_template is not None and template_settings.get('vseq_plan', True)
+        self._example_plan: Optional[str] = None
+        
+        # Scoreboard skeleton rendered from the UVC mapping, the LLM fills its holes
+        self.scoreboard_template = templates and template_settings.get('scoreboard', True)
+        
+        # Deterministic test classes for test cases without Test_Overrides
+        self.test_template = templates and template_settings.get('test', True)
+        self.test_template_stats = {'rendered': 0, 'fallback': 0}
+        
         # Track generated files for package
         self.vseq_files: List[str] = []
         self.test_files: List[str] = []
@@ -177,6 +343,7 @@ class UVMGenerator:
         self.logger.info(f"  Interface: {self.interface_name}")
         self.logger.info(f"  Package: {self.package_name}")
     
+    @tagged(phase="A")
     def run_phase_a(self, skip_existing: bool = False) -> tuple:
         """
         Phase A: Generate IP Infrastructure
@@ -191,46 +358,42 @@ class UVMGenerator:
         
         interfaces = self.block_parser.get_interfaces()
         
-        # A.1: Generate Environment
+        # A.1: Render Environment (no LLM call: wiring fixed by the UVC mapping)
         print("\n[A.1] Generating Environment...")
-        try:
-            env_content = self._generate_env(interfaces)
-            env_path = self.file_manager.write_file(
-                f"ip_infra/env/{self.env_class_name}.sv",
-                env_content,
-                skip_if_exists=skip_existing
-            )
-            self.generated_env_content = env_content
-            print(f"  [OK] Created: {env_path.name}")
-        except LLMError as e:
-            print(f"  [FAIL] Failed to generate environment: {e}")
-            raise
+        code = self._render_env(interfaces)
+        env_path, env_content, reused = self._write_artifact(
+            f"ip_infra/env/{self.env_class_name}.sv",
+            input_hash(ENV_TEMPLATE_VERSION, code),
+            lambda: code,
+            skip_existing=skip_existing,
+            add_header=False  # No timestamp: byte-stable across runs
+        )
+        self.generated_env_content = env_content
+        print(f"  [OK] {'Up to date' if reused else 'Created'}: {env_path.name}")
         
-        # A.2: Generate Virtual Sequencer
+        # A.2: Render Virtual Sequencer (no LLM call: fixed by the UVC mapping)
         print("\n[A.2] Generating Virtual Sequencer...")
-        try:
-            vseqr_content = self._generate_virtual_sequencer(interfaces)
-            vseqr_path = self.file_manager.write_file(
-                f"ip_infra/virtual_sequencer/{self.vseqr_class_name}.sv",
-                vseqr_content,
-                skip_if_exists=skip_existing
-            )
-            self.generated_vseqr_content = vseqr_content
-            print(f"  [OK] Created: {vseqr_path.name}")
-        except LLMError as e:
-            print(f"  [FAIL] Failed to generate virtual sequencer: {e}")
-            raise
+        code = self._render_virtual_sequencer(interfaces)
+        vseqr_path, vseqr_content, reused = self._write_artifact(
+            f"ip_infra/virtual_sequencer/{self.vseqr_class_name}.sv",
+            input_hash(VSEQR_TEMPLATE_VERSION, code),
+            lambda: code,
+            skip_existing=skip_existing,
+            add_header=False  # Phase B prompts embed it: no timestamp, so it stays byte-stable
+        )
+        self.generated_vseqr_content = vseqr_content
+        print(f"  [OK] {'Up to date' if reused else 'Created'}: {vseqr_path.name}")
         
         # A.3: Generate Interface
         print("\n[A.3] Generating Interface...")
         try:
-            interface_content = self._generate_interface(interfaces)
-            interface_path = self.file_manager.write_file(
+            interface_path, _, reused = self._write_artifact(
                 f"ip_infra/interface/{self.interface_name}.sv",
-                interface_content,
-                skip_if_exists=skip_existing
+                self._inputs(('interface',), interfaces),
+                lambda: self._generate_interface(interfaces),
+                skip_existing=skip_existing
             )
-            print(f"  [OK] Created: {interface_path.name}")
+            print(f"  [OK] {'Up to date' if reused else 'Created'}: {interface_path.name}")
         except LLMError as e:
             print(f"  [FAIL] Failed to generate interface: {e}")
             raise
@@ -238,21 +401,27 @@ class UVMGenerator:
         # A.4: Generate Scoreboard (NEW in V2)
         print("\n[A.4] Generating Scoreboard...")
         try:
-            scoreboard_content = self._generate_scoreboard(interfaces)
-            scoreboard_path = self.file_manager.write_file(
+            scoreboard_inputs = self._inputs(('scoreboard',), interfaces)
+            if self.scoreboard_template:
+                scoreboard_inputs = input_hash(scoreboard_inputs, SCOREBOARD_TEMPLATE_VERSION,
+                                               self._render_scoreboard_skeleton(interfaces))
+            scoreboard_path, _, reused = self._write_artifact(
                 f"ip_infra/scoreboard/{self.scoreboard_class_name}.sv",
-                scoreboard_content,
-                skip_if_exists=skip_existing
+                scoreboard_inputs,
+                lambda: self._generate_scoreboard(interfaces),
+                skip_existing=skip_existing
             )
-            print(f"  [OK] Created: {scoreboard_path.name}")
+            print(f"  [OK] {'Up to date' if reused else 'Created'}: {scoreboard_path.name}")
         except LLMError as e:
             print(f"  [FAIL] Failed to generate scoreboard: {e}")
             # Scoreboard is optional - continue
             self.logger.warning(f"Scoreboard generation failed: {e}")
         
+        self._save_manifest()
         print("\n[OK] Phase A complete!")
         return env_content, vseqr_content
     
+    @tagged(phase="B")
     def run_phase_b(self, env_content: str = None, vseqr_content: str = None, 
                     test_ids: Optional[List[str]] = None):
         """
@@ -282,6 +451,14 @@ class UVMGenerator:
         total = len(test_cases)
         print(f"\nGenerating {total} test case(s)...")
         
+        if self.batch:
+            try:
+                self._run_phase_b_batch(test_cases, vseqr_content)
+            finally:
+                self._save_manifest()
+            print(f"\n[OK] Phase B complete! Generated {len(self.test_files)} test case(s)")
+            return
+        
         for i, tc in enumerate(test_cases, 1):
             tc_id = tc.get('TC_ID', tc.get('tc_id', f'unknown_{i}'))
             print(f"\n[{i}/{total}] Generating: {tc_id}")
@@ -289,30 +466,45 @@ class UVMGenerator:
             try:
                 # Extract config from test case
                 tc_config = self.vplan_parser.extract_config(tc)
-                
+            
                 # Get active UVCs
                 active_uvcs = tc_config.get('active_uvcs', [])
-                
-                # B.1: Generate test file
+                tc_inputs = self._test_case_inputs(tc, vseqr_content)
+            
+                # B.1: Generate test file (template unless the vplan has overrides, else LLM)
                 print(f"  Generating _test.sv...")
-                test_content = self._generate_test(tc_config, env_content)
-                test_path = self.file_manager.write_file(
-                    f"tests/tests/{tc_id}_test.sv",
-                    test_content
-                )
+                templated_test = self._template_test(tc_config)
+                if templated_test:
+                    code, test_inputs = templated_test
+                    test_path, _, reused = self._write_artifact(
+                        f"tests/tests/{tc_id}_test.sv", test_inputs, lambda: code, add_header=False
+                    )
+                else:
+                    test_path, _, reused = self._write_artifact(
+                        f"tests/tests/{tc_id}_test.sv",
+                        tc_inputs,
+                        lambda: self._generate_test(tc_config, env_content, vseqr_content)
+                    )
                 self.test_files.append(f"{tc_id}_test.sv")
-                print(f"  [OK] {tc_id}_test.sv")
-                
-                # B.2: Generate vseq file
+                print(f"  [OK] {tc_id}_test.sv{' (template)' if templated_test else ''}{' (up to date)' if reused else ''}")
+            
+                # B.2: Generate vseq file (template when it applies, else LLM)
                 print(f"  Generating _vseq.sv...")
-                vseq_content = self._generate_vseq(tc_config, active_uvcs, vseqr_content)
-                vseq_path = self.file_manager.write_file(
-                    f"tests/virtual_sequences/{tc_id}_vseq.sv",
-                    vseq_content
-                )
+                templated = self._template_vseq(tc_config)
+                if templated:
+                    code, vseq_inputs = templated
+                    vseq_path, _, reused = self._write_artifact(
+                        f"tests/virtual_sequences/{tc_id}_vseq.sv", vseq_inputs, lambda: code
+                    )
+                else:
+                    vseq_path, _, reused = self._write_artifact(
+                        f"tests/virtual_sequences/{tc_id}_vseq.sv",
+                        self._vseq_inputs(tc_inputs),
+                        lambda: self._generate_vseq(tc_config, active_uvcs, vseqr_content)
+                    )
                 self.vseq_files.append(f"{tc_id}_vseq.sv")
-                print(f"  [OK] {tc_id}_vseq.sv")
-                
+                print(f"  [OK] {tc_id}_vseq.sv{' (template)' if templated else ''}{' (up to date)' if reused else ''}")
+            
             except LLMError as e:
                 print(f"  [FAIL] Error generating {tc_id}: {e}")
                 self.logger.error(f"Failed to generate test case {tc_id}: {e}")
@@ -321,130 +513,516 @@ class UVMGenerator:
                 print(f"  [FAIL] Unexpected error for {tc_id}: {e}")
                 self.logger.exception(f"Unexpected error for {tc_id}")
                 continue
-        
+    
+        self._save_manifest()
         print(f"\n[OK] Phase B complete! Generated {len(self.test_files)} test case(s)")
     
+    def _run_phase_b_batch(self, test_cases: List[Dict], vseqr_content: str):
+        """
+        Generate all test cases through the provider batch API
+        
+        Test and vseq prompts are independent, so every Phase B prompt goes
+        into a single batch. Cached responses are written directly; anything
+        the batch fails to answer is generated with a live call. Files the
+        manifest has up to date are not requested at all. Batch state lives
+        in <output>/.batch so an interrupted run resumes the same batch.
+        Vseqs and tests the templates render are written directly.
+        """
+        work_dir = self.file_manager.output_base / ".batch"
+        job = BatchJob(
+            create_batch_provider(self.batch_provider, self.llm.client, work_dir),
+            work_dir,
+            poll_interval=self.batch_poll_interval,
+            wait=self.batch_wait
+        )
+        # (tc_id, kind, relative path, prompt, context, cache key, custom_id, cached code, input hash, tc_config)
+        # in vplan order
+        items = []
+        requests = {}
+        for i, tc in enumerate(test_cases, 1):
+            tc_id = tc.get('TC_ID', tc.get('tc_id', f'unknown_{i}'))
+            tc_config = self.vplan_parser.extract_config(tc)
+            active_uvcs = tc_config.get('active_uvcs', [])
+            tc_inputs = self._test_case_inputs(tc, vseqr_content)
+            
+            for kind, rel_path, build_request in (
+                ('test', f"tests/tests/{tc_id}_test.sv", lambda: self._test_request(tc_config, vseqr_content)),
+                ('vseq', f"tests/virtual_sequences/{tc_id}_vseq.sv",
+                 lambda: self._vseq_request(tc_config, active_uvcs, vseqr_content)),
+            ):
+                templated = self._template_vseq(tc_config) if kind == 'vseq' else self._template_test(tc_config)
+                if templated:
+                    code, template_inputs = templated
+                    _, _, reused = self._write_artifact(rel_path, template_inputs, lambda: code,
+                                                        add_header=kind == 'vseq')
+                    (self.test_files if kind == 'test' else self.vseq_files).append(Path(rel_path).name)
+                    print(f"  [OK] {Path(rel_path).name} (template{', up to date' if reused else ''})")
+                    continue
+                inputs = self._vseq_inputs(tc_inputs) if kind == 'vseq' else tc_inputs
+                if self.manifest and self.manifest.is_current(rel_path, inputs):
+                    self.file_manager.reuse_file(rel_path)
+                    (self.test_files if kind == 'test' else self.vseq_files).append(Path(rel_path).name)
+                    print(f"  [OK] {Path(rel_path).name} (up to date)")
+                    continue
+                planned = kind == 'vseq' and self.vseq_plan
+                if planned:
+                    prompt, context = self._vseq_plan_request(tc_config, active_uvcs, vseqr_content)
+                else:
+                    prompt, context = build_request()
+                max_tokens = PLAN_MAX_TOKENS if planned else 8192
+                params, cache_key = self.llm.prepare_request(prompt, max_tokens=max_tokens, context=context)
+                custom_id = make_custom_id(f"{tc_id}_{kind}")
+                with call_tags(test_id=tc_id):
+                    code = self.llm.cached_code(cache_key, Path(rel_path).name)
+                items.append((tc_id, kind, rel_path, prompt, context, cache_key, custom_id, code, inputs, tc_config))
+                if code is None:
+                    requests[custom_id] = params
+        
+        results = {}
+        if requests:
+            print(f"  {len(items) - len(requests)} cached, {len(requests)} batched")
+            results = job.run("phase_b", requests)
+        
+        for tc_id, kind, rel_path, prompt, context, cache_key, custom_id, code, inputs, tc_config in items:
+            planned = kind == 'vseq' and self.vseq_plan
+            try:
+                if code is None:
+                    result = results.get(custom_id)
+                    if result and result.response:
+                        with call_tags(test_id=tc_id):
+                            self.llm.record_call(Path(rel_path).name, result.response, batch=True)
+                        code = self.llm.accept_response(cache_key, result.response)
+                    else:
+                        error = result.error if result else "missing from batch output"
+                        print(f"  [WARN] {tc_id} {kind}: {error} - generating directly")
+                        with call_tags(test_id=tc_id):
+                            code = self.llm.generate_with_retry(
+                                prompt, max_tokens=PLAN_MAX_TOKENS if planned else 8192,
+                                validate=not planned, context=context, label=Path(rel_path).name,
+                                accept=is_plan if planned else None
+                            )
+                if planned:
+                    # The response is a stimulus plan; without a usable one the vseq is written by the LLM
+                    with call_tags(test_id=tc_id):
+                        code = (self._render_vseq_plan(tc_config, code)
+                                or self._generate_sv_vseq(tc_config, tc_config.get('active_uvcs', []), vseqr_content))
+            except LLMError as e:
+                print(f"  [FAIL] Error generating {tc_id} {kind}: {e}")
+                self.logger.error(f"Failed to generate {kind} for {tc_id}: {e}")
+                continue
+            
+            self.file_manager.write_file(rel_path, code)
+            if self.manifest:
+                self.manifest.record(rel_path, inputs)
+            if kind == 'test':
+                self.test_files.append(f"{tc_id}_test.sv")
+            else:
+                self.vseq_files.append(f"{tc_id}_vseq.sv")
+            print(f"  [OK] {Path(rel_path).name}")
+    
+    @tagged(phase="C")
     def run_phase_c(self):
         """
         Phase C: Generate Package & Integration
-        - Package file
+        - Package file (rendered locally, no LLM call)
         """
         print("\n" + "=" * 60)
         print("PHASE C: Generating Package & Integration")
         print("=" * 60)
         
         print("\n[C.1] Generating Package File...")
-        try:
-            package_content = self._generate_package()
-            package_path = self.file_manager.write_file(
-                f"ip_infra/pkg/{self.package_name}.sv",
-                package_content
-            )
-            print(f"  [OK] Created: {package_path.name}")
-        except LLMError as e:
-            print(f"  [FAIL] Failed to generate package: {e}")
-            raise
+        code = self._render_package()
+        package_path, _, reused = self._write_artifact(
+            f"ip_infra/pkg/{self.package_name}.sv",
+            input_hash(PACKAGE_TEMPLATE_VERSION, code),
+            lambda: code,
+            add_header=False  # No timestamp: the package is byte-stable across runs
+        )
+        print(f"  [OK] {'Up to date' if reused else 'Created'}: {package_path.name}")
         
+        self._save_manifest()
         print("\n[OK] Phase C complete!")
     
     # =========================================================================
     # Private generation methods
     # =========================================================================
     
-    def _generate_env(self, interfaces: List[Dict]) -> str:
-        """Generate environment using LLM"""
-        prompt = get_env_prompt(
-            block_yaml=self.block_yaml_content,
-            interfaces=interfaces,
-            uvc_info=self.uvc_info_str,
-            example_env=self.examples.get('env', ''),
-            env_class_name=self.env_class_name,
+    def _inputs(self, example_keys: Tuple[str, ...], *parts) -> str:
+        """Manifest input hash: shared inputs, the given examples and artifact-specific parts"""
+        return input_hash(
+            PROMPT_TEMPLATE_VERSION, self.llm.provider, self.llm.model,
+            self.block_yaml_content, self.uvc_mapping, self.uvc_info_str, self.names,
+            [self.examples.get(key, '') for key in example_keys], *parts
+        )
+    
+    def _test_case_inputs(self, tc: Dict, vseqr_content: str) -> str:
+        """Input hash of a test case's test and vseq: its vplan entry and the generated vseqr"""
+        return self._inputs(('test', 'vseq'), tc, vseqr_content)
+    
+    def _template_vseq(self, tc_config: dict) -> Optional[Tuple[str, str]]:
+        """Template-rendered vseq and its input hash, or None when the LLM has to generate it"""
+        if not self.vseq_template:
+            return None
+        try:
+            code = self.vseq_template.render(tc_config)
+        except TemplateNotApplicable as e:
+            self.logger.info(f"{tc_config.get('tc_id')}: vseq template not applicable ({e}) - using LLM")
+            return None
+        # The rendered code depends on nothing else, so it is its own input hash
+        return code, input_hash(VSEQ_TEMPLATE_VERSION, code)
+    
+    def _template_test(self, tc_config: dict) -> Optional[Tuple[str, str]]:
+        """Template-rendered test and its input hash, or None when the LLM has to generate it"""
+        if not self.test_template:
+            return None
+        if tc_config.get('test_overrides'):
+            self.test_template_stats['fallback'] += 1
+            self.logger.info(f"{tc_config.get('tc_id')}: test has Test_Overrides - using LLM")
+            return None
+        self.test_template_stats['rendered'] += 1
+        code = render_test(
+            tc_id=tc_config.get('tc_id', 'unknown'),
+            env_class=self.env_class_name,
+            dut_if_name=self.interface_name,
+            vif_key=self.names['vif_key'],
+            reset_signal=self.reset.get('name', 'resetn'),
+            reset_active_low=self.reset.get('active_low', True)
+        )
+        # No timestamp header, so the code is byte-stable and its own input hash
+        return code, input_hash(TEST_TEMPLATE_VERSION, code)
+    
+    def _write_artifact(self, relative_path: str, inputs: str, generate: Callable[[], str],
+                        skip_existing: bool = False, add_header: bool = True) -> Tuple[Path, str, bool]:
+        """
+        Generate and write a file, or keep it when the manifest has it up to date
+        
+        Returns:
+            (path, generated code, reused)
+        """
+        if self.manifest and self.manifest.is_current(relative_path, inputs):
+            content = self.file_manager.reuse_file(relative_path)
+            return self.file_manager.output_base / relative_path, content, True
+        content = generate()
+        path = self.file_manager.write_file(relative_path, content, add_header=add_header,
+                                            skip_if_exists=skip_existing)
+        if self.manifest and path not in self.file_manager.skipped_files:
+            self.manifest.record(relative_path, inputs)
+        return path, content, False
+    
+    def _save_manifest(self):
+        if self.manifest:
+            self.manifest.save()
+    
+    def _infra_context(self, sections: Dict[str, str]) -> Optional[str]:
+        """Shared Phase A/C context (None when prompt caching is disabled)"""
+        if not self.prompt_caching:
+            return None
+        return get_infra_context(sections['block_yaml'], sections['uvc_info'])
+    
+    def _infra_sections(self, example_key: str) -> List[PromptSection]:
+        """Budgeted inputs of a Phase A/C prompt"""
+        return [
+            self.assembler.section('example', self.examples.get(example_key, ''), 'example', kind='sv'),
+            self.assembler.section('uvc_info', self.uvc_info_str, 'uvc_info'),
+            self.assembler.section('block_yaml', self.block_yaml_content, 'block_yaml'),
+        ]
+    
+    def _test_case_context(self, sections: Dict[str, str]) -> Optional[str]:
+        """Shared Phase B context (None when prompt caching is disabled)"""
+        if not self.prompt_caching:
+            return None
+        return get_test_case_context(
+            example_test=sections['example_test'],
+            example_vseq=sections['example_vseq'],
+            generated_vseqr=sections['vseqr'],
+            model_config=self.model_config
+        )
+    
+    def _test_case_sections(self, vseqr_content: str) -> List[PromptSection]:
+        """Budgeted inputs of a Phase B prompt"""
+        return [
+            self.assembler.section('example_test', self.examples.get('test', ''), 'example', kind='sv'),
+            self.assembler.section('example_vseq', self.examples.get('vseq', ''), 'example', kind='sv'),
+            self.assembler.section('vseqr', vseqr_content, 'infra_context', kind='sv'),
+        ]
+    
+    def _render_env(self, interfaces: List[Dict]) -> str:
+        """Render the environment from the UVC mapping (the scoreboard is always generated in V2)"""
+        return render_env(
+            class_name=self.env_class_name,
             vseqr_class_name=self.vseqr_class_name,
-            uvc_mapping=self.uvc_mapping
+            interfaces=interfaces,
+            uvc_mapping=self.uvc_mapping,
+            scoreboard_class_name=self.scoreboard_class_name
         )
-        return self.llm.generate_with_retry(prompt)
     
-    def _generate_virtual_sequencer(self, interfaces: List[Dict]) -> str:
-        """Generate virtual sequencer using LLM"""
-        prompt = get_virtual_sequencer_prompt(
-            block_yaml=self.block_yaml_content,
+    def _render_virtual_sequencer(self, interfaces: List[Dict]) -> str:
+        """Render the virtual sequencer from the UVC mapping and the DUT interface"""
+        return render_virtual_sequencer(
+            class_name=self.vseqr_class_name,
+            interface_name=self.interface_name,
+            vif_key=self.names['vif_key'],
             interfaces=interfaces,
-            example_vseqr=self.examples.get('vseqr', ''),
-            vseqr_class_name=self.vseqr_class_name,
-            dut_if_name=self.interface_name,
             uvc_mapping=self.uvc_mapping
         )
-        return self.llm.generate_with_retry(prompt)
     
     def _generate_interface(self, interfaces: List[Dict]) -> str:
         """Generate interface using LLM"""
-        prompt = get_interface_prompt(
-            block_yaml=self.block_yaml_content,
-            interfaces=interfaces,
-            example_interface=self.examples.get('interface', ''),
-            interface_name=self.interface_name,
-            clock_name=self.clock.get('name', 'clk'),
-            reset_name=self.reset.get('name', 'resetn')
-        )
-        return self.llm.generate_with_retry(prompt)
+        def build(sections):
+            prompt = get_interface_prompt(
+                block_yaml=sections['block_yaml'],
+                interfaces=interfaces,
+                example_interface=sections['example'],
+                interface_name=self.interface_name,
+                clock_name=self.clock.get('name', 'clk'),
+                reset_name=self.reset.get('name', 'resetn'),
+                shared_context=self.prompt_caching
+            )
+            return prompt, self._infra_context(sections)
+        
+        prompt, context = self.assembler.fit(build, self._infra_sections('interface'))
+        return self.llm.generate_with_retry(prompt, context=context, label=f"{self.interface_name}.sv")
     
     def _generate_scoreboard(self, interfaces: List[Dict]) -> str:
-        """Generate scoreboard using LLM (NEW in V2)"""
-        prompt = get_scoreboard_prompt(
-            block_yaml=self.block_yaml_content,
-            interfaces=interfaces,
-            example_scoreboard=self.examples.get('scoreboard', ''),
-            scoreboard_class_name=self.scoreboard_class_name,
-            env_class_name=self.env_class_name
-        )
-        return self.llm.generate_with_retry(prompt)
+        """Generate scoreboard using LLM (NEW in V2), filling the holes of the skeleton when enabled"""
+        if self.scoreboard_template:
+            code = self._filled_scoreboard(interfaces)
+            if code:
+                return code
+        
+        def build(sections):
+            prompt = get_scoreboard_prompt(
+                block_yaml=sections['block_yaml'],
+                interfaces=interfaces,
+                example_scoreboard=sections['example'],
+                scoreboard_class_name=self.scoreboard_class_name,
+                env_class_name=self.env_class_name,
+                shared_context=self.prompt_caching,
+                imp_ports=[f"{imp} (from {port})" for port, imp in scoreboard_imports(interfaces, self.uvc_mapping)]
+            )
+            return prompt, self._infra_context(sections)
+        
+        prompt, context = self.assembler.fit(build, self._infra_sections('scoreboard'))
+        return self.llm.generate_with_retry(prompt, context=context, label=f"{self.scoreboard_class_name}.sv")
+    
+    def _render_scoreboard_skeleton(self, interfaces: List[Dict]) -> str:
+        """Render the scoreboard skeleton from the UVC mapping"""
+        return render_scoreboard_skeleton(self.scoreboard_class_name, interfaces, self.uvc_mapping)
+    
+    def _filled_scoreboard(self, interfaces: List[Dict]) -> Optional[str]:
+        """Scoreboard skeleton with its holes filled by the LLM, or None when the fills are unusable"""
+        label = f"{self.scoreboard_class_name}.sv"
+        skeleton = self._render_scoreboard_skeleton(interfaces)
+        
+        def build(sections):
+            prompt = get_scoreboard_holes_prompt(
+                block_yaml=sections['block_yaml'],
+                skeleton=skeleton,
+                holes=scoreboard_holes(scoreboard_imps(interfaces, self.uvc_mapping)),
+                example_scoreboard=sections['example'],
+                scoreboard_class_name=self.scoreboard_class_name,
+                shared_context=self.prompt_caching
+            )
+            return prompt, self._infra_context(sections)
+        
+        prompt, context = self.assembler.fit(build, self._infra_sections('scoreboard'))
+        response = self.llm.generate_with_retry(prompt, max_tokens=HOLES_MAX_TOKENS, validate=False,
+                                                context=context, label=label,
+                                                accept=lambda content: bool(parse_fills(content)))
+        fills = parse_fills(response)
+        problems = check_fills(skeleton, fills, self.scoreboard_class_name)
+        code = splice_holes(skeleton, fills)
+        problems = problems or self.llm.client.validate_systemverilog(code)
+        if problems:
+            print(f"  [WARN] Scoreboard holes rejected ({'; '.join(problems[:3])}) - generating the whole file")
+            if self.ledger:
+                self.ledger.record_validation(label, problems)
+            return None
+        return code
     
-    def _generate_test(self, tc_config: dict, env_content: str) -> str:
+    def _generate_test(self, tc_config: dict, env_content: str, vseqr_content: str = "") -> str:
         """Generate test file using LLM"""
-        prompt = get_test_prompt(
-            tc_config=tc_config,
-            example_test=self.examples.get('test', ''),
-            env_class=self.env_class_name,
-            vseqr_class=self.vseqr_class_name,
-            dut_if_name=self.interface_name,
-            reset_signal=self.reset.get('name', 'resetn')
-        )
-        return self.llm.generate_with_retry(prompt)
+        prompt, context = self._test_request(tc_config, vseqr_content)
+        with call_tags(test_id=tc_config.get('tc_id')):
+            return self.llm.generate_with_retry(
+                prompt, context=context,
+                label=f"{tc_config.get('tc_id', 'unknown')}_test.sv"
+            )
+    
+    def _test_request(self, tc_config: dict, vseqr_content: str) -> Tuple[str, Optional[str]]:
+        """Build the budgeted test file (prompt, context)"""
+        def build(sections):
+            prompt = get_test_prompt(
+                tc_config=tc_config,
+                example_test=sections['example_test'],
+                env_class=self.env_class_name,
+                vseqr_class=self.vseqr_class_name,
+                dut_if_name=self.interface_name,
+                reset_signal=self.reset.get('name', 'resetn'),
+                shared_context=self.prompt_caching
+            )
+            return prompt, self._test_case_context(sections)
+        
+        return self.assembler.fit(build, self._test_case_sections(vseqr_content))
     
     def _generate_vseq(self, tc_config: dict, active_uvcs: list, vseqr_content: str) -> str:
-        """Generate virtual sequence using LLM"""
-        prompt = get_vseq_prompt(
-            tc_config=tc_config,
-            active_uvcs=active_uvcs,
-            example_vseq=self.examples.get('vseq', ''),
-            vseqr_class=self.vseqr_class_name,
-            uvc_mapping=self.uvc_mapping,
-            generated_vseqr=vseqr_content,
-            model_config=self.model_config
-        )
-        return self.llm.generate_with_retry(prompt)
+        """Generate virtual sequence using LLM (from a stimulus plan when enabled)"""
+        if self.vseq_plan:
+            code = self._planned_vseq(tc_config, active_uvcs, vseqr_content)
+            if code:
+                return code
+        return self._generate_sv_vseq(tc_config, active_uvcs, vseqr_content)
+    
+    def _generate_sv_vseq(self, tc_config: dict, active_uvcs: list, vseqr_content: str) -> str:
+        """Generate the virtual sequence SystemVerilog using LLM"""
+        prompt, context = self._vseq_request(tc_config, active_uvcs, vseqr_content)
+        with call_tags(test_id=tc_config.get('tc_id')):
+            return self.llm.generate_with_retry(
+                prompt, context=context,
+                label=f"{tc_config.get('tc_id', 'unknown')}_vseq.sv"
+            )
     
-    def _generate_package(self) -> str:
-        """Generate package file using LLM"""
-        uvc_packages = self.uvc_mapping.get('packages', [])
+    def _vseq_request(self, tc_config: dict, active_uvcs: list, vseqr_content: str) -> Tuple[str, Optional[str]]:
+        """Build the budgeted virtual sequence (prompt, context)"""
+        def build(sections):
+            prompt = get_vseq_prompt(
+                tc_config=tc_config,
+                active_uvcs=active_uvcs,
+                example_vseq=sections['example_vseq'],
+                vseqr_class=self.vseqr_class_name,
+                uvc_mapping=self.uvc_mapping,
+                generated_vseqr=sections['vseqr'],
+                model_config=self.model_config,
+                shared_context=self.prompt_caching
+            )
+            return prompt, self._test_case_context(sections)
         
-        prompt = get_package_prompt(
-            block_yaml=self.block_yaml_content,
-            example_package=self.examples.get('package', ''),
+        return self.assembler.fit(build, self._test_case_sections(vseqr_content))
+    
+    def _vseq_inputs(self, tc_inputs: str) -> str:
+        """Input hash of an LLM vseq: a stimulus plan prompt differs from the SystemVerilog one"""
+        return input_hash(tc_inputs, 'plan', VSEQ_TEMPLATE_VERSION) if self.vseq_plan else tc_inputs
+    
+    def _planned_vseq(self, tc_config: dict, active_uvcs: list, vseqr_content: str) -> Optional[str]:
+        """Vseq rendered from an LLM stimulus plan, or None when the plan is unusable"""
+        tc_id = tc_config.get('tc_id', 'unknown')
+        prompt, context = self._vseq_plan_request(tc_config, active_uvcs, vseqr_content)
+        with call_tags(test_id=tc_id):
+            response = self.llm.generate_with_retry(
+                prompt, max_tokens=PLAN_MAX_TOKENS, validate=False,
+                context=context, label=f"{tc_id}_vseq.sv", accept=is_plan
+            )
+            return self._render_vseq_plan(tc_config, response)
+    
+    def _render_vseq_plan(self, tc_config: dict, response: str) -> Optional[str]:
+        """Validate an LLM stimulus plan and render it, or None (with a warning) when rejected"""
+        tc_id = tc_config.get('tc_id', 'unknown')
+        plan = parse_plan(response)
+        if plan is None:
+            problems = ["the response has no JSON plan"]
+        else:
+            # The vplan fixes the register values; the LLM plans ordering and sizes
+            expected = self.vseq_template.regbank_values(tc_config)
+            plan = self.vseq_template.fill_regbank(plan, expected)
+            problems = self.vseq_template.validate_plan(plan, tc_config.get('active_uvcs', []), expected)
+        if problems:
+            self.vseq_template.stats['plan_rejected'] += 1
+            print(f"  [WARN] {tc_id}: stimulus plan rejected ({'; '.join(problems[:3])}) - generating SystemVerilog")
+            if self.ledger:
+                self.ledger.record_validation(f"{tc_id}_vseq.sv", problems)
+            return None
+        self.vseq_template.stats['planned'] += 1
+        return self.vseq_template.render_plan(tc_id, plan)
+    
+    def _vseq_plan_request(self, tc_config: dict, active_uvcs: list, vseqr_content: str) -> Tuple[str, Optional[str]]:
+        """Build the budgeted stimulus plan (prompt, context)"""
+        try:
+            self.vseq_template.plan(tc_config)
+            reason = ""
+        except TemplateNotApplicable as e:
+            reason = str(e)
+        
+        def build(sections):
+            prompt = get_vseq_plan_prompt(
+                tc_config=tc_config,
+                active_uvcs=active_uvcs,
+                uvc_mapping=self.uvc_mapping,
+                example_plan=self._example_vseq_plan(),
+                reason=reason,
+                model_config=self.model_config,
+                shared_context=self.prompt_caching,
+                register_values=self.vseq_template.regbank_values(tc_config)
+            )
+            return prompt, self._test_case_context(sections)
+        
+        return self.assembler.fit(build, self._test_case_sections(vseqr_content))
+    
+    def _example_vseq_plan(self) -> str:
+        """
+        The template's plan of the first test case it applies to, shown in plan prompts
+        
+        Its regbank variables are left out: they are filled in from each test
+        case's own regbank_program.
+        """
+        if self._example_plan is None:
+            self._example_plan = ""
+            for tc in self.vplan_parser.get_test_cases():
+                tc_config = self.vplan_parser.extract_config(tc)
+                try:
+                    plan = self.vseq_template.plan(tc_config)
+                except TemplateNotApplicable:
+                    continue
+                fixed = self.vseq_template.regbank_values(tc_config)
+                plan['variables'] = {name: value for name, value in plan['variables'].items() if name not in fixed}
+                self._example_plan = json.dumps(plan, indent=2)
+                break
+        return self._example_plan
+    
+    def _render_package(self) -> str:
+        """Render the package from the UVC packages and the generated file lists"""
+        return render_package(
             package_name=self.package_name,
-            vseq_includes=self.vseq_files,
-            test_includes=self.test_files,
-            env_file=f"{self.env_class_name}.sv",
-            vseqr_file=f"{self.vseqr_class_name}.sv",
-            scoreboard_file=f"{self.scoreboard_class_name}.sv",
-            interface_file=f"{self.interface_name}.sv",
-            uvc_packages=uvc_packages
+            block_name=self.block_name,
+            uvc_packages=self.uvc_mapping.get('packages', []),
+            infra_files=[
+                f"{self.vseqr_class_name}.sv",
+                f"{self.scoreboard_class_name}.sv",
+                f"{self.env_class_name}.sv",
+            ],
+            vseq_files=self.vseq_files,
+            test_files=self.test_files
         )
-        return self.llm.generate_with_retry(prompt)
     
     def print_summary(self):
         """Print generation summary"""
         print(self.file_manager.generate_summary())
+        if self.cache:
+            print(self.cache.stats_line())
+        print(self.llm.prompt_cache_summary())
+        print(self.assembler.summary())
+        print(self.llm.limiter.summary())
+        if self.llm.stream:
+            print(self.llm.stream_summary())
+        if self.llm.hedging:
+            print(self.llm.hedging.summary())
+        if self.llm.failover:
+            print(self.llm.failover.summary())
+        if self.manifest:
+            print(self.manifest.summary())
+        if self.vseq_template:
+            print(self.vseq_template.summary())
+        if self.test_template:
+            stats = self.test_template_stats
+            print(f"Test templates: {stats['rendered']}/{stats['rendered'] + stats['fallback']} rendered, "
+                  f"{stats['fallback']} via LLM (Test_Overrides)")
+        if self.transport:
+            print(f"Transport: {self.transport.describe()}")
+        if self.ledger:
+            breakdown = self.ledger.phase_summary()
+            if breakdown:
+                print(breakdown)
+            if self.ledger.path:
+                print(f"Run ledger: {self.ledger.path}")
     
     def run_all(self, skip_existing: bool = False, test_ids: List[str] = None):
         """Run complete pipeline"""
@@ -502,6 +1080,50 @@ Examples:
                         help='Specific test case IDs to generate')
     parser.add_argument('--skip-existing', action='store_true',
                         help='Skip files that already exist')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerate every file, even those the output manifest has up to date')
+    parser.add_argument('--no-templates', action='store_true',
+                        help='Generate every vseq, test and the whole scoreboard with the LLM '
+                             'instead of the deterministic templates')
+    
+    # Streaming
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream responses, stopping at the end of the code (default from settings.yaml)')
+    
+    # Hedging
+    parser.add_argument('--hedge', action='store_true',
+                        help='Duplicate requests slower than the latency percentile (default from settings.yaml)')
+    
+    # Failover
+    parser.add_argument('--failover', action='store_true',
+                        help='Route around a failing provider via llm.failover.chain (default from settings.yaml)')
+    
+    # Transport (record/replay/synthetic for offline benchmarking)
+    parser.add_argument('--transport', default=None, choices=['live', 'record', 'replay', 'synthetic'],
+                        help='LLM transport (default from settings.yaml): live API, record fixtures, '
+                             'replay fixtures offline, or synthetic SV skeletons')
+    parser.add_argument('--fixtures', default=None,
+                        help='Fixture store for --transport record/replay (default from settings.yaml)')
+    parser.add_argument('--latency', type=float, default=None,
+                        help='Fixed per-request latency in seconds for replay/synthetic (default: recorded/modelled)')
+    parser.add_argument('--latency-scale', type=float, default=None,
+                        help='Multiplier on replay/synthetic latency (0 = no delay)')
+    
+    # LLM response cache
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the persistent LLM response cache')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore cached LLM responses (fresh responses are still cached)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='LLM response cache directory (default from settings.yaml)')
+    
+    # Batch mode
+    parser.add_argument('--batch', action='store_true',
+                        help='Generate Phase B through the provider batch API (resumable)')
+    parser.add_argument('--batch-provider', default=None, choices=['anthropic', 'openai', 'local'],
+                        help='Batch back-end (default: LLM provider; "local" reads results from <output>/.batch/local)')
+    parser.add_argument('--batch-no-wait', action='store_true',
+                        help='Submit or check the batch once and exit; rerun to collect results')
     
     # Logging
     parser.add_argument('--log-level', default='INFO',
@@ -509,6 +1131,8 @@ Examples:
                         help='Logging level')
     parser.add_argument('--log-file', default=None,
                         help='Log file path')
+    parser.add_argument('--ledger', default=None,
+                        help='JSONL run ledger of LLM calls (default: <output>/.telemetry/run_<timestamp>.jsonl)')
     
     args = parser.parse_args()
     
@@ -524,9 +1148,9 @@ Examples:
         print(f"Error: Vplan YAML not found: {args.vplan}")
         sys.exit(1)
     
-    # Get API key
+    # Get API key (not needed when replaying fixtures or synthesizing responses)
     api_key = args.api_key or os.getenv('ANTHROPIC_API_KEY') or os.getenv('OPENAI_API_KEY')
-    if not api_key:
+    if not api_key and args.transport not in ('replay', 'synthetic'):
         print("Error: API key required. Set --api-key or ANTHROPIC_API_KEY/OPENAI_API_KEY env var")
         sys.exit(1)
     
@@ -554,7 +1178,23 @@ Examples:
             provider=args.provider,
             model=args.model,
             config_dir=args.config_dir,
-            uvc_mapping_path=args.uvc_mapping
+            uvc_mapping_path=args.uvc_mapping,
+            use_cache=not args.no_cache,
+            refresh_cache=args.refresh,
+            cache_dir=args.cache_dir,
+            batch=args.batch,
+            batch_provider=args.batch_provider,
+            batch_wait=not args.batch_no_wait,
+            stream=args.stream,
+            hedge=args.hedge,
+            failover=args.failover,
+            transport=args.transport,
+            fixtures_dir=args.fixtures,
+            latency=args.latency,
+            latency_scale=args.latency_scale,
+            ledger_file=args.ledger,
+            force=args.force,
+            templates=not args.no_templates
         )
         
         env_content = ""
@@ -578,6 +1218,9 @@ Examples:
         
         print("\n==> Generation complete!")
         
+    except BatchPending as e:
+        print(f"\n{e}")
+        print("Rerun the same command with --batch to collect the results.")
     except Exception as e:
         print(f"\n[ERROR] {e}")
         logger.exception("Generation failed")
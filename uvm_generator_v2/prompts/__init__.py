@@ -5,25 +5,36 @@ All prompts are now dynamic and derived from input YAML files,
 not hardcoded to a specific IP.
 """
 
+# Bump when a prompt template changes in a way that should regenerate
+# existing outputs (part of every file's input hash in the output manifest)
+PROMPT_TEMPLATE_VERSION = 1
+
 from .ip_infra_prompts import (
     get_env_prompt,
     get_virtual_sequencer_prompt,
     get_interface_prompt,
     get_package_prompt,
-    get_scoreboard_prompt
+    get_scoreboard_prompt,
+    get_scoreboard_holes_prompt,
+    get_infra_context
 )
 
 from .test_case_prompts import (
     get_test_prompt,
-    get_vseq_prompt
+    get_vseq_prompt,
+    get_test_case_context
 )
 
 __all__ = [
+    'PROMPT_TEMPLATE_VERSION',
     'get_env_prompt',
     'get_virtual_sequencer_prompt',
     'get_interface_prompt',
     'get_package_prompt',
     'get_scoreboard_prompt',
+    'get_scoreboard_holes_prompt',
     'get_test_prompt',
-    'get_vseq_prompt'
+    'get_vseq_prompt',
+    'get_infra_context',
+    'get_test_case_context'
 ]
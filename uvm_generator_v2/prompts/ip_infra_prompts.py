@@ -8,7 +8,7 @@ Key Improvements:
 - Supports arbitrary IP blocks
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 
 def format_interfaces_for_prompt(interfaces: List[Dict], uvc_mapping: Dict = None) -> str:
@@ -78,6 +78,38 @@ def format_sequencer_declarations(interfaces: List[Dict], uvc_mapping: Dict = No
     return '\n'.join(lines)
 
 
+def get_infra_context(block_yaml: str, uvc_info: str = "") -> str:
+    """
+    Build the shared static context for Phase A/C prompts
+    
+    Identical for every infrastructure call, so it is sent ahead of the
+    per-file prompt where providers can cache it.
+    """
+    context = f"""## Block Description (from YAML):
+```
+{block_yaml}
+```
+"""
+    if uvc_info:
+        context += f"""
+## Available UVC Information:
+```systemverilog
+{uvc_info}
+```
+"""
+    return context
+
+
+def format_block_section(block_yaml: str, shared_context: bool = False) -> str:
+    """Block description section, or a pointer to it when sent as shared context"""
+    if shared_context:
+        return "## Block Description:\nSee the Block YAML in the shared context above."
+    return f"""## Block Description:
+```
+{block_yaml}
+```"""
+
+
 def get_env_prompt(
     block_yaml: str,
     interfaces: List[Dict],
@@ -85,26 +117,33 @@ def get_env_prompt(
     example_env: str,
     env_class_name: str,
     vseqr_class_name: str,
-    uvc_mapping: Dict = None
+    uvc_mapping: Dict = None,
+    shared_context: bool = False
 ) -> str:
     """Generate prompt for environment file - DYNAMIC version"""
     
     interface_list = format_interfaces_for_prompt(interfaces, uvc_mapping)
     
-    return f"""You are a UVM verification expert. Generate a complete SystemVerilog UVM environment class.
-
-## Block Description (from YAML):
+    if shared_context:
+        # Block YAML and UVC info are sent once in the shared context
+        context_str = "## Block Description and Available UVC Information:\nSee the shared context above.\n"
+    else:
+        context_str = f"""## Block Description (from YAML):
 ```
 {block_yaml}
 ```
 
-## Interfaces to instantiate:
-{interface_list}
-
 ## Available UVC Information:
 ```systemverilog
 {uvc_info}
 ```
+"""
+    
+    return f"""You are a UVM verification expert. Generate a complete SystemVerilog UVM environment class.
+
+{context_str}
+## Interfaces to instantiate:
+{interface_list}
 
 ## Example Environment (follow this structure and style):
 ```systemverilog
@@ -149,7 +188,8 @@ def get_virtual_sequencer_prompt(
     example_vseqr: str,
     vseqr_class_name: str,
     dut_if_name: str,
-    uvc_mapping: Dict = None
+    uvc_mapping: Dict = None,
+    shared_context: bool = False
 ) -> str:
     """Generate prompt for virtual sequencer file - DYNAMIC version"""
     
@@ -157,11 +197,7 @@ def get_virtual_sequencer_prompt(
     
     return f"""You are a UVM verification expert. Generate a complete SystemVerilog UVM virtual sequencer class.
 
-## Block Description:
-```
-{block_yaml}
-```
-
+{format_block_section(block_yaml, shared_context)}
 ## Sequencer pointers to declare (derived from Block YAML interfaces):
 ```systemverilog
 {sequencer_declarations}
@@ -202,7 +238,8 @@ def get_interface_prompt(
     interface_name: str,
     clock_name: str,
     reset_name: str,
-    additional_signals: List[str] = None
+    additional_signals: List[str] = None,
+    shared_context: bool = False
 ) -> str:
     """Generate prompt for interface file - DYNAMIC version"""
     
@@ -225,11 +262,7 @@ def get_interface_prompt(
     
     return f"""You are a UVM verification expert. Generate a complete SystemVerilog interface for the DUT.
 
-## Block Description:
-```
-{block_yaml}
-```
-
+{format_block_section(block_yaml, shared_context)}
 ## Example Interface (follow this structure and style):
 ```systemverilog
 {example_interface}
@@ -276,7 +309,9 @@ def get_scoreboard_prompt(
     interfaces: List[Dict],
     example_scoreboard: str,
     scoreboard_class_name: str,
-    env_class_name: str
+    env_class_name: str,
+    shared_context: bool = False,
+    imp_ports: Optional[List[str]] = None
 ) -> str:
     """Generate prompt for scoreboard file - NEW in V2"""
     
@@ -293,13 +328,18 @@ def get_scoreboard_prompt(
         elif 'istream' in kind or 'input' in name.lower() or 'mem' in kind:
             input_ifaces.append(name)
     
+    if imp_ports:
+        # The rendered environment connects these, so the names must match
+        imp_section = ("Declare exactly these uvm_analysis_imp ports (the environment `" + env_class_name
+                       + "` creates the scoreboard as `scoreboard` and connects them; use "
+                       + "`uvm_analysis_imp_decl when there is more than one):\n"
+                       + '\n'.join(f"   - {port}" for port in imp_ports))
+    else:
+        imp_section = "Declare uvm_analysis_imp for receiving transactions"
+    
     return f"""You are a UVM verification expert. Generate a complete SystemVerilog UVM scoreboard class.
 
-## Block Description:
-```
-{block_yaml}
-```
-
+{format_block_section(block_yaml, shared_context)}
 ## Input interfaces (for reference data):
 {chr(10).join(f'  - {i}' for i in input_ifaces) if input_ifaces else '  - None identified'}
 
@@ -316,7 +356,7 @@ def get_scoreboard_prompt(
 2. Extend `uvm_scoreboard`
 3. Use `uvm_component_utils({scoreboard_class_name})` macro
 
-4. **Analysis imports**: Declare uvm_analysis_imp for receiving transactions
+4. **Analysis imports**: {imp_section}
 
 5. **Expected data storage**: 
    - Queue or associative array for expected/golden data
@@ -337,6 +377,50 @@ Generate the complete scoreboard file:
 """
 
 
+def get_scoreboard_holes_prompt(
+    block_yaml: str,
+    skeleton: str,
+    holes: List[Tuple[str, str]],
+    example_scoreboard: str,
+    scoreboard_class_name: str,
+    shared_context: bool = False
+) -> str:
+    """Generate prompt for the holes of a rendered scoreboard skeleton"""
+    
+    hole_list = '\n'.join(f"- {name}: {description}" for name, description in holes)
+    example_section = ""
+    if example_scoreboard:
+        example_section = f"""
+## Example Scoreboard (follow its checking style):
+```systemverilog
+{example_scoreboard}
+```
+"""
+    
+    return f"""You are a UVM verification expert. Complete a SystemVerilog UVM scoreboard.
+
+{format_block_section(block_yaml, shared_context)}{example_section}
+## Scoreboard skeleton (rendered; do NOT repeat it):
+```systemverilog
+{skeleton}```
+
+## Holes to fill:
+{hole_list}
+
+## Requirements:
+1. Write only the code of each hole; the class `{scoreboard_class_name}`, its imps,
+   new() and the function headers are already in the skeleton
+2. Start each fill with its marker line, e.g. `// @hole members`, and give every hole
+   (an empty fill is allowed)
+3. Fills of function bodies are statements only - no function/task/class keywords
+4. Members and helpers must not declare classes or factory macros
+5. Expected data comes from the C model output file; count matches and mismatches
+6. Output ONLY the marker lines and their SystemVerilog - no explanations, no markdown
+
+Fill the holes:
+"""
+
+
 def get_package_prompt(
     block_yaml: str,
     example_package: str,
@@ -347,7 +431,8 @@ def get_package_prompt(
     vseqr_file: str,
     scoreboard_file: str,
     interface_file: str,
-    uvc_packages: List[str] = None
+    uvc_packages: List[str] = None,
+    shared_context: bool = False
 ) -> str:
     """Generate prompt for package file - DYNAMIC version"""
     
@@ -362,11 +447,7 @@ def get_package_prompt(
     
     return f"""You are a UVM verification expert. Generate a complete SystemVerilog UVM package file.
 
-## Block Description:
-```
-{block_yaml}
-```
-
+{format_block_section(block_yaml, shared_context)}
 ## Example Package (follow this structure):
 ```systemverilog
 {example_package}
@@ -8,6 +8,7 @@ Key Improvements:
 - Sequencer names derived from generated virtual sequencer
 """
 
+import json
 from typing import Dict, List, Optional, Any
 
 
@@ -96,13 +97,50 @@ Executable: {executable}
 """
 
 
+def get_test_case_context(
+    example_test: str,
+    example_vseq: str,
+    generated_vseqr: str = "",
+    model_config: Dict = None
+) -> str:
+    """
+    Build the shared static context for Phase B prompts
+    
+    Examples, the generated virtual sequencer and C model info are the same
+    for every test case, so they are sent once ahead of the per-test prompt
+    where providers can cache them.
+    """
+    sections = [f"""## Example Test (follow this structure EXACTLY):
+```systemverilog
+{example_test}
+```"""]
+    
+    sections.append(f"""## Example Virtual Sequence (follow this structure and CODING STYLE):
+```systemverilog
+{example_vseq}
+```""")
+    
+    if generated_vseqr:
+        sections.append(f"""## Generated Virtual Sequencer (USE THESE EXACT sequencer names):
+```systemverilog
+{generated_vseqr}
+```
+
+IMPORTANT: Access sequencers via p_sequencer.<sequencer_name>""")
+    
+    sections.append(format_c_model_info(model_config).strip())
+    
+    return '\n\n'.join(sections) + '\n'
+
+
 def get_test_prompt(
     tc_config: Dict,
     example_test: str,
     env_class: str,
     vseqr_class: str,
     dut_if_name: str,
-    reset_signal: str = "resetn"
+    reset_signal: str = "resetn",
+    shared_context: bool = False
 ) -> str:
     """Generate prompt for test file - DYNAMIC version"""
     
@@ -112,6 +150,21 @@ def get_test_prompt(
     # Format parameters for display
     param_lines = '\n'.join([f"  - {k}: {v}" for k, v in parameters.items()])
     
+    # Custom phase behaviour from the vplan (Test_Overrides) replaces the steps above
+    overrides = tc_config.get('test_overrides', {})
+    overrides_str = ''
+    if overrides:
+        override_lines = '\n'.join(f"   - {phase}: {behaviour}" for phase, behaviour in overrides.items())
+        overrides_str = f"\n**Phase overrides (take precedence over the steps above)**:\n{override_lines}\n"
+    
+    if shared_context:
+        example_str = "## Example Test:\nFollow the Example Test in the shared context above EXACTLY."
+    else:
+        example_str = f"""## Example Test (follow this structure EXACTLY):
+```systemverilog
+{example_test}
+```"""
+    
     return f"""You are a UVM verification expert. Generate a complete UVM test class.
 
 ## Test Case Configuration:
@@ -119,10 +172,7 @@ def get_test_prompt(
 - Parameters:
 {param_lines if param_lines else '  (none specified)'}
 
-## Example Test (follow this structure EXACTLY):
-```systemverilog
-{example_test}
-```
+{example_str}
 
 ## Requirements:
 1. Class name: `{tc_id}_test`
@@ -151,7 +201,7 @@ def get_test_prompt(
    - drop_objection(this)
 
 8. **connect_phase()**: Call super.connect_phase(phase)
-
+{overrides_str}
 9. Output ONLY valid SystemVerilog code - no explanations, no markdown
 
 Generate the complete test file:
@@ -165,7 +215,8 @@ def get_vseq_prompt(
     vseqr_class: str,
     uvc_mapping: Dict,
     generated_vseqr: str = "",
-    model_config: Dict = None
+    model_config: Dict = None,
+    shared_context: bool = False
 ) -> str:
     """Generate prompt for virtual sequence file - DYNAMIC version"""
     
@@ -175,8 +226,8 @@ def get_vseq_prompt(
     # Format active UVCs with their info
     active_uvcs_str = format_active_uvcs_for_prompt(active_uvcs, uvc_mapping)
     
-    # Format C model info
-    c_model_info = format_c_model_info(model_config)
+    # Format C model info (sent once in the shared context when enabled)
+    c_model_info = "" if shared_context else format_c_model_info(model_config)
     
     # Format parameters
     param_assignments = []
@@ -197,7 +248,7 @@ def get_vseq_prompt(
     
     # Virtual sequencer info
     vseqr_info = ""
-    if generated_vseqr:
+    if generated_vseqr and not shared_context:
         vseqr_info = f"""
 ## Generated Virtual Sequencer (USE THESE EXACT sequencer names):
 ```systemverilog
@@ -235,6 +286,16 @@ IMPORTANT: Access sequencers via p_sequencer.<sequencer_name>
     
     seq_decl_str = '\n'.join(seq_declarations) if seq_declarations else '  // Declare sequences for active UVCs'
     seq_start_str = '\n'.join(seq_start_examples) if seq_start_examples else '  // Start sequences on appropriate sequencers'
+    
+    if shared_context:
+        example_str = ("## Example Virtual Sequence:\n"
+                       "Follow the Example Virtual Sequence in the shared context above (structure and CODING STYLE).\n"
+                       "Use the exact sequencer names from the Generated Virtual Sequencer shown there.")
+    else:
+        example_str = f"""## Example Virtual Sequence (follow this structure and CODING STYLE):
+```systemverilog
+{example_vseq}
+```"""
 
     return f"""You are a UVM verification expert. Generate a complete UVM virtual sequence.
 
@@ -258,10 +319,7 @@ IMPORTANT: Access sequencers via p_sequencer.<sequencer_name>
 {seq_start_str}
 ```
 
-## Example Virtual Sequence (follow this structure and CODING STYLE):
-```systemverilog
-{example_vseq}
-```
+{example_str}
 
 ## CRITICAL Requirements - Follow these EXACTLY:
 
@@ -310,3 +368,107 @@ IMPORTANT: Access sequencers via p_sequencer.<sequencer_name>
 
 Generate the complete virtual sequence file:
 """
+
+
+def format_plan_uvcs(active_uvcs: List[str], uvc_mapping: Dict) -> str:
+    """Active UVCs with the sequences a stimulus plan can run and their defaults"""
+    uvc_map = uvc_mapping.get('uvc_mapping', {}) if uvc_mapping else {}
+    lines = []
+    for uvc_name in active_uvcs:
+        mapping = uvc_map.get(uvc_name, {})
+        defaults = []
+        if mapping.get('default_file'):
+            defaults.append(f"file {mapping['default_file']}")
+        if mapping.get('default_size'):
+            defaults.append(f"size {mapping['default_size']}")
+        lines.append(f"  - {uvc_name}" + (f" (default {', '.join(defaults)})" if defaults else ""))
+        for kind, seq_type in (mapping.get('sequences') or {}).items():
+            lines.append(f"      {kind}: {seq_type}")
+    return '\n'.join(lines)
+
+
+def format_register_fields(uvc_mapping: Dict) -> str:
+    """Control register fields of the 'vseq_template' section with their default values"""
+    register = (uvc_mapping.get('vseq_template') or {}).get('register') or {}
+    lines = []
+    for field in register.get('fields') or []:
+        default = f"variable {field['param']}" if field.get('param') else field.get('init', 0)
+        start = f", {field['start']} in start_compute" if 'start' in field and not field.get('param') else ""
+        lines.append(f"  - {field['name']} [{field['msb']}:{field['lsb']}]: default {default}{start}")
+    return '\n'.join(lines) if lines else "  (no register layout - do not use program_reg/start_compute)"
+
+
+def get_vseq_plan_prompt(
+    tc_config: Dict,
+    active_uvcs: List[str],
+    uvc_mapping: Dict,
+    example_plan: str = "",
+    reason: str = "",
+    model_config: Dict = None,
+    shared_context: bool = False,
+    register_values: Dict = None
+) -> str:
+    """
+    Generate prompt for a virtual sequence stimulus plan
+
+    The LLM answers with a small JSON plan instead of SystemVerilog; the vseq
+    is rendered from it by the vseq template. register_values are the
+    variables the vplan's regbank_program fixes; the template fills them in.
+    """
+    tc_id = tc_config.get('tc_id', 'unknown_vseq')
+    parameters = tc_config.get('parameters', {})
+    param_str = '\n'.join(f"    {key} = {value}" for key, value in parameters.items()) or '    (none)'
+    stimulus = tc_config.get('raw', {}).get('Stimulus_Generation', tc_config.get('raw', {}).get('stimulus_generation', []))
+    c_model_info = "" if shared_context else format_c_model_info(model_config)
+    fixed_str = ', '.join(f"{name}={value}" for name, value in (register_values or {}).items()) or '(none)'
+
+    example_str = ""
+    if example_plan:
+        example_str = f"""
+## Example Plan (a test case of the standard shape):
+```json
+{example_plan}
+```
+"""
+
+    return f"""You are a UVM verification expert. Plan the virtual sequence of a test case.
+
+Do NOT write SystemVerilog: respond with a JSON stimulus plan and the vseq
+`{tc_id}_vseq` is rendered from it.
+
+## Test Case Configuration:
+- TC_ID: {tc_id}
+- Parameters from vplan:
+{param_str}
+- Why the standard vseq shape does not apply: {reason or 'not given'}
+- Variables fixed by the regbank_program: {fixed_str}
+  (added to the plan when left out; a variable or register field with another value is rejected)
+
+## Stimulus_Generation from the vplan:
+```
+{json.dumps(stimulus, indent=2, default=str)}
+```
+
+## Active UVCs and their sequences (write/read steps may only use these):
+{format_plan_uvcs(active_uvcs, uvc_mapping)}
+{c_model_info}
+## Control register fields:
+{format_register_fields(uvc_mapping)}
+
+## Plan format:
+{{"variables": {{"<name>": <int>, ...}}, "steps": [<step>, ...]}}
+
+The steps run in order. Each step is an object with exactly one of these keys:
+- {{"run": {{"command": "<shell command with $sformatf fields such as %0d>", "args": ["<variable>", ...], "message": "<error>"}}}}: run a script or the C model
+- {{"set": {{"<interface signal>": <value>, ...}}}}: drive DUT interface signals, then wait one clock
+- {{"program_reg": {{"<field>": <value>, ...}}}}: write the control register (fields not given take their default)
+- {{"start_compute": {{"<field>": <value>, ...}}}}: write the register again with the start_compute values
+- {{"write": {{"uvc": "<UVC>", "file": "<input file>", "size": <entries>, "sequence": "<kind>"}}}}: run a write sequence
+- {{"wait": {{"signal": "<interface signal>", "value": <value>}}}}: wait until the signal has the value
+- {{"read": {{"uvc": "<UVC>", "size": <entries>, "sequence": "<kind>"}}}}: run a read sequence
+
+A <value> is an integer or the name of a plan variable. "file" and "size" default
+to the UVC defaults above, "sequence" to write/read. Commands must not contain quotes.
+{example_str}
+Output ONLY the JSON object - no explanations, no markdown
+"""
@@ -0,0 +1,318 @@
+"""
+Offline batch submission for UVM Generator - V2
+
+Phase B prompts are rendered up front into a JSONL request file, submitted
+through the provider batch API (Anthropic Message Batches or OpenAI Batch),
+polled, and returned as LLMResponse objects keyed on custom_id.
+
+A file-based LocalBatchProvider stands in for the provider API so batch
+mode can be exercised offline.
+"""
+
+import re
+import json
+import time
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Optional, Any, List, Callable
+
+from .llm_client import LLMError, LLMResponse, BaseLLMClient
+
+logger = logging.getLogger(__name__)
+
+
+class BatchError(LLMError):
+    """Batch failed, expired or was cancelled on the provider side"""
+    pass
+
+
+class BatchPending(Exception):
+    """Batch submitted (or still running) and waiting was disabled"""
+    pass
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one request in a batch"""
+    custom_id: str
+    response: Optional[LLMResponse] = None
+    error: Optional[str] = None
+
+
+def make_custom_id(name: str) -> str:
+    """Turn an artifact name into a provider-safe custom_id (<= 64 chars)"""
+    custom_id = re.sub(r'[^A-Za-z0-9_-]', '_', name)
+    if len(custom_id) > 64:
+        digest = hashlib.sha256(name.encode('utf-8')).hexdigest()[:12]
+        custom_id = f"{custom_id[:51]}_{digest}"
+    return custom_id
+
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    """Read a JSONL file, skipping blank lines"""
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+
+
+class BatchProvider:
+    """Base class for batch back-ends"""
+
+    name = "base"
+
+    def format_request(self, custom_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """One line of the JSONL request file"""
+        return {"custom_id": custom_id, "params": params}
+
+    def submit(self, requests_path: Path) -> str:
+        """Submit a JSONL request file and return the batch id"""
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> str:
+        """Return 'in_progress', 'completed' or 'failed'"""
+        raise NotImplementedError
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Fetch results of a completed batch, keyed on custom_id"""
+        raise NotImplementedError
+
+
+class AnthropicBatchProvider(BatchProvider):
+    """Anthropic Message Batches API"""
+
+    name = "anthropic"
+
+    def __init__(self, llm_client: BaseLLMClient):
+        self.llm_client = llm_client
+        self.batches = llm_client.client.messages.batches
+
+    def submit(self, requests_path: Path) -> str:
+        batch = self.batches.create(requests=_read_jsonl(requests_path))
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        batch = self.batches.retrieve(batch_id)
+        if batch.processing_status == "ended":
+            return "completed"
+        return "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        results = {}
+        for entry in self.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                response = self.llm_client.parse_response(entry.result.message)
+                results[entry.custom_id] = BatchResult(entry.custom_id, response=response)
+            else:
+                # errored / canceled / expired
+                error = getattr(entry.result, 'error', None)
+                results[entry.custom_id] = BatchResult(entry.custom_id, error=str(error or entry.result.type))
+        return results
+
+
+class OpenAIBatchProvider(BatchProvider):
+    """OpenAI Batch API (/v1/chat/completions, 24h completion window)"""
+
+    name = "openai"
+    FAILED_STATES = {"failed", "expired", "cancelled", "cancelling"}
+
+    def __init__(self, llm_client: BaseLLMClient):
+        self.llm_client = llm_client
+        self.client = llm_client.client
+
+    def format_request(self, custom_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": params}
+
+    def submit(self, requests_path: Path) -> str:
+        with open(requests_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return "completed"
+        if batch.status in self.FAILED_STATES:
+            return "failed"
+        return "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        from openai.types.chat import ChatCompletion
+
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                custom_id = record["custom_id"]
+                response = record.get("response") or {}
+                if record.get("error"):
+                    results[custom_id] = BatchResult(custom_id, error=str(record["error"]))
+                elif response.get("status_code", 200) != 200:
+                    results[custom_id] = BatchResult(custom_id, error=f"HTTP {response['status_code']}")
+                else:
+                    completion = ChatCompletion.model_validate(response["body"])
+                    results[custom_id] = BatchResult(custom_id, response=self.llm_client.parse_response(completion))
+        return results
+
+
+class LocalBatchProvider(BatchProvider):
+    """
+    File-based stand-in for a batch API
+
+    Each batch is a directory <root>/<batch_id>/ holding input.jsonl. The
+    batch completes once output.jsonl exists, with one line per request:
+        {"custom_id": "...", "content": "<code>"}  or
+        {"custom_id": "...", "error": "<message>"}
+    output.jsonl is written by `responder` at submit time when given,
+    otherwise by hand or an external tool.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Path, responder: Optional[Callable[[str, Dict[str, Any]], str]] = None):
+        self.root = Path(root)
+        self.responder = responder
+
+    def submit(self, requests_path: Path) -> str:
+        batch_id = f"local_{int(time.time() * 1000)}"
+        batch_dir = self.root / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(requests_path, batch_dir / "input.jsonl")
+
+        if self.responder:
+            lines = []
+            for request in _read_jsonl(batch_dir / "input.jsonl"):
+                content = self.responder(request["custom_id"], request["params"])
+                lines.append(json.dumps({"custom_id": request["custom_id"], "content": content}))
+            (batch_dir / "output.jsonl").write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        batch_dir = self.root / batch_id
+        if not batch_dir.exists():
+            return "failed"
+        return "completed" if (batch_dir / "output.jsonl").exists() else "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch_dir = self.root / batch_id
+        models = {r["custom_id"]: r["params"].get("model", "local") for r in _read_jsonl(batch_dir / "input.jsonl")}
+
+        results = {}
+        for record in _read_jsonl(batch_dir / "output.jsonl"):
+            custom_id = record["custom_id"]
+            if record.get("error"):
+                results[custom_id] = BatchResult(custom_id, error=record["error"])
+            else:
+                results[custom_id] = BatchResult(custom_id, response=LLMResponse(
+                    content=record.get("content", ""),
+                    model=models.get(custom_id, "local"),
+                    finish_reason=record.get("finish_reason", "stop")
+                ))
+        return results
+
+
+def create_batch_provider(name: str, llm_client: BaseLLMClient, work_dir: Path) -> BatchProvider:
+    """Create a batch provider by name ('anthropic', 'openai' or 'local')"""
+    if name == "local":
+        return LocalBatchProvider(Path(work_dir) / "local")
+    if name == "anthropic":
+        return AnthropicBatchProvider(llm_client)
+    if name == "openai":
+        return OpenAIBatchProvider(llm_client)
+    raise ValueError(f"Unknown batch provider: {name}. Use 'anthropic', 'openai' or 'local'.")
+
+
+class BatchJob:
+    """
+    Submit-or-resume driver for batch stages
+
+    Each stage is recorded in <work_dir>/state.json with its batch id and a
+    hash of the request parameters. Rerunning with identical requests
+    resumes the recorded batch instead of submitting a new one.
+    """
+
+    def __init__(self, provider: BatchProvider, work_dir: Path, poll_interval: float = 60.0, wait: bool = True):
+        self.provider = provider
+        self.work_dir = Path(work_dir)
+        self.poll_interval = poll_interval
+        self.wait = wait
+        self.state_path = self.work_dir / "state.json"
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+    def _load_state(self) -> Dict[str, Any]:
+        if self.state_path.exists():
+            try:
+                return json.loads(self.state_path.read_text(encoding='utf-8'))
+            except ValueError:
+                logger.warning(f"Ignoring unreadable batch state: {self.state_path}")
+        return {}
+
+    def _save_state(self, state: Dict[str, Any]):
+        tmp_path = self.state_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(state, indent=2), encoding='utf-8')
+        tmp_path.replace(self.state_path)
+
+    def run(self, stage: str, requests: Dict[str, Dict[str, Any]]) -> Dict[str, BatchResult]:
+        """
+        Run one stage to completion
+
+        Args:
+            stage: Stage name, used for the request file and state entry
+            requests: Provider request parameters keyed on custom_id
+
+        Returns:
+            Results keyed on custom_id
+
+        Raises:
+            BatchPending: Batch still running and wait is disabled
+            BatchError: Provider reported the batch as failed
+        """
+        request_hash = hashlib.sha256(
+            json.dumps(requests, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+
+        state = self._load_state()
+        entry = state.get(stage)
+        if entry and entry.get('request_hash') == request_hash and entry.get('provider') == self.provider.name:
+            batch_id = entry['batch_id']
+            print(f"  Resuming {stage} batch {batch_id}")
+        else:
+            requests_path = self.work_dir / f"{stage}_requests.jsonl"
+            with open(requests_path, 'w', encoding='utf-8') as f:
+                for custom_id, params in requests.items():
+                    f.write(json.dumps(self.provider.format_request(custom_id, params), ensure_ascii=False) + '\n')
+
+            batch_id = self.provider.submit(requests_path)
+            state[stage] = {
+                'batch_id': batch_id,
+                'provider': self.provider.name,
+                'request_hash': request_hash,
+                'requests': len(requests),
+                'submitted_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self._save_state(state)
+            print(f"  Submitted {stage} batch {batch_id} ({len(requests)} requests)")
+
+        while True:
+            status = self.provider.status(batch_id)
+            if status == "completed":
+                return self.provider.results(batch_id)
+            if status == "failed":
+                # Forget the batch so the next run resubmits
+                state.pop(stage, None)
+                self._save_state(state)
+                raise BatchError(f"{stage} batch {batch_id} failed on the provider side")
+            if not self.wait:
+                raise BatchPending(f"{stage} batch {batch_id} is in progress")
+            logger.info(f"{stage} batch {batch_id} in progress - next check in {self.poll_interval:.0f}s")
+            time.sleep(self.poll_interval)
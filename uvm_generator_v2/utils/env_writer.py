@@ -0,0 +1,168 @@
+"""
+Deterministic environment renderer for UVM Generator - V2
+
+The environment's build and connect phases follow directly from the
+uvc_mapping.yaml entries (env_type, vif_type, config_db_name,
+sequencer_name, plus the optional vif_paths and scoreboard_port), so it is
+rendered in the layout of the golden p18_dimc_tile_wrap_env.sv instead of
+being requested from the LLM. Only the scoreboard is left to the LLM; its
+prompt is given the analysis imps the environment connects.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from .vseqr_writer import sequencer_declarations
+
+# Bump when the rendered SystemVerilog changes (part of the manifest input hash)
+ENV_TEMPLATE_VERSION = 1
+
+# Components given the interface when the mapping has no vif_paths
+DEFAULT_VIF_PATHS = ['m_agent', 'm_agent.m_driver']
+
+
+def _instance_stem(name: str) -> str:
+    """Interface name without m_/_env (m_feature_buffer_env -> feature_buffer)"""
+    stem = name[2:] if name.startswith('m_') else name
+    return stem[:-4] if stem.endswith('_env') else stem
+
+
+def _typed(iface: Dict, base: str) -> str:
+    """Type name with the interface's parameter values (istream_env -> istream_env#(64))"""
+    params = iface.get('params', {})
+    if isinstance(params, dict) and params.get('values'):
+        return f"{base}#({','.join(str(v) for v in params['values'])})"
+    return base
+
+
+def uvc_entries(interfaces: List[Dict], uvc_mapping: Dict) -> List[Dict]:
+    """
+    Environment wiring per Block YAML interface
+
+    Taken from the interface's uvc_mapping entry; without one the types are
+    derived from the kind and the config_db key from the instance name.
+    """
+    uvc_map = uvc_mapping.get('uvc_mapping', {}) if uvc_mapping else {}
+    entries = []
+    for iface, (_, handle) in zip(interfaces, sequencer_declarations(interfaces, uvc_mapping)):
+        name = iface.get('name', 'unknown')
+        info = uvc_map.get(name, {})
+        kind = iface.get('kind', '').split('#')[0] or 'uvm_env'
+        stem = _instance_stem(name)
+        env_type = info.get('env_type') or _typed(iface, kind)
+        entries.append({
+            'name': name,
+            'env_type': env_type,
+            'vif_type': info.get('vif_type') or _typed(iface, kind.replace('_env', '_if')),
+            'vif': f"{stem}_vif",
+            'config_db_name': info.get('config_db_name') or f"{stem}_vif",
+            'sequencer_name': handle,
+            'sequencer_path': info.get('sequencer_path') or 'm_agent.m_sequencer',
+            'vif_paths': info.get('vif_paths') or DEFAULT_VIF_PATHS,
+            'scoreboard_port': info.get('scoreboard_port'),
+            'scoreboard_item': info.get('scoreboard_item') or env_type.replace('_env', '_seq_item', 1),
+        })
+    return entries
+
+
+def scoreboard_imports(interfaces: List[Dict], uvc_mapping: Dict) -> List[Tuple[str, str]]:
+    """
+    (monitor port, scoreboard imp) per interface with a scoreboard_port
+
+    The imp is the port name with an imp_ prefix
+    (m_agent.m_monitor.ostream_rd_port -> imp_ostream_rd_port)
+    """
+    return [(f"{entry['name']}.{entry['scoreboard_port']}",
+             f"imp_{entry['scoreboard_port'].rsplit('.', 1)[-1]}")
+            for entry in uvc_entries(interfaces, uvc_mapping) if entry['scoreboard_port']]
+
+
+def render_env(
+    class_name: str,
+    vseqr_class_name: str,
+    interfaces: List[Dict],
+    uvc_mapping: Dict,
+    scoreboard_class_name: Optional[str] = None
+) -> str:
+    """
+    Render the top-level environment
+
+    Args:
+        class_name: Environment class name
+        vseqr_class_name: Virtual sequencer class name (instance 'v_seqr')
+        interfaces: Block YAML interfaces (one sub-environment each)
+        uvc_mapping: Loaded uvc_mapping.yaml
+        scoreboard_class_name: Scoreboard class (instance 'scoreboard'), or None for none
+
+    Returns:
+        SystemVerilog environment source
+    """
+    entries = uvc_entries(interfaces, uvc_mapping)
+
+    members = []
+    for entry in entries:
+        members.append((entry['env_type'], entry['name']))
+        members.append((f"virtual {entry['vif_type']}", entry['vif']))
+    members.append((vseqr_class_name, 'v_seqr'))
+    if scoreboard_class_name:
+        members.append((scoreboard_class_name, 'scoreboard'))
+    width = max(len(member_type) for member_type, _ in members) + 2
+
+    lines = [
+        f"// {class_name} instantiating {', '.join(entry['name'] for entry in entries)},",
+        f"// {vseqr_class_name}{f' and {scoreboard_class_name}' if scoreboard_class_name else ''}",
+        "// Auto-generated by UVM Generator - do not edit manually",
+        f"class {class_name} extends uvm_env;",
+        "",
+        "  // Sub-environment instances and their virtual interfaces",
+    ]
+    lines.extend(f"  {member_type.ljust(width)}{member};" for member_type, member in members)
+    lines.extend([
+        "",
+        f"  `uvm_component_utils({class_name})",
+        "",
+        "  function new(string name, uvm_component parent);",
+        "    super.new(name, parent);",
+        "  endfunction",
+        "",
+        "  function void build_phase(uvm_phase phase);",
+        "    super.build_phase(phase);",
+        "",
+        "    // Create sub-environments",
+    ])
+    creations = [(entry['name'], entry['env_type']) for entry in entries] + [('v_seqr', vseqr_class_name)]
+    if scoreboard_class_name:
+        creations.append(('scoreboard', scoreboard_class_name))
+    name_width = max(len(name) for name, _ in creations) + 1
+    lines.extend(f'    {name.ljust(name_width)}= {member_type}::type_id::create("{name}", this);'
+                 for name, member_type in creations)
+    lines.extend(["", "    // Get the virtual interfaces set by the testbench"])
+    for entry in entries:
+        lines.append(f"    if (!uvm_config_db#(virtual {entry['vif_type']})::get("
+                     f"this, \"\", \"{entry['config_db_name']}\", {entry['vif']}))")
+        lines.append(f"      `uvm_fatal(\"NOVIF\", \"Virtual interface must be set for {entry['vif']}\")")
+    lines.extend([
+        "  endfunction",
+        "",
+        "  function void connect_phase(uvm_phase phase);",
+        "    super.connect_phase(phase);",
+        "",
+        "    // Virtual sequencer handles",
+    ])
+    seqr_assignments = [(f"v_seqr.{entry['sequencer_name']}", f"{entry['name']}.{entry['sequencer_path']}")
+                        for entry in entries]
+    vif_assignments = [(f"{entry['name']}.{path}.vif", entry['vif'])
+                       for entry in entries for path in entry['vif_paths']]
+    target_width = max((len(target) for target, _ in seqr_assignments + vif_assignments), default=0) + 1
+    lines.extend(f"    {target.ljust(target_width)}= {source};" for target, source in seqr_assignments)
+    lines.extend(["", "    // Virtual interfaces of the UVC components"])
+    lines.extend(f"    {target.ljust(target_width)}= {source};" for target, source in vif_assignments)
+    if scoreboard_class_name:
+        lines.extend(["", "    // Output monitors to the scoreboard"])
+        lines.extend(f"    {port}.connect(scoreboard.{imp});"
+                     for port, imp in scoreboard_imports(interfaces, uvc_mapping))
+    lines.extend([
+        "  endfunction",
+        "",
+        "endclass",
+    ])
+    return '\n'.join(lines) + '\n'
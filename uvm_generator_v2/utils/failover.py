@@ -0,0 +1,189 @@
+"""
+Provider failover for UVM Generator - V2
+
+A ProviderChain orders the configured provider clients (primary first) and
+gives each one a CircuitBreaker. A breaker opens after a run of consecutive
+errors or slow responses, which routes traffic to the next provider; after a
+cooldown a single half-open probe decides whether the provider takes
+traffic again. A provider outage then costs throughput instead of failing
+the run.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one provider/model
+
+    closed: calls go through; failure_threshold consecutive failures open it
+    open: calls are refused until cooldown seconds have passed
+    half_open: one probe call is let through; success closes the circuit,
+    failure opens it again for another cooldown
+
+    A successful call slower than latency_threshold counts as a failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        latency_threshold: Optional[float] = None,
+        cooldown: float = 60.0,
+        clock=time.monotonic
+    ):
+        """
+        Args:
+            name: Provider/model, used in log messages and the summary
+            failure_threshold: Consecutive failures that open the circuit
+            latency_threshold: Seconds above which a success counts as a failure (None = off)
+            cooldown: Seconds an open circuit waits before a half-open probe
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"opened": 0, "probes": 0}
+
+    def allow(self) -> bool:
+        """True when a call may be sent (claims the probe slot when half-open)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self._clock() - self.opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            self.stats["probes"] += 1
+            logger.info(f"Circuit {self.name} half-open: sending probe")
+            return True
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit allows a probe (0 when not open)"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (self._clock() - self.opened_at))
+
+    def record_success(self, seconds: float):
+        """Record a completed call and its latency"""
+        if self.latency_threshold is not None and seconds > self.latency_threshold:
+            self.record_failure(f"slow response ({seconds:.1f}s > {self.latency_threshold:g}s)")
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed: provider recovered")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, reason: str = ""):
+        """Record a failed (or too slow) call"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                                and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+                self.stats["opened"] += 1
+                logger.warning(f"Circuit {self.name} opened after {self.failures} consecutive "
+                               f"failure(s) ({reason}); retrying in {self.cooldown:g}s")
+
+
+class ProviderChain:
+    """
+    Ordered provider clients with a circuit breaker each
+
+    The chain is built from the fallback clients; LLMClient puts its own
+    client in front of them as the primary (set_primary).
+
+    Usage:
+        chain = ProviderChain([create_client("openai", model="gpt-4.1")])
+        client = LLMClient(provider="anthropic", failover=chain)
+    """
+
+    def __init__(
+        self,
+        fallbacks: List,
+        failure_threshold: int = 3,
+        latency_threshold: Optional[float] = None,
+        cooldown: float = 60.0
+    ):
+        """
+        Args:
+            fallbacks: BaseLLMClients to fail over to, in order of preference
+            failure_threshold: Consecutive failures that open a provider's circuit
+            latency_threshold: Seconds above which a success counts as a failure (None = off)
+            cooldown: Seconds an open circuit waits before a half-open probe
+        """
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self.members: List[Tuple[object, CircuitBreaker]] = []
+        self.served: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {"requests": 0, "failovers": 0}
+        for client in fallbacks:
+            self._add(client)
+
+    def _add(self, client, first: bool = False):
+        breaker = CircuitBreaker(f"{client.provider}/{client.model}", self.failure_threshold,
+                                 self.latency_threshold, self.cooldown)
+        self.members.insert(0 if first else len(self.members), (client, breaker))
+        self.served[breaker.name] = 0
+
+    def set_primary(self, client):
+        """Put the primary client at the head of the chain"""
+        self._add(client, first=True)
+
+    def route(self) -> Iterator[Tuple[object, CircuitBreaker]]:
+        """
+        Yield (client, breaker) pairs to try in order
+
+        Providers whose circuit is open are skipped. Breakers are consulted
+        lazily, so a half-open probe slot is only claimed by a call that is
+        actually sent. When every circuit is open, the provider closest to
+        its next probe is tried anyway rather than failing the request.
+        """
+        self.stats["requests"] += 1
+        routed = False
+        for client, breaker in self.members:
+            if breaker.allow():
+                routed = True
+                yield client, breaker
+        if not routed:
+            yield min(self.members, key=lambda member: member[1].retry_in())
+
+    def record_served(self, breaker: CircuitBreaker):
+        """Count a request answered by this provider"""
+        self.served[breaker.name] += 1
+        if breaker is not self.members[0][1]:
+            self.stats["failovers"] += 1
+
+    def summary(self) -> str:
+        """One-line summary of failover for the run report"""
+        circuits = ", ".join(
+            f"{breaker.name} {breaker.state} ({self.served[breaker.name]} served, opened {breaker.stats['opened']}x)"
+            for _, breaker in self.members
+        )
+        return (f"Failover: {self.stats['failovers']} of {self.stats['requests']} requests served "
+                f"by a fallback provider; {circuits}")
@@ -18,6 +18,8 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+HEADER_RULE = "//" + "=" * 78
+
 
 class FileManager:
     """Manages file operations for generated UVM files"""
@@ -26,6 +28,7 @@ class FileManager:
         self.output_base = Path(output_base)
         self.created_files: List[Path] = []
         self.skipped_files: List[Path] = []
+        self.reused_files: List[Path] = []
     
     def setup_directories(self, custom_dirs: List[str] = None):
         """Create output directory structure"""
@@ -93,16 +96,30 @@ class FileManager:
         self.created_files.append(file_path)
         return file_path
     
+    def reuse_file(self, relative_path: str) -> str:
+        """
+        Keep an up-to-date file from an earlier run
+        
+        Returns:
+            The file content without the auto-generated header
+        """
+        file_path = self.output_base / relative_path
+        self.reused_files.append(file_path)
+        content = self.read_file_safe(str(file_path))
+        if content.startswith(HEADER_RULE):
+            content = content.split("\n\n", 1)[-1]
+        return content
+    
     def _generate_header(self, filename: str) -> str:
         """Generate auto-generated file header"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return f"""//==============================================================================
+        return f"""{HEADER_RULE}
 // File: {filename}
 // Auto-generated by UVM Generator V2
 // Generated: {timestamp}
 // 
 // WARNING: This file is auto-generated. Manual changes may be overwritten.
-//==============================================================================
+{HEADER_RULE}
 
 """
     
@@ -160,6 +177,8 @@ class FileManager:
         lines.append(f"\nTotal files generated: {len(self.created_files)}")
         if self.skipped_files:
             lines.append(f"Files skipped (already exist): {len(self.skipped_files)}")
+        if self.reused_files:
+            lines.append(f"Files up to date (unchanged inputs): {len(self.reused_files)}")
         lines.append("=" * 60)
         
         return "\n".join(lines)
@@ -310,6 +329,7 @@ def derive_names_from_block(block_name: str, naming_config: Dict = None) -> Dict
         'env_class': f"{snake_name}_env",
         'vseqr_class': f"{snake_name}_virtual_sequencer",
         'interface_name': f"{snake_name}_if",
+        'vif_key': f"{snake_name}_vif",
         'package_name': f"{snake_name}_pkg",
         'scoreboard_class': f"{snake_name}_scoreboard",
         'tb_module': f"{snake_name}_tb_top",
@@ -326,7 +346,7 @@ def derive_names_from_block(block_name: str, naming_config: Dict = None) -> Dict
             names['scoreboard_class'] = f"{prefix}_{names['scoreboard_class']}"
         
         # Direct overrides
-        for key in ['env_class', 'vseqr_class', 'interface_name', 'package_name', 'scoreboard_class']:
+        for key in ['env_class', 'vseqr_class', 'interface_name', 'vif_key', 'package_name', 'scoreboard_class']:
             if key in naming_config:
                 names[key] = naming_config[key]
     
@@ -0,0 +1,96 @@
+"""
+Hedged requests for UVM Generator - V2
+
+Tracks observed LLM latency per artifact type and decides when a slow
+request should be duplicated. The duplicate may go to a secondary provider;
+LLMClient takes whichever response passes validation first and cancels the
+other.
+"""
+
+import re
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_type(label: Optional[str]) -> str:
+    """Artifact type of a generation label, e.g. 'TC_01_vseq.sv' -> 'vseq'"""
+    if not label:
+        return "default"
+    stem = Path(label).stem
+    return re.split(r'[_.]', stem)[-1].lower() or "default"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of samples (pct in 0-100)"""
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class HedgePolicy:
+    """
+    Latency-percentile hedging policy
+
+    A request that has not completed after the configured percentile of
+    observed latency for its artifact type gets a duplicate. Until
+    min_samples latencies have been seen for a type, requests are not hedged.
+
+    Usage:
+        policy = HedgePolicy(percentile=95, secondary=create_client("openai"))
+        client = LLMClient(provider="anthropic", hedging=policy)
+    """
+
+    # Latencies kept per artifact type
+    WINDOW = 200
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_samples: int = 5,
+        min_delay: float = 5.0,
+        secondary=None
+    ):
+        """
+        Args:
+            percentile: Latency percentile after which a duplicate is sent
+            min_samples: Latencies needed for a type before hedging starts
+            min_delay: Never hedge earlier than this many seconds
+            secondary: BaseLLMClient for the duplicate (None = same provider)
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.secondary = secondary
+        self.latencies: Dict[str, List[float]] = {}
+        self.stats: Dict[str, int] = {"requests": 0, "hedged": 0, "hedge_wins": 0, "cancelled": 0}
+
+    def threshold(self, kind: str) -> Optional[float]:
+        """Seconds to wait before hedging a request of this type (None = don't hedge)"""
+        samples = self.latencies.get(kind, [])
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(samples, self.percentile))
+
+    def observe(self, kind: str, seconds: float):
+        """Record the latency of a completed request"""
+        samples = self.latencies.setdefault(kind, [])
+        samples.append(seconds)
+        if len(samples) > self.WINDOW:
+            del samples[0]
+
+    def summary(self) -> str:
+        """One-line summary of hedging for the run report, with current thresholds"""
+        stats = self.stats
+        thresholds = []
+        for kind in sorted(self.latencies):
+            threshold = self.threshold(kind)
+            if threshold is not None:
+                thresholds.append(f"{kind} {threshold:.1f}s")
+        line = (f"Hedging: {stats['hedged']} of {stats['requests']} requests hedged, "
+                f"{stats['hedge_wins']} won by the duplicate, {stats['cancelled']} cancelled")
+        if thresholds:
+            line += f" (p{self.percentile:g} thresholds: {', '.join(thresholds)})"
+        return line
@@ -12,9 +12,19 @@ Key Improvements:
 import os
 import re
 import time
+import asyncio
 import logging
-from typing import Dict, Optional, List
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, List, Tuple, Any, Iterator, Mapping, Callable
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from .llm_cache import ResponseCache
+from .rate_limiter import get_rate_limiter, estimate_request_tokens
+from .hedging import HedgePolicy, artifact_type
+from .failover import ProviderChain
+from .telemetry import RunLedger, call_tags
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +36,10 @@ class LLMError(Exception):
 
 class RateLimitError(LLMError):
     """Rate limit exceeded"""
-    pass
+    
+    def __init__(self, message: str = "", headers: Optional[Mapping[str, str]] = None):
+        super().__init__(message)
+        self.headers = headers  # retry-after / rate-limit headers of the 429, if any
 
 
 class TokenLimitError(LLMError):
@@ -34,13 +47,99 @@ class TokenLimitError(LLMError):
     pass
 
 
+class StreamAbortedError(LLMError):
+    """Streamed response abandoned because it is not SystemVerilog"""
+    pass
+
+
+@dataclass
+class LLMResponse:
+    """Raw LLM response with token usage"""
+    content: str
+    model: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    finish_reason: str = ""
+    headers: Mapping[str, str] = field(default_factory=dict)  # Rate-limit headers of live calls
+
+
+def _response_headers(obj) -> Mapping[str, str]:
+    """HTTP headers of an SDK response, stream or error (empty if unavailable)"""
+    return getattr(getattr(obj, 'response', None), 'headers', None) or {}
+
+
 class BaseLLMClient(ABC):
     """Abstract base class for LLM clients"""
     
+    provider: str = ""
+    model: str = ""
+    transport = None  # utils.transport.Transport; None = live API calls
+    
+    def build_messages(self, prompt: str, context: Optional[str] = None) -> List[Dict]:
+        """
+        Build the full message list sent for a prompt
+        
+        Shared static material (context) always precedes the per-call prompt
+        so that consecutive calls share a cacheable prefix.
+        """
+        if context:
+            return [{"role": "user", "content": f"{context}\n\n{prompt}"}]
+        return [{"role": "user", "content": prompt}]
+    
+    @abstractmethod
+    def request_params(self, messages: List[Dict], max_tokens: int = 4096) -> Dict[str, Any]:
+        """Provider API parameters for a message list (shared by live and batch calls)"""
+        pass
+    
+    @abstractmethod
+    def parse_response(self, response) -> LLMResponse:
+        """Convert a provider SDK response object into an LLMResponse"""
+        pass
+    
     @abstractmethod
-    def generate(self, prompt: str, max_tokens: int = 4096) -> str:
+    def send(self, params: Dict[str, Any]) -> LLMResponse:
+        """Send request parameters to the provider API and return the raw response"""
         pass
     
+    async def asend(self, params: Dict[str, Any]) -> LLMResponse:
+        """Async variant of send() (runs send() in a worker thread by default)"""
+        return await asyncio.to_thread(self.send, params)
+    
+    @abstractmethod
+    def send_stream(self, params: Dict[str, Any], response: LLMResponse) -> Iterator[str]:
+        """
+        Send request parameters and yield text chunks as they arrive
+        
+        Model, usage and finish_reason are filled into `response` as the
+        provider reports them. Closing the generator closes the HTTP stream.
+        """
+        pass
+    
+    def complete(self, messages: List[Dict], max_tokens: int = 4096) -> LLMResponse:
+        """Send a message list and return the raw response"""
+        params = self.request_params(messages, max_tokens)
+        if self.transport:
+            return self.transport.send(self, params)
+        return self.send(params)
+    
+    async def acomplete(self, messages: List[Dict], max_tokens: int = 4096) -> LLMResponse:
+        """Async variant of complete()"""
+        params = self.request_params(messages, max_tokens)
+        if self.transport:
+            return await self.transport.asend(self, params)
+        return await self.asend(params)
+    
+    def stream(self, messages: List[Dict], max_tokens: int, response: LLMResponse) -> Iterator[str]:
+        """Send a message list and yield text chunks as they arrive (see send_stream)"""
+        params = self.request_params(messages, max_tokens)
+        if self.transport:
+            return self.transport.stream(self, params, response)
+        return self.send_stream(params, response)
+    
+    def generate(self, prompt: str, max_tokens: int = 4096, context: Optional[str] = None) -> str:
+        """Generate code for a prompt (raw response passed through extract_code)"""
+        response = self.complete(self.build_messages(prompt, context), max_tokens)
+        return self.extract_code(response.content)
+    
     def extract_code(self, response: str) -> str:
         """Extract SystemVerilog code from LLM response"""
         if not response:
@@ -110,12 +209,114 @@ class BaseLLMClient(ABC):
         return issues
 
 
+class SVStreamMonitor:
+    """
+    Incremental structural check of a streamed SystemVerilog response
+    
+    Fed text chunks as they arrive; works on complete lines only. Tracks the
+    nesting of top-level units (class/module/interface/package/program) and
+    reports when generation can stop:
+    - once the top-level unit has closed and the next significant line is a
+      closing code fence or prose (another unit keeps the stream going)
+    - StreamAbortedError when more than preamble_lines prose lines come
+      before any code ("Here is the code:" is allowed by default), or prose
+      follows code outside a unit before one has closed
+    """
+    
+    # Lines allowed outside a top-level unit
+    CODE_LINE_RE = re.compile(
+        r'^(`\w+|import\b|typedef\b|virtual\s+class\b|class\b|module\b|interface\b|package\b|program\b|'
+        r'parameter\b|localparam\b|endclass\b|endmodule\b|endinterface\b|endpackage\b|endprogram\b)'
+    )
+    OPEN_RE = re.compile(r'^(?:virtual\s+class|class|module|interface|package|program)\b')
+    CLOSE_RE = re.compile(r'\b(?:endclass|endmodule|endinterface|endpackage|endprogram)\b')
+    
+    def __init__(self, preamble_lines: int = 1):
+        self.preamble_lines = preamble_lines
+        self.preamble = 0  # Prose lines seen before any code
+        self.started = False  # A code line has been seen
+        self.depth = 0
+        self.closed = False  # A top-level unit has closed
+        self.end_offset = 0  # Offset just past the last top-level close
+        self._offset = 0
+        self._pending = ""
+        self._in_comment = False
+    
+    def feed(self, text: str) -> bool:
+        """Consume a chunk; True when the stream should stop"""
+        self._pending += text
+        *lines, self._pending = self._pending.split('\n')
+        for line in lines:
+            self._offset += len(line) + 1
+            if self._check_line(line):
+                return True
+        return False
+    
+    def _strip_comments(self, line: str) -> str:
+        """Remove // and /* */ comments, tracking block comments across lines"""
+        out = []
+        i = 0
+        while i < len(line):
+            if self._in_comment:
+                end = line.find('*/', i)
+                if end < 0:
+                    return ''.join(out)
+                self._in_comment = False
+                i = end + 2
+            elif line.startswith('//', i):
+                break
+            elif line.startswith('/*', i):
+                self._in_comment = True
+                i += 2
+            else:
+                out.append(line[i])
+                i += 1
+        return ''.join(out)
+    
+    def _check_line(self, line: str) -> bool:
+        code = self._strip_comments(line).strip()
+        if not code:
+            return False
+        
+        if code.startswith('```'):
+            # Opening fence is harmless; a fence after the unit closed ends the code
+            return self.closed and self.depth == 0
+        
+        if self.depth == 0 and not self.CODE_LINE_RE.match(code):
+            if self.closed:
+                return True  # Trailing explanation after the code
+            self.preamble += 1
+            if self.started or self.preamble > self.preamble_lines:
+                raise StreamAbortedError(f"Prose outside SystemVerilog code: {code[:60]!r}")
+            return False
+        
+        self.started = True
+        if self.OPEN_RE.match(code):
+            self.depth += 1
+        closes = len(self.CLOSE_RE.findall(code))
+        if closes and self.depth > 0:
+            self.depth = max(self.depth - closes, 0)
+            if self.depth == 0:
+                self.closed = True
+                self.end_offset = self._offset
+        return False
+
+
 class AnthropicClient(BaseLLMClient):
     """Anthropic Claude API client"""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "claude-sonnet-4-20250514"):
+    provider = "anthropic"
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "claude-sonnet-4-20250514", transport=None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         self.model = model
+        self.transport = transport
+        self._async_client = None
+        self.client = None
+        
+        # Replay/synthetic transports never reach the API
+        if transport and transport.offline:
+            return
         
         if not self.api_key:
             raise ValueError("Anthropic API key not provided. Set ANTHROPIC_API_KEY env var or pass api_key.")
@@ -126,37 +327,131 @@ class AnthropicClient(BaseLLMClient):
         except ImportError:
             raise ImportError("Please install anthropic: pip install anthropic")
     
-    def generate(self, prompt: str, max_tokens: int = 8192) -> str:
+    @property
+    def async_client(self):
+        """Lazily created async SDK client used by acomplete()"""
+        if self._async_client is None:
+            import anthropic
+            self._async_client = anthropic.AsyncAnthropic(api_key=self.api_key)
+        return self._async_client
+    
+    def build_messages(self, prompt: str, context: Optional[str] = None) -> List[Dict]:
+        """
+        Build messages with a prompt-cache breakpoint after the shared context
+        
+        The context block is marked with cache_control so Anthropic caches
+        the prefix; only the trailing prompt block is billed at full price
+        on subsequent calls.
+        """
+        content = []
+        if context:
+            content.append({"type": "text", "text": context, "cache_control": {"type": "ephemeral"}})
+        content.append({"type": "text", "text": prompt})
+        return [{"role": "user", "content": content}]
+    
+    def request_params(self, messages: List[Dict], max_tokens: int = 8192) -> Dict[str, Any]:
+        # Anthropic takes the system prompt as a separate parameter
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        params = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [m for m in messages if m["role"] != "system"],
+        }
+        if system:
+            params["system"] = system
+        return params
+    
+    def parse_response(self, response) -> LLMResponse:
+        # input_tokens excludes cache reads/writes - add them back for the total
+        usage = response.usage
+        cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        prompt_tokens = usage.input_tokens + cache_read + cache_write
+        
+        return LLMResponse(
+            content=response.content[0].text,
+            model=response.model,
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": cache_read,
+                "cache_write_tokens": cache_write,
+                "completion_tokens": usage.output_tokens,
+                "total_tokens": prompt_tokens + usage.output_tokens,
+            },
+            finish_reason=response.stop_reason or ""
+        )
+    
+    def _api_error(self, e: Exception) -> LLMError:
+        """Map an SDK exception onto the LLMError hierarchy"""
+        error_str = str(e).lower()
+        if 'rate' in error_str or '429' in error_str:
+            return RateLimitError(f"Rate limit exceeded: {e}", headers=_response_headers(e))
+        elif 'token' in error_str or 'context' in error_str:
+            return TokenLimitError(f"Token limit exceeded: {e}")
+        return LLMError(f"Anthropic API error: {e}")
+    
+    def send(self, params: Dict[str, Any]) -> LLMResponse:
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            raw = self.client.messages.with_raw_response.create(**params)
+            response = self.parse_response(raw.parse())
+            response.headers = raw.headers
+            return response
             
-            raw_response = response.content[0].text
-            return self.extract_code(raw_response)
+        except Exception as e:
+            raise self._api_error(e)
+    
+    async def asend(self, params: Dict[str, Any]) -> LLMResponse:
+        try:
+            raw = await self.async_client.messages.with_raw_response.create(**params)
+            response = self.parse_response(await raw.parse())
+            response.headers = raw.headers
+            return response
             
         except Exception as e:
-            error_str = str(e).lower()
-            if 'rate' in error_str or '429' in error_str:
-                raise RateLimitError(f"Rate limit exceeded: {e}")
-            elif 'token' in error_str or 'context' in error_str:
-                raise TokenLimitError(f"Token limit exceeded: {e}")
-            raise LLMError(f"Anthropic API error: {e}")
+            raise self._api_error(e)
+    
+    def send_stream(self, params: Dict[str, Any], response: LLMResponse) -> Iterator[str]:
+        try:
+            with self.client.messages.stream(**params) as events:
+                response.headers = _response_headers(events)
+                for event in events:
+                    if event.type == "message_start":
+                        usage = event.message.usage
+                        cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+                        cache_write = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+                        response.model = event.message.model
+                        response.usage.update({
+                            "prompt_tokens": usage.input_tokens + cache_read + cache_write,
+                            "cached_tokens": cache_read,
+                            "cache_write_tokens": cache_write,
+                        })
+                    elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        yield event.delta.text
+                    elif event.type == "message_delta":
+                        response.finish_reason = event.delta.stop_reason or ""
+                        response.usage["completion_tokens"] = event.usage.output_tokens
+        except Exception as e:
+            raise self._api_error(e)
 
 
 class OpenAIClient(BaseLLMClient):
     """OpenAI GPT API client"""
     
+    provider = "openai"
+    
     # Models that use max_completion_tokens instead of max_tokens
     NEW_MODELS = ['gpt-5', 'gpt-4.5', 'gpt-4.1', 'o1', 'o3', 'gpt-4o']
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4-turbo"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4-turbo", transport=None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
+        self.transport = transport
+        self._async_client = None
+        self.client = None
+        
+        # Replay/synthetic transports never reach the API
+        if transport and transport.offline:
+            return
         
         if not self.api_key:
             raise ValueError("OpenAI API key not provided. Set OPENAI_API_KEY env var or pass api_key.")
@@ -167,41 +462,125 @@ class OpenAIClient(BaseLLMClient):
         except ImportError:
             raise ImportError("Please install openai: pip install openai")
     
+    @property
+    def async_client(self):
+        """Lazily created async SDK client used by acomplete()"""
+        if self._async_client is None:
+            import openai
+            self._async_client = openai.AsyncOpenAI(api_key=self.api_key)
+        return self._async_client
+    
     def _is_new_model(self) -> bool:
         """Check if model uses new API parameters"""
         model_lower = self.model.lower()
         return any(x in model_lower for x in self.NEW_MODELS)
     
-    def generate(self, prompt: str, max_tokens: int = 8192) -> str:
+    def build_messages(self, prompt: str, context: Optional[str] = None) -> List[Dict]:
+        """
+        Build messages in prefix-stable order for OpenAI automatic caching
+        
+        System prompt and shared context are identical across calls and come
+        first; the per-call prompt is the final message.
+        """
+        messages = [
+            {"role": "system", "content": "You are a UVM verification expert. Generate clean, compilable SystemVerilog code. Output ONLY the code, no explanations."}
+        ]
+        if context:
+            messages.append({"role": "user", "content": context})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def request_params(self, messages: List[Dict], max_tokens: int = 8192) -> Dict[str, Any]:
+        params = {"model": self.model, "messages": messages}
+        if self._is_new_model():
+            params["max_completion_tokens"] = max_tokens
+        else:
+            params["max_tokens"] = max_tokens
+        return params
+    
+    def parse_response(self, response) -> LLMResponse:
+        details = getattr(response.usage, 'prompt_tokens_details', None)
+        
+        return LLMResponse(
+            content=response.choices[0].message.content or "",
+            model=response.model,
+            usage={
+                "prompt_tokens": response.usage.prompt_tokens,
+                "cached_tokens": getattr(details, 'cached_tokens', 0) or 0,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens,
+            },
+            finish_reason=response.choices[0].finish_reason or ""
+        )
+    
+    def _api_error(self, e: Exception) -> LLMError:
+        """Map an SDK exception onto the LLMError hierarchy"""
+        error_str = str(e).lower()
+        if 'rate' in error_str or '429' in str(e):
+            return RateLimitError(f"Rate limit exceeded: {e}", headers=_response_headers(e))
+        elif 'token' in error_str or 'context' in error_str or 'length' in error_str:
+            return TokenLimitError(f"Token limit exceeded: {e}")
+        return LLMError(f"OpenAI API error: {e}")
+    
+    def send(self, params: Dict[str, Any]) -> LLMResponse:
         try:
-            messages = [
-                {"role": "system", "content": "You are a UVM verification expert. Generate clean, compilable SystemVerilog code. Output ONLY the code, no explanations."},
-                {"role": "user", "content": prompt}
-            ]
+            raw = self.client.chat.completions.with_raw_response.create(**params)
+            response = self.parse_response(raw.parse())
+            response.headers = raw.headers
+            return response
             
-            if self._is_new_model():
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    max_completion_tokens=max_tokens,
-                    messages=messages
-                )
-            else:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    max_tokens=max_tokens,
-                    messages=messages
-                )
-            
-            raw_response = response.choices[0].message.content
-            return self.extract_code(raw_response)
+        except Exception as e:
+            raise self._api_error(e)
+    
+    async def asend(self, params: Dict[str, Any]) -> LLMResponse:
+        try:
+            raw = await self.async_client.chat.completions.with_raw_response.create(**params)
+            response = self.parse_response(await raw.parse())
+            response.headers = raw.headers
+            return response
             
         except Exception as e:
-            error_str = str(e).lower()
-            if 'rate' in error_str or '429' in str(e):
-                raise RateLimitError(f"Rate limit exceeded: {e}")
-            elif 'token' in error_str or 'context' in error_str or 'length' in error_str:
-                raise TokenLimitError(f"Token limit exceeded: {e}")
-            raise LLMError(f"OpenAI API error: {e}")
+            raise self._api_error(e)
+    
+    def send_stream(self, params: Dict[str, Any], response: LLMResponse) -> Iterator[str]:
+        try:
+            chunks = self.client.chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **params
+            )
+            response.headers = _response_headers(chunks)
+            try:
+                for chunk in chunks:
+                    response.model = chunk.model or response.model
+                    if chunk.usage:
+                        details = getattr(chunk.usage, 'prompt_tokens_details', None)
+                        response.usage.update({
+                            "prompt_tokens": chunk.usage.prompt_tokens,
+                            "cached_tokens": getattr(details, 'cached_tokens', 0) or 0,
+                            "completion_tokens": chunk.usage.completion_tokens,
+                        })
+                    if chunk.choices:
+                        choice = chunk.choices[0]
+                        if choice.finish_reason:
+                            response.finish_reason = choice.finish_reason
+                        if choice.delta and choice.delta.content:
+                            yield choice.delta.content
+            finally:
+                chunks.close()
+        except Exception as e:
+            raise self._api_error(e)
+
+
+def create_client(provider: str, api_key: Optional[str] = None, model: Optional[str] = None,
+                  transport=None) -> BaseLLMClient:
+    """Create a provider client ('anthropic' or 'openai') with its default model"""
+    provider = provider.lower()
+    if provider == "anthropic":
+        return AnthropicClient(api_key=api_key, model=model or "claude-sonnet-4-20250514", transport=transport)
+    if provider == "openai":
+        return OpenAIClient(api_key=api_key, model=model or "gpt-4-turbo", transport=transport)
+    raise ValueError(f"Unknown provider: {provider}. Use 'anthropic' or 'openai'.")
 
 
 class LLMClient:
@@ -211,25 +590,373 @@ class LLMClient:
     Usage:
         client = LLMClient(provider="anthropic", api_key="...")
         code = client.generate_with_retry(prompt)
+    
+    Pass a ResponseCache to serve repeated prompts from disk. Live calls are
+    paced by a RateLimiter shared by every client of the same provider/model.
+    Pass a HedgePolicy to duplicate requests that run past the latency
+    percentile for their artifact type, and a Transport (utils.transport) to
+    record, replay or synthesize responses instead of calling the API. Pass a
+    RunLedger (utils.telemetry) to log every call and its validation issues,
+    and a ProviderChain (utils.failover) to route around a failing provider.
     """
     
-    def __init__(self, provider: str = "anthropic", api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(self, provider: str = "anthropic", api_key: Optional[str] = None, model: Optional[str] = None,
+                 cache: Optional[ResponseCache] = None, stream: bool = False, stream_dir: Optional[str] = None,
+                 rate_limit: Optional[Dict[str, int]] = None, hedging: Optional[HedgePolicy] = None,
+                 transport=None, ledger: Optional[RunLedger] = None,
+                 failover: Optional[ProviderChain] = None, stream_preamble_lines: int = 1):
         self.provider = provider.lower()
+        self.cache = cache
+        self.ledger = ledger
+        
+        # Streaming mode: tokens are written to <stream_dir>/<label>.partial as they arrive
+        self.stream = stream
+        self.stream_dir = Path(stream_dir) if stream_dir else Path(tempfile.gettempdir())
+        self.stream_preamble_lines = stream_preamble_lines  # Prose lines tolerated before the code
+        self.stream_stats: Dict[str, int] = {"streams": 0, "early_stops": 0, "aborts": 0}
+        
+        # Token usage of API calls made this run (cache hits excluded)
+        self.usage_totals: Dict[str, int] = {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
+        
+        self.client = create_client(self.provider, api_key=api_key, model=model, transport=transport)
+        self.model = model = self.client.model
+        
+        # Hedged duplicates for slow requests (non-streaming calls only)
+        self.hedging = hedging
+        if hedging and stream:
+            logger.warning("Hedging is disabled in streaming mode")
+        # One event loop for all hedged calls - async SDK connection pools are bound to it
+        self._hedge_loop: Optional[asyncio.AbstractEventLoop] = None
         
-        if self.provider == "anthropic":
-            model = model or "claude-sonnet-4-20250514"
-            self.client = AnthropicClient(api_key=api_key, model=model)
-        elif self.provider == "openai":
-            model = model or "gpt-4-turbo"
-            self.client = OpenAIClient(api_key=api_key, model=model)
+        # Provider chain with per-provider circuit breakers; its primary is self.client
+        self.failover = failover
+        if failover:
+            failover.set_primary(self.client)
+        
+        # Client-side RPM/TPM pacing; unset limits are learned from response headers
+        rate_limit = rate_limit or {}
+        self.limiter = get_rate_limiter(self.provider, model, rate_limit.get('rpm'), rate_limit.get('tpm'))
+    
+    def generate(self, prompt: str, max_tokens: int = 8192, context: Optional[str] = None,
+                 label: Optional[str] = None, accept: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Generate code using the configured LLM (served from cache when possible)
+        
+        Args:
+            prompt: Per-call prompt (sent last)
+            max_tokens: Maximum tokens in response
+            context: Shared static material sent as a cacheable prefix
+            label: Artifact name, used for the partial file in streaming mode
+            accept: Whether a response's content is usable, deciding which hedged
+                response wins (default: its code passes validate_systemverilog)
+        """
+        messages = self.client.build_messages(prompt, context)
+        
+        cache_key = self._cache_key(messages, max_tokens)
+        code = self.cached_code(cache_key, label)
+        if code is not None:
+            return code
+        
+        if self.failover:
+            response = self._complete_failover(prompt, context, messages, max_tokens, label, accept)
         else:
-            raise ValueError(f"Unknown provider: {provider}. Use 'anthropic' or 'openai'.")
+            response = self._complete_on(self.client, prompt, context, messages, max_tokens, label, accept)
+        return self.accept_response(cache_key, response)
+    
+    def _complete_failover(self, prompt: str, context: Optional[str], messages: List[Dict],
+                           max_tokens: int, label: Optional[str],
+                           accept: Optional[Callable[[str], bool]] = None) -> LLMResponse:
+        """
+        Send a request down the provider chain
         
-        self.model = model
+        Providers whose circuit is open are skipped; an API error moves on
+        to the next provider at once instead of waiting for a retry. Token
+        limit errors and aborted streams are request problems, not provider
+        health, and are raised without failing over.
+        """
+        last_error = None
+        for client, breaker in self.failover.route():
+            if last_error is not None:
+                logger.warning(f"Failing over {label or 'request'} to {breaker.name}")
+            client_messages = messages if client is self.client else client.build_messages(prompt, context)
+            started = time.monotonic()
+            try:
+                response = self._complete_on(client, prompt, context, client_messages, max_tokens, label, accept)
+            except (TokenLimitError, StreamAbortedError):
+                breaker.record_success(time.monotonic() - started)
+                raise
+            except LLMError as e:
+                breaker.record_failure(str(e)[:120])
+                last_error = e
+                continue
+            
+            breaker.record_success(time.monotonic() - started)
+            self.failover.record_served(breaker)
+            return response
+        raise last_error
     
-    def generate(self, prompt: str, max_tokens: int = 8192) -> str:
-        """Generate code using the configured LLM"""
-        return self.client.generate(prompt, max_tokens)
+    def _complete_on(self, client: BaseLLMClient, prompt: str, context: Optional[str],
+                     messages: List[Dict], max_tokens: int, label: Optional[str],
+                     accept: Optional[Callable[[str], bool]] = None) -> LLMResponse:
+        """Rate-limited call to one provider client (hedged or streamed when configured)"""
+        if self.hedging and not self.stream:
+            if self._hedge_loop is None:
+                self._hedge_loop = asyncio.new_event_loop()
+            return self._hedge_loop.run_until_complete(
+                self._complete_hedged(client, prompt, context, messages, max_tokens, label, accept)
+            )
+        
+        limiter = get_rate_limiter(client.provider, client.model)
+        queued_at = time.monotonic()
+        reserved = limiter.acquire(estimate_request_tokens(messages, max_tokens))
+        started = time.monotonic()
+        try:
+            if self.stream:
+                response = self._complete_streaming(client, messages, max_tokens, label)
+            else:
+                response = client.complete(messages, max_tokens)
+        except RateLimitError as e:
+            limiter.penalize(headers=e.headers)
+            self.record_call(label, client=client, seconds=time.monotonic() - started,
+                             queued=started - queued_at, error=e)
+            raise
+        except Exception as e:
+            # Only a 429 keeps its reservation (penalize() drained the limiter anyway)
+            limiter.release(reserved)
+            self.record_call(label, client=client, seconds=time.monotonic() - started,
+                             queued=started - queued_at, error=e)
+            raise
+        
+        self.record_call(label, response, client=client, seconds=time.monotonic() - started,
+                         queued=started - queued_at)
+        used = response.usage.get("prompt_tokens", 0) + response.usage.get("completion_tokens", 0)
+        limiter.record(reserved, used, response.headers)
+        return response
+    
+    async def _acomplete(self, client: BaseLLMClient, messages: List[Dict], max_tokens: int,
+                         label: Optional[str] = None, hedge: bool = False) -> LLMResponse:
+        """Rate-limited async call to one provider client (cancelled calls are not recorded)"""
+        limiter = get_rate_limiter(client.provider, client.model)
+        queued_at = time.monotonic()
+        reserved = await limiter.aacquire(estimate_request_tokens(messages, max_tokens))
+        started = time.monotonic()
+        try:
+            response = await client.acomplete(messages, max_tokens)
+        except RateLimitError as e:
+            limiter.penalize(headers=e.headers)
+            self.record_call(label, client=client, seconds=time.monotonic() - started,
+                             queued=started - queued_at, hedge=hedge, error=e)
+            raise
+        except Exception as e:
+            # Only a 429 keeps its reservation (penalize() drained the limiter anyway)
+            limiter.release(reserved)
+            self.record_call(label, client=client, seconds=time.monotonic() - started,
+                             queued=started - queued_at, hedge=hedge, error=e)
+            raise
+        except asyncio.CancelledError:
+            # The losing request of a hedge pair, or a cancelled failover call
+            limiter.release(reserved)
+            raise
+        
+        self.record_call(label, response, client=client, seconds=time.monotonic() - started,
+                         queued=started - queued_at, hedge=hedge)
+        used = response.usage.get("prompt_tokens", 0) + response.usage.get("completion_tokens", 0)
+        limiter.record(reserved, used, response.headers)
+        return response
+    
+    async def _complete_hedged(self, client: BaseLLMClient, prompt: str, context: Optional[str],
+                               messages: List[Dict], max_tokens: int, label: Optional[str],
+                               accept: Optional[Callable[[str], bool]] = None) -> LLMResponse:
+        """
+        Send a request and hedge it once it runs past the latency threshold
+        
+        The duplicate goes to the policy's secondary client (or the same
+        provider as `client`). The first response `accept` takes (by default,
+        one whose code passes validate_systemverilog) wins and the other
+        request is cancelled; if neither is taken, the first successful
+        response is used.
+        """
+        policy = self.hedging
+        kind = artifact_type(label)
+        threshold = policy.threshold(kind)
+        policy.stats["requests"] += 1
+        
+        loop = asyncio.get_running_loop()
+        primary = asyncio.ensure_future(self._acomplete(client, messages, max_tokens, label))
+        started = {primary: loop.time()}
+        owners = {primary: client}
+        
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done:
+            response = primary.result()
+            policy.observe(kind, loop.time() - started[primary])
+            return response
+        
+        hedge_client = policy.secondary or client
+        logger.info(f"Hedging {label or 'request'} after {threshold:.1f}s via {hedge_client.provider}/{hedge_client.model}")
+        hedge = asyncio.ensure_future(
+            self._acomplete(hedge_client, hedge_client.build_messages(prompt, context), max_tokens,
+                            label, hedge=True)
+        )
+        started[hedge] = loop.time()
+        owners[hedge] = hedge_client
+        policy.stats["hedged"] += 1
+        
+        pending = {primary, hedge}
+        fallback = None
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except LLMError as e:
+                        last_error = e
+                        continue
+                    
+                    policy.observe(kind, loop.time() - started[task])
+                    owner = owners[task]
+                    if (accept(response.content) if accept
+                            else not owner.validate_systemverilog(owner.extract_code(response.content))):
+                        if task is hedge:
+                            policy.stats["hedge_wins"] += 1
+                        return response
+                    fallback = fallback or response
+        finally:
+            for task in pending:
+                task.cancel()
+                policy.stats["cancelled"] += 1
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        if fallback is not None:
+            return fallback
+        raise last_error
+    
+    def _complete_streaming(self, client: BaseLLMClient, messages: List[Dict], max_tokens: int,
+                            label: Optional[str]) -> LLMResponse:
+        """
+        Stream a response to a partial file, stopping at the end of the code
+        
+        The stream is closed as soon as the top-level unit has closed and
+        trailing prose begins, and aborted (StreamAbortedError) when more
+        than stream_preamble_lines prose lines come before the code. The partial file is removed on success and
+        kept for inspection on abort.
+        """
+        self.stream_dir.mkdir(parents=True, exist_ok=True)
+        partial_path = self.stream_dir / f"{label or 'response'}.partial"
+        
+        response = LLMResponse(content="", model=client.model)
+        monitor = SVStreamMonitor(self.stream_preamble_lines)
+        chunks = []
+        stopped_early = False
+        self.stream_stats["streams"] += 1
+        
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            stream = client.stream(messages, max_tokens, response)
+            try:
+                for text in stream:
+                    chunks.append(text)
+                    f.write(text)
+                    f.flush()
+                    if monitor.feed(text):
+                        stopped_early = True
+                        break
+            except StreamAbortedError:
+                self.stream_stats["aborts"] += 1
+                self._record_usage(response.usage)
+                logger.warning(f"Stream aborted after {sum(len(c) for c in chunks)} chars - partial output in {partial_path}")
+                raise
+            finally:
+                stream.close()
+        
+        content = ''.join(chunks)
+        if stopped_early:
+            self.stream_stats["early_stops"] += 1
+            content = content[:monitor.end_offset]
+            response.finish_reason = response.finish_reason or "stop"
+            logger.debug(f"Stream stopped at end of code ({len(content)} chars)")
+        
+        partial_path.unlink(missing_ok=True)
+        response.content = content
+        return response
+    
+    def _cache_key(self, messages: List[Dict], max_tokens: int) -> Optional[str]:
+        """Content address of a request, or None when caching is disabled"""
+        if not self.cache:
+            return None
+        # Temperature is not set by V2 clients - keyed as None
+        return ResponseCache.make_key(self.model, messages, None, max_tokens)
+    
+    def cached_code(self, cache_key: Optional[str], label: Optional[str] = None) -> Optional[str]:
+        """Return extracted code for a cached response, or None on miss"""
+        if not cache_key:
+            return None
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            return None
+        logger.debug(f"LLM cache hit: {cache_key[:12]}")
+        self.record_call(label, cache_hit=True)
+        return self.client.extract_code(entry["content"])
+    
+    def prepare_request(self, prompt: str, max_tokens: int = 8192,
+                        context: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Provider request parameters and cache key for a prompt
+        
+        Used by batch mode so a batched prompt is the same request (and cache
+        entry) that generate() would send.
+        """
+        messages = self.client.build_messages(prompt, context)
+        return self.client.request_params(messages, max_tokens), self._cache_key(messages, max_tokens)
+    
+    def accept_response(self, cache_key: Optional[str], response: LLMResponse) -> str:
+        """Record usage, cache and extract code from a response (live or batched)"""
+        self._record_usage(response.usage)
+        
+        # Don't cache responses cut off by the token limit
+        if cache_key and response.finish_reason not in ("length", "max_tokens"):
+            self.cache.put(cache_key, {
+                "content": response.content,
+                "model": response.model,
+                "usage": response.usage,
+                "finish_reason": response.finish_reason,
+            })
+        
+        return self.client.extract_code(response.content)
+    
+    def record_call(self, label: Optional[str], response: Optional[LLMResponse] = None,
+                    client: Optional[BaseLLMClient] = None, **details):
+        """Log one call to the run ledger, if any (details as for RunLedger.record_call)"""
+        if self.ledger:
+            client = client or self.client
+            self.ledger.record_call(client.provider, client.model, label, response, **details)
+    
+    def _record_usage(self, usage: Dict[str, int]):
+        """Accumulate token usage for the run report"""
+        self.usage_totals["calls"] += 1
+        for key in ("prompt_tokens", "cached_tokens", "completion_tokens"):
+            self.usage_totals[key] += usage.get(key, 0)
+    
+    def stream_summary(self) -> str:
+        """One-line summary of streaming early stops/aborts"""
+        stats = self.stream_stats
+        return (f"Streaming: {stats['streams']} streams, {stats['early_stops']} stopped at end of code, "
+                f"{stats['aborts']} aborted")
+    
+    def prompt_cache_summary(self) -> str:
+        """One-line summary of provider prompt-cache hits"""
+        prompt_tokens = self.usage_totals["prompt_tokens"]
+        cached_tokens = self.usage_totals["cached_tokens"]
+        rate = (cached_tokens / prompt_tokens * 100) if prompt_tokens else 0.0
+        return (f"Prompt cache: {cached_tokens:,} of {prompt_tokens:,} input tokens cached "
+                f"({rate:.0f}%) over {self.usage_totals['calls']} API calls")
     
     def generate_with_retry(
         self, 
@@ -238,39 +965,47 @@ class LLMClient:
         retries: int = 5,
         base_delay: float = 1.0,
         max_delay: float = 60.0,
-        validate: bool = True
+        validate: bool = True,
+        context: Optional[str] = None,
+        label: Optional[str] = None,
+        accept: Optional[Callable[[str], bool]] = None
     ) -> str:
         """
         Generate with exponential backoff retry on failure
         
         Args:
             prompt: The prompt to send
+            context: Shared static material sent as a cacheable prefix
+            label: Artifact name, used for the partial file in streaming mode
             max_tokens: Maximum tokens in response
             retries: Number of retry attempts
             base_delay: Initial delay between retries (seconds)
             max_delay: Maximum delay between retries (seconds)
             validate: Whether to validate generated code
+            accept: Whether a response is usable, for hedging (see generate())
         """
         last_error = None
         delay = base_delay
         
         for attempt in range(retries):
             try:
-                code = self.generate(prompt, max_tokens)
+                with call_tags(attempt=attempt):
+                    code = self.generate(prompt, max_tokens, context=context, label=label, accept=accept)
                 
                 # Optional validation
                 if validate:
                     issues = self.client.validate_systemverilog(code)
                     if issues:
                         logger.warning(f"Code validation warnings: {issues}")
+                        if self.ledger:
+                            self.ledger.record_validation(label, issues)
                 
                 return code
                 
             except RateLimitError as e:
+                # The shared limiter has already paused every caller; the retry waits there
                 last_error = e
-                wait_time = min(delay * (2 ** attempt), max_delay)
-                logger.warning(f"Rate limited. Waiting {wait_time:.1f}s before retry {attempt + 1}/{retries}")
-                time.sleep(wait_time)
+                logger.warning(f"Rate limited. Retrying ({attempt + 1}/{retries})")
                 
             except TokenLimitError as e:
                 # Don't retry token limit errors - need to reduce prompt size
@@ -0,0 +1,104 @@
+"""
+Output manifest for UVM Generator - V2
+
+Records, for every generated file, a hash of the inputs that produced it:
+its vplan entry, the Block YAML, UVC mapping and UVC info, the few-shot
+examples, the prompt template version, the provider/model and, for
+dependent files, the content of the upstream files their prompts embed.
+A rerun regenerates only the files whose hash changed, so editing one test
+case of a large vplan costs that test case's requests instead of a full run.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+def input_hash(*parts: Any) -> str:
+    """SHA-256 over JSON-serialised inputs (dict key order does not matter)"""
+    digest = hashlib.sha256()
+    for part in (MANIFEST_VERSION,) + parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class OutputManifest:
+    """
+    Input hashes of the generated files, stored in <output>/.manifest.json
+
+    Paths are relative to the output directory, as passed to FileManager.
+
+    Usage:
+        manifest = OutputManifest("./output")
+        if not manifest.is_current("tests/tests/TC_1_test.sv", inputs):
+            ...  # generate and write
+            manifest.record("tests/tests/TC_1_test.sv", inputs)
+        manifest.save()
+    """
+
+    def __init__(self, output_dir: str, force: bool = False):
+        """
+        Args:
+            output_dir: Generation output directory (holds the manifest)
+            force: Treat every file as stale (hashes are still recorded)
+        """
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILE
+        self.force = force
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+        self.stats = {"reused": 0, "generated": 0}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            logger.info("Manifest version changed - regenerating all files")
+            return {}
+        return data.get("files", {})
+
+    def is_current(self, relative_path: str, inputs: str) -> bool:
+        """True when the file exists and was generated from the same inputs (counted as reused)"""
+        entry = self.entries.get(relative_path)
+        if (self.force or entry is None or entry.get("inputs") != inputs
+                or not (self.output_dir / relative_path).exists()):
+            return False
+        self.stats["reused"] += 1
+        return True
+
+    def record(self, relative_path: str, inputs: str):
+        """Record the input hash of a file that was just written"""
+        self.entries[relative_path] = {
+            "inputs": inputs,
+            "generated_at": datetime.now().isoformat(timespec="seconds")
+        }
+        self.stats["generated"] += 1
+
+    def save(self):
+        """Write the manifest (atomically, so an interrupted run keeps the previous one)"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"version": MANIFEST_VERSION, "files": self.entries},
+                                       indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        """One-line summary for the run report"""
+        line = f"Manifest: {self.stats['reused']} files up to date, {self.stats['generated']} generated"
+        if self.force:
+            line += " (--force)"
+        return line
@@ -385,6 +385,7 @@ class VplanYAMLParser:
             'parameters': {},  # All extracted parameters
             'patterns': {},
             'coverage': [],
+            'test_overrides': tc.get('Test_Overrides', tc.get('test_overrides')) or {},  # phase -> behaviour
             'raw': tc  # Keep raw data for custom access
         }
         
@@ -511,6 +512,35 @@ class ParameterTransformer:
         }
         return defaults.get(ps_phase, {'PS_FIRST': 1, 'PS_MODE': 0, 'PS_LAST': 0})
 
+    def to_ints(self, param_name: str, value: Any) -> Optional[Dict[str, int]]:
+        """
+        Integer variables for a vplan parameter value
+
+        A transformation entry may be an integer, a dict with 'value', or a
+        dict of flags (e.g. ps_phase -> PS_FIRST/PS_MODE/PS_LAST). Values
+        without an entry must be integers themselves. Unlike transform(),
+        'default' is not applied: None means the value is not understood.
+        """
+        mapping = self.transformations.get(param_name)
+        if isinstance(mapping, dict) and str(value) in mapping:
+            entry = mapping[str(value)]
+            if isinstance(entry, dict) and 'value' in entry:
+                entry = entry['value']
+            if isinstance(entry, bool):
+                return None
+            if isinstance(entry, int):
+                return {param_name: entry}
+            if isinstance(entry, dict) and entry and all(
+                    isinstance(v, int) and not isinstance(v, bool) for v in entry.values()):
+                return dict(entry)
+            return None
+        if isinstance(value, bool):
+            return None
+        try:
+            return {param_name: int(str(value))}
+        except ValueError:
+            return None
+
 
 def load_uvc_mapping(config_path: str) -> Dict:
     """Load UVC mapping configuration"""
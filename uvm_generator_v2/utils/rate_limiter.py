@@ -0,0 +1,269 @@
+"""
+Client-side rate limiting for UVM Generator - V2
+
+One token-bucket limiter per (provider, model) paces every caller against the
+requests/min and tokens/min quota. Limits come from settings.yaml and are
+corrected from the provider's rate-limit headers (x-ratelimit-* for OpenAI,
+anthropic-ratelimit-* for Anthropic) as responses arrive.
+"""
+
+import re
+import time
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List, Tuple, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+# Fallback pause after a 429 that carries no retry-after information
+DEFAULT_RETRY_AFTER = 2.0
+
+# Multiplicative decrease applied to known limits on every 429
+BACKOFF_FACTOR = 0.8
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# (limit, remaining) header names per bucket, OpenAI first then Anthropic
+RATE_LIMIT_HEADERS = {
+    "requests": [
+        ("x-ratelimit-limit-requests", "x-ratelimit-remaining-requests"),
+        ("anthropic-ratelimit-requests-limit", "anthropic-ratelimit-requests-remaining"),
+    ],
+    "tokens": [
+        ("x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens"),
+        ("anthropic-ratelimit-tokens-limit", "anthropic-ratelimit-tokens-remaining"),
+    ],
+}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse a reset duration such as `"6m0s"`, `"1.5s"` or `"20ms"` into seconds"""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds to wait according to retry-after-ms / retry-after headers, if present"""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+    """Tokens a request counts against TPM: ~4 chars/token of input plus max_tokens"""
+    chars = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            chars += sum(len(block.get("text", "")) for block in content)
+        else:
+            chars += len(content or "")
+    return chars // 4 + (max_tokens or 0)
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `limit` units per minute"""
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = float(limit) if limit else None  # None = unknown, not limited
+        self.level = self.limit or 0.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.limit:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def take(self, amount: float) -> float:
+        """Reserve amount and return the delay before it is available"""
+        if not self.limit:
+            return 0.0
+        # A request larger than the whole bucket still only waits for a full bucket
+        self.level -= min(amount, self.limit)
+        return -self.level * 60.0 / self.limit if self.level < 0 else 0.0
+
+    def observe(self, limit: Optional[float], remaining: Optional[float]):
+        """Correct the bucket from provider-reported limit/remaining values"""
+        if limit:
+            if not self.limit:
+                self.level = limit if remaining is None else remaining
+            self.limit = limit
+        if remaining is not None and self.limit:
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Shared requests/min and tokens/min budget for one provider and model
+
+    Callers reserve one request and its estimated tokens before sending. When
+    a bucket runs dry the reservation is granted with a delay, so concurrent
+    workers queue behind one budget at the quota ceiling instead of bursting
+    into 429s. A 429 pauses every caller for the advertised retry-after and
+    shrinks the known limits until the next headers correct them.
+    """
+
+    def __init__(self, name: str, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.name = name
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "requests": 0,
+            "delayed": 0,
+            "wait_seconds": 0.0,
+            "rate_limited": 0,
+        }
+
+    def configure(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        """Set configured limits (headers seen later still take precedence)"""
+        with self._lock:
+            if rpm:
+                self._requests.observe(float(rpm), None)
+            if tpm:
+                self._tokens.observe(float(tpm), None)
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve capacity for one request. Returns the delay before sending"""
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            delay = max(
+                self._paused_until - now,
+                self._requests.take(1),
+                self._tokens.take(tokens),
+                0.0,
+            )
+            self.stats["requests"] += 1
+            if delay > 0:
+                self.stats["delayed"] += 1
+                self.stats["wait_seconds"] += delay
+        return delay
+
+    def acquire(self, tokens: int) -> int:
+        """Block until a request of `tokens` may be sent. Returns the reservation"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return tokens
+
+    async def aacquire(self, tokens: int) -> int:
+        """Async variant of acquire() for callers on an event loop"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Cancelled while queued (e.g. the losing hedge): the request is never sent
+                self.release(tokens)
+                raise
+        return tokens
+
+    def record(self, reserved: int, used: Optional[int], headers: Optional[Mapping[str, str]] = None):
+        """Settle a reservation with actual usage and any rate-limit headers"""
+        with self._lock:
+            if used is not None and self._tokens.limit:
+                self._tokens.level = min(self._tokens.limit, self._tokens.level + reserved - used)
+            if headers:
+                self._observe_headers(headers)
+
+    def release(self, reserved: int):
+        """Give back the tokens of a reservation whose request failed or was cancelled"""
+        self.record(reserved, 0)
+
+    def _observe_headers(self, headers: Mapping[str, str]):
+        for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+            for limit_name, remaining_name in RATE_LIMIT_HEADERS[kind]:
+                limit = _header_float(headers, limit_name)
+                remaining = _header_float(headers, remaining_name)
+                if limit or remaining is not None:
+                    bucket.observe(limit, remaining)
+                    break
+
+    def penalize(self, retry_after: Optional[float] = None, headers: Optional[Mapping[str, str]] = None) -> float:
+        """
+        Record a 429: pause all callers and back off the known limits
+
+        Returns:
+            Seconds every caller will now wait before its next request
+        """
+        retry_after = retry_after if retry_after is not None else parse_retry_after(headers)
+        with self._lock:
+            now = time.monotonic()
+            if headers:
+                self._observe_headers(headers)
+            if retry_after is None:
+                # No hint from the provider: back off longer on repeated 429s
+                retry_after = DEFAULT_RETRY_AFTER * (2 ** min(self.stats["rate_limited"], 5))
+            for bucket in (self._requests, self._tokens):
+                if bucket.limit:
+                    bucket.limit *= BACKOFF_FACTOR
+                    bucket.level = min(bucket.level, 0.0)
+            self._paused_until = max(self._paused_until, now + retry_after)
+            self.stats["rate_limited"] += 1
+            wait = self._paused_until - now
+        logger.warning(f"Rate limited ({self.name}) - pausing all requests for {wait:.1f}s")
+        return wait
+
+    def summary(self) -> str:
+        """One-line summary of pacing for the run report"""
+        stats = self.stats
+        return (
+            f"Rate limiter ({self.name}): {stats['requests']:.0f} requests, "
+            f"{stats['delayed']:.0f} paced ({stats['wait_seconds']:.1f}s total wait), "
+            f"{stats['rate_limited']:.0f} rate-limited responses"
+        )
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+_LIMITERS: Dict[Tuple[str, str], RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str, rpm: Optional[int] = None, tpm: Optional[int] = None) -> RateLimiter:
+    """Return the process-wide limiter for (provider, model), creating it on first use"""
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get((provider, model))
+        if limiter is None:
+            limiter = _LIMITERS[(provider, model)] = RateLimiter(f"{provider}/{model}", rpm, tpm)
+            return limiter
+    limiter.configure(rpm, tpm)
+    return limiter
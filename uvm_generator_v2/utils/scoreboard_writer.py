@@ -0,0 +1,197 @@
+"""
+Scoreboard skeleton renderer for UVM Generator - V2
+
+Most of a scoreboard follows from the uvc_mapping.yaml entries: the class
+and its factory registration, one analysis imp per scoreboard_port (the
+names the rendered environment connects), the constructor creating them
+and the phase signatures. render_scoreboard_skeleton() renders that part
+and leaves named holes - '// @hole <name>' lines - for the regions that
+need judgment: the expected data storage, the write() comparison and the
+report. The LLM fills only the holes in one compact request; parse_fills()
+and splice_holes() put the fills back, and check_fills() rejects fills
+that redeclare the class structure or name another class.
+"""
+
+import re
+import textwrap
+from typing import Dict, List, Tuple
+
+from .env_writer import uvc_entries
+
+# Bump when the rendered skeleton changes (part of the manifest input hash)
+SCOREBOARD_TEMPLATE_VERSION = 1
+
+# A hole in the skeleton, and the start of its fill in the LLM response
+HOLE_MARKER = re.compile(r'^[ \t]*// @hole (\w+)[ \t]*$', re.MULTILINE)
+
+# Holes inside a function body: their fill is statements only
+BODY_KEYWORDS = re.compile(r'\b(function|endfunction|task|endtask|class|endclass)\b')
+CLASS_KEYWORDS = re.compile(r'\b(class|endclass|uvm_component_utils)\b')
+COMMENT = re.compile(r'//.*?$|/\*.*?\*/', re.MULTILINE | re.DOTALL)
+
+
+def scoreboard_imps(interfaces: List[Dict], uvc_mapping: Dict) -> List[Dict]:
+    """
+    Analysis imp per interface with a scoreboard_port
+
+    The imp is the port name with an imp_ prefix, as the environment connects
+    it; the transaction type is the mapping's scoreboard_item.
+    """
+    imps = []
+    for entry in uvc_entries(interfaces, uvc_mapping):
+        if not entry['scoreboard_port']:
+            continue
+        suffix = entry['scoreboard_port'].rsplit('.', 1)[-1]
+        imps.append({
+            'name': f"imp_{suffix}",
+            'suffix': suffix,
+            'item': entry['scoreboard_item'],
+            'port': f"{entry['name']}.{entry['scoreboard_port']}",
+        })
+    return imps
+
+
+def _write_function(imp: Dict, single: bool) -> str:
+    """write() of an imp: plain write with one imp, write_<suffix> with uvm_analysis_imp_decl"""
+    return 'write' if single else f"write_{imp['suffix']}"
+
+
+def scoreboard_holes(imps: List[Dict]) -> List[Tuple[str, str]]:
+    """(hole name, what its fill holds) in skeleton order"""
+    holes = [
+        ('members', "class members: expected data storage (queue), match/mismatch counters, "
+                    "expected file name"),
+        ('build_phase', "statements of build_phase after super.build_phase (config_db overrides)"),
+        ('helpers', "complete helper functions, e.g. loading the expected data from its file"),
+    ]
+    for imp in imps:
+        function = _write_function(imp, len(imps) == 1)
+        holes.append((function, f"statements of {function}({imp['item']} t): compare t against "
+                                f"the next expected value, count and report mismatches with `uvm_error"))
+    holes.append(('report_phase', "statements of report_phase after super.report_phase: "
+                                  "print the comparison summary, `uvm_error if anything failed"))
+    return holes
+
+
+def render_scoreboard_skeleton(class_name: str, interfaces: List[Dict], uvc_mapping: Dict) -> str:
+    """
+    Render the scoreboard skeleton
+
+    Args:
+        class_name: Scoreboard class name (instance 'scoreboard' in the environment)
+        interfaces: Block YAML interfaces
+        uvc_mapping: Loaded uvc_mapping.yaml
+
+    Returns:
+        SystemVerilog scoreboard source with '// @hole <name>' lines
+    """
+    imps = scoreboard_imps(interfaces, uvc_mapping)
+    single = len(imps) == 1
+
+    lines = [
+        f"// {class_name} checking {', '.join(imp['port'] for imp in imps) or 'no monitor ports'}",
+        "// against the expected data; skeleton rendered from the UVC mapping",
+    ]
+    if not single:
+        lines.extend(f"`uvm_analysis_imp_decl(_{imp['suffix']})" for imp in imps)
+    lines.extend([
+        f"class {class_name} extends uvm_scoreboard;",
+        "",
+        f"  `uvm_component_utils({class_name})",
+        "",
+    ])
+    if imps:
+        declarations = [(f"uvm_analysis_imp{'' if single else '_' + imp['suffix']}"
+                         f"#({imp['item']}, {class_name})", imp['name']) for imp in imps]
+        width = max(len(imp_type) for imp_type, _ in declarations) + 2
+        lines.append("  // Analysis imps connected by the environment")
+        lines.extend(f"  {imp_type.ljust(width)}{name};" for imp_type, name in declarations)
+        lines.append("")
+    lines.extend([
+        "  // @hole members",
+        "",
+        "  function new(string name, uvm_component parent);",
+        "    super.new(name, parent);",
+    ])
+    lines.extend(f'    {imp["name"]} = new("{imp["name"]}", this);' for imp in imps)
+    lines.extend([
+        "  endfunction",
+        "",
+        "  function void build_phase(uvm_phase phase);",
+        "    super.build_phase(phase);",
+        "    // @hole build_phase",
+        "  endfunction",
+        "",
+        "  // @hole helpers",
+        "",
+    ])
+    for imp in imps:
+        function = _write_function(imp, single)
+        lines.extend([
+            f"  // Transactions from {imp['port']}",
+            f"  function void {function}({imp['item']} t);",
+            f"    // @hole {function}",
+            "  endfunction",
+            "",
+        ])
+    lines.extend([
+        "  function void report_phase(uvm_phase phase);",
+        "    super.report_phase(phase);",
+        "    // @hole report_phase",
+        "  endfunction",
+        "",
+        "endclass",
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def skeleton_holes(skeleton: str) -> List[str]:
+    """Hole names of a skeleton, in order"""
+    return HOLE_MARKER.findall(skeleton)
+
+
+def parse_fills(response: str) -> Dict[str, str]:
+    """Hole name -> fill of an LLM response ('// @hole <name>' lines start each fill)"""
+    parts = HOLE_MARKER.split(response)
+    # parts: [text before the first marker, name, fill, name, fill, ...]
+    return {name: textwrap.dedent(fill).strip('\n') for name, fill in zip(parts[1::2], parts[2::2])}
+
+
+def check_fills(skeleton: str, fills: Dict[str, str], class_name: str) -> List[str]:
+    """
+    Problems that keep the fills from being spliced into the skeleton (empty if none)
+
+    Every hole needs a fill and nothing else may be filled. Body holes hold
+    statements only and class-level holes no class structure. Any
+    scoreboard class or analysis imp a fill names must be this class.
+    """
+    problems = []
+    holes = skeleton_holes(skeleton)
+    missing = [name for name in holes if name not in fills]
+    if missing:
+        problems.append(f"missing holes: {', '.join(missing)}")
+    unknown = [name for name in fills if name not in holes]
+    if unknown:
+        problems.append(f"unknown holes: {', '.join(unknown)}")
+
+    for name, fill in fills.items():
+        code = COMMENT.sub('', fill)
+        keywords = CLASS_KEYWORDS if name in ('members', 'helpers') else BODY_KEYWORDS
+        found = sorted(set(keywords.findall(code)))
+        if found:
+            problems.append(f"hole {name}: must not contain {', '.join(found)}")
+        others = {other for other in re.findall(r'\b(\w*_scoreboard)\b', code) if other != class_name}
+        others |= {other for other in re.findall(r'uvm_analysis_imp\w*\s*#\s*\([^,]+,\s*(\w+)\s*\)', code)
+                   if other != class_name}
+        if others:
+            problems.append(f"hole {name}: names {', '.join(sorted(others))} instead of {class_name}")
+    return problems
+
+
+def splice_holes(skeleton: str, fills: Dict[str, str]) -> str:
+    """Replace every hole line of the skeleton with its fill, at the hole's indentation"""
+    def fill(match: re.Match) -> str:
+        indent = match.group(0)[:len(match.group(0)) - len(match.group(0).lstrip())]
+        text = fills.get(match.group(1), '')
+        return textwrap.indent(text, indent) if text else f"{indent}// (none)"
+    return HOLE_MARKER.sub(fill, skeleton)
@@ -0,0 +1,247 @@
+"""
+Per-call LLM telemetry for UVM Generator - V2
+
+Every LLM call of a run is appended to a JSONL ledger with its phase,
+artifact, test id, provider/model, token usage, wall time, retries,
+finish_reason and estimated cost; validation issues found in the generated
+code are logged alongside. print_summary() shows a per-phase breakdown.
+"""
+
+import json
+import functools
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from .hedging import percentile
+
+# USD per 1M tokens: (input, cached input, output). The longest matching
+# prefix wins, so dated snapshots use their family's price.
+MODEL_PRICING: Dict[str, Tuple[float, float, float]] = {
+    "claude-opus-4": (15.00, 1.50, 75.00),
+    "claude-opus-4-5": (5.00, 0.50, 25.00),
+    "claude-sonnet-4": (3.00, 0.30, 15.00),
+    "claude-3-7-sonnet": (3.00, 0.30, 15.00),
+    "claude-3-5-sonnet": (3.00, 0.30, 15.00),
+    "claude-haiku-4-5": (1.00, 0.10, 5.00),
+    "claude-3-5-haiku": (0.80, 0.08, 4.00),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4-turbo": (10.00, 10.00, 30.00),
+    "gpt-5": (1.25, 0.125, 10.00),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "o3": (2.00, 0.50, 8.00),
+    "o4-mini": (1.10, 0.275, 4.40),
+}
+
+# Anthropic prompt-cache writes cost 25% more than plain input
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+# Batch API requests are billed at half the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+
+_call_tags: contextvars.ContextVar = contextvars.ContextVar("llm_call_tags", default={})
+
+
+@contextmanager
+def call_tags(**tags):
+    """
+    Tag the LLM calls made inside the block (phase, test_id, attempt, ...)
+
+    Tags nest and follow asyncio tasks, so a phase tag and a per-test-case
+    tag combine.
+    """
+    token = _call_tags.set({**_call_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _call_tags.reset(token)
+
+
+def tagged(**tags):
+    """Decorator form of call_tags, e.g. @tagged(phase="A")"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with call_tags(**tags):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def model_pricing(model: str) -> Optional[Tuple[float, float, float]]:
+    """Per-1M-token prices of a model, or None when it is not in MODEL_PRICING"""
+    matches = [name for name in MODEL_PRICING if model == name or model.startswith(name + "-")]
+    return MODEL_PRICING[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str, usage: Dict[str, int], batch: bool = False) -> Optional[float]:
+    """Estimated USD cost of one call's token usage (None for unknown models)"""
+    pricing = model_pricing(model)
+    if pricing is None:
+        return None
+    input_price, cached_price, output_price = pricing
+    cached = usage.get("cached_tokens", 0)
+    written = usage.get("cache_write_tokens", 0)
+    uncached = usage.get("prompt_tokens", 0) - cached - written
+    cost = (uncached * input_price
+            + cached * cached_price
+            + written * input_price * CACHE_WRITE_PRICE_FACTOR
+            + usage.get("completion_tokens", 0) * output_price) / 1e6
+    return cost * BATCH_PRICE_FACTOR if batch else cost
+
+
+def default_ledger_path(output_dir: str) -> Path:
+    """Per-run ledger file under <output>/.telemetry/"""
+    return Path(output_dir) / ".telemetry" / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+class RunLedger:
+    """
+    JSONL ledger of the LLM calls of one run
+
+    Each line is a "call" record (one per API attempt or cache hit) or a
+    "validation" record (issues found in generated code). Records are also
+    kept in memory for the end-of-run breakdown; with no path the ledger is
+    in-memory only.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _append(self, record: Dict[str, Any]):
+        with self._lock:
+            self.records.append(record)
+            if self.path:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record_call(
+        self,
+        provider: str,
+        model: str,
+        label: Optional[str],
+        response=None,
+        seconds: Optional[float] = None,
+        queued: float = 0.0,
+        cache_hit: bool = False,
+        batch: bool = False,
+        hedge: bool = False,
+        error: Optional[Exception] = None,
+    ):
+        """
+        Record one LLM call
+
+        Args:
+            provider: Provider that served (or failed) the call
+            model: Requested model (the response's model is preferred)
+            label: Artifact name, e.g. 'TC_01_vseq.sv'
+            response: LLMResponse (None when the call failed)
+            seconds: Wall time of the API call (None for batch results)
+            queued: Time spent waiting on the rate limiter
+            cache_hit: Served from the response cache
+            batch: Answered through the batch API
+            hedge: Hedged duplicate of a slow request
+            error: Exception raised by a failed call
+        """
+        tags = dict(_call_tags.get())
+        usage = dict(response.usage) if response else {}
+        model = (response.model if response else None) or model
+        record = {
+            "type": "call",
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "phase": tags.pop("phase", None),
+            "artifact": label,
+            "test_id": tags.pop("test_id", None),
+            "provider": provider,
+            "model": model,
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "cached_tokens": usage.get("cached_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "seconds": round(seconds, 3) if seconds is not None else None,
+            "queued": round(queued, 3),
+            "retries": tags.pop("attempt", 0),
+            "finish_reason": response.finish_reason if response else None,
+            "cache_hit": cache_hit,
+            "batch": batch,
+            "hedge": hedge,
+            "cost": 0.0 if cache_hit or not response else estimate_cost(model, usage, batch),
+            "error": f"{type(error).__name__}: {error}" if error else None,
+        }
+        record.update(tags)
+        self._append(record)
+
+    def record_validation(self, label: Optional[str], issues: List[str]):
+        """Record validation issues found in generated code"""
+        tags = dict(_call_tags.get())
+        self._append({
+            "type": "validation",
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "phase": tags.get("phase"),
+            "artifact": label,
+            "test_id": tags.get("test_id"),
+            "issues": issues,
+        })
+
+    def phase_summary(self) -> str:
+        """Per-phase table of calls, p50/p95 latency, tokens, issues and cost ('' when no calls)"""
+        phases: Dict[str, Dict[str, Any]] = {}
+        for record in self.records:
+            row = phases.setdefault(record["phase"] or "-", _empty_row())
+            if record["type"] == "validation":
+                row["issues"] += len(record["issues"])
+                continue
+            row["calls"] += 1
+            row["retries"] += record["retries"] > 0
+            if record["cache_hit"]:
+                # Served locally: no latency, tokens or cost
+                row["cache_hits"] += 1
+                continue
+            if record["seconds"] is not None:
+                row["latencies"].append(record["seconds"])
+            row["prompt"] += record["prompt_tokens"]
+            row["completion"] += record["completion_tokens"]
+            if record["cost"] is None:
+                row["priced"] = False
+            else:
+                row["cost"] += record["cost"]
+        if not any(row["calls"] for row in phases.values()):
+            return ""
+
+        header = f"{'Phase':<6}{'Calls':>7}{'Hits':>6}{'Retries':>9}{'p50 s':>8}{'p95 s':>8}" \
+                 f"{'In tok':>10}{'Out tok':>10}{'Issues':>8}{'Cost $':>9}"
+        lines = ["LLM calls by phase:", header, "-" * len(header)]
+        total = _empty_row()
+        for name, row in phases.items():
+            lines.append(_format_row(name, row))
+            for key, value in row.items():
+                total[key] = (total[key] and value) if key == "priced" else total[key] + value
+        if len(phases) > 1:
+            lines.append(_format_row("Total", total))
+        if not total["priced"]:
+            lines.append("(+ = some calls used a model without pricing in MODEL_PRICING)")
+        return "\n".join(lines)
+
+
+def _empty_row() -> Dict[str, Any]:
+    return {"calls": 0, "cache_hits": 0, "retries": 0, "issues": 0, "latencies": [],
+            "prompt": 0, "completion": 0, "cost": 0.0, "priced": True}
+
+
+def _format_row(name: str, row: Dict[str, Any]) -> str:
+    latencies = row["latencies"]
+    p50 = f"{percentile(latencies, 50):.1f}" if latencies else "-"
+    p95 = f"{percentile(latencies, 95):.1f}" if latencies else "-"
+    cost = f"{row['cost']:.2f}" + ("" if row["priced"] else "+")
+    return (f"{name:<6}{row['calls']:>7}{row['cache_hits']:>6}{row['retries']:>9}{p50:>8}{p95:>8}"
+            f"{row['prompt']:>10,}{row['completion']:>10,}{row['issues']:>8}{cost:>9}")
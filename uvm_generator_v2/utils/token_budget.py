@@ -0,0 +1,262 @@
+"""
+Token budgeting for prompts - V2
+
+Counts prompt tokens locally before a request is sent and trims the
+lowest-priority sections (examples first, Block YAML last) until the request
+fits the model's context window.
+
+Token counts use tiktoken when installed and fall back to a ~4 chars/token
+estimate otherwise.
+"""
+
+import re
+import logging
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Callable, Tuple
+
+from .llm_client import TokenLimitError
+
+try:
+    import tiktoken
+except ImportError:  # Optional - fall back to a character estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+# Context windows by model-name prefix (longest prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    'claude': 200_000,
+    'gpt-5': 400_000,
+    'gpt-4.1': 1_047_576,
+    'gpt-4o': 128_000,
+    'gpt-4-turbo': 128_000,
+    'gpt-4': 8_192,
+    'o1': 200_000,
+    'o3': 200_000,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# Section budgets: lower priority is trimmed first; max_tokens caps a section
+# even when the request would fit
+DEFAULT_SECTION_BUDGETS = {
+    'example': {'priority': 0, 'max_tokens': 8000},
+    'infra_context': {'priority': 1, 'max_tokens': 12000},
+    'uvc_info': {'priority': 2, 'max_tokens': 8000},
+    'block_yaml': {'priority': 3, 'max_tokens': None},
+}
+
+TRUNCATION_MARKER = "... [{n} lines omitted to fit token budget]"
+
+
+def context_window(model: str) -> int:
+    """Context window for a model name"""
+    model_lower = (model or '').lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model_lower.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for a model (approximate for non-OpenAI models)"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        newer = any(model.lower().startswith(p) for p in ('gpt-4o', 'gpt-4.1', 'gpt-5', 'o1', 'o3'))
+        return tiktoken.get_encoding('o200k_base' if newer else 'cl100k_base')
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Count tokens in text (tiktoken if available, else ~4 chars/token)"""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def compact_whitespace(text: str) -> str:
+    """Strip trailing whitespace and collapse runs of blank lines"""
+    text = re.sub(r'[ \t]+$', '', text, flags=re.MULTILINE)
+    return re.sub(r'\n{3,}', '\n\n', text).strip('\n')
+
+
+# Declarations kept when summarizing SystemVerilog examples
+SV_SKELETON_RE = re.compile(
+    r'^\s*(`\w+|import\b|typedef\b|(?:virtual\s+)?class\b|module\b|interface\b|package\b|'
+    r'end(?:class|module|interface|package|function|task)\b|'
+    r'(?:(?:extern|virtual|static|protected|local|pure)\s+)*(?:function|task)\b|'
+    r'rand\b|constraint\b|[\w:]+(?:\s*#\([^;]*\))?\s+\w+(?:\s*\[[^\]]*\])?\s*;)'
+)
+
+
+def summarize_systemverilog(code: str) -> str:
+    """
+    Reduce SystemVerilog to its skeleton
+
+    Keeps declarations, macros and function/task signatures; each run of
+    dropped body lines becomes a single elision comment.
+    """
+    lines = []
+    elided = False
+    for line in code.splitlines():
+        if SV_SKELETON_RE.match(line):
+            lines.append(line)
+            elided = False
+        elif line.strip() and not elided:
+            indent = line[:len(line) - len(line.lstrip())]
+            lines.append(f"{indent}// ...")
+            elided = True
+    return '\n'.join(lines)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "") -> str:
+    """Keep leading lines of text within max_tokens, noting what was dropped"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    lines = text.splitlines()
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER.format(n=len(lines)), model)
+    kept = []
+    used = 0
+    for line in lines:
+        cost = count_tokens(line + '\n', model)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+
+    kept.append(TRUNCATION_MARKER.format(n=len(lines) - len(kept)))
+    return '\n'.join(kept)
+
+
+@dataclass
+class PromptSection:
+    """A variable-size block of prompt input"""
+    name: str
+    text: str
+    priority: int  # Lower priority is trimmed first
+    max_tokens: Optional[int] = None
+    kind: str = "text"  # "sv" sections are summarized before truncation
+
+
+class PromptAssembler:
+    """
+    Fits prompts to the model's context window
+
+    Usage:
+        assembler = PromptAssembler(model="claude-sonnet-4-20250514")
+        prompt, context = assembler.fit(build, [
+            assembler.section('example_env', example, 'example', kind='sv'),
+            assembler.section('block_yaml', block_yaml, 'block_yaml'),
+        ])
+
+    `build` maps section name -> text to (prompt, context); it is called again
+    after each trimming step so the count always covers the real request.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_output_tokens: int = 8192,
+        context_window_tokens: Optional[int] = None,
+        safety_margin: int = 1024,
+        section_budgets: Optional[Dict[str, Dict]] = None
+    ):
+        self.model = model
+        window = context_window_tokens or context_window(model)
+        # Reserve room for the response and message framing/system prompt
+        self.budget = window - max_output_tokens - safety_margin
+        self.section_budgets = {k: dict(v) for k, v in DEFAULT_SECTION_BUDGETS.items()}
+        for name, overrides in (section_budgets or {}).items():
+            self.section_budgets.setdefault(name, {}).update(overrides or {})
+
+        self.requests = 0
+        self.trimmed_requests = 0
+
+    def section(self, name: str, text: str, budget: str, kind: str = "text") -> PromptSection:
+        """Create a section using the priority/max_tokens configured for `budget`"""
+        config = self.section_budgets.get(budget, {})
+        return PromptSection(
+            name=name,
+            text=compact_whitespace(text or ""),
+            priority=config.get('priority', 0),
+            max_tokens=config.get('max_tokens'),
+            kind=kind
+        )
+
+    def _shrink(self, section: PromptSection, text: str, target: int) -> str:
+        """Reduce text towards target tokens: summarize SV first, then truncate"""
+        if section.kind == "sv" and count_tokens(text, self.model) > target:
+            text = summarize_systemverilog(text)
+        return truncate_to_tokens(text, max(target, 0), self.model)
+
+    def _count(self, request: Tuple[str, Optional[str]]) -> int:
+        prompt, context = request
+        return count_tokens(prompt, self.model) + count_tokens(context or "", self.model)
+
+    def fit(
+        self,
+        build: Callable[[Dict[str, str]], Tuple[str, Optional[str]]],
+        sections: List[PromptSection]
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Build a request whose prompt + context fits the token budget
+
+        Returns:
+            (prompt, context) as produced by build()
+
+        Raises:
+            TokenLimitError: Request does not fit even with every section trimmed
+        """
+        self.requests += 1
+        texts = {}
+        trimmed = False
+
+        # Per-section caps apply regardless of total size
+        for section in sections:
+            text = section.text
+            if section.max_tokens and count_tokens(text, self.model) > section.max_tokens:
+                text = self._shrink(section, text, section.max_tokens)
+                trimmed = True
+            texts[section.name] = text
+
+        request = build(texts)
+        total = self._count(request)
+
+        # Trim lowest priority first until the request fits
+        for section in sorted(sections, key=lambda s: s.priority):
+            overflow = total - self.budget
+            if overflow <= 0:
+                break
+            current = count_tokens(texts[section.name], self.model)
+            if not current:
+                continue
+            original = texts[section.name]
+            texts[section.name] = self._shrink(section, original, current - overflow)
+            shrunk = build(texts)
+            shrunk_total = self._count(shrunk)
+            if shrunk_total >= total:
+                # Section is not part of this prompt (e.g. shared context disabled)
+                texts[section.name] = original
+                continue
+            trimmed = True
+            logger.info(f"Trimmed '{section.name}' from {current:,} tokens to fit the prompt budget")
+            request, total = shrunk, shrunk_total
+
+        if trimmed:
+            self.trimmed_requests += 1
+        if total > self.budget:
+            raise TokenLimitError(f"Prompt needs {total:,} tokens after trimming; budget is {self.budget:,}")
+
+        logger.debug(f"Pre-flight token count: {total:,} of {self.budget:,}")
+        return request
+
+    def summary(self) -> str:
+        """One-line summary for the run report"""
+        counter = "tiktoken" if tiktoken is not None else "estimated"
+        return (f"Prompt budget: {self.trimmed_requests} of {self.requests} requests trimmed "
+                f"(budget {self.budget:,} tokens, {counter} counts)")
@@ -0,0 +1,390 @@
+"""
+Pluggable LLM transports for UVM Generator - V2
+
+Provider clients send requests through a transport:
+- live: the provider API (default, no transport object)
+- record: the provider API, saving every request/response pair as a fixture
+- replay: recorded fixtures served offline with configurable latency
+- synthetic: SystemVerilog skeletons sized like real outputs, offline
+
+Replay and synthetic runs need no API key or network access, so the full
+Phase A -> C pipeline can be timed deterministically in CI.
+"""
+
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Any, Iterator, Tuple
+
+from .llm_client import LLMError, LLMResponse
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_MODES = ("live", "record", "replay", "synthetic")
+
+# Synthetic latency model: time to first token plus decode time
+SYNTHETIC_FIRST_TOKEN_SECONDS = 0.5
+SYNTHETIC_TOKENS_PER_SECOND = 60.0
+
+# Output size when the request carries no example of the artifact
+DEFAULT_SYNTHETIC_CHARS = 3000
+
+# Example plan of a stimulus plan prompt, echoed by the synthetic transport
+JSON_EXAMPLE = re.compile(r'```json\n(.*?)\n```', re.DOTALL)
+
+# Hole of a rendered skeleton in a prompt, filled by the synthetic transport
+HOLE_LINE = re.compile(r'^[ \t]*// @hole (\w+)[ \t]*$', re.MULTILINE)
+
+# Offline streams are delivered in chunks of this many characters
+STREAM_CHUNK_CHARS = 200
+
+
+class FixtureMissing(LLMError):
+    """Replay mode found no recorded response for a request"""
+    pass
+
+
+def _request_text(params: Dict[str, Any]) -> str:
+    """All prompt text of a request (system prompt and every message block)"""
+    parts = [params.get("system") or ""]
+    for message in params.get("messages", []):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content)
+        else:
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def _last_prompt(params: Dict[str, Any]) -> str:
+    """Text of the final (per-call) prompt of a request"""
+    messages = params.get("messages", [])
+    if not messages:
+        return ""
+    content = messages[-1].get("content") or ""
+    if isinstance(content, list):
+        return content[-1].get("text", "") if content else ""
+    return content
+
+
+class FixtureStore:
+    """
+    Directory of recorded request/response pairs
+
+    Each pair is <root>/<key[:2]>/<key>.json with the request parameters, the
+    response and the observed latency. The key hashes provider and request
+    parameters, so any prompt or model change is a miss.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps({"provider": provider, "params": params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, provider: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._path(self.make_key(provider, params)).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, provider: str, params: Dict[str, Any], response: LLMResponse, latency: float):
+        path = self._path(self.make_key(provider, params))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "provider": provider,
+            "request": params,
+            "response": {
+                "content": response.content,
+                "model": response.model,
+                "usage": response.usage,
+                "finish_reason": response.finish_reason,
+                "headers": dict(response.headers or {}),
+            },
+            "latency": latency,
+        }
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(record, ensure_ascii=False, indent=1), encoding='utf-8')
+        with self._lock:
+            tmp_path.replace(path)
+
+
+class Transport:
+    """
+    Base transport: passes requests straight to the provider client
+
+    send/asend/stream take the provider client (BaseLLMClient) and its
+    request parameters.
+    """
+
+    name = "live"
+    offline = False  # True when no API key or network is needed
+
+    def send(self, client, params: Dict[str, Any]) -> LLMResponse:
+        return client.send(params)
+
+    async def asend(self, client, params: Dict[str, Any]) -> LLMResponse:
+        return await client.asend(params)
+
+    def stream(self, client, params: Dict[str, Any], response: LLMResponse) -> Iterator[str]:
+        return client.send_stream(params, response)
+
+    def describe(self) -> str:
+        return self.name
+
+
+class RecordTransport(Transport):
+    """Live calls whose request/response pairs are saved to a fixture store"""
+
+    name = "record"
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+
+    def send(self, client, params: Dict[str, Any]) -> LLMResponse:
+        start = time.monotonic()
+        response = client.send(params)
+        self.store.put(client.provider, params, response, time.monotonic() - start)
+        return response
+
+    async def asend(self, client, params: Dict[str, Any]) -> LLMResponse:
+        start = time.monotonic()
+        response = await client.asend(params)
+        self.store.put(client.provider, params, response, time.monotonic() - start)
+        return response
+
+    def stream(self, client, params: Dict[str, Any], response: LLMResponse) -> Iterator[str]:
+        start = time.monotonic()
+        chunks = []
+        completed = False
+        stream = client.send_stream(params, response)
+        try:
+            for text in stream:
+                chunks.append(text)
+                yield text
+            completed = True
+        finally:
+            stream.close()
+            # Streams closed early at the end of the code are recorded as received
+            if completed or chunks:
+                response.content = ''.join(chunks)
+                self.store.put(client.provider, params, response, time.monotonic() - start)
+
+    def describe(self) -> str:
+        return f"record -> {self.store.root}"
+
+
+class _OfflineTransport(Transport):
+    """Shared latency handling of replay and synthetic transports"""
+
+    offline = True
+
+    def __init__(self, latency: Optional[float] = None, latency_scale: float = 1.0):
+        self.latency = latency  # Fixed seconds per request (None = recorded/modelled)
+        self.latency_scale = latency_scale
+
+    def _respond(self, client, params: Dict[str, Any]) -> Tuple[LLMResponse, float]:
+        """Response and its latency (before scaling)"""
+        raise NotImplementedError
+
+    def _resolve(self, client, params: Dict[str, Any]) -> Tuple[LLMResponse, float]:
+        response, latency = self._respond(client, params)
+        if self.latency is not None:
+            latency = self.latency
+        return response, latency * self.latency_scale
+
+    def send(self, client, params: Dict[str, Any]) -> LLMResponse:
+        response, latency = self._resolve(client, params)
+        time.sleep(latency)
+        return response
+
+    async def asend(self, client, params: Dict[str, Any]) -> LLMResponse:
+        response, latency = self._resolve(client, params)
+        await asyncio.sleep(latency)
+        return response
+
+    def stream(self, client, params: Dict[str, Any], response: LLMResponse) -> Iterator[str]:
+        result, latency = self._resolve(client, params)
+        response.model = result.model
+        response.usage.update(result.usage)
+        response.finish_reason = result.finish_reason
+
+        chunks = [result.content[i:i + STREAM_CHUNK_CHARS]
+                  for i in range(0, len(result.content), STREAM_CHUNK_CHARS)] or [""]
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield chunk
+
+
+class ReplayTransport(_OfflineTransport):
+    """
+    Serves recorded fixtures offline
+
+    Latency is the recorded latency unless a fixed latency is given; either
+    is multiplied by latency_scale.
+    """
+
+    name = "replay"
+
+    def __init__(self, store: FixtureStore, latency: Optional[float] = None, latency_scale: float = 1.0):
+        super().__init__(latency, latency_scale)
+        self.store = store
+
+    def _respond(self, client, params: Dict[str, Any]) -> Tuple[LLMResponse, float]:
+        record = self.store.get(client.provider, params)
+        if record is None:
+            key = FixtureStore.make_key(client.provider, params)
+            raise FixtureMissing(f"No recorded response for request {key[:12]} in {self.store.root} "
+                                 f"- rerun with --transport record")
+        data = record["response"]
+        response = LLMResponse(
+            content=data["content"],
+            model=data.get("model", client.model),
+            usage=dict(data.get("usage", {})),
+            finish_reason=data.get("finish_reason", "stop"),
+            headers=data.get("headers", {})
+        )
+        return response, record.get("latency", 0.0)
+
+    def describe(self) -> str:
+        latency = "recorded" if self.latency is None else f"{self.latency:g}s"
+        return f"replay <- {self.store.root} (latency {latency} x{self.latency_scale:g})"
+
+
+class SyntheticTransport(_OfflineTransport):
+    """
+    Fabricates SystemVerilog skeletons offline
+
+    Output is sized like the example of the same artifact found in the
+    request (or DEFAULT_SYNTHETIC_CHARS); latency follows a first-token plus
+    tokens/second model unless a fixed latency is given. Stimulus plan
+    requests get the example plan of the prompt back, skeleton requests a
+    comment per hole.
+    """
+
+    name = "synthetic"
+
+    def _respond(self, client, params: Dict[str, Any]) -> Tuple[LLMResponse, float]:
+        request_text = _request_text(params)
+        max_tokens = params.get("max_tokens") or params.get("max_completion_tokens") or 8192
+        target = min(_example_size(request_text) or DEFAULT_SYNTHETIC_CHARS, max_tokens * 4)
+        prompt = _last_prompt(params)
+        example_plan = JSON_EXAMPLE.search(prompt)
+        holes = list(dict.fromkeys(HOLE_LINE.findall(prompt)))
+        if example_plan:
+            content = example_plan.group(1)
+        elif holes:
+            content = '\n'.join(f"// @hole {hole}\n// Synthetic fill for {hole}" for hole in holes)
+        else:
+            content = synthesize_systemverilog(prompt, target)
+
+        prompt_tokens = len(request_text) // 4
+        completion_tokens = len(content) // 4
+        response = LLMResponse(
+            content=content,
+            model=params.get("model", client.model),
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": 0,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+            finish_reason="stop"
+        )
+        return response, SYNTHETIC_FIRST_TOKEN_SECONDS + completion_tokens / SYNTHETIC_TOKENS_PER_SECOND
+
+    def describe(self) -> str:
+        latency = "modelled" if self.latency is None else f"{self.latency:g}s"
+        return f"synthetic (latency {latency} x{self.latency_scale:g})"
+
+
+def create_transport(mode: str, fixtures_dir: str = ".llm_fixtures", latency: Optional[float] = None,
+                     latency_scale: float = 1.0) -> Optional[Transport]:
+    """Create a transport by mode name (None for live API calls)"""
+    if mode == "live":
+        return None
+    if mode == "record":
+        return RecordTransport(FixtureStore(fixtures_dir))
+    if mode == "replay":
+        return ReplayTransport(FixtureStore(fixtures_dir), latency, latency_scale)
+    if mode == "synthetic":
+        return SyntheticTransport(latency, latency_scale)
+    raise ValueError(f"Unknown transport: {mode}. Use one of: {', '.join(TRANSPORT_MODES)}")
+
+
+# =============================================================================
+# Synthetic SystemVerilog
+# =============================================================================
+
+UNIT_RE = re.compile(r'^\s*(class|module|interface|package)\b.*?^\s*end\1\b', re.MULTILINE | re.DOTALL)
+NAME_PATTERNS = [
+    re.compile(r'[Cc]lass name:\s*`?(\w+)`?'),
+    re.compile(r'[Ii]nterface name:\s*`?(\w+)`?'),
+    re.compile(r'[Pp]ackage name:\s*`?(\w+)`?'),
+    re.compile(r'\b(\w+)\.sv\b'),
+]
+BASE_CLASSES = [
+    ('vseq', 'uvm_sequence'),
+    ('seq', 'uvm_sequence'),
+    ('test', 'uvm_test'),
+    ('scoreboard', 'uvm_scoreboard'),
+    ('sequencer', 'uvm_sequencer'),
+    ('seqr', 'uvm_sequencer'),
+    ('env', 'uvm_env'),
+]
+COMPONENT_BASES = ('uvm_test', 'uvm_env', 'uvm_scoreboard', 'uvm_sequencer')
+
+
+def _example_size(text: str) -> int:
+    """Length of the largest complete SV unit (the few-shot example) in text"""
+    return max((len(m.group(0)) for m in UNIT_RE.finditer(text)), default=0)
+
+
+def synthesize_systemverilog(prompt: str, target_chars: int) -> str:
+    """Deterministic SV skeleton for the artifact a prompt asks for, about target_chars long"""
+    name = next((m.group(1) for p in NAME_PATTERNS for m in [p.search(prompt)] if m), None)
+    name = name or f"synthetic_{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]}"
+    lowered = name.lower()
+
+    if lowered.endswith('_pkg') or 'UVM package' in prompt:
+        head, tail = [f"package {name};", "  import uvm_pkg::*;", '  `include "uvm_macros.svh"'], "endpackage"
+        filler = '  `include "{name}_part_{i}.sv"'
+    elif lowered.endswith('_if') or 'SystemVerilog interface' in prompt:
+        head, tail = [f"interface {name} (input logic clk, input logic resetn);"], "endinterface"
+        filler = "  logic [31:0] sig_{i};"
+    elif lowered.endswith(('_tb', '_top')):
+        head, tail = [f"module {name};", "  import uvm_pkg::*;", '  `include "uvm_macros.svh"'], "endmodule"
+        filler = "  logic [31:0] sig_{i};"
+    else:
+        base = next((b for suffix, b in BASE_CLASSES if lowered.endswith(suffix)), 'uvm_object')
+        component = base in COMPONENT_BASES
+        head = [
+            f"class {name} extends {base};",
+            f"  `{'uvm_component_utils' if component else 'uvm_object_utils'}({name})",
+            "",
+            "  task run_phase(uvm_phase phase);" if component else "  task body();",
+        ]
+        tail = "  endtask\n\nendclass"
+        filler = '    `uvm_info(get_type_name(), $sformatf("{name} step %0d", {i}), UVM_MEDIUM)'
+
+    lines = [f"// Synthetic output for {name}"] + head
+    size = sum(len(line) + 1 for line in lines) + len(tail)
+    i = 0
+    while size < target_chars:
+        line = filler.format(name=name, i=i)
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    lines.append(tail)
+    return '\n'.join(lines) + '\n'
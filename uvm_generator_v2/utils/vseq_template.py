@@ -0,0 +1,593 @@
+"""
+Deterministic virtual sequence renderer for UVM Generator - V2
+
+Most vseqs follow one shape: set the parameters, generate stimulus, run the
+C model, program the control register via pack_register(), write the
+memories/streams, start compute, wait for the output and read it back.
+VseqTemplate builds that shape as a stimulus plan - ordered run, set,
+program_reg, write, start_compute, wait and read steps - from
+uvc_mapping.yaml (sequence types, sequencer names, default files/sizes, the
+'vseq_template' section) and its 'transformations', and renders the plan
+without an LLM call. Test cases the template cannot express raise
+TemplateNotApplicable; the LLM then writes the plan, which validate_plan()
+checks against uvc_mapping.yaml and the vplan's regbank_program values
+(filled in by fill_regbank()) before it is rendered the same way.
+"""
+
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .parser import ParameterTransformer
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered SystemVerilog changes (part of the manifest input hash)
+VSEQ_TEMPLATE_VERSION = 4
+
+# Stimulus_Generation steps the template implements
+TEMPLATE_STEPS = ('regbank_program', 'input_provisioning', 'trigger_compute', 'output_read')
+
+PLACEHOLDER = re.compile(r'\{(\w+)(?::(\w+))?\}')
+
+# Stimulus plan steps, in the order a vseq usually runs them
+PLAN_OPS = ('run', 'set', 'program_reg', 'start_compute', 'write', 'wait', 'read')
+
+# Names the rendered vseq uses itself
+RESERVED_NAMES = ('pack_register', 'status', 'body', 'new')
+
+IDENTIFIER = re.compile(r'^[A-Za-z_]\w*$')
+FORMAT_SPEC = re.compile(r'%%|%-?\d*[bdhoxsBDHOXS]')
+
+
+class TemplateNotApplicable(Exception):
+    """The test case needs something the vseq template cannot express"""
+    pass
+
+
+class VseqTemplate:
+    """
+    Renders virtual sequences for test cases of the standard shape
+
+    Usage:
+        template = VseqTemplate(uvc_mapping, transformer, vseqr_class, interfaces, clock)
+        try:
+            code = template.render(tc_config)
+        except TemplateNotApplicable as e:
+            expected = template.regbank_values(tc_config)
+            plan = template.fill_regbank(llm_plan, expected)  # stimulus plan from the LLM
+            if not template.validate_plan(plan, active_uvcs, expected):
+                code = template.render_plan(tc_id, plan)
+    """
+
+    def __init__(self, uvc_mapping: Dict, transformer: ParameterTransformer,
+                 vseqr_class: str, interfaces: List[Dict], clock: str):
+        """
+        Args:
+            uvc_mapping: Parsed uvc_mapping.yaml (must have a 'vseq_template' section)
+            transformer: Vplan value -> integer transformations
+            vseqr_class: Virtual sequencer class (p_sequencer type)
+            interfaces: Block YAML interfaces (map_to_model names the vplan targets)
+            clock: Clock signal on the DUT interface
+        """
+        self.uvcs = uvc_mapping.get('uvc_mapping', {}) or {}
+        self.settings = uvc_mapping.get('vseq_template', {}) or {}
+        self.model_command = (uvc_mapping.get('c_model') or {}).get('command_format', '')
+        self.transformer = transformer
+        self.vseqr_class = vseqr_class
+        self.clock = clock
+        self.targets = self._model_targets(interfaces)
+        self.stats = {'rendered': 0, 'fallback': 0, 'planned': 0, 'plan_rejected': 0}
+
+    @staticmethod
+    def _model_targets(interfaces: List[Dict]) -> Dict[str, str]:
+        """Vplan target name -> interface, from 'map_to_model' (e.g. 'arg : kernels')"""
+        targets = {}
+        for iface in interfaces:
+            names = str(iface.get('map_to_model') or '').rsplit(':', 1)[-1]
+            for name in names.split(','):
+                if name.strip():
+                    targets[name.strip()] = iface['name']
+        return targets
+
+    def render(self, tc_config: Dict) -> str:
+        """
+        Render the vseq of a test case (counted in the coverage stats)
+
+        Raises:
+            TemplateNotApplicable: with the reason the LLM has to handle it
+        """
+        try:
+            code = self._render(tc_config)
+        except TemplateNotApplicable:
+            self.stats['fallback'] += 1
+            raise
+        self.stats['rendered'] += 1
+        return code
+
+    def summary(self) -> str:
+        """One-line template coverage for the run report"""
+        total = self.stats['rendered'] + self.stats['fallback']
+        ratio = self.stats['rendered'] / total if total else 0.0
+        summary = (f"Vseq templates: {self.stats['rendered']}/{total} rendered "
+                   f"({ratio:.0%} coverage), {self.stats['fallback']} via LLM")
+        if self.stats['planned'] or self.stats['plan_rejected']:
+            summary += (f" ({self.stats['planned']} from stimulus plans, "
+                        f"{self.stats['plan_rejected']} plans rejected)")
+        return summary
+
+    # =========================================================================
+    # Test case analysis
+    # =========================================================================
+
+    def _steps(self, tc: Dict) -> Dict[str, Any]:
+        """Stimulus_Generation steps by name (list or dict form)"""
+        stim_gen = tc.get('Stimulus_Generation', tc.get('stimulus_generation', {}))
+        items = stim_gen if isinstance(stim_gen, list) else [stim_gen]
+        steps = {}
+        for item in items:
+            if not isinstance(item, dict):
+                raise TemplateNotApplicable("unstructured Stimulus_Generation")
+            for name, value in item.items():
+                if name not in TEMPLATE_STEPS:
+                    raise TemplateNotApplicable(f"step '{name}'")
+                if name in steps:
+                    raise TemplateNotApplicable(f"repeated step '{name}'")
+                steps[name] = value or {}
+        for name in ('regbank_program', 'trigger_compute', 'output_read'):
+            if name not in steps:
+                raise TemplateNotApplicable(f"no '{name}' step")
+        return steps
+
+    def _variables(self, regbank: Dict) -> Dict[str, int]:
+        """Integer vseq variables from the regbank_program parameters"""
+        if not isinstance(regbank, dict):
+            raise TemplateNotApplicable("unstructured regbank_program")
+        variables = {}
+        for name, value in regbank.items():
+            ints = self.transformer.to_ints(name, value)
+            if ints is None:
+                raise TemplateNotApplicable(f"parameter {name}={value!r} has no transformation")
+            variables.update(ints)
+        return variables
+
+    def regbank_values(self, tc_config: Dict) -> Dict[str, int]:
+        """
+        Integer vseq variables the vplan's regbank_program fixes (mode, sign_8b, PS_* ...)
+
+        Unlike plan(), any test case shape is accepted; parameters without a
+        transformation are left out.
+        """
+        raw = tc_config.get('raw', {})
+        stim_gen = raw.get('Stimulus_Generation', raw.get('stimulus_generation', {}))
+        values = {}
+        for item in stim_gen if isinstance(stim_gen, list) else [stim_gen]:
+            regbank = item.get('regbank_program') if isinstance(item, dict) else None
+            if isinstance(regbank, dict):
+                for name, value in regbank.items():
+                    values.update(self.transformer.to_ints(name, value) or {})
+        return values
+
+    def _target_uvc(self, target: str, active_uvcs: List[str], sequence: str) -> str:
+        """Active UVC driving a vplan target with the given sequence kind"""
+        uvc = self.targets.get(target)
+        if uvc not in active_uvcs:
+            raise TemplateNotApplicable(f"target '{target}' has no active UVC")
+        if sequence not in self.uvcs.get(uvc, {}).get('sequences', {}):
+            raise TemplateNotApplicable(f"{uvc} has no '{sequence}' sequence")
+        return uvc
+
+    def _targets(self, step: Any) -> Dict[str, Any]:
+        """Target name -> entry of an input_provisioning/output_read step"""
+        if not isinstance(step, dict):
+            raise TemplateNotApplicable("unstructured target list")
+        targets = {}
+        for name, entry in step.items():
+            if not isinstance(entry, dict):
+                raise TemplateNotApplicable(f"unstructured target '{name}'")
+            targets[entry.get('target', name)] = entry
+        return targets
+
+    # =========================================================================
+    # Stimulus plan
+    # =========================================================================
+
+    def plan(self, tc_config: Dict) -> Dict[str, Any]:
+        """
+        Stimulus plan of a test case of the standard shape
+
+        Raises:
+            TemplateNotApplicable: with the reason the LLM has to plan it
+        """
+        active_uvcs = list(tc_config.get('active_uvcs', []))
+        unmapped = [uvc for uvc in active_uvcs if uvc not in self.uvcs]
+        if unmapped:
+            raise TemplateNotApplicable(f"UVCs without mapping: {', '.join(unmapped)}")
+
+        steps = self._steps(tc_config.get('raw', {}))
+        variables = self._variables(steps['regbank_program'])
+        register = self.settings.get('register') or {}
+        if register.get('uvc') not in active_uvcs:
+            raise TemplateNotApplicable(f"register UVC {register.get('uvc')} is not active")
+        for name, _, _, field in self._register_fields(register):
+            if field.get('param') and field['param'] not in variables:
+                raise TemplateNotApplicable(f"register field {name} needs parameter {field['param']}")
+
+        inputs = self._targets(steps.get('input_provisioning', {}))
+        patterns = {f"pattern_{target}": entry.get('pattern_bin', '') for target, entry in inputs.items()}
+        writes = [self._target_uvc(target, active_uvcs, 'write') for target in inputs]
+        for uvc in writes:
+            if not self.uvcs[uvc].get('default_file') or not self.uvcs[uvc].get('default_size'):
+                raise TemplateNotApplicable(f"{uvc} has no default_file/default_size")
+        # Active input UVCs the vplan does not provision are not written
+        writes = [uvc for uvc in active_uvcs if uvc in writes]
+
+        outputs = self._targets(steps['output_read'])
+        if len(outputs) != 1:
+            raise TemplateNotApplicable(f"{len(outputs)} output targets")
+        read_uvc = self._target_uvc(next(iter(outputs)), active_uvcs, 'read')
+        if not self.uvcs[read_uvc].get('default_size'):
+            raise TemplateNotApplicable(f"{read_uvc} has no default_size")
+
+        # Placeholder values: vseq variables, C model files and pattern bins
+        strings = dict(self.settings.get('model_files') or {}, **patterns)
+        commands = [(command, "Failed to generate stimulus data") for command in self.settings.get('stimulus') or []]
+        if self.model_command:
+            commands.append((self.model_command, "Failed to run the C model"))
+        plan_steps = [{'run': dict(self._command(command, variables, strings), message=message)}
+                      for command, message in commands]
+
+        capture = self.settings.get('expected_capture') or {}
+        if capture.get('enable'):
+            loaded = {capture['enable']: 1}
+            if capture.get('size'):
+                loaded[capture['size']] = self.uvcs[read_uvc]['default_size']
+            plan_steps += [{'set': {capture['enable']: 0}}, {'set': loaded}, {'set': {capture['enable']: 0}}]
+
+        plan_steps.append({'program_reg': {}})
+        plan_steps += [{'write': {'uvc': uvc}} for uvc in writes]
+        plan_steps.append({'start_compute': {}})
+        if self.settings.get('done_signal'):
+            plan_steps.append({'wait': {'signal': self.settings['done_signal'], 'value': 1}})
+        plan_steps.append({'read': {'uvc': read_uvc}})
+        return {'variables': variables, 'steps': plan_steps}
+
+    @staticmethod
+    def fill_regbank(plan: Dict[str, Any], expected: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Add the regbank_values() the plan does not declare as variables
+
+        Register fields default to these variables, so the LLM only has to
+        plan the ordering and sizes. A variable the plan declares under the
+        same name (any case) is kept for validate_plan() to check.
+        """
+        variables = plan.get('variables')
+        if variables is None:
+            variables = plan['variables'] = {}
+        if isinstance(variables, dict):
+            declared = {name.lower() for name in variables}
+            for name, value in expected.items():
+                if name.lower() not in declared:
+                    variables[name] = value
+        return plan
+
+    def validate_plan(self, plan: Dict[str, Any], active_uvcs: List[str],
+                      expected: Optional[Dict[str, int]] = None) -> List[str]:
+        """
+        Problems that keep an LLM stimulus plan from being rendered (empty if none)
+
+        Write/read UVCs must be active and have the sequence in uvc_mapping.yaml,
+        with a size/file given or defaulted there; register steps need the
+        register UVC and known fields. Variables named like an expected
+        regbank value (any case) and register fields driven by one must have
+        the vplan's value. Interface signal names are only checked to be
+        identifiers: the interface is generated, not described by the mapping.
+        """
+        problems = []
+        variables = plan.get('variables', {})
+        if not isinstance(variables, dict):
+            return ["'variables' is not an object"]
+        expected = expected or {}
+        fixed = {name.lower(): (name, value) for name, value in expected.items()}
+        for name, value in variables.items():
+            if not IDENTIFIER.match(name) or name in RESERVED_NAMES or name.startswith('seq_'):
+                problems.append(f"variable '{name}' is not a usable identifier")
+            if isinstance(value, bool) or not isinstance(value, int):
+                problems.append(f"variable '{name}' is not an integer")
+            elif name.lower() in fixed and value != fixed[name.lower()][1]:
+                problems.append(f"variable '{name}' is {value}, the vplan's regbank_program "
+                                f"gives {fixed[name.lower()][0]}={fixed[name.lower()][1]}")
+
+        def check_value(where: str, value: Any):
+            if isinstance(value, bool) or not (isinstance(value, int) or value in variables):
+                problems.append(f"{where}: {value!r} is neither an integer nor a plan variable")
+
+        steps = plan.get('steps')
+        if not isinstance(steps, list) or not steps:
+            return problems + ["'steps' is missing or empty"]
+
+        register = self.settings.get('register') or {}
+        try:
+            fields = self._register_fields(register)
+        except TemplateNotApplicable:
+            fields = []
+        seen = set()
+        for index, step in enumerate(steps, 1):
+            if not isinstance(step, dict) or len(step) != 1 or next(iter(step)) not in PLAN_OPS:
+                problems.append(f"step {index}: expected one of {', '.join(PLAN_OPS)}")
+                continue
+            op, args = next(iter(step.items()))
+            where = f"step {index} ({op})"
+            seen.add(op)
+            args = {} if args is None else args
+            if not isinstance(args, dict):
+                problems.append(f"{where}: expected an object")
+                continue
+            if op in ('program_reg', 'start_compute'):
+                if not fields or register.get('uvc') not in active_uvcs:
+                    problems.append(f"{where}: the register UVC is not active or has no layout")
+                    continue
+                known = {name: field for name, _, _, field in fields}
+                for name, value in args.items():
+                    if name not in known:
+                        problems.append(f"{where}: unknown register field '{name}'")
+                    check_value(f"{where} {name}", value)
+                    param = known.get(name, {}).get('param')
+                    actual = variables.get(value, value) if isinstance(value, str) else value
+                    if param in expected and actual != expected[param]:
+                        problems.append(f"{where}: {name}={value!r}, the vplan's regbank_program "
+                                        f"gives {param}={expected[param]}")
+                for name, field in known.items():
+                    if name not in args and field.get('param') and field['param'] not in variables:
+                        problems.append(f"{where}: register field {name} needs variable {field['param']}")
+            elif op == 'run':
+                command, call_args = args.get('command'), args.get('args', [])
+                if not isinstance(command, str) or not command or '"' in command or '\\' in command:
+                    problems.append(f"{where}: 'command' must be a non-empty string without quotes or backslashes")
+                    continue
+                if not isinstance(call_args, list) or any(arg not in variables for arg in call_args):
+                    problems.append(f"{where}: 'args' must list plan variables")
+                    continue
+                if '"' in str(args.get('message', '')):
+                    problems.append(f"{where}: 'message' must not contain quotes")
+                specs = [spec for spec in FORMAT_SPEC.findall(command) if spec != '%%']
+                if len(specs) != len(call_args):
+                    problems.append(f"{where}: {len(specs)} format fields but {len(call_args)} args")
+            elif op == 'set':
+                if not args:
+                    problems.append(f"{where}: no interface signals")
+                for signal, value in args.items():
+                    if not IDENTIFIER.match(signal):
+                        problems.append(f"{where}: '{signal}' is not a signal name")
+                    check_value(f"{where} {signal}", value)
+            elif op == 'wait':
+                if not isinstance(args.get('signal'), str) or not IDENTIFIER.match(args['signal']):
+                    problems.append(f"{where}: 'signal' must be a signal name")
+                    continue
+                check_value(where, args.get('value', 1))
+            else:
+                uvc = args.get('uvc')
+                if uvc not in active_uvcs or uvc not in self.uvcs:
+                    problems.append(f"{where}: '{uvc}' is not an active UVC of this test case")
+                    continue
+                kind = args.get('sequence', op)
+                if kind not in self.uvcs[uvc].get('sequences', {}):
+                    problems.append(f"{where}: {uvc} has no '{kind}' sequence")
+                    continue
+                size = args.get('size', self.uvcs[uvc].get('default_size'))
+                if isinstance(size, bool) or not isinstance(size, int) or size <= 0:
+                    problems.append(f"{where}: {uvc} needs a positive integer 'size'")
+                if op == 'write':
+                    path = args.get('file', self.uvcs[uvc].get('default_file'))
+                    if not isinstance(path, str) or not path or '"' in path:
+                        problems.append(f"{where}: {uvc} needs an input 'file'")
+
+        for op in ('start_compute', 'read'):
+            if op not in seen:
+                problems.append(f"the plan has no {op} step")
+        return problems
+
+    # =========================================================================
+    # Rendering
+    # =========================================================================
+
+    def _render(self, tc_config: Dict) -> str:
+        return self.render_plan(tc_config['tc_id'], self.plan(tc_config))
+
+    def render_plan(self, tc_id: str, plan: Dict[str, Any]) -> str:
+        """Render the vseq of a stimulus plan (built by plan() or validated by validate_plan())"""
+        register = self.settings.get('register') or {}
+        register_uvc = register.get('uvc')
+        variables = plan.get('variables', {})
+        steps = [(op, args or {}) for step in plan['steps'] for op, args in step.items()]
+
+        # One handle per (UVC, sequence) the plan runs, in first-use order
+        handles: Dict[Tuple[str, str], str] = {}
+        for op, args in steps:
+            if op in ('program_reg', 'start_compute'):
+                key, suffix = (register_uvc, 'configure'), 'wr'
+            elif op in ('write', 'read'):
+                key, suffix = (args['uvc'], args.get('sequence', op)), 'wr' if op == 'write' else 'rd'
+            else:
+                continue
+            if key not in handles:
+                handle = f"seq_{self._short_name(key[0])}_{suffix}"
+                taken = list(handles.values())
+                handles[key] = f"{handle}_{taken.count(handle) + 1}" if handle in taken else handle
+
+        lines = [
+            f"class {tc_id}_vseq extends uvm_sequence; // virtual sequence",
+            "",
+            f"  `uvm_object_utils({tc_id}_vseq)",
+            f"  `uvm_declare_p_sequencer({self.vseqr_class})",
+            "",
+        ]
+        width = max((len(self.uvcs[uvc]['sequences'][kind]) for uvc, kind in handles), default=0)
+        lines += [f"  {self.uvcs[uvc]['sequences'][kind]:<{width}}  {handle};" for (uvc, kind), handle in handles.items()]
+        lines.append("")
+        lines += [f"  int {name};" for name in variables]
+        lines += [
+            "",
+            f'  function new(string name = "{tc_id}_vseq");',
+            "    super.new(name);",
+            "  endfunction",
+        ]
+        if (register_uvc, 'configure') in handles:
+            lines.append("")
+            lines += self._pack_register_function(register)
+        lines += [
+            "",
+            "  task body();",
+            "    int status;",
+            "",
+            "    // Parameters from the vplan",
+        ]
+        lines += [f"    {name} = {value};" for name, value in variables.items()]
+
+        written: Dict[str, Any] = {}
+        for op, args in steps:
+            lines.append("")
+            if op == 'run':
+                command, call_args = args['command'], args.get('args', [])
+                message = (f'"{args["message"]}"' if args.get('message')
+                           else self._sv_string(f"Command failed: {command}", call_args))
+                lines += [
+                    f"    status = $system({self._sv_string(command, call_args)});",
+                    "    if (status != 0) begin",
+                    f'      `uvm_error("Vseq", {message})',
+                    "      return;",
+                    "    end",
+                ]
+            elif op == 'set':
+                lines += [f"    p_sequencer.vif.{signal} = {value};" for signal, value in args.items()]
+                lines.append(f"    @(posedge p_sequencer.vif.{self.clock});")
+            elif op == 'wait':
+                lines += [
+                    f"    while (p_sequencer.vif.{args['signal']} != {args.get('value', 1)}) begin",
+                    f"      @(posedge p_sequencer.vif.{self.clock});",
+                    "    end",
+                ]
+            elif op in ('program_reg', 'start_compute'):
+                start = op == 'start_compute'
+                written = dict(written if start else {}, **args)
+                lines += self._register_write(register, handles[(register_uvc, 'configure')], register_uvc,
+                                              "Start compute" if start else "Initialization register write",
+                                              start, written)
+            else:
+                uvc, kind = args['uvc'], args.get('sequence', op)
+                mapping = self.uvcs[uvc]
+                handle = handles[(uvc, kind)]
+                lines += [
+                    f"    // {uvc} {op}",
+                    f'    {handle} = {mapping["sequences"][kind]}::type_id::create("{handle}");',
+                    f"    {handle}.size = {args.get('size', mapping.get('default_size'))};",
+                ]
+                if op == 'write':
+                    lines.append(f'    {handle}.file_path = "{args.get("file", mapping.get("default_file"))}";')
+                lines.append(f"    {handle}.start(p_sequencer.{self._sequencer(uvc)});")
+        lines += [
+            "  endtask",
+            "",
+            "endclass",
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def _short_name(self, uvc: str) -> str:
+        return uvc.replace('m_', '', 1).replace('_env', '')
+
+    def _sequencer(self, uvc: str) -> str:
+        return self.uvcs[uvc].get('sequencer_name', f"seqr_{self._short_name(uvc)}")
+
+    def _command(self, command: str, variables: Dict[str, int], strings: Dict[str, str]) -> Dict[str, Any]:
+        """Plan 'run' step for a command with {placeholder} / {placeholder:fmt} fields"""
+        text = []
+        args = []
+        position = 0
+        for match in PLACEHOLDER.finditer(command):
+            text.append(self._sv_literal(command[position:match.start()]))
+            name, fmt = match.group(1), match.group(2)
+            if name in variables:
+                text.append(f"%{fmt or '0d'}")
+                args.append(name)
+            elif name in strings and not fmt:
+                text.append(self._sv_literal(str(strings[name])))
+            else:
+                raise TemplateNotApplicable(f"no value for {{{name}}} in '{command}'")
+            position = match.end()
+        text.append(self._sv_literal(command[position:]))
+        return {'command': ''.join(text), 'args': args}
+
+    @staticmethod
+    def _sv_literal(text: str) -> str:
+        """Escape text for a $sformatf format string"""
+        return text.replace('\\', '\\\\').replace('"', '\\"').replace('%', '%%')
+
+    @staticmethod
+    def _sv_string(text: str, args: List[str]) -> str:
+        """SV string of a format string: $sformatf with its args when it has any '%' (so '%%' reads '%')"""
+        if args or '%' in text:
+            return f'$sformatf("{text}"{"".join(f", {arg}" for arg in args)})'
+        return f'"{text}"'
+
+    def _register_fields(self, register: Dict) -> List[Tuple[str, int, int, Dict]]:
+        """(name, msb, lsb, field) of every register field"""
+        fields = register.get('fields') or []
+        if not fields or not register.get('field'):
+            raise TemplateNotApplicable("no register layout in vseq_template")
+        return [(field['name'], int(field['msb']), int(field['lsb']), field) for field in fields]
+
+    def _pack_register_function(self, register: Dict) -> List[str]:
+        """pack_register(): one argument per register field, OR'ed into its bit range"""
+        fields = self._register_fields(register)
+        lines = ["  // Pack the control register fields", "  // Register bit mapping:"]
+        for name, msb, lsb, _ in fields:
+            bits = f"[{msb}:{lsb}]" if msb != lsb else f"[{msb}]"
+            lines.append(f"  // register{bits:<8} = {name}")
+        lines.append("  function int pack_register(")
+        lines += [f"    int {name} = 0{',' if i < len(fields) - 1 else ''}" for i, (name, _, _, _) in enumerate(fields)]
+        lines += ["  );", "    int reg_val;", "    reg_val = 0;"]
+        for name, msb, lsb, _ in fields:
+            width = msb - lsb + 1
+            lines.append(f"    reg_val = reg_val | (({name} & {width}'h{(1 << width) - 1:X}) << {lsb});")
+        lines += ["    return reg_val;", "  endfunction"]
+        return lines
+
+    def _register_write(self, register: Dict, handle: str, uvc: str, comment: str, start: bool,
+                        values: Dict[str, Any]) -> List[str]:
+        """
+        Register sequence write
+
+        Fields not in 'values' take their parameter, else their start-compute
+        ('start') or initialization ('init') value.
+        """
+        fields = self._register_fields(register)
+        arguments = []
+        for name, _, _, field in fields:
+            value = values.get(name, field.get('param') or field.get('start' if start else 'init', field.get('init', 0)))
+            arguments.append(f"      .{name}({value})")
+        return [
+            f"    // {comment}",
+            f'    {handle} = {self.uvcs[uvc]["sequences"]["configure"]}::type_id::create("{handle}");',
+            f"    {handle}.{register['field']} = pack_register(",
+            ',\n'.join(arguments),
+            "    );",
+            f"    {handle}.start(p_sequencer.{self._sequencer(uvc)});",
+        ]
+
+
+def parse_plan(response: str) -> Optional[Dict[str, Any]]:
+    """The JSON stimulus plan in an LLM response, or None if there is no JSON object"""
+    start, end = response.find('{'), response.rfind('}')
+    if start < 0 or end < start:
+        return None
+    try:
+        plan = json.loads(response[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return plan if isinstance(plan, dict) else None
+
+
+def is_plan(response: str) -> bool:
+    """Whether an LLM response holds a JSON stimulus plan (the hedging check of plan requests)"""
+    return parse_plan(response) is not None
@@ -0,0 +1,95 @@
+"""
+Deterministic virtual sequencer renderer for UVM Generator - V2
+
+The virtual sequencer is fully determined by the uvc_mapping.yaml entries
+(sequencer_type, sequencer_name) and the DUT interface, so it is rendered
+directly in the layout of the golden p18_dimc_tile_wrap_virtual_sequencer.sv
+instead of being requested from the LLM. The handle names Phase B relies on
+are the mapping's own, exact by construction.
+"""
+
+from typing import Dict, List, Tuple
+
+# Bump when the rendered SystemVerilog changes (part of the manifest input hash)
+VSEQR_TEMPLATE_VERSION = 1
+
+
+def sequencer_declarations(interfaces: List[Dict], uvc_mapping: Dict) -> List[Tuple[str, str]]:
+    """
+    (sequencer type, handle name) per Block YAML interface
+
+    Taken from the interface's uvc_mapping entry; without one the type is
+    derived from the kind (istream_env -> istream_sequencer, plus the
+    interface's parameter values) and the handle from the instance name.
+    """
+    uvc_map = uvc_mapping.get('uvc_mapping', {}) if uvc_mapping else {}
+    declarations = []
+    for iface in interfaces:
+        name = iface.get('name', 'unknown')
+        info = uvc_map.get(name, {})
+        seq_type = info.get('sequencer_type', '')
+        if not seq_type:
+            kind = iface.get('kind', '')
+            seq_type = kind.split('#')[0].replace('_env', '_sequencer') if kind else 'uvm_sequencer'
+            params = iface.get('params', {})
+            if isinstance(params, dict) and params.get('values'):
+                seq_type = f"{seq_type}#({', '.join(str(v) for v in params['values'])})"
+        handle = name[2:] if name.startswith('m_') else name
+        handle = handle[:-4] if handle.endswith('_env') else handle
+        declarations.append((seq_type, info.get('sequencer_name', f"seqr_{handle}")))
+    return declarations
+
+
+def render_virtual_sequencer(
+    class_name: str,
+    interface_name: str,
+    vif_key: str,
+    interfaces: List[Dict],
+    uvc_mapping: Dict
+) -> str:
+    """
+    Render the virtual sequencer
+
+    Args:
+        class_name: Virtual sequencer class name
+        interface_name: DUT interface type (virtual interface handle 'vif')
+        vif_key: uvm_config_db key the DUT interface is set under
+        interfaces: Block YAML interfaces (one sequencer handle each)
+        uvc_mapping: Loaded uvc_mapping.yaml
+
+    Returns:
+        SystemVerilog virtual sequencer source
+    """
+    declarations = sequencer_declarations(interfaces, uvc_mapping)
+    width = max((len(seq_type) for seq_type, _ in declarations), default=0) + 2
+
+    lines = [
+        f"// {class_name} having handles to the UVC sequencers:",
+        f"// {', '.join(handle for _, handle in declarations)}",
+        "// Auto-generated by UVM Generator - do not edit manually",
+        f"class {class_name} extends uvm_sequencer;",
+        "",
+        f"  `uvm_component_utils({class_name})",
+        "",
+    ]
+    lines.extend(f"  {seq_type.ljust(width)}{handle};" for seq_type, handle in declarations)
+    lines.extend([
+        "",
+        "  // Virtual interface",
+        f"  virtual {interface_name} vif;",
+        "",
+        "  function new(string name, uvm_component parent);",
+        "    super.new(name, parent);",
+        "  endfunction",
+        "",
+        "  function void build_phase(uvm_phase phase);",
+        "    super.build_phase(phase);",
+        "",
+        "    // Get virtual interface from config_db",
+        f'    if (!uvm_config_db#(virtual {interface_name})::get(this, "", "{vif_key}", vif))',
+        f'      `uvm_fatal("NOVIF", "Virtual interface must be set for {class_name}")',
+        "  endfunction",
+        "",
+        "endclass",
+    ])
+    return '\n'.join(lines) + '\n'